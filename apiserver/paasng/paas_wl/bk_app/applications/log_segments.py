@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+"""Compressed, append-only segments for the lines of output streams.
+
+Storing one row per log line makes a build with tens of thousands of lines cost the same number of
+INSERTs, and the retention job has to delete them row by row. Lines are buffered in memory instead and
+flushed as compressed segments, each segment records the range of line offsets it covers, so that a
+range read only loads and decompresses the segments it overlaps.
+"""
+
+import gzip
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Sequence
+
+# The codec of the segments, only gzip is supported for now, the field is kept so that the
+# segments written by another codec could be recognized in the future.
+SEGMENT_CODEC_GZIP = "gzip"
+
+
+@dataclass(frozen=True)
+class LogLine:
+    """A line of an output stream
+
+    :param stream: The stream type, "STDOUT" or "STDERR"
+    :param line: The content of the line, including the ending "\\n"
+    """
+
+    stream: str
+    line: str
+
+
+def encode_segment(lines: Sequence[LogLine]) -> bytes:
+    """Encode the given lines into a compressed segment"""
+    payload = json.dumps([[log.stream, log.line] for log in lines], ensure_ascii=False, separators=(",", ":"))
+    return gzip.compress(payload.encode(), compresslevel=6)
+
+
+def decode_segment(data: bytes, codec: str = SEGMENT_CODEC_GZIP) -> List[LogLine]:
+    """Decode a compressed segment into lines"""
+    if codec != SEGMENT_CODEC_GZIP:
+        raise ValueError(f"unsupported segment codec: {codec}")
+    # The database driver may return a memoryview for binary fields
+    payload = gzip.decompress(bytes(data))
+    return [LogLine(stream=stream, line=line) for stream, line in json.loads(payload)]
+
+
+class LogSegmentBuffer:
+    """Buffer the lines in memory, call `flush_func` with the buffered lines when any of the
+    thresholds is reached.
+
+    The interval is only checked when a line is appended, the owner must call `flush` at the end.
+
+    :param flush_func: The function which persists the lines as a segment.
+    :param max_lines: Flush when the number of buffered lines reaches this value.
+    :param max_bytes: Flush when the size of buffered lines reaches this value.
+    :param max_interval: Flush when the first buffered line has waited for this many seconds.
+    :param clock: The monotonic clock, customizable for testing.
+    """
+
+    def __init__(
+        self,
+        flush_func: Callable[[List[LogLine]], None],
+        max_lines: int = 500,
+        max_bytes: int = 256 * 1024,
+        max_interval: float = 2.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.flush_func = flush_func
+        self.max_lines = max_lines
+        self.max_bytes = max_bytes
+        self.max_interval = max_interval
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._lines: List[LogLine] = []
+        self._size = 0
+        self._first_at = 0.0
+
+    def append(self, log: LogLine):
+        with self._lock:
+            if not self._lines:
+                self._first_at = self.clock()
+            self._lines.append(log)
+            self._size += len(log.line)
+            if self._should_flush():
+                self._flush()
+
+    def flush(self):
+        """Flush all the buffered lines"""
+        with self._lock:
+            self._flush()
+
+    def _should_flush(self) -> bool:
+        return (
+            len(self._lines) >= self.max_lines
+            or self._size >= self.max_bytes
+            or self.clock() - self._first_at >= self.max_interval
+        )
+
+    def _flush(self):
+        # Segments must be persisted in order, so the lock is held during flushing
+        if not self._lines:
+            return
+        lines, self._lines, self._size = self._lines, [], 0
+        self.flush_func(lines)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import logging
+import time
+from typing import Iterator, List
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from paas_wl.bk_app.applications.log_segments import SEGMENT_CODEC_GZIP, LogLine, encode_segment
+from paas_wl.bk_app.applications.models.misc import OutputStreamLine, OutputStreamSegment
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """将 OutputStream 旧的逐行日志记录(OutputStreamLine)迁移为压缩的日志片段(OutputStreamSegment)
+
+    迁移后原有的逐行记录会被删除, 已经存在日志片段的 OutputStream 会被跳过(在升级期间仍在写入的日志),
+    这部分日志在读取时仍会与日志片段合并, 不影响展示。
+    """
+
+    # 限流参数, 每迁移 1000 个 OutputStream 休眠 1 秒
+    throttle_count = 1000
+    throttle_sleep = 1
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--segment_size",
+            type=int,
+            default=500,
+            help="每个日志片段包含的最大行数, 默认 500",
+        )
+        parser.add_argument(
+            "--dry_run",
+            action="store_true",
+            help="预览模式，不执行实际迁移操作",
+        )
+
+    def handle(self, *args, **options):
+        segment_size = options["segment_size"]
+        dry_run = options["dry_run"]
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("运行在预览模式，不会执行实际迁移操作"))
+
+        migrated_count = 0
+        since_last_throttle = 0
+        for stream_id in self._get_stream_ids():
+            if OutputStreamSegment.objects.filter(output_stream_id=stream_id).exists():
+                self.stdout.write(f"OutputStream {stream_id} 已存在日志片段, 跳过")
+                continue
+
+            if dry_run:
+                count = OutputStreamLine.objects.filter(output_stream_id=stream_id).count()
+                self.stdout.write(f"[预览] OutputStream {stream_id}: 将迁移 {count} 条详细记录")
+                migrated_count += 1
+                continue
+
+            try:
+                line_count, segment_count = self._migrate_stream(stream_id, segment_size)
+            except Exception:
+                logger.exception(f"迁移 OutputStream {stream_id} 失败")
+                continue
+
+            logger.info(f"成功迁移 OutputStream {stream_id}，{line_count} 条详细记录被合并为 {segment_count} 个片段")
+            migrated_count += 1
+            since_last_throttle += 1
+            if since_last_throttle >= self.throttle_count:
+                self.stdout.write(f"休眠 {self.throttle_sleep} 秒，防止数据库压力过大")
+                time.sleep(self.throttle_sleep)
+                since_last_throttle = 0
+
+        prefix = "[预览完成]" if dry_run else "[处理完成]"
+        self.stdout.write(self.style.SUCCESS(f"{prefix} 共迁移 {migrated_count} 个 OutputStream"))
+
+    def _get_stream_ids(self) -> Iterator[str]:
+        """获取仍有逐行记录的 OutputStream"""
+        return (
+            OutputStreamLine.objects.order_by()
+            .values_list("output_stream_id", flat=True)
+            .distinct()
+            .iterator(chunk_size=1000)
+        )
+
+    def _migrate_stream(self, stream_id: str, segment_size: int) -> tuple[int, int]:
+        """将单个 OutputStream 的逐行记录迁移为日志片段
+
+        :return: (迁移的行数, 生成的片段数)
+        """
+        rows = (
+            OutputStreamLine.objects.filter(output_stream_id=stream_id)
+            .order_by("created", "id")
+            .values_list("stream", "line", "created")
+        )
+        segments: List[OutputStreamSegment] = []
+        chunk: List[tuple] = []
+        offset = 0
+        for row in rows.iterator(chunk_size=segment_size):
+            chunk.append(row)
+            if len(chunk) >= segment_size:
+                segments.append(self._make_segment(stream_id, len(segments), offset, chunk))
+                offset += len(chunk)
+                chunk = []
+        if chunk:
+            segments.append(self._make_segment(stream_id, len(segments), offset, chunk))
+            offset += len(chunk)
+
+        # 单个 OutputStream 单独事务
+        with transaction.atomic(using="workloads"):
+            OutputStreamSegment.objects.bulk_create(segments)
+            OutputStreamLine.objects.filter(output_stream_id=stream_id).delete()
+        return offset, len(segments)
+
+    @staticmethod
+    def _make_segment(stream_id: str, seq: int, start_offset: int, rows: List[tuple]) -> OutputStreamSegment:
+        return OutputStreamSegment(
+            output_stream_id=stream_id,
+            seq=seq,
+            start_offset=start_offset,
+            end_offset=start_offset + len(rows),
+            codec=SEGMENT_CODEC_GZIP,
+            data=encode_segment([LogLine(stream=stream, line=line) for stream, line, _ in rows]),
+            # 使用片段中最后一行的写入时间, 保证“最后写入时间”等判断不受迁移影响
+            created=rows[-1][2],
+        )
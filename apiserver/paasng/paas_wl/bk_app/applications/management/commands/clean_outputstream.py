@@ -25,7 +25,7 @@ from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.utils import timezone
 
-from paas_wl.bk_app.applications.models.misc import OutputStream, OutputStreamLine
+from paas_wl.bk_app.applications.models.misc import OutputStream
 
 logger = logging.getLogger(__name__)
 
@@ -131,8 +131,8 @@ class Command(BaseCommand):
 
         compressed_count = 0
 
-        for stream_id in stream_ids:
-            count = OutputStreamLine.objects.filter(output_stream_id=stream_id).count()
+        for stream in OutputStream.objects.filter(uuid__in=stream_ids):
+            stream_id, count = stream.uuid, stream.count_lines()
             if count <= 1:
                 self.stdout.write(f"[预览] OutputStream {stream_id}: 只有 {count} 条详细记录, 无需压缩")
             else:
@@ -144,31 +144,26 @@ class Command(BaseCommand):
     def _compress_uuid_batch(self, stream_ids: List[str]) -> int:
         """批量压缩 OutputStream 记录"""
         compressed_count = 0
-        for stream_id in stream_ids:
+        for stream in OutputStream.objects.filter(uuid__in=stream_ids):
+            stream_id = stream.uuid
             try:
-                queryset = OutputStreamLine.objects.filter(output_stream_id=stream_id).order_by("-created")
-                count = queryset.count()
+                count = stream.count_lines()
                 if count <= 1:
                     logger.debug(f"OutputStream {stream_id} 详细记录只有 {count} 条，跳过, 无需压缩")
                     continue
 
                 recycle_time = timezone.localtime(timezone.now()).strftime("%Y-%m-%d %H:%M:%S")
                 # 最后一条记录的时间
-                last_line_created = timezone.localtime(queryset.first().created).strftime("%Y-%m-%d %H:%M:%S")
-                # 单个 OutputStream 单独事务
-                with transaction.atomic():
-                    deleted_count, _ = OutputStreamLine.objects.filter(output_stream_id=stream_id).delete()
+                last_line_created = timezone.localtime(stream.get_last_line_created()).strftime("%Y-%m-%d %H:%M:%S")
+                # 单个 OutputStream 单独事务, 日志按片段存储, 删除的代价与片段数量而非行数相关
+                with transaction.atomic(using="workloads"):
+                    deleted_count = stream.drop_lines()
 
                     info_message = (
                         f"{OBSOLETE_MESSAGE}\n[Original log info] line count: {deleted_count},"
                         f" created at: {last_line_created}, removed at: {recycle_time}\n\n"
                     )
-
-                    OutputStreamLine.objects.create(
-                        output_stream_id=stream_id,
-                        line=info_message,
-                        stream="STDOUT",
-                    )
+                    stream.write(info_message)
                     logger.info(f"成功压缩 OutputStream {stream_id}，删除了 {deleted_count} 条详细记录")
                     compressed_count += 1
             except Exception:
@@ -16,17 +16,10 @@
 # to the current version of the project delivered to anyone in the future.
 
 import logging
-from typing import NamedTuple
-
-from django.utils import timezone
 
 from paas_wl.bk_app.applications.constants import ArtifactType
+from paas_wl.bk_app.applications.managers.image_gc import DeletionResult, RegistryImageCollector
 from paas_wl.bk_app.applications.models import Build
-from paas_wl.infras.cluster.utils import get_image_registry_by_app
-from paasng.utils.moby_distribution.registry.client import APIEndpoint, DockerRegistryV2Client
-from paasng.utils.moby_distribution.registry.exceptions import PermissionDeny, ResourceNotFound
-from paasng.utils.moby_distribution.registry.resources.manifests import ManifestRef
-from paasng.utils.moby_distribution.registry.utils import parse_image
 
 logger = logging.getLogger(__name__)
 
@@ -41,77 +34,10 @@ def mark_as_latest_artifact(build: "Build"):
     return
 
 
-class DeletionResult(NamedTuple):
-    deleted: int
-    failed: int
-
-
 def delete_redundant_images(module_id: int, max_reserved_num: int) -> DeletionResult:
     """delete redundant images by module id, the result was returned as DeletionResult namedtuple
 
     :param module_id: id of the module
     :param max_reserved_num: maximum number of images to be reserved
     """
-    builds = Build.objects.filter(
-        module_id=module_id,
-        artifact_type=ArtifactType.IMAGE,
-        artifact_deleted=False,
-        image__isnull=False,
-    ).order_by("-created")[max_reserved_num:]
-
-    if not builds:
-        logger.info("Module<%s> image count within limit, no need to clean up", module_id)
-        return DeletionResult(deleted=0, failed=0)
-
-    deleted_count = 0
-    failed_count = 0
-    success_delete_builds = []
-
-    image_registry = get_image_registry_by_app(builds[0].app)
-    docker_client = DockerRegistryV2Client.from_api_endpoint(
-        api_endpoint=APIEndpoint(url=image_registry.host),
-        username=image_registry.username,
-        password=image_registry.password,
-    )
-
-    for b in builds:
-        success = False
-        try:
-            image_info = parse_image(b.image)
-            if not image_info.tag:
-                raise ValueError(f"image tag missing, build id: {b.id}, image: {b.image}")
-
-            manifest_ref = ManifestRef(
-                repo=image_info.name,
-                reference=image_info.tag,
-                client=docker_client,
-            )
-            success = manifest_ref.delete(raise_not_found=True)
-        except PermissionDeny:
-            logger.warning("delete image %s permission denied, registry: %s", b.image, image_registry.host)
-        except ResourceNotFound:
-            # 镜像已不存在，也标记为已删除
-            success = True
-        except Exception:
-            logger.exception("delete image %s failed, registry: %s", b.image, image_registry.host)
-
-        if success:
-            deleted_count += 1
-            b.artifact_deleted = True
-            # https://stackoverflow.com/questions/64116500/update-auto-now-field-in-bulk-update
-            # https://docs.djangoproject.com/en/6.0/ref/models/querysets/#bulk-update
-            # bulk_update not call save method, so auto_now will not work here, manually update
-            b.updated = timezone.now()
-            success_delete_builds.append(b)
-        else:
-            failed_count += 1
-
-    Build.objects.bulk_update(success_delete_builds, ["artifact_deleted", "updated"])
-
-    logger.info(
-        "Module<%s> delete redundant images completed, deleted: %d, failed: %d",
-        module_id,
-        deleted_count,
-        failed_count,
-    )
-    return DeletionResult(deleted=deleted_count, failed=failed_count)
+    return RegistryImageCollector().run([module_id], max_reserved_num)
@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+"""Garbage collector for the redundant images of builds.
+
+Candidates are grouped by registry and then by repository, each registry is accessed with a single
+authenticated client. Within a repository the tags are resolved to digests concurrently, then each
+unique digest is deleted only once, no matter how many tags point to it.
+
+The repositories are processed one by one because the token of the registry is scoped to the
+repository, sharing it between concurrent requests of different repositories makes them re-authenticate
+all the time.
+"""
+
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from django.utils import timezone
+
+from paas_wl.bk_app.applications.constants import ArtifactType
+from paas_wl.bk_app.applications.models import Build
+from paas_wl.infras.cluster.entities import AppImageRegistry
+from paas_wl.infras.cluster.utils import get_image_registry_by_app
+from paasng.core.core.storages.redisdb import get_default_redis
+from paasng.utils.moby_distribution.registry.client import APIEndpoint, DockerRegistryV2Client, URLBuilder
+from paasng.utils.moby_distribution.registry.exceptions import PermissionDeny, ResourceNotFound
+from paasng.utils.moby_distribution.registry.resources.manifests import ManifestRef
+from paasng.utils.moby_distribution.registry.utils import parse_image
+
+logger = logging.getLogger(__name__)
+
+
+class DeletionResult(NamedTuple):
+    deleted: int
+    failed: int
+
+
+class ImageGCCheckpoint:
+    """Record the modules which have been cleaned up in a redis set, so that an interrupted
+    cleanup can be resumed without scanning them again.
+
+    :param key: The redis key of the checkpoint.
+    :param timeout: The expiration of the checkpoint, in seconds.
+    """
+
+    def __init__(self, key: str = "image_gc:finished_modules", timeout: int = 7 * 24 * 3600):
+        self.key = key
+        self.timeout = timeout
+        self.redis = get_default_redis()
+
+    def load(self) -> Set[str]:
+        return {m.decode() if isinstance(m, bytes) else m for m in self.redis.smembers(self.key)}
+
+    def add(self, module_ids: Iterable[str]):
+        members = [str(m) for m in module_ids]
+        if not members:
+            return
+        # Only the new members are sent, instead of rewriting the whole set after each batch
+        pipe = self.redis.pipeline()
+        pipe.sadd(self.key, *members)
+        pipe.expire(self.key, self.timeout)
+        pipe.execute()
+
+    def clear(self):
+        self.redis.delete(self.key)
+
+
+class RegistryImageCollector:
+    """Delete the redundant images of modules, only the latest `max_reserved_num` images of each
+    module are kept.
+
+    :param max_workers: The maximum number of concurrent requests to a registry.
+    :param modules_per_batch: The number of modules processed in each batch, the progress is saved
+        to the checkpoint after each batch.
+    :param checkpoint: If given, the finished modules are skipped and recorded.
+    """
+
+    def __init__(
+        self, max_workers: int = 8, modules_per_batch: int = 50, checkpoint: Optional[ImageGCCheckpoint] = None
+    ):
+        self.max_workers = max_workers
+        self.modules_per_batch = modules_per_batch
+        self.checkpoint = checkpoint
+        self._clients: Dict[Tuple[str, str], DockerRegistryV2Client] = {}
+        self._app_registries: Dict[str, AppImageRegistry] = {}
+
+    def run(self, module_ids: Iterable[str], max_reserved_num: int) -> DeletionResult:
+        """Delete the redundant images of the given modules"""
+        finished = self.checkpoint.load() if self.checkpoint else set()
+        pending = [m for m in module_ids if str(m) not in finished]
+        if finished:
+            logger.info("Resuming image gc, %d modules finished already", len(finished))
+
+        deleted_count = failed_count = 0
+        for i in range(0, len(pending), self.modules_per_batch):
+            batch = pending[i : i + self.modules_per_batch]
+            res = self._clean(self.collect(batch, max_reserved_num))
+            deleted_count += res.deleted
+            failed_count += res.failed
+            if self.checkpoint:
+                self.checkpoint.add(batch)
+        return DeletionResult(deleted=deleted_count, failed=failed_count)
+
+    def collect(self, module_ids: Iterable[str], max_reserved_num: int) -> List[Build]:
+        """Collect the builds whose images are redundant"""
+        builds = (
+            Build.objects.filter(
+                module_id__in=list(module_ids),
+                artifact_type=ArtifactType.IMAGE,
+                artifact_deleted=False,
+                image__isnull=False,
+            )
+            .select_related("app")
+            .order_by("module_id", "-created")
+        )
+        candidates = []
+        reserved: Dict[str, int] = defaultdict(int)
+        for b in builds:
+            if reserved[b.module_id] < max_reserved_num:
+                reserved[b.module_id] += 1
+                continue
+            candidates.append(b)
+        return candidates
+
+    def _clean(self, builds: List[Build]) -> DeletionResult:
+        # {(registry key): {repo: {tag: [build]}}}
+        groups: Dict[Tuple[str, str], Dict[str, Dict[str, List[Build]]]] = defaultdict(
+            lambda: defaultdict(lambda: defaultdict(list))
+        )
+        registries: Dict[Tuple[str, str], AppImageRegistry] = {}
+        failed_count = 0
+        for b in builds:
+            image_info = parse_image(b.image)
+            if not image_info.tag:
+                logger.warning("image tag missing, build id: %s, image: %s", b.uuid, b.image)
+                failed_count += 1
+                continue
+
+            registry = self._get_registry(b)
+            key = (registry.host, registry.username)
+            registries[key] = registry
+            groups[key][image_info.name][image_info.tag].append(b)
+
+        deleted_builds: List[Build] = []
+        for key, repos in groups.items():
+            client = self._get_client(registries[key])
+            for repo, builds_by_tag in repos.items():
+                deleted_tags = self._clean_repo(client, repo, list(builds_by_tag))
+                for tag, tag_builds in builds_by_tag.items():
+                    if tag in deleted_tags:
+                        deleted_builds.extend(tag_builds)
+                    else:
+                        failed_count += len(tag_builds)
+
+        now = timezone.now()
+        for b in deleted_builds:
+            b.artifact_deleted = True
+            # bulk_update not call save method, so auto_now will not work here, manually update
+            b.updated = now
+        Build.objects.bulk_update(deleted_builds, ["artifact_deleted", "updated"])
+
+        logger.info("Delete redundant images completed, deleted: %d, failed: %d", len(deleted_builds), failed_count)
+        return DeletionResult(deleted=len(deleted_builds), failed=failed_count)
+
+    def _clean_repo(self, client: DockerRegistryV2Client, repo: str, tags: List[str]) -> Set[str]:
+        """Delete the manifests of the tags in the repo, return the tags which have been deleted"""
+
+        def resolve(tag: str) -> Tuple[str, bool, Optional[str]]:
+            try:
+                descriptor = ManifestRef(repo=repo, reference=tag, client=client).get_metadata()
+            except PermissionDeny:
+                logger.warning("resolve image %s:%s permission denied, registry: %s", repo, tag, client.api_base_url)
+                return tag, False, None
+            except Exception:
+                logger.exception("resolve image %s:%s failed, registry: %s", repo, tag, client.api_base_url)
+                return tag, False, None
+            if descriptor is None:
+                # The manifest not exists any more, also regard it as deleted
+                return tag, True, None
+            if not descriptor.digest:
+                # The registry did not return the "Docker-Content-Digest" header, the manifest can not be deleted
+                logger.warning("resolve image %s:%s got no digest, registry: %s", repo, tag, client.api_base_url)
+                return tag, False, None
+            return tag, True, descriptor.digest
+
+        def delete(digest: str) -> Tuple[str, bool]:
+            url = URLBuilder.build_manifests_url(client.api_base_url, repo, digest)
+            try:
+                return digest, client.delete(url=url).ok
+            except ResourceNotFound:
+                return digest, True
+            except PermissionDeny:
+                logger.warning("delete image %s@%s permission denied, registry: %s", repo, digest, client.api_base_url)
+            except Exception:
+                logger.exception("delete image %s@%s failed, registry: %s", repo, digest, client.api_base_url)
+            return digest, False
+
+        # Resolve the first tag alone, so the token of the repo is ready before the concurrent requests
+        resolved = [resolve(tags[0])]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            resolved.extend(executor.map(resolve, tags[1:]))
+            # Tags pointing to the same manifest share the digest, delete it only once
+            digests = {digest for _, ok, digest in resolved if ok and digest}
+            deleted_digests = {digest for digest, ok in executor.map(delete, sorted(digests)) if ok}
+
+        return {tag for tag, ok, digest in resolved if ok and (digest is None or digest in deleted_digests)}
+
+    def _get_registry(self, build: Build) -> AppImageRegistry:
+        app_id = str(build.app_id)
+        if app_id not in self._app_registries:
+            self._app_registries[app_id] = get_image_registry_by_app(build.app)
+        return self._app_registries[app_id]
+
+    def _get_client(self, registry: AppImageRegistry) -> DockerRegistryV2Client:
+        key = (registry.host, registry.username)
+        if key not in self._clients:
+            self._clients[key] = DockerRegistryV2Client.from_api_endpoint(
+                api_endpoint=APIEndpoint(url=registry.host),
+                username=registry.username,
+                password=registry.password,
+            )
+        return self._clients[key]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-19 03:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0024_config_tenant_id_outputstream_tenant_id_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutputStreamSegment",
+            fields=[
+                ("id", models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("seq", models.PositiveIntegerField(help_text="片段序号，从 0 开始")),
+                ("start_offset", models.PositiveIntegerField(help_text="片段中第一行的偏移量")),
+                ("end_offset", models.PositiveIntegerField(help_text="片段中最后一行的偏移量 + 1")),
+                ("codec", models.CharField(default="gzip", help_text="压缩格式", max_length=16)),
+                ("data", models.BinaryField(help_text="压缩后的日志行")),
+                (
+                    "created",
+                    models.DateTimeField(default=django.utils.timezone.now, help_text="片段中最后一行的写入时间"),
+                ),
+                (
+                    "output_stream",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="segments",
+                        to="api.outputstream",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["seq"],
+                "unique_together": {("output_stream", "seq")},
+            },
+        ),
+    ]
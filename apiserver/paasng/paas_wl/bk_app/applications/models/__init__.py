@@ -20,7 +20,7 @@ from paas_wl.utils.models import AuditedModel, UuidAuditedModel
 from .app import WlApp
 from .build import DEFAULT_SLUG_RUNNER_ENTRYPOINT, Build, BuildProcess
 from .config import Config
-from .misc import OutputStream, OutputStreamLine
+from .misc import OutputStream, OutputStreamLine, OutputStreamSegment
 from .release import Release
 
 __all__ = [
@@ -31,6 +31,7 @@ __all__ = [
     "Config",
     "OutputStream",
     "OutputStreamLine",
+    "OutputStreamSegment",
     "Release",
     "UuidAuditedModel",
     "WlApp",
@@ -15,19 +15,148 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
-from django.db import models
+import datetime
+from contextlib import contextmanager, nullcontext
+from typing import Iterator, List, Optional
 
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from paas_wl.bk_app.applications.log_segments import (
+    SEGMENT_CODEC_GZIP,
+    LogLine,
+    LogSegmentBuffer,
+    decode_segment,
+    encode_segment,
+)
 from paas_wl.bk_app.applications.models import UuidAuditedModel
 from paasng.core.tenant.fields import tenant_id_field_factory
 
 
 class OutputStream(UuidAuditedModel):
+    """The output stream of a build or command, lines are stored as compressed segments.
+
+    Streams written before segments were introduced may still own per-line rows(`OutputStreamLine`),
+    those lines are placed before the segments, the offsets of segments start after them.
+    """
+
     tenant_id = tenant_id_field_factory()
 
     def write(self, line, stream="STDOUT"):
         if not line.endswith("\n"):
             line += "\n"
-        OutputStreamLine.objects.create(output_stream=self, line=line, stream=stream)
+        log = LogLine(stream=stream, line=line)
+        if buffer := getattr(self, "_segment_buffer", None):
+            buffer.append(log)
+        else:
+            self.append_segment([log])
+
+    @contextmanager
+    def buffered(self, **kwargs):
+        """Buffer the lines written in the context and flush them as segments, the remaining lines
+        are flushed when exiting the context.
+
+        :param kwargs: The thresholds of the buffer, see `LogSegmentBuffer`.
+        """
+        if getattr(self, "_segment_buffer", None):
+            yield
+            return
+
+        self._segment_buffer = LogSegmentBuffer(self.append_segment, **kwargs)
+        try:
+            yield
+        finally:
+            buffer, self._segment_buffer = self._segment_buffer, None
+            buffer.flush()
+
+    def append_segment(self, lines: List[LogLine]):
+        """Append the given lines to the stream as a new segment.
+
+        The position of the next segment is remembered after writing, so a stream which has only one
+        writer appends a segment with a single INSERT. When another writer has taken the position,
+        the unique seq makes the INSERT fail and the segment is appended under the stream lock instead.
+        """
+        if not lines:
+            return
+        data = encode_segment(lines)
+        if position := getattr(self, "_next_position", None):
+            try:
+                self._insert_segment(*position, lines_count=len(lines), data=data)
+            except IntegrityError:
+                self._next_position = None
+            else:
+                return
+
+        with transaction.atomic(using="workloads"):
+            # Lock the stream to serialize the writers, the offsets of segments must be continuous
+            list(OutputStream.objects.select_for_update().filter(pk=self.pk).values_list("pk", flat=True))
+            last = self.segments.order_by("-seq").values_list("seq", "end_offset").first()
+            # The first segment starts after the legacy lines, so that the offsets are global
+            seq, start_offset = (last[0] + 1, last[1]) if last else (0, self.lines.count())
+            self._insert_segment(seq, start_offset, lines_count=len(lines), data=data)
+
+    def _insert_segment(self, seq: int, start_offset: int, lines_count: int, data: bytes):
+        conn = transaction.get_connection("workloads")
+        # A failed INSERT breaks the outer transaction, isolate it with a savepoint
+        with transaction.atomic(using="workloads") if conn.in_atomic_block else nullcontext():
+            OutputStreamSegment.objects.create(
+                output_stream=self,
+                seq=seq,
+                start_offset=start_offset,
+                end_offset=start_offset + lines_count,
+                codec=SEGMENT_CODEC_GZIP,
+                data=data,
+            )
+        self._next_position = (seq + 1, start_offset + lines_count)
+
+    def iter_lines(self, start: int = 0, end: Optional[int] = None) -> Iterator[LogLine]:
+        """Iterate the lines in the offset range [start, end)
+
+        :param start: The offset of the first line.
+        :param end: The offset after the last line, None means reading to the end.
+        """
+        first_offset = self.segments.order_by("seq").values_list("start_offset", flat=True).first()
+        # The legacy lines are placed before the first segment, count them only when there are no segments
+        legacy_count = self.lines.count() if first_offset is None else first_offset
+        if start < legacy_count:
+            legacy_qs = self.lines.order_by("created", "id").values_list("stream", "line")
+            for stream, line in legacy_qs[start : legacy_count if end is None else min(end, legacy_count)]:
+                yield LogLine(stream=stream, line=line)
+
+        if first_offset is None or (end is not None and end <= max(start, first_offset)):
+            return
+
+        # Only the segments which overlap with the range are loaded
+        segments = self.segments.filter(end_offset__gt=start)
+        if end is not None:
+            segments = segments.filter(start_offset__lt=end)
+        for seg_offset, codec, data in segments.order_by("seq").values_list("start_offset", "codec", "data"):
+            lines = decode_segment(data, codec)
+            lo = max(start - seg_offset, 0)
+            hi = len(lines) if end is None else min(end - seg_offset, len(lines))
+            yield from lines[lo:hi]
+
+    def count_lines(self) -> int:
+        """Count the lines of the stream"""
+        # The offsets of segments include the legacy lines
+        end_offset = self.segments.order_by("-seq").values_list("end_offset", flat=True).first()
+        return self.lines.count() if end_offset is None else end_offset
+
+    def get_last_line_created(self) -> Optional[datetime.datetime]:
+        """Get the time when the last line was written, None if the stream has no lines"""
+        # Segments are always newer than the legacy lines
+        if created := self.segments.order_by("-seq").values_list("created", flat=True).first():
+            return created
+        return self.lines.order_by("-created").values_list("created", flat=True).first()
+
+    def drop_lines(self) -> int:
+        """Delete all the lines of the stream, return the number of deleted lines"""
+        count = self.count_lines()
+        with transaction.atomic(using="workloads"):
+            self.segments.all().delete()
+            self.lines.all().delete()
+        self._next_position = None
+        return count
 
 
 class OutputStreamLine(models.Model):
@@ -47,3 +176,26 @@ class OutputStreamLine(models.Model):
 
     def __str__(self):
         return "%s-%s" % (self.id, self.line)
+
+
+class OutputStreamSegment(models.Model):
+    """A compressed segment which contains the lines in offset range [start_offset, end_offset),
+    segments are append-only.
+
+    [multi-tenancy] This model is not tenant-aware.
+    """
+
+    output_stream = models.ForeignKey("OutputStream", related_name="segments", on_delete=models.CASCADE)
+    seq = models.PositiveIntegerField(help_text="片段序号，从 0 开始")
+    start_offset = models.PositiveIntegerField(help_text="片段中第一行的偏移量")
+    end_offset = models.PositiveIntegerField(help_text="片段中最后一行的偏移量 + 1")
+    codec = models.CharField(max_length=16, default=SEGMENT_CODEC_GZIP, help_text="压缩格式")
+    data = models.BinaryField(help_text="压缩后的日志行")
+    created = models.DateTimeField(default=timezone.now, help_text="片段中最后一行的写入时间")
+
+    class Meta:
+        unique_together = ("output_stream", "seq")
+        ordering = ["seq"]
+
+    def __str__(self):
+        return "%s-%s[%s:%s]" % (self.output_stream_id, self.seq, self.start_offset, self.end_offset)
@@ -32,7 +32,7 @@ from paas_wl.core.resource import generate_bkapp_name
 from paas_wl.infras.cluster.utils import get_cluster_by_app
 from paas_wl.workloads.networking.ingress.certs import (
     DomainWithCert,
-    pick_shared_cert,
+    pick_shared_certs,
     update_or_create_secret_by_cert,
 )
 from paas_wl.workloads.networking.ingress.constants import AppDomainProtocol, AppDomainSource, AppSubpathSource
@@ -115,10 +115,9 @@ class AddrResourceManager:
         if not paths:
             return []
 
-        return [
-            to_shared_tls_domain(Domain(host=domain.name, pathPrefixList=paths), self.wl_app)
-            for domain in root_domains
-        ]
+        return to_shared_tls_domains(
+            [Domain(host=domain.name, pathPrefixList=paths) for domain in root_domains], self.wl_app
+        )
 
     def _get_custom_domains(self) -> List[Domain]:
         """Get all "custom" source domain objects"""
@@ -155,16 +154,26 @@ def to_shared_tls_domain(d: Domain, app: WlApp) -> Domain:
 
     :return: The modified domain object
     """
-    cert = pick_shared_cert(app.tenant_id, d.host)
-    if not cert:
-        d.tlsSecretName = None
-        return d
+    return to_shared_tls_domains([d], app)[0]
 
-    secret_name, created = update_or_create_secret_by_cert(app, cert)
-    if created:
-        logger.info("created a secret %s for host %s", secret_name, d.host)
-    d.tlsSecretName = secret_name
-    return d
+
+def to_shared_tls_domains(domains: List[Domain], app: WlApp) -> List[Domain]:
+    """The bulk version of `to_shared_tls_domain`, the shared certs of all hosts are picked at once.
+
+    :return: The modified domain objects
+    """
+    certs = pick_shared_certs(app.tenant_id, [d.host for d in domains])
+    for d in domains:
+        cert = certs[d.host]
+        if not cert:
+            d.tlsSecretName = None
+            continue
+
+        secret_name, created = update_or_create_secret_by_cert(app, cert)
+        if created:
+            logger.info("created a secret %s for host %s", secret_name, d.host)
+        d.tlsSecretName = secret_name
+    return domains
 
 
 def gen_domain_group_mapping_name(wl_app: WlApp) -> str:
@@ -20,3 +20,7 @@ from django.dispatch import Signal
 # 云原生应用部署完成后触发的信号，会执行操作记录等后续步骤
 # providing_args: [deploy: AppModelDeploy]
 post_cnative_env_deploy = Signal()
+
+# 云原生应用的进程被启动、停止或扩缩容后触发的信号，sender 为 ModuleEnvironment
+# providing_args: [proc_type: str]
+post_cnative_proc_scaled = Signal()
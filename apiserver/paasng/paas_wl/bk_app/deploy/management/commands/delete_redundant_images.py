@@ -22,7 +22,7 @@ from django.core.management.base import BaseCommand, CommandError
 from django.db.models import Count
 
 from paas_wl.bk_app.applications.constants import ArtifactType
-from paas_wl.bk_app.applications.managers.app_build import delete_redundant_images
+from paas_wl.bk_app.applications.managers.image_gc import ImageGCCheckpoint, RegistryImageCollector
 from paas_wl.bk_app.applications.models.build import Build
 from paasng.platform.modules.models import Module
 
@@ -56,8 +56,30 @@ class Command(BaseCommand):
             nargs="+",
             help="One or more app_code. e.g. --app-codes app1 app2",
         )
+        parser.add_argument(
+            "--concurrency",
+            dest="concurrency",
+            type=int,
+            default=8,
+            help="The maximum number of concurrent requests to each registry.",
+        )
+        parser.add_argument(
+            "--resume",
+            dest="resume",
+            action="store_true",
+            help="Skip the modules which have been cleaned up by the last interrupted run.",
+        )
 
-    def handle(self, max_reserved_num: int, dry_run, app_codes: list[str], *args, **options):
+    def handle(
+        self,
+        max_reserved_num: int,
+        dry_run,
+        app_codes: list[str],
+        concurrency: int,
+        resume: bool,
+        *args,
+        **options,
+    ):
         if max_reserved_num < 0:
             raise CommandError("max_reserved_num must be non-negative")
 
@@ -79,25 +101,22 @@ class Command(BaseCommand):
                 .values_list("module_id", flat=True)
             )
 
+        module_ids = list(module_ids)
         deleted_count = failed_count = 0
 
-        for module_id in module_ids:
-            if dry_run:
-                need_delete = Build.objects.filter(
-                    module_id=module_id,
-                    artifact_type=ArtifactType.IMAGE,
-                    artifact_deleted=False,
-                    image__isnull=False,
-                ).order_by("-created")[max_reserved_num:]
-                deleted_count += len(need_delete)
+        # The progress is always recorded, so an interrupted run can be resumed by "--resume",
+        # a dry run deletes nothing and must keep the progress of the interrupted run
+        checkpoint = ImageGCCheckpoint()
+        if not resume and not dry_run:
+            checkpoint.clear()
+        collector = RegistryImageCollector(max_workers=concurrency, checkpoint=checkpoint)
 
-            else:
-                res = delete_redundant_images(
-                    module_id=module_id,
-                    max_reserved_num=max_reserved_num,
-                )
-                deleted_count += res.deleted
-                failed_count += res.failed
+        if dry_run:
+            deleted_count = len(collector.collect(module_ids, max_reserved_num))
+        else:
+            res = collector.run(module_ids, max_reserved_num)
+            deleted_count, failed_count = res.deleted, res.failed
+            checkpoint.clear()
 
         if dry_run:
             self.stdout.write(
@@ -21,6 +21,7 @@ from typing import Optional
 
 from paas_wl.bk_app.cnative.specs.procs.exceptions import ProcNotFoundInRes
 from paas_wl.bk_app.cnative.specs.procs.replicas import BkAppProcScaler
+from paas_wl.bk_app.cnative.specs.signals import post_cnative_proc_scaled
 from paas_wl.bk_app.deploy.app_res.controllers import ProcAutoscalingHandler, ProcessesHandler
 from paas_wl.bk_app.processes.constants import DEFAULT_CNATIVE_MAX_REPLICAS, ProcessTargetStatus
 from paas_wl.bk_app.processes.controllers import ProcControllerHub
@@ -201,6 +202,7 @@ class CNativeProcController:
             )
         except ProcNotFoundInRes as e:
             raise ProcessNotFound(str(e))
+        post_cnative_proc_scaled.send(self.env, proc_type=proc_type)
 
     def stop(self, proc_type: str):
         """Stop a process."""
@@ -208,6 +210,7 @@ class CNativeProcController:
             BkAppProcScaler(self.env).set_replicas(proc_type, 0)
         except ProcNotFoundInRes as e:
             raise ProcessNotFound(str(e))
+        post_cnative_proc_scaled.send(self.env, proc_type=proc_type)
 
     def scale(
         self,
@@ -230,6 +233,7 @@ class CNativeProcController:
             self.disable_autoscaling_if_enabled(proc_type)
             if target_replicas is not None:
                 self.scale_static(proc_type, target_replicas)
+        post_cnative_proc_scaled.send(self.env, proc_type=proc_type)
 
     def scale_static(self, proc_type: str, target_replicas: int):
         """Scale process to the `target_replicas`."""
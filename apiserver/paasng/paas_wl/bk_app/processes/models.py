@@ -24,6 +24,7 @@ from jsonfield import JSONField
 
 from paas_wl.bk_app.applications.managers import get_metadata
 from paas_wl.bk_app.processes.constants import ProcessTargetStatus
+from paas_wl.bk_app.processes.signals import post_process_specs_synced
 from paas_wl.core.app_structure import set_global_get_structure
 from paas_wl.utils.models import TimestampedModel
 from paas_wl.workloads.autoscaling.entities import AutoscalingConfig
@@ -210,6 +211,7 @@ class ProcessSpecManager:
                 "updated",
             ],
         )
+        post_process_specs_synced.send(sender=self.wl_app)
 
     def bulk_create_procs(
         self,
@@ -16,13 +16,14 @@
 # to the current version of the project delivered to anyone in the future.
 
 from functools import partialmethod
-from typing import List
+from typing import Callable, Dict, List, Set, Tuple
 
 from django.db.models import Case, Q, QuerySet, When
 
 from paas_wl.infras.cluster.constants import ClusterAllocationPolicyType
 from paas_wl.infras.cluster.entities import AllocationContext, AllocationPolicy
 from paas_wl.infras.cluster.models import Cluster, ClusterAllocationPolicy
+from paasng.utils.versioned_cache import VersionedCache
 
 
 class ClusterAllocator:
@@ -108,3 +109,110 @@ class ClusterAllocator:
             Q(tenant_id=self.ctx.tenant_id) | Q(available_tenant_ids__contains=self.ctx.tenant_id),
             name__in=cluster_names,
         ).order_by(order)
+
+
+class CompiledAllocationPolicy:
+    """编译后的租户集群分配策略
+
+    编译时将策略中各规则的集群列表（按环境）预先与租户可用集群取交集，分配时只需按优先级匹配规则，
+    无需再查询数据库；同时按上下文属性缓存分配结果。分配结果与 ClusterAllocator 保持一致。
+
+    :param policy: 租户的集群分配策略，为 None 表示未配置
+    :param available_cluster_names: 租户可用的集群名称
+    """
+
+    # 单个租户最多缓存的分配结果数量（上下文中的 username 可能较为分散）
+    max_decisions = 4096
+
+    def __init__(self, policy: ClusterAllocationPolicy | None, available_cluster_names: Set[str]):
+        self.policy = policy
+        self._available_cluster_names = available_cluster_names
+        self._rules: List[Tuple[Callable[[AllocationContext], bool], Dict[str | None, List[str]]]] = []
+        self._decisions: Dict[Tuple, List[str]] = {}
+
+        if policy is None:
+            return
+
+        if policy.type == ClusterAllocationPolicyType.UNIFORM:
+            if policy.allocation_policy:
+                self._rules.append((lambda ctx: True, self._expand(policy.allocation_policy)))
+        elif policy.type == ClusterAllocationPolicyType.RULE_BASED:
+            for p in policy.allocation_precedence_policies:
+                self._rules.append((p.match, self._expand(p.policy)))
+        else:
+            raise ValueError(f"unknown cluster allocation policy type: {policy.type}")
+
+    @classmethod
+    def compile(cls, tenant_id: str) -> "CompiledAllocationPolicy":
+        """从数据库中加载租户的分配策略及可用集群，并进行编译"""
+        policy = ClusterAllocationPolicy.objects.filter(tenant_id=tenant_id).first()
+        if policy is None:
+            return cls(None, set())
+
+        names = Cluster.objects.filter(
+            Q(tenant_id=tenant_id) | Q(available_tenant_ids__contains=tenant_id)
+        ).values_list("name", flat=True)
+        return cls(policy, set(names))
+
+    def list_names(self, ctx: AllocationContext) -> List[str]:
+        """获取可用的集群名称，第一个为默认集群
+
+        :raises: ValueError 配置了分配策略，但没有可用集群时
+        """
+        key = (ctx.region, ctx.environment, ctx.username, ctx.usage)
+        if (names := self._decisions.get(key)) is not None:
+            return names
+
+        names = self._list_names(ctx)
+        if len(self._decisions) < self.max_decisions:
+            self._decisions[key] = names
+        return names
+
+    def _list_names(self, ctx: AllocationContext) -> List[str]:
+        # 未配置策略，返回空列表
+        if self.policy is None:
+            return []
+
+        names: List[str] = []
+        for match, env_clusters in self._rules:
+            if match(ctx):
+                names = env_clusters.get(None, env_clusters.get(ctx.environment, []))
+                break
+
+        if not names:
+            raise ValueError(f"no cluster found for policy: {self.policy}")
+        return names
+
+    def _expand(self, policy: AllocationPolicy) -> Dict[str | None, List[str]]:
+        """将分配策略展开为 {环境: 可用集群名称列表}，非按环境分配时，环境为 None"""
+        if policy.env_specific:
+            if not policy.env_clusters:
+                raise ValueError("env_clusters is required for env_specific policy")
+            return {env: self._filter_available(names) for env, names in policy.env_clusters.items()}
+        return {None: self._filter_available(policy.clusters or [])}
+
+    def _filter_available(self, cluster_names: List[str]) -> List[str]:
+        # 保持策略中的顺序，并去除重复项
+        return [name for name in dict.fromkeys(cluster_names) if name in self._available_cluster_names]
+
+
+class AllocationPolicyCache(VersionedCache[CompiledAllocationPolicy]):
+    """进程内的集群分配策略编译缓存，以租户 ID 为 key
+
+    集群可能被多个租户使用，因此集群分配策略或集群发生变更时（见 handlers），所有租户的编译结果都会失效
+    """
+
+    def __init__(self):
+        super().__init__("paas_wl:cluster_allocation", CompiledAllocationPolicy.compile, version_per_key=False)
+
+    def get_default_name(self, ctx: AllocationContext) -> str:
+        """获取默认集群名称，与 ClusterAllocator(ctx).get_default().name 等价
+
+        :raises: ValueError 没有可用的集群时
+        """
+        if names := self.get(ctx.tenant_id).list_names(ctx):
+            return names[0]
+        raise ValueError(f"cluster allocator with ctx {ctx} and name None got no cluster")
+
+
+allocation_policy_cache = AllocationPolicyCache()
@@ -20,3 +20,6 @@ from django.apps import AppConfig
 
 class KubeClusterConfig(AppConfig):
     name = "paas_wl.infras.cluster"
+
+    def ready(self):
+        from . import handlers  # noqa: F401
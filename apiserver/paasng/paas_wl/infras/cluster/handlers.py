@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from paas_wl.infras.cluster.allocator import allocation_policy_cache
+from paas_wl.infras.cluster.models import Cluster, ClusterAllocationPolicy
+
+
+@receiver(post_save, sender=Cluster)
+@receiver(post_delete, sender=Cluster)
+@receiver(post_save, sender=ClusterAllocationPolicy)
+@receiver(post_delete, sender=ClusterAllocationPolicy)
+def on_allocation_changed(sender, instance, *args, **kwargs):
+    """Invalidate the compiled allocation policies when clusters or policies were changed"""
+    allocation_policy_cache.bump_version_on_commit(using=kwargs.get("using"))
@@ -16,13 +16,21 @@
 # to the current version of the project delivered to anyone in the future.
 
 import logging
-from collections import UserDict
-from typing import Dict
+import os
+import threading
+from collections import UserDict, defaultdict
+from datetime import datetime
+from operator import attrgetter
+from typing import Callable, Dict, List, Optional, Tuple
 
-from blue_krill.connections.ha_endpoint_pool import HAEndpointPool
+from blue_krill.connections.exceptions import NoEndpointAvailable
+from blue_krill.connections.ha_endpoint_pool import Endpoint, HAEndpointPool
 from django.conf import settings
+from kubernetes.client import Configuration
+from kubernetes.client.rest import RESTClientObject
 
 from paas_wl.infras.cluster.loaders import DBConfigLoader, LegacyKubeConfigLoader
+from paas_wl.infras.cluster.models import APIServer, Cluster
 
 logger = logging.getLogger(__name__)
 
@@ -57,3 +65,172 @@ class ContextConfigurationPoolMap(UserDict):
             instance[tag] = HAEndpointPool(items=loader.list_configurations_by_tag(tag))
 
         return instance  # type: ignore
+
+
+# The stamp of a cluster, made of the cluster's "updated" and its api servers' "updated",
+# any change of these rows leads to a new stamp.
+ClusterStamp = Tuple[datetime, Tuple[Tuple[str, datetime], ...]]
+
+
+class ClusterPoolRegistry:
+    """An in-process registry of the HAEndpointPool of each cluster.
+
+    Different from `ContextConfigurationPoolMap.from_db`, the registry is refreshed incrementally: only
+    the clusters whose `Cluster`/`APIServer` rows were changed are rebuilt, and the health states of the
+    endpoints(score, failure count, etc.) as well as the active endpoint are carried over to the new pool.
+
+    :param probe_interval: The interval seconds of probing unhealthy endpoints in background, 0 means no probing.
+    :param probe: The function to probe an endpoint, return True if the endpoint is available.
+    """
+
+    def __init__(self, probe_interval: float = 0, probe: Optional[Callable[[Configuration], bool]] = None):
+        self.probe_interval = probe_interval
+        self.probe = probe or probe_configuration
+
+        self._lock = threading.Lock()
+        self._version: Optional[str] = None
+        self._stamps: Dict[str, ClusterStamp] = {}
+        self._pools: Dict[str, HAEndpointPool] = {}
+
+        self._probe_stopped = threading.Event()
+        self._prober_pid: Optional[int] = None
+
+    def get_pools(self, version: str) -> Dict[str, HAEndpointPool]:
+        """Get the pools of all clusters, the registry will be refreshed when `version` has changed.
+
+        :param version: Any value which indicates whether clusters have been updated, such as
+            the last modified time of all clusters.
+        """
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    self.refresh()
+                    self._version = version
+
+        self._ensure_prober()
+        return self._pools
+
+    def refresh(self):
+        """Rebuild the pools of the changed clusters, remove the pools of the deleted clusters"""
+        stamps = self._load_stamps()
+        changed = [name for name, stamp in stamps.items() if self._stamps.get(name) != stamp]
+
+        # Always build a new dict, the old one might be in use by other threads
+        pools = {name: pool for name, pool in self._pools.items() if name in stamps and name not in changed}
+        if changed:
+            loader = DBConfigLoader(Cluster.objects.filter(name__in=changed))
+            for cluster_name in changed:
+                configurations = list(loader.list_configurations_by_name(cluster_name))
+                if not configurations:
+                    logger.warning("Can't find any configurations for cluster %s", cluster_name)
+                    continue
+                pools[cluster_name] = self._build_pool(configurations, self._pools.get(cluster_name))
+
+            logger.info("Rebuilt endpoint pools for %d clusters: %s", len(changed), changed)
+
+        self._pools = pools
+        self._stamps = {name: stamp for name, stamp in stamps.items() if name in pools}
+
+    def probe_unhealthy(self):
+        """Probe all unhealthy endpoints, recover the available ones immediately. For the unavailable
+        ones, refresh the unhealthy time so that they will not be recovered passively.
+        """
+        for cluster_name, pool in list(self._pools.items()):
+            for ep in [ep for ep in pool.endpoints if ep.is_unhealthy()]:
+                # Only the public setters of the endpoint are used, each one is a plain attribute
+                # assignment, racing with the pool's own election is harmless.
+                if self.probe(ep.raw):
+                    logger.info("Endpoint %s of cluster %s is available again", ep.raw.host, cluster_name)
+                    ep.set_healthy()
+                else:
+                    ep.set_unhealthy()
+
+    def stop_probing(self):
+        self._probe_stopped.set()
+
+    def _build_pool(self, configurations: List[Configuration], old_pool: Optional[HAEndpointPool]) -> HAEndpointPool:
+        """Build a pool, the health states of the endpoints are carried over from the old pool by host"""
+        pool = HAEndpointPool(items=configurations)
+        if not old_pool:
+            return pool
+
+        # The new pool is not visible to other threads yet, no lock is needed
+        old_endpoints: Dict[str, Endpoint] = {ep.raw.host: ep for ep in old_pool.endpoints}
+        for ep in pool.endpoints:
+            if old_ep := old_endpoints.get(ep.raw.host):
+                copy_endpoint_health(old_ep, ep)
+
+        # Keep the last-known-good ordering: the endpoints with higher scores come first
+        pool.endpoints.sort(key=attrgetter("score"), reverse=True)
+
+        active_host = old_pool.get_endpoint().raw.host
+        active = next((ep for ep in pool.list_healthy() if ep.raw.host == active_host), None)
+        try:
+            pool.elect(active)
+        except NoEndpointAvailable:
+            logger.warning("No healthy endpoint in the rebuilt pool, keep the initial election")
+        return pool
+
+    @staticmethod
+    def _load_stamps() -> Dict[str, ClusterStamp]:
+        servers = defaultdict(list)
+        for cluster_name, uuid, updated in APIServer.objects.values_list("cluster__name", "uuid", "updated"):
+            servers[cluster_name].append((str(uuid), updated))
+
+        return {
+            name: (updated, tuple(sorted(servers[name])))
+            for name, updated in Cluster.objects.values_list("name", "updated")
+        }
+
+    def _ensure_prober(self):
+        """Start the probing thread, a forked process needs its own thread"""
+        if not self.probe_interval or self._prober_pid == os.getpid():
+            return
+
+        with self._lock:
+            if self._prober_pid == os.getpid():
+                return
+            self._prober_pid = os.getpid()
+            threading.Thread(target=self._run_prober, name="k8s-endpoint-prober", daemon=True).start()
+
+    def _run_prober(self):
+        while not self._probe_stopped.wait(self.probe_interval):
+            try:
+                self.probe_unhealthy()
+            except Exception:
+                logger.exception("Failed to probe unhealthy endpoints")
+
+
+def copy_endpoint_health(src: Endpoint, dest: Endpoint):
+    """Copy the health states of endpoint `src` to `dest`, the score is shifted by `succeed()`/`fail()`
+    because `Endpoint` provides no setter for it.
+    """
+    delta = src.score - dest.score
+    if delta > 0:
+        dest.succeed(score_delta=delta)
+    elif delta < 0:
+        dest.fail(score_delta=-delta)
+
+    # Overwrite the counters changed by the score shifting above
+    dest.success_count = src.success_count
+    dest.failure_count = src.failure_count
+    dest.unhealthy_at = src.unhealthy_at
+
+
+def probe_configuration(configuration: Configuration) -> bool:
+    """Check whether the apiserver of given configuration is available by calling the "/healthz" endpoint"""
+    headers = {}
+    if token := configuration.api_key.get("authorization"):
+        headers["authorization"] = token
+
+    try:
+        RESTClientObject(configuration).request(
+            "GET",
+            f"{configuration.host}/healthz",
+            headers=headers,
+            _request_timeout=(settings.K8S_DEFAULT_CONNECT_TIMEOUT, settings.K8S_DEFAULT_CONNECT_TIMEOUT),
+        )
+    except Exception as e:  # noqa: BLE001
+        logger.debug("Probe endpoint %s failed: %s", configuration.host, e)
+        return False
+    return True
@@ -15,9 +15,11 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
-from typing import TYPE_CHECKING, Dict
+from typing import TYPE_CHECKING, Dict, Iterable
 
-from paas_wl.infras.cluster.allocator import ClusterAllocator
+from django.db.models import OuterRef, Subquery
+
+from paas_wl.infras.cluster.allocator import ClusterAllocator, allocation_policy_cache
 from paas_wl.infras.cluster.constants import ClusterFeatureFlag, ClusterUsage
 from paas_wl.infras.cluster.entities import AllocationContext
 from paas_wl.infras.cluster.models import Cluster
@@ -53,8 +55,43 @@ class EnvClusterService:
         if cluster_name := wl_app.latest_config.cluster:
             return cluster_name
 
-        ctx = self._build_allocation_context()
-        return ClusterAllocator(ctx).get_default().name
+        return self.get_default_cluster_name()
+
+    def get_default_cluster_name(self) -> str:
+        """get the default cluster name allocated to the env by the allocation policy, use the compiled
+        policy cache so no database query is needed in most cases.
+        """
+        return allocation_policy_cache.get_default_name(self._build_allocation_context())
+
+    @classmethod
+    def resolve_many(cls, envs: Iterable["ModuleEnvironment"]) -> Dict[int, str]:
+        """get the cluster names of multiple envs in bulk, the bound clusters are queried all at once,
+        the other envs are allocated by the compiled policy cache.
+
+        NOTE: `env.application` and `env.module` are used to build the allocation context, use
+        `select_related` on the envs to avoid extra queries.
+
+        :return: {env.id: cluster_name}
+        """
+        # Avoid circular import: applications.models -> cluster.utils -> cluster.shim
+        from paas_wl.bk_app.applications.models import Config, WlApp
+
+        envs = list(envs)
+        engine_app_names = {env.pk: env.engine_app.name for env in envs}
+        latest_cluster = Config.objects.filter(app=OuterRef("pk")).order_by("-created").values("cluster")[:1]
+        bound_clusters = dict(
+            WlApp.objects.filter(name__in=engine_app_names.values())
+            .annotate(bound_cluster=Subquery(latest_cluster))
+            .values_list("name", "bound_cluster")
+        )
+
+        results = {}
+        for env in envs:
+            if cluster_name := bound_clusters.get(engine_app_names[env.pk]):
+                results[env.pk] = cluster_name
+            else:
+                results[env.pk] = cls(env).get_default_cluster_name()
+        return results
 
     def bind_cluster(self, cluster_name: str | None, operator: str | None = None):
         """bind `env` to cluster named `cluster_name`, if cluster_name is not given, use default cluster
@@ -115,4 +152,6 @@ def get_app_cluster_names(app: "Application") -> Dict[str, str]:
     :param app: 应用对象
     :return: {环境: 集群名称}
     """
-    return {env.environment: EnvClusterService(env).get_cluster_name() for env in app.get_default_module().envs.all()}
+    envs = app.get_default_module().envs.select_related("application", "module", "engine_app")
+    cluster_names = EnvClusterService.resolve_many(envs)
+    return {env.environment: cluster_names[env.pk] for env in envs}
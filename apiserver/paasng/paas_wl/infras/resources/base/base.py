@@ -22,35 +22,32 @@ from functools import lru_cache
 from typing import Dict, List
 
 from blue_krill.connections.ha_endpoint_pool import HAEndpointPool
+from django.conf import settings
 from django.utils import timezone
 from kubernetes.client import ApiClient as BaseApiClient
 from kubernetes.client import Configuration
 from kubernetes.client.rest import RESTClientObject
 from urllib3.exceptions import HTTPError
 
-from paas_wl.infras.cluster.pools import ContextConfigurationPoolMap
+from paas_wl.infras.cluster.pools import ClusterPoolRegistry
 from paasng.core.core.storages.redisdb import get_default_redis
 
 logger = logging.getLogger(__name__)
 
 
-def get_global_configuration_pool() -> Dict[str, HAEndpointPool]:
-    """Get the global config pool object from cache"""
-    last_modified = _GlobalConfigLastModified().get()
-    return _get_global_configuration_pool(last_modified)
+_global_pool_registry = ClusterPoolRegistry(probe_interval=settings.K8S_UNHEALTHY_ENDPOINT_PROBE_INTERVAL)
 
 
-@lru_cache
-def _get_global_configuration_pool(last_modified: str) -> Dict[str, HAEndpointPool]:
+def get_global_configuration_pool() -> Dict[str, HAEndpointPool]:
     """Get the global config pool object.
 
-    NOTE: This function is cached for performance. When the clusters have been updated,
-    the cache must be cleared.
-
-    :param last_modified: 任意集群配置最后变更时间. 与 lru_cache 配合使用,
-        如果 last_modified 发生变化, 则会触发缓存失效，从数据库重新加载
+    NOTE: The pools are kept in an in-process registry for performance. When the clusters have been
+    updated, `invalidate_global_configuration_pool` must be called, then only the changed clusters
+    will be reloaded from database, the health states of unchanged endpoints are kept.
     """
-    return ContextConfigurationPoolMap.from_db()
+    # 任意集群配置最后变更时间, 如果发生变化, 则触发 registry 增量刷新
+    last_modified = _GlobalConfigLastModified().get()
+    return _global_pool_registry.get_pools(last_modified)
 
 
 def invalidate_global_configuration_pool():
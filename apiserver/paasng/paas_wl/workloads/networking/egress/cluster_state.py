@@ -18,12 +18,16 @@
 import copy
 import hashlib
 import logging
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional
 
+from blue_krill.data_types.enum import StrStructuredEnum
 from django.utils.encoding import force_bytes
 from kubernetes.dynamic.resource import ResourceInstance
 
-from paas_wl.infras.resources.base.kres import KNode
+from paas_wl.infras.resources.base.exceptions import ResourceMissing
+from paas_wl.infras.resources.base.kres import KNode, PatchType
 from paas_wl.infras.resources.utils.basic import EnhancedApiClient
 
 from .models import RegionClusterState
@@ -31,10 +35,19 @@ from .models import RegionClusterState
 logger = logging.getLogger(__name__)
 
 
-def generate_state(cluster_name: str, client, ignore_labels: Dict[str, str], tenant_id: str) -> RegionClusterState:
-    """Generate a new state for the given cluster."""
+def generate_state(
+    cluster_name: str,
+    client,
+    ignore_labels: Dict[str, str],
+    tenant_id: str,
+    nodes: Optional[List[ResourceInstance]] = None,
+) -> RegionClusterState:
+    """Generate a new state for the given cluster.
 
-    nodes = get_nodes(client)
+    :param nodes: The nodes of the cluster, will be listed if not given.
+    """
+    if nodes is None:
+        nodes = get_nodes(client)
     nodes = list(filter_nodes_with_labels(nodes, ignore_labels))
     nodes_name = sorted([node.metadata.name for node in nodes])
     nodes_digest = get_digest_of_nodes_name(nodes_name)
@@ -110,15 +123,103 @@ def get_nodes(client: EnhancedApiClient) -> List[ResourceInstance]:
     return KNode(client).ops_batch.list({}).items
 
 
-def sync_state_to_nodes(client: EnhancedApiClient, state):
+def sync_state_to_nodes(
+    client: EnhancedApiClient, state: RegionClusterState, nodes: Optional[List[ResourceInstance]] = None
+) -> List["NodeLabelResult"]:
     """Sync a RegionClusterState object to current cluster, which means:
 
     - Update the labels of all nodes
     - Engine apps may use the labels to customize their schedule strategy
+
+    :param nodes: The nodes of the cluster, will be listed if not given.
+    :return: The result of each node in the state.
     """
-    labels = state.to_labels()
-    for node_name in state.nodes_name:
-        node = KNode(client).get(node_name)
-        node.metadata.labels = {**node.metadata.get("labels", {}), **labels}
-        logger.debug(f"Patching node object {node_name} with labels {labels}")
-        KNode(client).ops_name.replace_or_patch(node_name, node, update_method="patch")
+    return NodeLabeler(client).sync(state.nodes_name, state.to_labels(), nodes=nodes)
+
+
+class NodeLabelStatus(StrStructuredEnum):
+    PATCHED = "patched"
+    # The node already has the desired labels
+    UNCHANGED = "unchanged"
+    # The node has been removed from the cluster
+    MISSING = "missing"
+    FAILED = "failed"
+
+
+@dataclass
+class NodeLabelResult:
+    """The result of labeling a node"""
+
+    name: str
+    status: NodeLabelStatus
+    error: str = ""
+
+
+class NodeLabeler:
+    """Add labels to nodes, only nodes which lack the labels are patched, the patches are sent
+    concurrently.
+
+    :param client: The client of the cluster.
+    :param max_workers: The maximum number of concurrent patch requests.
+    """
+
+    def __init__(self, client: EnhancedApiClient, max_workers: int = 10):
+        self.client = client
+        self.max_workers = max_workers
+        self.knode = KNode(client)
+
+    def sync(
+        self, node_names: List[str], labels: Dict[str, str], nodes: Optional[List[ResourceInstance]] = None
+    ) -> List[NodeLabelResult]:
+        """Make sure the given nodes have the labels.
+
+        :param node_names: The names of the nodes to label.
+        :param labels: The desired labels.
+        :param nodes: The nodes of the cluster, will be listed if not given.
+        :return: The result of each node, in the same order as `node_names`.
+        """
+        if nodes is None:
+            nodes = get_nodes(self.client)
+        current_labels = {node.metadata.name: dict(node.metadata.get("labels") or {}) for node in nodes}
+
+        results: Dict[str, NodeLabelResult] = {}
+        patches: Dict[str, Dict[str, str]] = {}
+        for name in node_names:
+            if name not in current_labels:
+                results[name] = NodeLabelResult(name, NodeLabelStatus.MISSING)
+            elif patch := self.get_missing_labels(current_labels[name], labels):
+                patches[name] = patch
+            else:
+                results[name] = NodeLabelResult(name, NodeLabelStatus.UNCHANGED)
+
+        if patches:
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(patches))) as executor:
+                for result in executor.map(lambda item: self._patch(*item), patches.items()):
+                    results[result.name] = result
+
+        logger.info(
+            "Synced labels %s to %d nodes, patched: %d, failed: %d",
+            labels,
+            len(node_names),
+            sum(r.status == NodeLabelStatus.PATCHED for r in results.values()),
+            sum(r.status == NodeLabelStatus.FAILED for r in results.values()),
+        )
+        return [results[name] for name in node_names]
+
+    @staticmethod
+    def get_missing_labels(current: Dict[str, str], desired: Dict[str, str]) -> Dict[str, str]:
+        """Get the labels which are absent or have different values in current labels"""
+        return {k: v for k, v in desired.items() if current.get(k) != v}
+
+    def _patch(self, name: str, labels: Dict[str, str]) -> NodeLabelResult:
+        logger.debug(f"Patching node object {name} with labels {labels}")
+        # A strategic merge patch only touches the given labels, other labels are kept
+        body = {"metadata": {"labels": labels}}
+        try:
+            self.knode.ops_name.patch(name, body, ptype=PatchType.STRATEGIC)
+        except ResourceMissing:
+            return NodeLabelResult(name, NodeLabelStatus.MISSING)
+        except Exception as e:
+            logger.exception(f"Failed to patch labels of node {name}")
+            return NodeLabelResult(name, NodeLabelStatus.FAILED, error=str(e))
+        return NodeLabelResult(name, NodeLabelStatus.PATCHED)
@@ -29,6 +29,7 @@ class IngressConfig(AppConfig):
     label = "ingress"
 
     def ready(self):
+        from . import handlers  # noqa: F401
         from .plugins.ingress import register
 
         register()
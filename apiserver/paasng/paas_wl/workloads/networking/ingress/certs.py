@@ -17,7 +17,8 @@
 
 import base64
 import logging
-from typing import Optional, Tuple
+import re
+from typing import Dict, Iterable, List, Optional, Pattern, Tuple
 
 from django.utils.encoding import force_bytes, force_str
 
@@ -25,6 +26,7 @@ from paas_wl.bk_app.applications.models import WlApp
 from paas_wl.infras.resources.base import kres
 from paas_wl.infras.resources.utils.basic import get_client_by_app
 from paas_wl.workloads.networking.ingress.models import AppDomain, AppDomainSharedCert, BasicCert, Domain
+from paasng.utils.versioned_cache import VersionedCache
 
 logger = logging.getLogger(__name__)
 
@@ -95,7 +97,122 @@ def pick_shared_cert(tenant_id: str, host: str) -> Optional[AppDomainSharedCert]
     :param tenant_id: The tenant_id.
     :param host: Hostname for finding valid cert object.
     """
-    for cert in AppDomainSharedCert.objects.filter(tenant_id=tenant_id):
-        if cert.match_hostname(host):
-            return cert
-    return None
+    return shared_cert_index_cache.get(tenant_id).match(host)
+
+
+def pick_shared_certs(tenant_id: str, hosts: Iterable[str]) -> Dict[str, Optional[AppDomainSharedCert]]:
+    """The bulk version of `pick_shared_cert`, match the hosts in one pass.
+
+    :return: A dict of {host: matched cert or None}.
+    """
+    return shared_cert_index_cache.get(tenant_id).match_many(hosts)
+
+
+# A "*" in the common name matches exactly one label, see `AppDomainSharedCert.match_hostname`
+_WILDCARD_LABEL = re.compile(r"[a-zA-Z0-9-]+")
+
+
+class _LabelTrieNode:
+    __slots__ = ("cert_pk", "children", "wildcard")
+
+    def __init__(self):
+        self.children: Dict[str, "_LabelTrieNode"] = {}
+        self.wildcard: Optional["_LabelTrieNode"] = None
+        self.cert_pk: Optional[int] = None
+
+
+class SharedCertIndex:
+    """An index for matching hosts against the common names of shared certs.
+
+    - Common names without "*" are stored in an exact-host map.
+    - Common names whose wildcards are whole labels("*.foo.com") are stored in a trie keyed by
+      the reversed labels, so a lookup only walks the labels of the host.
+    - Other common names("foo-*.bar.com") fall back to compiled regexes.
+
+    When multiple certs match a host, the one with the smallest pk wins, same as scanning the
+    certs in the table order.
+
+    :param certs: The shared certs to index.
+    """
+
+    def __init__(self, certs: Iterable[AppDomainSharedCert]):
+        self._certs: Dict[int, AppDomainSharedCert] = {}
+        self._exact: Dict[str, int] = {}
+        self._root = _LabelTrieNode()
+        self._fallback: List[Tuple[int, Pattern]] = []
+
+        for cert in sorted(certs, key=lambda c: c.pk):
+            self._certs[cert.pk] = cert
+            for cn in cert.auto_match_cns.split(";"):
+                if cn:
+                    self._add(cn, cert.pk)
+
+    @classmethod
+    def build(cls, tenant_id: str) -> "SharedCertIndex":
+        return cls(AppDomainSharedCert.objects.filter(tenant_id=tenant_id))
+
+    def match(self, host: str) -> Optional[AppDomainSharedCert]:
+        """Get the matched cert of given host, None if no cert matches"""
+        candidates = []
+        if (pk := self._exact.get(host)) is not None:
+            candidates.append(pk)
+        if (pk := self._match_trie(host)) is not None:
+            candidates.append(pk)
+        # The fallback patterns were sorted by pk, the first matched one is enough
+        if (pk := next((pk for pk, regex in self._fallback if regex.match(host)), None)) is not None:
+            candidates.append(pk)
+        return self._certs[min(candidates)] if candidates else None
+
+    def match_many(self, hosts: Iterable[str]) -> Dict[str, Optional[AppDomainSharedCert]]:
+        """Match the hosts in one pass, duplicated hosts are only matched once"""
+        results: Dict[str, Optional[AppDomainSharedCert]] = {}
+        for host in hosts:
+            if host not in results:
+                results[host] = self.match(host)
+        return results
+
+    def _add(self, cn: str, pk: int):
+        if "*" not in cn:
+            self._exact.setdefault(cn, pk)
+            return
+
+        labels = cn.split(".")
+        if any("*" in label and label != "*" for label in labels):
+            pattern = re.escape(cn).replace(r"\*", r"[a-zA-Z0-9-]+")
+            self._fallback.append((pk, re.compile(f"^{pattern}$")))
+            return
+
+        node = self._root
+        for label in reversed(labels):
+            if label == "*":
+                node.wildcard = node.wildcard or _LabelTrieNode()
+                node = node.wildcard
+            else:
+                node = node.children.setdefault(label, _LabelTrieNode())
+        if node.cert_pk is None:
+            node.cert_pk = pk
+
+    def _match_trie(self, host: str) -> Optional[int]:
+        labels = host.split(".")[::-1]
+        best: Optional[int] = None
+        stack = [(self._root, 0)]
+        while stack:
+            node, pos = stack.pop()
+            if pos == len(labels):
+                if node.cert_pk is not None and (best is None or node.cert_pk < best):
+                    best = node.cert_pk
+                continue
+
+            label = labels[pos]
+            if (child := node.children.get(label)) is not None:
+                stack.append((child, pos + 1))
+            if node.wildcard is not None and _WILDCARD_LABEL.fullmatch(label):
+                stack.append((node.wildcard, pos + 1))
+        return best
+
+
+# Per-process cache of the shared cert indexes, keyed by tenant id, invalidated when the shared
+# certs of the tenant are changed(see handlers)
+shared_cert_index_cache: VersionedCache[SharedCertIndex] = VersionedCache(
+    "ingress:shared_cert_index", SharedCertIndex.build
+)
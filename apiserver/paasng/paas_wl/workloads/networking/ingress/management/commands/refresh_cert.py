@@ -31,7 +31,11 @@ from django.core.management.base import BaseCommand
 from paas_wl.bk_app.applications.models import WlApp
 from paas_wl.infras.cluster.models import Cluster
 from paas_wl.infras.cluster.utils import get_cluster_by_app
-from paas_wl.workloads.networking.ingress.certs import pick_shared_cert, update_or_create_secret_by_cert
+from paas_wl.workloads.networking.ingress.certs import (
+    SharedCertIndex,
+    pick_shared_certs,
+    update_or_create_secret_by_cert,
+)
 from paas_wl.workloads.networking.ingress.models import AppDomain, AppDomainSharedCert, AppSubpath
 
 
@@ -125,10 +129,9 @@ class Command(BaseCommand):
         # "sub_path_domains" and it's host matches given certificate.
         cluster_names = []
         for cluster in Cluster.objects.all():
-            for domain in cluster.ingress_config.sub_path_domains:
-                if pick_shared_cert(cluster.tenant_id, domain.name) == cert:
-                    cluster_names.append(cluster.name)
-                    break
+            hosts = [domain.name for domain in cluster.ingress_config.sub_path_domains]
+            if cert in pick_shared_certs(cluster.tenant_id, hosts).values():
+                cluster_names.append(cluster.name)
 
         if not cluster_names:
             return []
@@ -194,8 +197,8 @@ class Command(BaseCommand):
 
 def find_uninitialized_domains(cert: AppDomainSharedCert) -> Iterable[AppDomain]:
     """Find all domains which matches the given certificate but not initialized yet"""
-    for domain in AppDomain.objects.filter(tenant_id=cert.tenant_id).iterator():
-        if domain.cert or domain.shared_cert:
-            continue
-        if cert.match_hostname(domain.host):
+    index = SharedCertIndex([cert])
+    domains = AppDomain.objects.filter(tenant_id=cert.tenant_id, cert__isnull=True, shared_cert__isnull=True)
+    for domain in domains.iterator():
+        if index.match(domain.host):
             yield domain
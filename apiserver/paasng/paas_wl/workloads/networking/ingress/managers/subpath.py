@@ -16,14 +16,14 @@
 # to the current version of the project delivered to anyone in the future.
 
 import logging
-from typing import List, Set
+from typing import List, Optional, Set
 
 from paas_wl.bk_app.applications.models import WlApp
 from paas_wl.infras.cluster.utils import get_cluster_by_app
-from paas_wl.workloads.networking.ingress.certs import pick_shared_cert, update_or_create_secret_by_cert
+from paas_wl.workloads.networking.ingress.certs import pick_shared_certs, update_or_create_secret_by_cert
 from paas_wl.workloads.networking.ingress.constants import AppSubpathSource
 from paas_wl.workloads.networking.ingress.entities import PIngressDomain
-from paas_wl.workloads.networking.ingress.models import AppSubpath
+from paas_wl.workloads.networking.ingress.models import AppDomainSharedCert, AppSubpath
 
 from .base import AppIngressMgr
 
@@ -91,14 +91,23 @@ class SubPathAppIngressMgr(AppIngressMgr):
         if not paths:
             return []
 
-        return [self.create_ingress_domain(domain.name, paths, domain.https_enabled) for domain in domains]
+        # Pick the shared certs of all HTTPS domains at once
+        certs = pick_shared_certs(self.app.tenant_id, [domain.name for domain in domains if domain.https_enabled])
+        return [
+            self.create_ingress_domain(domain.name, paths, domain.https_enabled, certs.get(domain.name))
+            for domain in domains
+        ]
 
-    def create_ingress_domain(self, host: str, path_prefix_list: List[str], https_enabled: bool) -> PIngressDomain:
-        """Create a domain object, will create HTTPS related Secret resource on demand"""
+    def create_ingress_domain(
+        self, host: str, path_prefix_list: List[str], https_enabled: bool, cert: Optional[AppDomainSharedCert]
+    ) -> PIngressDomain:
+        """Create a domain object, will create HTTPS related Secret resource on demand
+
+        :param cert: The shared cert picked for the host, HTTPS is disabled when it's None.
+        """
         if not https_enabled:
             return PIngressDomain(host=host, path_prefix_list=path_prefix_list, tls_enabled=False)
 
-        cert = pick_shared_cert(self.app.tenant_id, host)
         if cert:
             secret_name, created = update_or_create_secret_by_cert(self.app, cert)
             if created:
@@ -14,18 +14,27 @@
 #
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
-from typing import Dict, List
+import itertools
+from functools import cached_property
+from typing import IO, Dict, Iterator
 
 import requests
 from django.utils.translation import gettext_lazy as _
 from rest_framework import status
 
 from paas_wl.bk_app.dev_sandbox.controller import DevSandboxController
-from paasng.accessories.dev_sandbox.exceptions import CannotCommitToRepository, DevSandboxApiException
+from paasng.accessories.dev_sandbox.exceptions import (
+    CannotCommitToRepository,
+    DevSandboxApiException,
+    DevServerFileApiUnsupported,
+)
 from paasng.accessories.dev_sandbox.models import DevSandbox
 from paasng.platform.modules.models import Module
 
 DEFAULT_TIMEOUT = 120
+# 每页获取的变更文件数量
+DIFFS_PAGE_SIZE = 100
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
 
 
 class DevSandboxApiClient:
@@ -38,31 +47,68 @@ class DevSandboxApiClient:
 
         self.controller = DevSandboxController(dev_sandbox)
 
-    def fetch_diffs(self) -> List[Dict]:
-        """从沙箱获取代码变更文件"""
-        detail = self.controller.get_detail()
+    @cached_property
+    def devserver_url(self) -> str:
+        """devserver 的访问地址，逐个下载文件时避免重复查询沙箱详情"""
+        return f"http://{self.controller.get_detail().urls.devserver}"
 
-        resp = requests.get(
-            f"http://{detail.urls.devserver}codes/diffs",
-            headers={"Authorization": f"Bearer {self.dev_sandbox.token}"},
-            params={"content": "true"},
-            timeout=DEFAULT_TIMEOUT,
-        )
-        if resp.status_code != status.HTTP_200_OK:
-            raise DevSandboxApiException(resp.text)
+    def iter_diffs(self, with_content: bool = False) -> Iterator[Dict]:
+        """分页从沙箱获取代码变更文件
+
+        不包含内容时，每个文件的格式如：{"path": "api/main.py", "action": "modified", "hash": "..."}，
+        hash 为文件内容的 git blob sha1，文件内容需通过 `download_file` 获取。
+        旧版本的 devserver 不返回 hash，并可能忽略 content 参数直接返回内容
 
-        resp_data = resp.json()
-        if not resp_data["total"]:
-            raise CannotCommitToRepository(_("没有可提交的代码变更"))
+        :param with_content: 是否在变更文件中直接返回文件内容
+        """
+        fetched = 0
+        for page in itertools.count(start=1):
+            resp = requests.get(
+                f"{self.devserver_url}codes/diffs",
+                headers={"Authorization": f"Bearer {self.dev_sandbox.token}"},
+                params={"content": "true" if with_content else "false", "page": page, "page_size": DIFFS_PAGE_SIZE},
+                timeout=DEFAULT_TIMEOUT,
+            )
+            if resp.status_code != status.HTTP_200_OK:
+                raise DevSandboxApiException(resp.text)
 
-        return resp_data["files"]
+            resp_data = resp.json()
+            if page == 1 and not resp_data["total"]:
+                raise CannotCommitToRepository(_("没有可提交的代码变更"))
+
+            files = resp_data["files"]
+            yield from files
+
+            # 不支持分页的旧版本 devserver 会在第一页返回全部文件
+            fetched += len(files)
+            if not files or fetched >= resp_data["total"]:
+                return
+
+    def download_file(self, path: str, fp: IO[bytes]) -> None:
+        """以流的方式下载沙箱中的文件内容，并写入到 fp 中
+
+        :param path: 文件相对于代码目录的路径
+        :param fp: 写入内容的文件对象
+        :raise DevServerFileApiUnsupported: devserver 不提供下载文件的接口
+        """
+        with requests.get(
+            f"{self.devserver_url}codes/files",
+            headers={"Authorization": f"Bearer {self.dev_sandbox.token}"},
+            params={"path": path},
+            timeout=DEFAULT_TIMEOUT,
+            stream=True,
+        ) as resp:
+            if resp.status_code == status.HTTP_404_NOT_FOUND:
+                raise DevServerFileApiUnsupported(resp.text)
+            if resp.status_code != status.HTTP_200_OK:
+                raise DevSandboxApiException(resp.text)
+            for chunk in resp.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                fp.write(chunk)
 
     def commit(self, commit_msg: str) -> None:
         """在沙箱本地执行一次 commit"""
-        detail = self.controller.get_detail()
-
         resp = requests.get(
-            f"http://{detail.urls.devserver}codes/commit",
+            f"{self.devserver_url}codes/commit",
             headers={"Authorization": f"Bearer {self.dev_sandbox.token}"},
             params={"message": commit_msg},
             timeout=DEFAULT_TIMEOUT,
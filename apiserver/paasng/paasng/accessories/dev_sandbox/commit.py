@@ -17,21 +17,26 @@
 
 import logging
 import os
-from typing import Dict, List
+from contextlib import ExitStack
+from tempfile import SpooledTemporaryFile
+from typing import IO, Dict, Iterable
 
 from django.utils.translation import gettext_lazy as _
 
 from paasng.accessories.dev_sandbox.client import DevSandboxApiClient
-from paasng.accessories.dev_sandbox.exceptions import CannotCommitToRepository
+from paasng.accessories.dev_sandbox.exceptions import CannotCommitToRepository, DevServerFileApiUnsupported
 from paasng.accessories.dev_sandbox.models import DevSandbox
 from paasng.platform.modules.models import Module
 from paasng.platform.sourcectl.constants import FileChangeType, VersionType
 from paasng.platform.sourcectl.exceptions import CallGitApiFailed
 from paasng.platform.sourcectl.models import ChangedFile, CommitInfo
-from paasng.platform.sourcectl.repo_controller import get_repo_controller
+from paasng.platform.sourcectl.repo_controller import RepoController, get_repo_controller
 
 logger = logging.getLogger(__name__)
 
+# 文件内容超过该大小时会被写入临时文件
+SPOOL_MAX_MEMORY_SIZE = 1024 * 1024
+
 
 class DevSandboxCodeCommit:
     """开发沙箱代码提交"""
@@ -49,32 +54,57 @@ class DevSandboxCodeCommit:
         :param message: 提交信息
         :return: 代码仓库 Url
         '"""
-        # 1. 调用 devserver api 获取代码差异信息
-        diffs = self.api_client.fetch_diffs()
-        # 2. 构建提交信息（CommitInfo）
-        commit_info = self._build_commit_info(diffs, message)
-        # 3. 调用代码库 API 提交代码
-        repo_url = self._commit_to_repository(commit_info)
+        repo_ctrl = get_repo_controller(self.module, self.operator)
+        with ExitStack() as stack:
+            # 1. 调用 devserver api 分页获取代码差异信息，并逐个下载目标分支中内容不同的文件
+            # 2. 构建提交信息（CommitInfo）
+            repo_hashes = self._get_repo_file_hashes(repo_ctrl)
+            try:
+                commit_info = self._build_commit_info(self.api_client.iter_diffs(), message, repo_hashes, stack)
+            except DevServerFileApiUnsupported:
+                # 旧版本的 devserver 无法逐个下载文件，退回到在变更文件中直接获取内容
+                logger.info("devserver does not support downloading files, fetch diffs with content")
+                commit_info = self._build_commit_info(
+                    self.api_client.iter_diffs(with_content=True), message, repo_hashes, stack
+                )
+            # 3. 调用代码库 API 提交代码
+            repo_url = self._commit_to_repository(commit_info, repo_ctrl)
         # 4. 在沙箱中也进行一次 commit，否则无法重复提交
         self.api_client.commit(message)
 
         return repo_url
 
-    def _build_commit_info(self, diffs: List[Dict], commit_msg: str) -> CommitInfo:
+    def _get_repo_file_hashes(self, repo_ctrl: RepoController) -> Dict[str, str]:
+        """一次性获取目标分支中所有文件的 git blob sha1，代码仓库不支持或获取失败时返回空字典（所有文件都会提交）"""
+        try:
+            return repo_ctrl.list_file_hashes(self.dev_sandbox.version_info)
+        except NotImplementedError:
+            return {}
+        except Exception:  # noqa: BLE001
+            # 仅用于跳过未变化的文件，获取失败时不影响提交
+            logger.warning("failed to list file hashes of the repository, commit all changed files", exc_info=True)
+            return {}
+
+    def _build_commit_info(
+        self, diffs: Iterable[Dict], commit_msg: str, repo_hashes: Dict[str, str], stack: ExitStack
+    ) -> CommitInfo:
         """根据变更的文件构建提交信息
 
-        :param diffs: 变更的文件列表，格式如：
+        :param diffs: 变更的文件，格式如：
             [
-                {"path": "webfe/app.js", "action": "added", "content": "..."},
-                {"path": "api/main.py", "action": "modified", "content": "..."},
-                {"path": "backend/cmd/main.go", "action": "deleted", "content": "..."},
+                {"path": "webfe/app.js", "action": "added", "hash": "..."},
+                {"path": "api/main.py", "action": "modified", "hash": "..."},
+                {"path": "backend/cmd/main.go", "action": "deleted"},
             ]
+            旧版本的 devserver 不返回 hash，而是直接返回 content
         :param commit_msg: 提交信息
+        :param repo_hashes: 目标分支中文件的 git blob sha1，hash 相同的文件无需再次提交
+        :param stack: 文件内容的临时文件会注册到 stack 中，退出时清理
         :return: 提交详细信息
+        :raise DevServerFileApiUnsupported: devserver 不支持逐个下载文件
         """
         # 代码部署目录
         source_dir = self.module.get_source_obj().get_source_dir()
-
         commit_info = CommitInfo(branch=self.dev_sandbox.version_info.version_name, message=commit_msg)
         mapping = {
             FileChangeType.ADDED: commit_info.add_files,
@@ -83,21 +113,38 @@ class DevSandboxCodeCommit:
         }
         for item in diffs:
             path = os.path.join(source_dir, item["path"]) if source_dir else item["path"]
-            mapping[item["action"]].append(ChangedFile(path, item["content"]))
-
+            if item["action"] == FileChangeType.DELETED:
+                mapping[item["action"]].append(ChangedFile(path, ""))
+                continue
+
+            # devserver 忽略了 content 参数，直接使用返回的内容
+            if "content" in item:
+                mapping[item["action"]].append(ChangedFile(path, item["content"]))
+                continue
+            if not item.get("hash"):
+                raise DevServerFileApiUnsupported(f"no hash for file {item['path']}")
+            # 文件已以相同内容存在于目标分支中（如上次提交到仓库后沙箱内 commit 失败），无需再次提交
+            if repo_hashes.get(path) == item["hash"]:
+                logger.info("file %s is unchanged in the repository, skip", path)
+                continue
+
+            spool = stack.enter_context(SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY_SIZE))  # noqa: SIM115
+            self.api_client.download_file(item["path"], spool)
+            mapping[item["action"]].append(SpooledChangedFile(path, spool))
         return commit_info
 
-    def _commit_to_repository(self, commit_info: CommitInfo) -> str:
+    def _commit_to_repository(self, commit_info: CommitInfo, repo_ctrl: RepoController) -> str:
         """提交代码到代码库
 
         :return: 代码库访问地址
         """
-        repo_ctrl = get_repo_controller(self.module, self.operator)
-        try:
-            repo_ctrl.commit_files(commit_info)
-        except CallGitApiFailed as e:
-            logger.exception("failed to commit code to repository")
-            raise CannotCommitToRepository(_("提交代码到代码库失败")) from e
+        # 所有变更都已存在于目标分支中时，无需提交到代码库
+        if commit_info.add_files or commit_info.edit_files or commit_info.delete_files:
+            try:
+                repo_ctrl.commit_files(commit_info)
+            except CallGitApiFailed as e:
+                logger.exception("failed to commit code to repository")
+                raise CannotCommitToRepository(_("提交代码到代码库失败")) from e
 
         version_info = self.dev_sandbox.version_info
         repo_url = repo_ctrl.build_url(version_info)
@@ -107,3 +154,16 @@ class DevSandboxCodeCommit:
 
         # 如果版本类型是分支，访问地址可以更具体一些
         return f"{repo_url.removesuffix('.git')}/tree/{version_info.version_name}"
+
+
+class SpooledChangedFile(ChangedFile):
+    """内容暂存在临时文件中的变更文件，较大的文件内容会被写入磁盘，仅在读取 content 时加载"""
+
+    def __init__(self, path: str, spool: IO[bytes]):
+        self.path = path
+        self._spool = spool
+
+    @property  # type: ignore[override]
+    def content(self) -> str:
+        self._spool.seek(0)
+        return self._spool.read().decode("utf-8")
@@ -22,3 +22,7 @@ class DevSandboxApiException(Exception):
 
 class CannotCommitToRepository(Exception):
     """无法提交代码变更到仓库"""
+
+
+class DevServerFileApiUnsupported(DevSandboxApiException):
+    """devserver 版本较旧，不支持逐个下载文件内容"""
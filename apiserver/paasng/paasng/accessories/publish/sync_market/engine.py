@@ -17,19 +17,23 @@
 
 import datetime
 import logging
-from typing import Optional
+from collections import defaultdict
+from itertools import islice
+from typing import Dict, List, Optional
 from urllib.parse import urlparse
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import QuerySet
 
 from paasng.accessories.publish.market.constant import AppState
-from paasng.accessories.publish.market.models import MarketConfig
+from paasng.accessories.publish.market.models import MarketConfig, Product
 from paasng.accessories.publish.market.protections import AppPublishPreparer
 from paasng.accessories.publish.market.utils import MarketAvailableAddressHelper
 from paasng.accessories.publish.sync_market.constant import RegionConverter
 from paasng.accessories.publish.sync_market.managers import AppManger, AppTagManger
 from paasng.core.region.models import get_region
+from paasng.platform.applications.models import ApplicationEnvironment
 from paasng.platform.engine.models.mobile_config import MobileConfig
 from paasng.utils.basic import get_username_by_bkpaas_user_id
 
@@ -39,12 +43,20 @@ logger = logging.getLogger(__name__)
 
 
 class RemoteAppManager:
-    def __init__(self, product, session):
+    """同步应用市场数据到桌面
+
+    :param product: 应用市场的 Product 对象
+    :param session: 桌面数据库的 session
+    :param default_envs: 预先加载的默认模块的环境 {环境名: 环境对象}, 为 None 时按需查询
+    """
+
+    def __init__(self, product, session, default_envs: Optional[Dict[str, ApplicationEnvironment]] = None):
         self.product = product
         self.application = product.application
         market_config, _ = MarketConfig.objects.get_or_create_by_app(self.application)
         self.market_config = market_config
         self.session = session
+        self.default_envs = default_envs
 
     @property
     def display_options(self):
@@ -62,13 +74,14 @@ class RemoteAppManager:
         """更新 field_names 列表中的字段"""
         data = dict()
         app_mode = AppManger(self.session).model
-        for name in dir(app_mode):
-            if name in field_names:
-                field = getattr(app_mode, name)
-                try:
-                    data[name] = self.single_field_hybrate(field)
-                except FieldNotFound:
-                    continue
+        for name in field_names:
+            field = getattr(app_mode, name, None)
+            if field is None:
+                continue
+            try:
+                data[name] = self.single_field_hybrate(field)
+            except FieldNotFound:
+                continue
         return data
 
     def sync_data(self, field_names):
@@ -327,8 +340,11 @@ class RemoteAppManager:
 
     def get_mobile_config(self, env_name: str) -> Optional[MobileConfig]:
         try:
-            env = self.application.envs.get(module__is_default=True, environment=env_name)
-        except ObjectDoesNotExist:
+            if self.default_envs is not None:
+                env = self.default_envs[env_name]
+            else:
+                env = self.application.envs.get(module__is_default=True, environment=env_name)
+        except (KeyError, ObjectDoesNotExist):
             logger.warning("The env object does not exist, app: %s(%s).", self.application.code, env_name)
             return None
 
@@ -478,3 +494,55 @@ class RemoteAppManager:
     def hybrate_visiable_labels(self):
         """应用可见范围"""
         return self.product.transform_visiable_labels()
+
+
+class BulkRemoteAppSyncer:
+    """批量同步应用市场数据到桌面, 适用于全量同步大量应用的场景
+
+    - 每批应用所需的平台侧数据通过少量查询预先加载
+    - 一次性查询该批应用在桌面中的记录, 逐个应用对比出有变化的字段
+    - 仅将有变化的字段通过一次 executemany 写入
+
+    :param session: 桌面数据库的 session
+    :param batch_size: 每批同步的应用数量
+    """
+
+    def __init__(self, session, batch_size: int = 500):
+        self.session = session
+        self.batch_size = batch_size
+
+    def sync(self, products: QuerySet[Product], field_names: List[str]) -> int:
+        """同步应用的 field_names 字段
+
+        :return: 有字段发生变化的应用数量
+        """
+        products = products.select_related(
+            "application__market_config",
+            "application__extra_info__tag__tagmap",
+            "displayoptions",
+        ).order_by("pk")
+
+        count = 0
+        iterator = products.iterator(chunk_size=self.batch_size)
+        while batch := list(islice(iterator, self.batch_size)):
+            count += self._sync_batch(batch, field_names)
+        return count
+
+    def _sync_batch(self, products: List[Product], field_names: List[str]) -> int:
+        envs_by_app: Dict[str, Dict[str, ApplicationEnvironment]] = defaultdict(dict)
+        for env in ApplicationEnvironment.objects.filter(
+            application_id__in=[p.application_id for p in products], module__is_default=True
+        ).select_related("mobile_config"):
+            envs_by_app[env.application_id][env.environment] = env
+
+        data_by_code = {}
+        for product in products:
+            try:
+                manager = RemoteAppManager(product, self.session, default_envs=envs_by_app[product.application_id])
+                data_by_code[product.code] = manager.fields_hybrate(field_names)
+            except Exception:
+                logger.exception("Failed to collect the data of product %s, skip syncing", product.code)
+
+        count = AppManger(self.session).bulk_sync(data_by_code)
+        logger.info("Synced %d products to console, %d of them were changed", len(data_by_code), count)
+        return count
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from paasng.accessories.publish.market.models import Product
+from paasng.accessories.publish.sync_market.engine import BulkRemoteAppSyncer
+from paasng.core.core.storages.sqlalchemy import console_db
+
+try:
+    from paasng.accessories.publish.sync_market.constant_ext import I18N_FIELDS_IN_CONSOLE
+except ImportError:
+    from paasng.accessories.publish.sync_market.constant import I18N_FIELDS_IN_CONSOLE
+
+# 默认同步的字段，与修改应用市场信息时同步的字段一致
+DEFAULT_SYNC_FIELDS = [
+    "created_date",
+    "creater",
+    "description",
+    "introduction",
+    "isresize",
+    "issetbar",
+    "language",
+    "logo",
+    "name",
+    "tags_id",
+    "width",
+    "height",
+    "open_mode",
+    "visiable_labels",
+    *I18N_FIELDS_IN_CONSOLE,
+]
+
+
+class Command(BaseCommand):
+    """全量同步应用市场信息到桌面，仅写入有变化的字段"""
+
+    def add_arguments(self, parser):
+        parser.add_argument("--app-code", dest="app_codes", nargs="*", help="应用 code，默认同步所有应用")
+        parser.add_argument("--field", dest="fields", nargs="*", help="同步的字段，默认同步应用市场基本信息")
+        parser.add_argument("--batch-size", dest="batch_size", type=int, default=500, help="每批同步的应用数量")
+
+    def handle(self, app_codes, fields, batch_size, *args, **kwargs):
+        if not getattr(settings, "BK_CONSOLE_DBCONF", None):
+            self.stdout.write("未配置桌面数据库(BK_CONSOLE_DBCONF)，跳过同步")
+            return
+
+        products = Product.objects.all()
+        if app_codes:
+            products = products.filter(code__in=app_codes)
+
+        with console_db.session_scope() as session:
+            count = BulkRemoteAppSyncer(session, batch_size=batch_size).sync(products, fields or DEFAULT_SYNC_FIELDS)
+        self.stdout.write(f"同步完成，共 {count} 个应用的桌面信息发生了变化")
@@ -18,10 +18,10 @@
 import datetime
 import logging
 from dataclasses import asdict
-from typing import Optional
+from typing import Dict, Optional, Set
 
 from django.utils.translation import get_language
-from sqlalchemy import and_, or_
+from sqlalchemy import and_, bindparam, or_, update
 
 from paasng.accessories.publish.market.models import Tag
 from paasng.accessories.publish.sync_market.models import TagData, TagMap
@@ -155,6 +155,49 @@ class AppManger(AppAdaptor):
 
         return qs.filter(or_(tenant_filter, global_filter))
 
+    def bulk_sync(self, data_by_code: Dict[str, dict]) -> int:
+        """Sync the data of many applications, only the changed columns are written
+
+        The existing rows are selected at once, the changed columns of all applications are
+        then written by a single "executemany" statement.
+
+        :param data_by_code: {application code: data}, the data has the same format as `update`.
+        :return: the number of applications which have changed columns.
+        """
+        if not data_by_code:
+            return 0
+
+        rows = self.session.query(self.model).filter(self.model.code.in_(list(data_by_code))).all()
+        changed_rows = []
+        columns: Set[str] = set()
+        for row in rows:
+            data = self.prepare_update_data(dict(data_by_code[row.code]))
+            changed = {name for name, value in data.items() if getattr(row, name) != value}
+            if changed:
+                changed_rows.append((row, data))
+                columns.update(changed)
+        if not changed_rows:
+            return 0
+
+        # All rows share the same statement, so the columns changed in any row are written, the
+        # columns absent in the data of a row are written with their existing values.
+        table = self.model.__table__
+        stmt = (
+            update(table)
+            .where(table.c.code == bindparam("b_code"))
+            .values({name: bindparam(f"b_{name}") for name in sorted(columns)})
+        )
+        params = []
+        for row, data in changed_rows:
+            params.append(
+                {"b_code": row.code, **{f"b_{name}": data.get(name, getattr(row, name)) for name in columns}}
+            )
+        self.session.execute(stmt, params)
+        # The statement bypasses the ORM, expire the loaded rows to avoid reading stale values later
+        for row, _ in changed_rows:
+            self.session.expire(row)
+        return len(changed_rows)
+
     def delete_by_code(self, code: str):
         """根据 code 从 DB 中删除应用"""
         self.session.query(self.model).filter_by(code=code).delete()
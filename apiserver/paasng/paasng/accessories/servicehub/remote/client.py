@@ -21,7 +21,7 @@ import logging
 import time
 from contextlib import contextmanager
 from dataclasses import MISSING, dataclass
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from urllib.parse import urljoin
 
 import requests
@@ -177,6 +177,23 @@ class RemoteServiceClient:
             self.validate_resp(resp)
             return resp.json()
 
+    def list_services_if_modified(self, etag: Optional[str]) -> Tuple[Optional[List[Dict]], Optional[str]]:
+        """List all services infos only if they have been modified since the last request
+
+        :param etag: The ETag of the last response, None means always fetching.
+        :raises: RemoteClientError
+        :return: ([<service dict>, ...], <etag>), the services are None if not modified.
+        """
+        headers = {"If-None-Match": etag} if etag else {}
+        with wrap_request_exc(self):
+            resp = requests.get(
+                self.config.index_url, auth=self.auth, headers=headers, timeout=self.REQUEST_LIST_TIMEOUT
+            )
+            if resp.status_code == 304:
+                return None, etag
+            self.validate_resp(resp)
+            return resp.json(), resp.headers.get("ETag")
+
     def create_service(self, data: Dict):
         """Create a new service
 
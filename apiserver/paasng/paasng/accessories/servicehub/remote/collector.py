@@ -17,8 +17,14 @@
 
 """Collector for remote services"""
 
+import hashlib
+import json
 import logging
-from typing import Dict, Generator, List, NamedTuple, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Generator, List, NamedTuple, Optional, Tuple
 
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
@@ -27,7 +33,8 @@ from rest_framework.exceptions import ValidationError
 
 from paasng.accessories.servicehub.remote.client import RemoteServiceClient, RemoteSvcConfig
 from paasng.accessories.servicehub.remote.exceptions import FetchRemoteSvcError, RemoteClientError
-from paasng.accessories.servicehub.remote.store import RemoteServiceStore
+from paasng.accessories.servicehub.remote.store import RemoteServiceStore, get_remote_store
+from paasng.accessories.servicehub.signals import remote_services_changed
 from paasng.utils.i18n.serializers import I18nDictCharField
 
 logger = logging.getLogger(__name__)
@@ -61,6 +68,20 @@ class RemoteSvcFetcher:
         items = self.validate_data(json_data)
         return items
 
+    def fetch_if_modified(self, etag: Optional[str]) -> Tuple[Optional[List[Dict]], Optional[str]]:
+        """Fetch services and plans only if they have been modified since the last fetching
+
+        :return: (<services>, <etag>), the services are None if not modified.
+        """
+        try:
+            json_data, etag = self.client.list_services_if_modified(etag)
+        except RemoteClientError as e:
+            raise FetchRemoteSvcError("error fetching services.") from e
+
+        if json_data is None:
+            return None, etag
+        return self.validate_data(json_data), etag
+
     def validate_data(self, json_data) -> List[Dict]:
         """Validate json data
 
@@ -136,17 +157,20 @@ def refresh_remote_service(remote_store: RemoteServiceStore, service_id: str):
     remote_store.bulk_upsert(ret.data, meta_info=ret.meta_info, source_config=ret.config)
 
 
-def fetch_all_remote_services() -> Generator[FetchResult, None, None]:
-    """Fetch all service data defined in config"""
+def load_remote_svc_configs() -> List[RemoteSvcConfig]:
+    """Load the configs of remote service endpoints from settings"""
     try:
         remote_svc_configs = settings.SERVICE_REMOTE_ENDPOINTS
     except AttributeError:
         raise ImproperlyConfigured("Can't initialize remote services, SERVICE_REMOTE_ENDPOINTS is not configured")
     if not isinstance(remote_svc_configs, list):
         raise ImproperlyConfigured("SERVICE_REMOTE_ENDPOINTS must be list type")
+    return [RemoteSvcConfig.from_json(endpoint_conf) for endpoint_conf in remote_svc_configs]
+
 
-    for endpoint_conf in remote_svc_configs:
-        config = RemoteSvcConfig.from_json(endpoint_conf)
+def fetch_all_remote_services() -> Generator[FetchResult, None, None]:
+    """Fetch all service data defined in config"""
+    for config in load_remote_svc_configs():
         try:
             yield fetch_remote_service(config)
         except FetchRemoteSvcError:
@@ -164,3 +188,203 @@ def initialize_remote_services(remote_store: RemoteServiceStore):
             remote_store.bulk_upsert(ret.data, meta_info=ret.meta_info, source_config=ret.config)
         except Exception:
             logger.exception("update service failed.")
+
+
+@dataclass
+class RefreshResult:
+    """The result of refreshing an endpoint, the fields are lists of service uuids"""
+
+    config: RemoteSvcConfig
+    not_modified: bool = False
+    created: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.created or self.updated or self.removed)
+
+
+@dataclass
+class _EndpointState:
+    etag: Optional[str] = None
+    # The digests of the services from the last fetching, {<uuid>: <digest>}
+    digests: Dict[str, str] = field(default_factory=dict)
+    # The time of the last full fetching
+    fetched_at: float = 0
+
+
+class RemoteServicesRefresher:
+    """Refresh the remote services from all endpoints incrementally.
+
+    - the endpoints are fetched concurrently, each one has its own timeout
+    - the services are fetched with the ETag of the last response, an unchanged endpoint only
+      costs one "304 Not Modified" response. The endpoints which do not support ETag are fetched
+      at the fallback interval instead, as often as before
+    - only the changed services are written to the store, the unchanged ones are kept alive
+    - a `remote_services_changed` signal is sent for every changed endpoint
+
+    The services disappeared from an endpoint are not deleted, they expire in the store as before.
+
+    :param store: The store of remote services.
+    :param timeout: The timeout of fetching each endpoint, in seconds.
+    :param full_refresh_interval: Fetch without ETag after this interval, so that the meta info
+        of the endpoint, which has no ETag, is refreshed too, in seconds.
+    :param fallback_interval: The interval of fetching the endpoints which returned no ETag, in seconds,
+        defaults to `settings.REMOTE_SERVICES_UPDATE_INTERVAL_MINUTES`.
+    :param clock: The monotonic clock, customizable for testing.
+    """
+
+    max_workers = 8
+
+    def __init__(
+        self,
+        store: RemoteServiceStore,
+        timeout: float = RemoteServiceClient.REQUEST_LIST_TIMEOUT,
+        full_refresh_interval: float = 600,
+        fallback_interval: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.store = store
+        self.timeout = timeout
+        self.full_refresh_interval = full_refresh_interval
+        if fallback_interval is None:
+            fallback_interval = settings.REMOTE_SERVICES_UPDATE_INTERVAL_MINUTES * 60
+        self.fallback_interval = fallback_interval
+        self.clock = clock
+        self._states: Dict[str, _EndpointState] = {}
+
+    def refresh(self, configs: Optional[List[RemoteSvcConfig]] = None) -> List[RefreshResult]:
+        """Refresh the services of given endpoints, all endpoints in settings by default
+
+        :return: The results of endpoints which have been refreshed successfully.
+        """
+        if configs is None:
+            configs = load_remote_svc_configs()
+        configs = [config for config in configs if self._is_due(config)]
+        if not configs:
+            return []
+
+        results = []
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(configs)))
+        try:
+            started_at = self.clock()
+            futures = [(config, executor.submit(self._fetch, config)) for config in configs]
+            for config, future in futures:
+                timeout = max(0.0, started_at + self.timeout - self.clock())
+                try:
+                    services, etag, meta_info = future.result(timeout=timeout)
+                except FutureTimeoutError:
+                    logger.warning(
+                        "fetching remote services from %s did not finish in %s seconds", config, self.timeout
+                    )
+                    continue
+                except Exception:
+                    logger.exception("unable to load remote service from %s.", config)
+                    continue
+
+                try:
+                    results.append(self._apply(config, services, etag, meta_info))
+                except Exception:
+                    logger.exception("update services from %s failed.", config)
+        finally:
+            # Do not wait for the timed out endpoints
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def _is_due(self, config: RemoteSvcConfig) -> bool:
+        """Check if the endpoint should be fetched now, an endpoint without ETag can not be fetched
+        cheaply, so it is fetched at the fallback interval only.
+        """
+        state = self._states.get(config.name)
+        if state is None or state.etag:
+            return True
+        return self.clock() - state.fetched_at >= self.fallback_interval
+
+    def _fetch(self, config: RemoteSvcConfig) -> Tuple[Optional[List[Dict]], Optional[str], Optional[Dict]]:
+        state = self._states.get(config.name)
+        etag = None
+        if state and self.clock() - state.fetched_at < self.full_refresh_interval:
+            etag = state.etag
+
+        fetcher = RemoteSvcFetcher(config)
+        services, etag = fetcher.fetch_if_modified(etag)
+        if services is None:
+            return None, etag, None
+        return services, etag, fetcher.get_meta_info()
+
+    def _apply(
+        self,
+        config: RemoteSvcConfig,
+        services: Optional[List[Dict]],
+        etag: Optional[str],
+        meta_info: Optional[Dict],
+    ) -> RefreshResult:
+        state = self._states.get(config.name)
+        if services is None:
+            # Not modified, the state must exist because the ETag comes from it
+            assert state is not None
+            self.store.touch(list(state.digests))
+            return RefreshResult(config, not_modified=True, unchanged=list(state.digests))
+
+        # The meta info is a part of the stored service data
+        digests = {svc["uuid"]: _make_service_digest({**svc, "_meta_info": meta_info}) for svc in services}
+        if state is None:
+            # Compare with the services in store at the first time, such as after restarting
+            stored = self.store.bulk_get(list(digests))
+            previous = {uuid: _make_service_digest(svc) for uuid, svc in zip(digests, stored, strict=True) if svc}
+        else:
+            previous = state.digests
+
+        result = RefreshResult(config)
+        changed = []
+        for svc in services:
+            uuid = svc["uuid"]
+            if uuid not in previous:
+                result.created.append(uuid)
+            elif previous[uuid] != digests[uuid]:
+                result.updated.append(uuid)
+            else:
+                result.unchanged.append(uuid)
+                continue
+            changed.append(svc)
+        result.removed = [uuid for uuid in previous if uuid not in digests] if state else []
+
+        if changed:
+            self.store.bulk_upsert(changed, meta_info=meta_info, source_config=config)
+        self.store.touch(result.unchanged)
+
+        self._states[config.name] = _EndpointState(etag=etag, digests=digests, fetched_at=self.clock())
+        if result.changed:
+            logger.info(
+                "remote services from %s changed, created: %s, updated: %s, removed: %s",
+                config,
+                result.created,
+                result.updated,
+                result.removed,
+            )
+            remote_services_changed.send(
+                sender=self.__class__,
+                source_config=config,
+                created=result.created,
+                updated=result.updated,
+                removed=result.removed,
+            )
+        return result
+
+
+def _make_service_digest(service: Dict) -> str:
+    data = json.dumps(service, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+_remote_services_refresher: Optional[RemoteServicesRefresher] = None
+
+
+def get_remote_services_refresher() -> RemoteServicesRefresher:
+    """Get the refresher of current process, which keeps the states of endpoints between refreshing"""
+    global _remote_services_refresher
+    if _remote_services_refresher is None:
+        _remote_services_refresher = RemoteServicesRefresher(get_remote_store())
+    return _remote_services_refresher
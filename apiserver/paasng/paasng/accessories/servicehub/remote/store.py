@@ -104,6 +104,9 @@ class MemoryStore(StoreMixin):
             self._map_id_to_service[service["uuid"]] = service
             self._map_id_to_config[service["uuid"]] = source_config
 
+    def touch(self, uuids: List[str]):
+        """Keep the unchanged services alive, the memory store never expires"""
+
     def get_source_config(self, uuid: str) -> RemoteSvcConfig:
         """Get the source remote svc config by service uuid"""
         return self._map_id_to_config[uuid]
@@ -176,6 +179,17 @@ class RedisStore(StoreMixin):
             pipe.sadd(self.registered_services_key, sid.encode(self.encoding))
             pipe.execute()
 
+    def touch(self, uuids: List[str]):
+        """Keep the unchanged services alive by renewing their expiration time"""
+        if not uuids:
+            return
+
+        pipe = self.redis.pipeline()
+        for sid in uuids:
+            pipe.expire(self._make_svc_info_key(sid), self.expires)
+            pipe.expire(self._make_svc_config_key(sid), self.expires)
+        pipe.execute()
+
     def get_source_config(self, uuid: str) -> RemoteSvcConfig:
         """Get the source remote svc config by service uuid"""
         config = self.redis.get(self._make_svc_config_key(uuid))
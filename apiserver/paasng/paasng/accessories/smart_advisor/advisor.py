@@ -15,11 +15,18 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
+import heapq
+import logging
 from collections import defaultdict
-from typing import List
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterable, List, Set, Tuple
+
+from paasng.utils.versioned_cache import VersionedCache
 
 from .models import DocumentaryLink
-from .tags import Tag
+from .tags import Tag, get_dynamic_tag
+
+logger = logging.getLogger(__name__)
 
 
 class DocumentaryLinkAdvisor:
@@ -42,26 +49,77 @@ class DocumentaryLinkAdvisor:
         """
         if not tags:
             return []
+        return documentary_link_index_cache.get().search(tags, limit)
+
+
+@dataclass
+class IndexedLink:
+    """A documentary link with its affinity tags grouped by tag type"""
+
+    link: DocumentaryLink
+    tags_by_type: Dict[str, FrozenSet[Tag]]
+
+
+class DocumentaryLinkIndex:
+    """An inverted index from affinity tag to documentary links
+
+    A link can only get a positive score when it shares at least one tag with the subject, so only
+    the links reached through the subject's tags need to be scored.
+    """
+
+    def __init__(self, links: Iterable[DocumentaryLink]):
+        self._links: Dict[int, IndexedLink] = {}
+        self._link_ids_by_tag: Dict[Tag, List[int]] = defaultdict(list)
 
-        subject_tags_by_type = defaultdict(set)
+        for link in links:
+            tags_by_type: Dict[str, Set[Tag]] = defaultdict(set)
+            for tag_str in link.affinity_tags:
+                try:
+                    tag = get_dynamic_tag(tag_str)
+                except ValueError:
+                    logger.warning("Invalid affinity tag %s found in documentary link %s, skipped", tag_str, link.pk)
+                    continue
+                tags_by_type[tag.tag_type].add(tag)
+
+            self._links[link.pk] = IndexedLink(link, {k: frozenset(v) for k, v in tags_by_type.items()})
+            for tag_set in tags_by_type.values():
+                for tag in tag_set:
+                    self._link_ids_by_tag[tag].append(link.pk)
+
+    @classmethod
+    def build(cls) -> "DocumentaryLinkIndex":
+        return cls(DocumentaryLink.objects.all().order_by("pk"))
+
+    def search(self, tags: List[Tag], limit: int = 5) -> List[DocumentaryLink]:
+        """Find the most related links by given tags, see `DocumentaryLinkAdvisor.search_by_tags` for details"""
+        subject_tags_by_type: Dict[str, Set[Tag]] = defaultdict(set)
         for tag in tags:
             subject_tags_by_type[tag.tag_type].add(tag)
 
-        results = []
-        for link in DocumentaryLink.objects.all().order_by("pk"):
+        candidate_ids = set()
+        for tag in tags:
+            candidate_ids.update(self._link_ids_by_tag.get(tag, ()))
+
+        scored: List[Tuple[int, int]] = []
+        for link_id in candidate_ids:
+            indexed = self._links[link_id]
             score = 0
-            for tag_type in subject_tags_by_type:
-                link_tags = link.get_affinity_tags_by_type(tag_type)
+            for tag_type, subject_tags in subject_tags_by_type.items():
+                link_tags = indexed.tags_by_type.get(tag_type)
                 if not link_tags:
-                    score += len(link_tags)
                     continue
 
-                common_tags = set(link_tags) & subject_tags_by_type[tag_type]
-                if common_tags:
-                    score += 10 * len(common_tags)
-                else:
-                    score -= 100
+                common_count = len(link_tags & subject_tags)
+                score += 10 * common_count if common_count else -100
             if score > 0:
-                results.append({"score": score * link.priority, "link": link})
-        results.sort(key=lambda item: item["score"], reverse=True)
-        return [item["link"] for item in results[:limit]]
+                scored.append((score * indexed.link.priority, link_id))
+
+        # Links with the same score are ordered by pk
+        top = heapq.nsmallest(limit, scored, key=lambda item: (-item[0], item[1]))
+        return [self._links[link_id].link for _, link_id in top]
+
+
+# 进程内的文档链接索引缓存，文档链接发生变更时（见 handlers）失效
+documentary_link_index_cache: VersionedCache[DocumentaryLinkIndex] = VersionedCache(
+    "smart_advisor:documentary_link_index", lambda _: DocumentaryLinkIndex.build()
+)
@@ -20,3 +20,6 @@ from django.apps import AppConfig
 
 class SmartAdvisorConfig(AppConfig):
     name = "paasng.accessories.smart_advisor"
+
+    def ready(self):
+        from . import handlers  # noqa: F401
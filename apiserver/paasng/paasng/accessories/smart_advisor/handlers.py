@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .advisor import documentary_link_index_cache
+from .models import DeployFailurePattern, DocumentaryLink
+from .tagging import failure_patterns_cache
+
+
+@receiver(post_save, sender=DeployFailurePattern)
+@receiver(post_delete, sender=DeployFailurePattern)
+def on_failure_pattern_changed(sender, instance, *args, **kwargs):
+    """Invalidate the compiled failure patterns when any pattern was changed"""
+    failure_patterns_cache.bump_version_on_commit(using=kwargs.get("using"))
+
+
+@receiver(post_save, sender=DocumentaryLink)
+@receiver(post_delete, sender=DocumentaryLink)
+def on_documentary_link_changed(sender, instance, *args, **kwargs):
+    """Rebuild the documentary link index when any link was changed"""
+    documentary_link_index_cache.bump_version_on_commit(using=kwargs.get("using"))
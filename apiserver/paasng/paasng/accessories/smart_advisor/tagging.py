@@ -17,14 +17,19 @@
 
 """Tagging tools"""
 
+import contextlib
 import logging
 import re
+import threading
+from dataclasses import dataclass
 from os import PathLike
 from pathlib import Path
-from typing import List
+from typing import Callable, Collection, Dict, FrozenSet, Iterable, List, Optional, Pattern, Sequence, Set
 
+from paasng.core.core.storages.redisdb import get_default_redis
 from paasng.platform.engine.logs import get_all_logs
 from paasng.platform.engine.models.deployment import Deployment
+from paasng.utils.versioned_cache import VersionedCache
 
 from .constants import DeployFailurePatternType
 from .models import DeployFailurePattern
@@ -83,16 +88,218 @@ def py_module_in_requirements(name, requirements):
     return False
 
 
+# 不含任何正则元字符的表达式，可以直接当作字面量做子串匹配
+_REGEX_META_CHARS = frozenset(r".^$*+?{}[]\|()")
+
+
+@dataclass
+class CompiledFailurePattern:
+    """A compiled deploy failure pattern
+
+    :param value: The raw regular expression.
+    :param tag_str: The tag which will be attached when the pattern matched.
+    :param regex: The compiled regular expression, with IGNORECASE flag.
+    :param literal: The lowercased literal, only set when the expression contains no meta chars,
+        in which case a substring search is enough.
+    """
+
+    value: str
+    tag_str: str
+    regex: Pattern
+    literal: Optional[str] = None
+
+    def search(self, text: str, lowered_text: str) -> bool:
+        if self.literal is not None:
+            return self.literal in lowered_text
+        return bool(self.regex.search(text))
+
+
+class CompiledFailurePatterns:
+    """All deploy failure patterns, compiled once and reused by every failed deployment
+
+    Literal patterns are matched by substring search. The others are combined into a single
+    alternation of named groups, one `finditer` pass over the text tells which patterns matched.
+    An alternation only reports one pattern at a position, so the pass is repeated with the
+    patterns not matched yet, until it finds nothing new. The text is therefore scanned
+    "number of matched patterns + 1" times, instead of once for every pattern.
+    """
+
+    def __init__(self, patterns: Sequence[CompiledFailurePattern]):
+        self.patterns = list(patterns)
+        self._regex_indexes = frozenset(idx for idx, p in enumerate(self.patterns) if p.literal is None)
+        self._combined: Dict[FrozenSet[int], Optional[Pattern]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def compile(cls) -> "CompiledFailurePatterns":
+        """Compile all the regular expression patterns stored in database"""
+        compiled = []
+        qs = DeployFailurePattern.objects.filter(type=DeployFailurePatternType.REGULAR_EXPRESSION).order_by("pk")
+        for pattern in qs:
+            try:
+                regex = re.compile(pattern.value, re.IGNORECASE)
+            except re.error:
+                logger.warning("Invalid deploy failure pattern, skipped: %s", pattern.value)
+                continue
+
+            literal = None
+            if not _REGEX_META_CHARS.intersection(pattern.value):
+                literal = pattern.value.lower()
+            compiled.append(CompiledFailurePattern(pattern.value, pattern.tag_str, regex, literal))
+        return cls(compiled)
+
+    def match(self, text: str, skipped: Collection[int] = ()) -> List[int]:
+        """Find the patterns which match given text
+
+        :param text: The text to match.
+        :param skipped: The indexes of patterns which should be skipped, usually matched before.
+        :return: The indexes of the matched patterns.
+        """
+        lowered_text = text.lower()
+        matched = {
+            idx
+            for idx, pattern in enumerate(self.patterns)
+            if pattern.literal is not None and idx not in skipped and pattern.literal in lowered_text
+        }
+        matched.update(self._match_regexes(text, self._regex_indexes.difference(skipped)))
+        for idx in sorted(matched):
+            logger.debug("Deployment failure pattern match found: %s", self.patterns[idx].value)
+        return sorted(matched)
+
+    def _match_regexes(self, text: str, remaining: FrozenSet[int]) -> Set[int]:
+        matched: Set[int] = set()
+        while remaining:
+            combined = self._get_combined(remaining)
+            if combined is None:
+                # 组合后可能因为分组引用等原因失效，此时逐个匹配即可
+                return matched | {idx for idx in remaining if self.patterns[idx].regex.search(text)}
+
+            found = {_group_index(m.lastgroup) for m in combined.finditer(text)}
+            if not found:
+                break
+            matched |= found
+            remaining = remaining - found
+        return matched
+
+    def _get_combined(self, indexes: FrozenSet[int]) -> Optional[Pattern]:
+        if indexes in self._combined:
+            return self._combined[indexes]
+
+        try:
+            combined: Optional[Pattern] = re.compile(
+                "|".join(f"(?P<{_GROUP_PREFIX}{idx}>{self.patterns[idx].value})" for idx in sorted(indexes)),
+                re.IGNORECASE,
+            )
+        except re.error:
+            combined = None
+        with self._lock:
+            self._combined[indexes] = combined
+        return combined
+
+
+_GROUP_PREFIX = "_failure_pattern_"
+
+
+def _group_index(group_name: Optional[str]) -> int:
+    """Get the index of pattern by the name of the outermost group, which is always the last closed one"""
+    assert group_name is not None
+    return int(group_name.removeprefix(_GROUP_PREFIX))
+
+
+# 进程内的部署失败模式编译缓存，部署失败模式发生变更时（见 handlers）失效
+failure_patterns_cache: VersionedCache[CompiledFailurePatterns] = VersionedCache(
+    "smart_advisor:deploy_failure_patterns", lambda _: CompiledFailurePatterns.compile()
+)
+
+
+class DeploymentFailureHits:
+    """The tags of the failure patterns matched while a deployment is running, stored in redis
+    so that the logs written by different processes (such as the build task) are all counted.
+
+    :param deployment_id: The ID of the Deployment object.
+    """
+
+    key_tmpl = "smart_advisor:deploy_failure_hits:{}"
+    # Recorded when the matching begins, tells "nothing matched" apart from "never matched"
+    started_marker = ""
+    expires_in = 3600 * 24 * 7
+
+    def __init__(self, deployment_id: str):
+        self.key = self.key_tmpl.format(deployment_id)
+        self.redis = get_default_redis()
+
+    def start(self):
+        self.add([self.started_marker])
+
+    def add(self, tag_strs: Iterable[str]):
+        pipe = self.redis.pipeline()
+        pipe.sadd(self.key, *tag_strs)
+        pipe.expire(self.key, self.expires_in)
+        pipe.execute()
+
+    def clear(self):
+        self.redis.delete(self.key)
+
+    def get(self) -> Optional[Set[str]]:
+        """Get the matched tags, None if the matching was never started"""
+        members = {m.decode() if isinstance(m, bytes) else m for m in self.redis.smembers(self.key)}
+        if not members:
+            return None
+        return members - {self.started_marker}
+
+
+class StreamingFailureMatcher:
+    """Match deploy failure patterns against the logs incrementally, message by message
+
+    Feed the log messages while the deployment is running, the matched tags are ready as soon as
+    it fails. A pattern will not be tried again once it matched.
+
+    NOTE: each message is matched separately, patterns spanning multiple messages will not match.
+
+    :param deployment_id: The ID of the Deployment object, the matched tags are recorded by it.
+    :param patterns: The compiled patterns, defaults to the cached ones.
+    """
+
+    def __init__(self, deployment_id: str, patterns: Optional[CompiledFailurePatterns] = None):
+        self.patterns = patterns or failure_patterns_cache.get()
+        self.hits = DeploymentFailureHits(deployment_id)
+        self._matched: Set[int] = set()
+        self._stopped = False
+        self._record(self.hits.start)
+
+    def feed(self, text: str):
+        if self._stopped or not text or len(self._matched) == len(self.patterns.patterns):
+            return
+
+        found = self.patterns.match(text, skipped=self._matched)
+        if not found:
+            return
+        self._matched.update(found)
+        self._record(lambda: self.hits.add(self.patterns.patterns[idx].tag_str for idx in found))
+
+    def _record(self, func: Callable[[], None]):
+        try:
+            func()
+        except Exception:
+            # 记录失败时不能影响日志的写入，停止匹配并尽量清除已记录的结果，获取标签时将回退为扫描全部日志
+            logger.exception("Failed to record the deploy failure hits, stop matching")
+            self._stopped = True
+            with contextlib.suppress(Exception):
+                self.hits.clear()
+
+
 def get_deployment_tags(deployment: Deployment) -> List[Tag]:
     """Get tags for a deployment object"""
-    patterns = DeployFailurePattern.objects.filter(type=DeployFailurePatternType.REGULAR_EXPRESSION)
-    tag_strs = []
-
-    # Find deployment failure tags by comparing logs with existed patterns
-    logs = get_all_logs(deployment)
-    for pattern in patterns:
-        if re.search(pattern.value, logs, re.IGNORECASE):
-            logger.debug("Deployment failure pattern match found: %s", pattern.value)
-            tag_strs.append(pattern.tag_str)
+    patterns = failure_patterns_cache.get()
+    try:
+        tag_strs = DeploymentFailureHits(str(deployment.id)).get()
+    except Exception:
+        logger.exception("Failed to get the deploy failure hits")
+        tag_strs = None
+    if tag_strs is None:
+        # 日志未经流式匹配（如更早创建的部署），扫描全部日志
+        return [get_dynamic_tag(patterns.patterns[idx].tag_str) for idx in patterns.match(get_all_logs(deployment))]
 
-    return [get_dynamic_tag(tag_str) for tag_str in tag_strs]
+    # 错误详情不会写入日志流，需要单独匹配
+    tag_strs |= {patterns.patterns[idx].tag_str for idx in patterns.match(deployment.err_detail or "")}
+    return [get_dynamic_tag(tag_str) for tag_str in sorted(tag_strs)]
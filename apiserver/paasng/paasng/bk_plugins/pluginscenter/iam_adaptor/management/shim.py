@@ -31,6 +31,7 @@ from paasng.bk_plugins.pluginscenter.iam_adaptor.constants import NEVER_EXPIRE_D
 from paasng.bk_plugins.pluginscenter.iam_adaptor.management.client import BKIAMClient
 from paasng.bk_plugins.pluginscenter.iam_adaptor.models import PluginGradeManager, PluginUserGroup
 from paasng.bk_plugins.pluginscenter.models import PluginInstance
+from paasng.bk_plugins.pluginscenter.thirdparty.utils import call_concurrently
 from paasng.infras.iam.exceptions import BKIAMApiError, BKIAMGatewayServiceError
 
 
@@ -138,11 +139,16 @@ def delete_role_members(plugin: PluginInstance, role: PluginRole, usernames: Lis
 def fetch_user_roles(plugin: PluginInstance, username: str) -> List[PluginRole]:
     """获取用户在插件中的对应的角色"""
     iam_client = BKIAMClient(plugin.tenant_id)
-    user_roles = []
-    for group in PluginUserGroup.objects.filter_by_plugin(plugin):
-        if username in iam_client.fetch_user_group_members(group.user_group_id):
-            user_roles.append(PluginRole(group.role))
-
+    groups = list(PluginUserGroup.objects.filter_by_plugin(plugin))
+    # 各用户组的成员互不影响，并发查询
+    groups_members = call_concurrently(
+        [functools.partial(iam_client.fetch_user_group_members, group.user_group_id) for group in groups]
+    )
+    user_roles = [
+        PluginRole(group.role)
+        for group, usernames in zip(groups, groups_members, strict=True)
+        if username in usernames
+    ]
     return sorted(user_roles)
 
 
@@ -190,16 +196,21 @@ def fetch_plugin_members(plugin: PluginInstance) -> List[PluginMember]:
     :param plugin: 蓝鲸插件
     """
     iam_client = BKIAMClient(plugin.tenant_id)
+    groups = list(PluginUserGroup.objects.filter_by_plugin(plugin))
+    # 各用户组的成员互不影响，并发查询
+    groups_members = call_concurrently(
+        [functools.partial(iam_client.fetch_user_group_members, group.user_group_id) for group in groups]
+    )
 
     members = []
-    for group in PluginUserGroup.objects.filter_by_plugin(plugin):
+    for group, usernames in zip(groups, groups_members, strict=True):
         members.extend(
             [
                 {
                     "role": {"id": PluginRole(group.role), "name": PluginRole.get_choice_label(group.role)},
                     "username": username,
                 }
-                for username in iam_client.fetch_user_group_members(group.user_group_id)
+                for username in usernames
             ]
         )
     return sorted(cattr.structure(members, List[PluginMember]), key=attrgetter("role.id"))
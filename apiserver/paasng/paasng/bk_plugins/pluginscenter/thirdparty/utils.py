@@ -16,9 +16,14 @@
 # to the current version of the project delivered to anyone in the future.
 
 import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
+from dataclasses import dataclass
 from functools import lru_cache, wraps
-from typing import Optional, Type
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type, TypeVar
 
 from bkapi_client_core.apigateway import APIGatewayClient, Operation, bind_property
 from bkapi_client_core.apigateway import OperationGroup as _OperationGroup
@@ -27,29 +32,35 @@ from bkapi_client_core.exceptions import ResponseError
 from bkapi_client_core.session import Session
 from blue_krill.web.std_error import APIError
 from django.conf import settings
-from django.utils.translation import get_language
+from django.db import connection, connections
+from django.utils.translation import get_language, override
+from requests.adapters import HTTPAdapter
 from requests.models import Request
 
 from paasng.bk_plugins.pluginscenter.definitions import PluginBackendAPIResource
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class OperationGroup(_OperationGroup):
     call: Operation
 
 
 class DynamicClient(APIGatewayClient):
-    group: OperationGroup
-
     def __init__(self, api_name: str, stage: Optional[str] = None, endpoint: str = "", session=None):
         self._api_name = api_name
         super().__init__(stage, endpoint, session)
 
-    def with_group(self, group_cls: Type[OperationGroup]):
-        self.group = group_cls("group", self)
-        self.group.call = exception_transformer_decorator(self.group.call)
-        return self
+    def make_group(
+        self, group_cls: Type[OperationGroup], limiter: Optional["ConcurrencyLimiter"] = None
+    ) -> OperationGroup:
+        """Make an operation group bound to the client, a client may be shared by many groups"""
+        group = group_cls("group", self)
+        call = exception_transformer_decorator(group.call)
+        group.call = limiter.wrap(call) if limiter else call
+        return group
 
     def with_bkapi_authorization(self, **auth):
         self.update_bkapi_authorization(**auth)
@@ -72,21 +83,172 @@ def _make_operation_group(resource: PluginBackendAPIResource) -> Type[OperationG
 
 
 def make_client(resource: PluginBackendAPIResource, bk_username: Optional[str] = None) -> OperationGroup:
-    auth = {"bk_app_code": settings.BK_APP_CODE, "bk_app_secret": settings.BK_APP_SECRET}
-    if bk_username:
-        auth["bk_username"] = bk_username
-
-    return (
-        DynamicClient(
-            api_name=resource.apiName,
-            stage=resource.stage or settings.BK_PLUGIN_APIGW_SERVICE_STAGE,
-            endpoint=settings.BK_API_URL_TMPL,
+    """Make an operation group for calling the resource, the underlying client is reused from the registry"""
+    stage = resource.stage or settings.BK_PLUGIN_APIGW_SERVICE_STAGE
+    registry = get_client_registry()
+    client = registry.get(resource.apiName, stage, bk_username)
+    return client.make_group(_make_operation_group(resource), registry.get_limiter(resource.apiName))
+
+
+ClientKey = Tuple[str, str, Optional[str]]
+
+
+@dataclass
+class _PooledClient:
+    client: DynamicClient
+    last_used_at: float
+
+
+class ConcurrencyLimiter:
+    """Limit the concurrent calls to a backend API
+
+    :param max_concurrency: The maximum number of concurrent calls.
+    :param acquire_timeout: How long to wait for a free slot before giving up, in seconds.
+    """
+
+    def __init__(self, name: str, max_concurrency: int, acquire_timeout: float):
+        self.name = name
+        self.acquire_timeout = acquire_timeout
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+
+    def wrap(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not self._semaphore.acquire(timeout=self.acquire_timeout):
+                logger.warning("too many concurrent requests to third-party API: %s", self.name)
+                raise APIError(code="TooManyRequests", message=f"too many concurrent requests to {self.name}")
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._semaphore.release()
+
+        return wrapper
+
+
+class APIClientRegistry:
+    """The registry of API gateway clients, keyed by (api_name, stage, bk_username).
+
+    Creating a client pays for a new session(and connection pool), the hooks and the authorization
+    headers, the registry keeps the clients so that the connections are kept alive between calls.
+
+    - the registry is bounded, the least recently used client is dropped when it's full
+    - clients which have not been used for ``idle_timeout`` seconds are closed
+    - calls to the same API are limited by a :class:`ConcurrencyLimiter`
+
+    :param max_size: The maximum number of clients.
+    :param idle_timeout: Close the clients idle for longer than this, in seconds.
+    :param max_concurrency: The maximum concurrent calls of each API, also the connection pool size.
+    :param acquire_timeout: How long a call waits for a free slot of the API, in seconds.
+    :param clock: The monotonic clock, customizable for testing.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 128,
+        idle_timeout: float = 300,
+        max_concurrency: int = 10,
+        acquire_timeout: float = 30,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.max_concurrency = max_concurrency
+        self.acquire_timeout = acquire_timeout
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._clients: "OrderedDict[ClientKey, _PooledClient]" = OrderedDict()
+        self._limiters: Dict[str, ConcurrencyLimiter] = {}
+
+    def get(self, api_name: str, stage: str, bk_username: Optional[str] = None) -> DynamicClient:
+        """Get the client of given key, create one if it does not exist"""
+        key = (api_name, stage, bk_username)
+        now = self.clock()
+        with self._lock:
+            self._evict_idle(now)
+            if pooled := self._clients.get(key):
+                pooled.last_used_at = now
+                self._clients.move_to_end(key)
+                return pooled.client
+
+            client = self._make_client(api_name, stage, bk_username)
+            self._clients[key] = _PooledClient(client=client, last_used_at=now)
+            while len(self._clients) > self.max_size:
+                # In-flight requests may still use the dropped client, leave the session to be
+                # collected instead of closing it
+                self._clients.popitem(last=False)
+            return client
+
+    def get_limiter(self, api_name: str) -> ConcurrencyLimiter:
+        with self._lock:
+            if api_name not in self._limiters:
+                self._limiters[api_name] = ConcurrencyLimiter(api_name, self.max_concurrency, self.acquire_timeout)
+            return self._limiters[api_name]
+
+    def clear(self):
+        with self._lock:
+            for pooled in self._clients.values():
+                pooled.client.session.close()
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def _evict_idle(self, now: float):
+        # The clients are ordered by the last used time, stop at the first one which is not idle
+        while self._clients:
+            key, pooled = next(iter(self._clients.items()))
+            if now - pooled.last_used_at <= self.idle_timeout:
+                break
+            del self._clients[key]
+            pooled.client.session.close()
+
+    def _make_client(self, api_name: str, stage: str, bk_username: Optional[str]) -> DynamicClient:
+        auth = {"bk_app_code": settings.BK_APP_CODE, "bk_app_secret": settings.BK_APP_SECRET}
+        if bk_username:
+            auth["bk_username"] = bk_username
+
+        session = Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return (
+            DynamicClient(api_name=api_name, stage=stage, endpoint=settings.BK_API_URL_TMPL, session=session)
+            .with_bkapi_authorization(**auth)
+            .with_i18n_hook()
         )
-        .with_group(_make_operation_group(resource))
-        .with_bkapi_authorization(**auth)
-        .with_i18n_hook()
-        .group
-    )
+
+
+_client_registry = APIClientRegistry()
+
+
+def get_client_registry() -> APIClientRegistry:
+    return _client_registry
+
+
+def call_concurrently(operations: Sequence[Callable[[], T]], max_workers: int = 8) -> List[T]:
+    """Run several third-party operations concurrently, such as fetching data for each item of a
+    list view. The results are in the same order as the operations, the first error is raised.
+
+    The operations run in threads, they must not rely on the uncommitted data of the caller's
+    transaction, so they are run sequentially when called in an atomic block.
+    """
+    if len(operations) <= 1 or max_workers <= 1 or connection.in_atomic_block:
+        return [op() for op in operations]
+
+    # The language is thread-local, pass it to the threads for the i18n hook
+    language = get_language()
+
+    def run(op: Callable[[], T]) -> T:
+        try:
+            with override(language):
+                return op()
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(operations))) as executor:
+        futures = [executor.submit(run, op) for op in operations]
+        return [future.result() for future in futures]
 
 
 def transform_exception(exc: Exception):
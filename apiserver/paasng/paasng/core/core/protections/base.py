@@ -18,9 +18,16 @@
 """Preconditions for doing something"""
 
 import logging
+import time
 from abc import ABCMeta, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import dataclass
-from typing import List
+from typing import ClassVar, Dict, List, Optional, Tuple, Type
+
+from django.core.cache import cache
+from django.db import connection, connections
+from django.utils.translation import gettext_lazy as _
 
 from paasng.core.core.protections.exceptions import ConditionNotMatched
 
@@ -28,10 +35,28 @@ logger = logging.getLogger(__name__)
 
 
 class BaseCondition(metaclass=ABCMeta):
+    # The conditions which must be matched before current one is evaluated, current condition is
+    # skipped if any of them fails, so a cheap check can short-circuit an expensive one. Condition
+    # types which are absent in the checker are ignored.
+    depends_on: ClassVar[Tuple[Type["BaseCondition"], ...]] = ()
+    # The maximum seconds to wait for the condition. A condition with timeout is considered to be
+    # remote and evaluated in a thread pool, others are evaluated in the calling thread.
+    timeout: ClassVar[Optional[float]] = None
+    # The seconds to cache a matched result, 0 means never cache
+    cache_ttl: ClassVar[int] = 0
+
     @abstractmethod
     def validate(self):
         """Raise ConditionNotMatched exception if validate failed"""
 
+    def get_cache_key(self) -> Optional[str]:
+        """The cache key of a matched result, None means the result can not be cached"""
+        return None
+
+    def make_timeout_error(self) -> ConditionNotMatched:
+        """The error to report when the condition did not finish in time"""
+        return ConditionNotMatched(_("检查超时，请稍后重试"), getattr(self, "action_name", ""))
+
 
 @dataclass
 class FailedCondition:
@@ -86,3 +111,106 @@ class BaseConditionChecker:
     def all_matched(self) -> bool:
         """Check if application can publish to market"""
         return not self.perform().activated
+
+
+class ConcurrentConditionChecker(BaseConditionChecker):
+    """A condition checker which evaluates independent conditions concurrently.
+
+    - conditions are evaluated in rounds, a round contains all conditions whose dependencies
+      (`depends_on`) have been resolved
+    - in a round, the remote conditions (with `timeout`) run in a thread pool, a condition which
+      does not finish in `timeout` seconds is reported as failed
+    - a matched result is cached for `cache_ttl` seconds under `get_cache_key()`
+    - the failed conditions are always reported in the same order as `conditions`
+    """
+
+    # The maximum number of conditions evaluated at the same time, 1 means evaluate sequentially
+    max_workers: int = 8
+
+    def perform(self) -> ProtectionStatus:
+        results: Dict[int, Optional[ConditionNotMatched]] = {}
+        pending = list(range(len(self.conditions)))
+        while pending:
+            ready = [idx for idx in pending if self._dependencies_resolved(idx, results)]
+            if not ready:
+                raise ValueError(f"circular dependencies between conditions of {self}")
+
+            to_evaluate = []
+            for idx in ready:
+                if self._dependencies_failed(idx, results):
+                    logger.debug("condition %s is skipped because its dependencies failed", self.conditions[idx])
+                    results[idx] = None
+                else:
+                    to_evaluate.append(idx)
+            results.update(self._evaluate_round(to_evaluate))
+            pending = [idx for idx in pending if idx not in results]
+
+        failed_conditions = [e for e in (results[idx] for idx in range(len(self.conditions))) if e is not None]
+        if failed_conditions:
+            logger.info("%s is not prepare for %s", self, "\n".join([str(x.message) for x in failed_conditions]))
+        return ProtectionStatus(failed_conditions)
+
+    def _evaluate_round(self, indexes: List[int]) -> Dict[int, Optional[ConditionNotMatched]]:
+        remote_indexes = [idx for idx in indexes if self.conditions[idx].timeout is not None]
+        # WARNING: 子线程无法读取到 atomic() 中未提交的数据，此时只能顺序执行
+        if not remote_indexes or self.max_workers <= 1 or connection.in_atomic_block:
+            return {idx: _evaluate_condition(self.conditions[idx]) for idx in indexes}
+
+        results: Dict[int, Optional[ConditionNotMatched]] = {}
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(remote_indexes)))
+        try:
+            started_at = time.monotonic()
+            futures = {
+                idx: executor.submit(_evaluate_condition_in_thread, self.conditions[idx]) for idx in remote_indexes
+            }
+            # Evaluate the local conditions while the remote ones are running
+            for idx in indexes:
+                if idx not in futures:
+                    results[idx] = _evaluate_condition(self.conditions[idx])
+
+            for idx, future in futures.items():
+                condition = self.conditions[idx]
+                timeout = max(0.0, started_at + condition.timeout - time.monotonic())  # type: ignore[operator]
+                try:
+                    results[idx] = future.result(timeout=timeout)
+                except FutureTimeoutError:
+                    logger.warning("condition %s did not finish in %s seconds", condition, condition.timeout)
+                    results[idx] = condition.make_timeout_error()
+        finally:
+            # Do not wait for the timed out conditions
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+    def _dependencies_resolved(self, idx: int, results: Dict[int, Optional[ConditionNotMatched]]) -> bool:
+        return all(dep_idx in results for dep_idx in self._get_dependencies(idx))
+
+    def _dependencies_failed(self, idx: int, results: Dict[int, Optional[ConditionNotMatched]]) -> bool:
+        return any(results[dep_idx] is not None for dep_idx in self._get_dependencies(idx))
+
+    def _get_dependencies(self, idx: int) -> List[int]:
+        dep_types = self.conditions[idx].depends_on
+        return [dep_idx for dep_idx, c in enumerate(self.conditions) if dep_idx != idx and isinstance(c, dep_types)]
+
+
+def _evaluate_condition(condition: BaseCondition) -> Optional[ConditionNotMatched]:
+    """Evaluate the condition, return the error if it's not matched"""
+    cache_key = condition.get_cache_key() if condition.cache_ttl else None
+    if cache_key and cache.get(cache_key):
+        return None
+
+    try:
+        condition.validate()
+    except ConditionNotMatched as e:
+        return e
+
+    if cache_key:
+        cache.set(cache_key, True, timeout=condition.cache_ttl)
+    return None
+
+
+def _evaluate_condition_in_thread(condition: BaseCondition) -> Optional[ConditionNotMatched]:
+    try:
+        return _evaluate_condition(condition)
+    finally:
+        # The connections are bound to the worker thread, close them to avoid leaking
+        connections.close_all()
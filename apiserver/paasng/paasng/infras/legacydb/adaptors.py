@@ -85,6 +85,12 @@ class AppAdaptor:
         created_date,creater,description,introduction,isresize,issetbar,language,tags_id,width,height
         is_mapp,use_mobile_online,use_mobile_test,mobile_url_test,mobile_url_prod
         """
+        data = self.prepare_update_data(data)
+        count = self.session.query(self.model).filter_by(code=code).update(data)
+        return count
+
+    def prepare_update_data(self, data: dict) -> dict:
+        """Convert the data to the columns of the application table, the fields which does not exist are removed"""
         # 兼容老数据
         for key in [
             "description",
@@ -107,9 +113,7 @@ class AppAdaptor:
             data["is_resize"] = data.pop("isresize")
         if "issetbar" in data:
             data["is_setbar"] = data.pop("issetbar")
-
-        count = self.session.query(self.model).filter_by(code=code).update(data)
-        return count
+        return data
 
     def create(
         self,
@@ -34,6 +34,9 @@ NEW_APP_COUNTER = Counter(
     ),
 )
 
+# 模板代码本地缓存，result: hit/miss
+TEMPLATE_SOURCE_CACHE_COUNTER = Counter("template_source_cache", "", ("template", "result"))
+
 # 部署
 DEPLOYMENT_TIME_CONSUME_HISTOGRAM = Histogram(
     "time_consumed_by_deployment",
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+"""The background prober of healthz.
+
+Examining all probes on every healthz request multiplies the load on every dependency by the
+frequency of monitoring scrapes, and the latency of the request is the sum of all probes. The
+prober instead runs the probes in a background thread:
+
+- every probe has its own interval and timeout, the due probes are run concurrently
+- the latest diagnosis of each probe is saved in Redis together with the checked time, a lock
+  in Redis makes sure that each probe only runs once per interval among all processes
+- the healthz view serves the saved diagnosis, a diagnosis which has not been refreshed for a
+  few intervals is considered as fatal, because the prober itself might be stuck
+- the saved diagnosis expires after the same few intervals of the slowest probe, and a stale
+  diagnosis is examined again on the first request of a process, so that a diagnosis left by
+  the processes long gone is never served
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import asdict
+from typing import Callable, Dict, List, Optional, Type
+
+from blue_krill.monitoring.probe.base import DiagnosisReport, DiagnosisReportList, Issue, VirtualProbe
+from django.conf import settings
+from redis import Redis
+
+from paasng.core.core.storages.redisdb import get_default_redis
+from paasng.misc.monitoring.healthz.probes import get_default_probes
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProber:
+    """Run probes in background and keep the latest diagnosis in Redis.
+
+    A probe class may define ``probe_interval`` and ``probe_timeout`` attributes to override the
+    defaults, in seconds.
+
+    :param probes: The probe classes.
+    :param default_interval: The default interval between two runs of a probe.
+    :param default_timeout: The default timeout of a probe, a timed out probe is reported as fatal.
+    :param stale_intervals: A diagnosis older than this many intervals is considered as fatal.
+    :param tick: How often the background thread checks for due probes.
+    :param clock: The wall clock, it's shared by processes so it can't be a monotonic one.
+    """
+
+    max_workers = 8
+
+    def __init__(
+        self,
+        probes: List[Type[VirtualProbe]],
+        redis_db: Optional[Redis] = None,
+        key_prefix: str = "healthz::diagnosis",
+        default_interval: float = 30,
+        default_timeout: float = 10,
+        stale_intervals: int = 3,
+        tick: float = 5,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.probes = probes
+        self.redis_db = redis_db or get_default_redis()
+        self.key_prefix = key_prefix
+        self.default_interval = default_interval
+        self.default_timeout = default_timeout
+        self.stale_intervals = stale_intervals
+        self.tick = tick
+        self.clock = clock
+
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._stale_checked = False
+
+    def get_interval(self, probe_cls: Type[VirtualProbe]) -> float:
+        return getattr(probe_cls, "probe_interval", self.default_interval)
+
+    def get_timeout(self, probe_cls: Type[VirtualProbe]) -> float:
+        return getattr(probe_cls, "probe_timeout", self.default_timeout)
+
+    def get_stale_after(self, probe_cls: Type[VirtualProbe]) -> float:
+        return self.get_interval(probe_cls) * self.stale_intervals
+
+    def get_diagnosis(self) -> DiagnosisReportList:
+        """Get the latest diagnosis of all probes.
+
+        The probes which have never been run are run synchronously, such as the first request after
+        deploying. On the first call of current process, the stale diagnosis is also run synchronously,
+        it might be left by the processes before restarting. If Redis is unavailable, all probes are
+        examined synchronously.
+        """
+        try:
+            saved = self._load_all()
+        except Exception:
+            logger.exception("unable to load the saved diagnosis, examine all probes synchronously")
+            return DiagnosisReportList(self.run(self.probes, save=False))
+
+        now = self.clock()
+        check_stale = not self._stale_checked
+        self._stale_checked = True
+        if missing := [
+            probe_cls
+            for probe_cls in self.probes
+            if probe_cls.name not in saved
+            or (check_stale and now - saved[probe_cls.name][1] > self.get_stale_after(probe_cls))
+        ]:
+            for report in self.run(missing):
+                saved[report.system_name] = (report, self.clock())
+
+        now = self.clock()
+        reports = []
+        for probe_cls in self.probes:
+            report, checked_at = saved[probe_cls.name]
+            if now - checked_at > self.get_stale_after(probe_cls):
+                report = DiagnosisReport(
+                    system_name=report.system_name,
+                    is_core=report.is_core,
+                    issues=[
+                        *report.issues,
+                        Issue(fatal=True, description=f"diagnosis is stale, last checked {now - checked_at:.0f}s ago"),
+                    ],
+                )
+            reports.append(report)
+        return DiagnosisReportList(reports)
+
+    def run_due(self) -> List[DiagnosisReport]:
+        """Run the probes which are due, among all processes"""
+        due = [probe_cls for probe_cls in self.probes if self._acquire_turn(probe_cls)]
+        if not due:
+            return []
+        return self.run(due)
+
+    def run(self, probes: List[Type[VirtualProbe]], save: bool = True) -> List[DiagnosisReport]:
+        """Run given probes concurrently, each one within its timeout"""
+        reports = []
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(probes)))
+        try:
+            started_at = time.monotonic()
+            futures = [(probe_cls, executor.submit(_report, probe_cls)) for probe_cls in probes]
+            for probe_cls, future in futures:
+                timeout = self.get_timeout(probe_cls)
+                try:
+                    report = future.result(timeout=max(0.0, started_at + timeout - time.monotonic()))
+                except FutureTimeoutError:
+                    logger.warning("probe %s did not finish in %s seconds", probe_cls.name, timeout)
+                    report = DiagnosisReport(
+                        system_name=probe_cls.name,
+                        is_core=probe_cls.is_core,
+                        issues=[Issue(fatal=True, description=f"probe timed out after {timeout}s")],
+                    )
+                reports.append(report)
+        finally:
+            # Do not wait for the timed out probes
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        if save:
+            try:
+                self._save_all(reports)
+            except Exception:
+                logger.exception("unable to save the diagnosis")
+        return reports
+
+    def start(self):
+        """Start the background thread if it's not running"""
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._loop, name="healthz-prober", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stopped.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _loop(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_due()
+            except Exception:
+                logger.exception("healthz prober failed")
+            self._stopped.wait(self.tick)
+
+    def _acquire_turn(self, probe_cls: Type[VirtualProbe]) -> bool:
+        """Take the turn of running the probe in current interval, the lock expires with the interval"""
+        expires = max(1, int(self.get_interval(probe_cls)))
+        try:
+            return bool(self.redis_db.set(f"{self.key_prefix}::lock::{probe_cls.name}", 1, nx=True, ex=expires))
+        except Exception:
+            logger.exception("unable to acquire the turn of probe %s", probe_cls.name)
+            return False
+
+    def _save_all(self, reports: List[DiagnosisReport]):
+        now = self.clock()
+        mapping = {report.system_name: json.dumps({"report": asdict(report), "checked_at": now}) for report in reports}
+        # The whole hash expires when no process refreshes it, such as all processes are gone
+        expires = max(1, int(max(self.get_stale_after(probe_cls) for probe_cls in self.probes)))
+        pipe = self.redis_db.pipeline()
+        pipe.hset(self.key_prefix, mapping=mapping)
+        pipe.expire(self.key_prefix, expires)
+        pipe.execute()
+
+    def _load_all(self) -> Dict[str, tuple[DiagnosisReport, float]]:
+        result = {}
+        for name, value in self.redis_db.hgetall(self.key_prefix).items():
+            data = json.loads(value)
+            report_data = data["report"]
+            report = DiagnosisReport(
+                system_name=report_data["system_name"],
+                is_core=report_data["is_core"],
+                issues=[Issue(**issue) for issue in report_data["issues"]],
+            )
+            result[name.decode() if isinstance(name, bytes) else name] = (report, data["checked_at"])
+        return result
+
+
+def _report(probe_cls: Type[VirtualProbe]) -> DiagnosisReport:
+    try:
+        return probe_cls().report()
+    except Exception as e:
+        logger.exception("probe %s failed", probe_cls.name)
+        return DiagnosisReport(
+            system_name=probe_cls.name,
+            is_core=probe_cls.is_core,
+            issues=[Issue(fatal=True, description=f"probe failed: {e}")],
+        )
+
+
+_prober: Optional[HealthProber] = None
+_prober_lock = threading.Lock()
+
+
+def get_health_prober() -> HealthProber:
+    """Get the prober of current process, the background thread is started on the first call"""
+    global _prober
+    with _prober_lock:
+        if _prober is None:
+            _prober = HealthProber(
+                get_default_probes(),
+                default_interval=settings.HEALTHZ_PROBE_INTERVAL,
+                default_timeout=settings.HEALTHZ_PROBE_TIMEOUT,
+            )
+            _prober.start()
+        return _prober
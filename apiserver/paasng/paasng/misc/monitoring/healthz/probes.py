@@ -119,6 +119,9 @@ class BKIAMProbe(HttpProbe):
 class ServiceHubProbe(VirtualProbe):
     name = "bk-services"
     is_core = False
+    # Fetching every remote service endpoint is expensive, run it less often
+    probe_interval = 120
+    probe_timeout = 30
 
     def diagnose(self) -> List[Issue]:
         from paasng.accessories.servicehub.remote.collector import (
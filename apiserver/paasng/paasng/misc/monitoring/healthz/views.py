@@ -15,13 +15,12 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
-from blue_krill.monitoring.probe.base import ProbeSet
 from django.conf import settings
 from rest_framework import serializers, status, viewsets
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 
-from paasng.misc.monitoring.healthz.probes import get_default_probes
+from paasng.misc.monitoring.healthz.prober import get_health_prober
 
 
 class IssueSerializer(serializers.Serializer):
@@ -53,8 +52,8 @@ class HealthViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        probe_set = ProbeSet(get_default_probes())
-        diagnosis_list = probe_set.examination()
+        # The probes are run by the background prober, serve the latest diagnosis
+        diagnosis_list = get_health_prober().get_diagnosis()
 
         if diagnosis_list.is_death:
             # if something deadly exist, we have to make response non-200 which is easier to be found
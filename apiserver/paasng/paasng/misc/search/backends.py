@@ -15,20 +15,29 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
+import hashlib
 import itertools
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from dataclasses import dataclass, field
 from datetime import datetime
 from json.decoder import JSONDecodeError
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Type
 
 import requests
 from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
 
+from .constants import SearchSourceStatus
 from .serializers import DocumentSLZ
 
 logger = logging.getLogger(__name__)
 DEFAULT_TIMEOUT = 120
+DEFAULT_POOL_MAXSIZE = 10
 
 
 @dataclass
@@ -72,16 +81,43 @@ def get_json_response(resp: requests.Response, only_allow_ok_status=True) -> Any
 
 
 class BaseSearcher:
+    # The source type of the documents, used for marking the status of the source in mixed searching
+    source_type: str = ""
+
+    # The timeout of each request, searchers should pass it to their HTTP requests
+    timeout: float = DEFAULT_TIMEOUT
+
     def search(self, keyword: str) -> SearchDocResults:
         raise NotImplementedError
 
+    @property
+    def session(self) -> requests.Session:
+        """The HTTP session shared by all instances of the searcher, which supports connection pooling"""
+        return _get_searcher_session(type(self))
+
+
+_searcher_sessions: Dict[Type[BaseSearcher], requests.Session] = {}
+_searcher_sessions_lock = threading.Lock()
+
+
+def _get_searcher_session(searcher_cls: Type[BaseSearcher]) -> requests.Session:
+    with _searcher_sessions_lock:
+        if searcher_cls not in _searcher_sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=DEFAULT_POOL_MAXSIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _searcher_sessions[searcher_cls] = session
+        return _searcher_sessions[searcher_cls]
+
 
 class BKDocumentSearcher(BaseSearcher):
     BKDOC_SEARCH_BASE_URL = settings.BKDOC_URL + "/search/?keyword={}"
+    source_type = "bk_document"
 
     def search(self, keyword: str) -> SearchDocResults:
         """Call blueking document API to get matching documents"""
-        resp = requests.get(self.BKDOC_SEARCH_BASE_URL.format(keyword), timeout=DEFAULT_TIMEOUT)
+        resp = self.session.get(self.BKDOC_SEARCH_BASE_URL.format(keyword), timeout=self.timeout)
         try:
             json_data = get_json_response(resp)
         except ValueError:
@@ -91,7 +127,7 @@ class BKDocumentSearcher(BaseSearcher):
         for item in json_data:
             url = settings.BKDOC_URL + item["url"]
             results.append(
-                SearchDocumentary(source_type="bk_document", title=item["title"], url=url, digest=item["digest"])
+                SearchDocumentary(source_type=self.source_type, title=item["title"], url=url, digest=item["digest"])
             )
         return SearchDocResults(docs=results, count=len(results))
 
@@ -105,19 +141,104 @@ except ImportError:
     pass
 
 
+@dataclass
+class MixSearchResults:
+    """The results of a mixed search
+
+    :param docs: The documents mixed from all sources, in simple payload format.
+    :param sources: The status of each source, the documents are incomplete if any source is not ok.
+    """
+
+    docs: List[Dict]
+    sources: Dict[str, SearchSourceStatus] = field(default_factory=dict)
+
+    @property
+    def incomplete_sources(self) -> List[str]:
+        return [source for source, status in self.sources.items() if status != SearchSourceStatus.OK]
+
+
 class MixSearcher:
-    def __init__(self):
+    """Search documents from all searchers concurrently and mix the results.
+
+    All searchers share an overall deadline, the ones which failed or did not finish in time are
+    skipped, and their statuses are marked in the results. Complete results are cached for a short
+    while by the normalized keyword, so that the repeated searches when typing return instantly.
+
+    :param deadline: The overall deadline of searching, in seconds.
+    :param cache_ttl: The TTL of the results cache, in seconds, 0 means no caching.
+    """
+
+    max_workers = 8
+
+    def __init__(self, deadline: float = 5, cache_ttl: int = 30):
+        self.deadline = deadline
+        self.cache_ttl = cache_ttl
         self.searchers = [cls() for cls in SEARCHER_CLS]
+        for searcher in self.searchers:
+            # The requests are useless after the deadline
+            searcher.timeout = min(searcher.timeout, deadline)
 
     @staticmethod
     def to_simple_payload(doc: SearchDocumentary) -> Dict:
         """Turn SearchDocumentary object into simple json payload"""
         return DocumentSLZ(doc).data
 
+    @staticmethod
+    def normalize_keyword(keyword: str) -> str:
+        return " ".join(keyword.split()).lower()
+
     def search(self, keyword: str) -> List[Dict]:
-        search_results = [searcher.search(keyword).docs for searcher in self.searchers]
+        return self.search_with_status(keyword).docs
+
+    def search_with_status(self, keyword: str) -> MixSearchResults:
+        """Search documents and return the status of every source together"""
+        cache_key = self._make_cache_key(keyword)
+        if self.cache_ttl and (cached := cache.get(cache_key)) is not None:
+            return MixSearchResults(docs=cached, sources=dict.fromkeys(self._source_types, SearchSourceStatus.OK))
+
+        search_results, sources = self._search_all(keyword)
         items = []
         for item in itertools.zip_longest(*search_results):
             # 按 1:1 混合各个 searcher 的结果
             items.extend([i for i in item if i is not None])
-        return [self.to_simple_payload(doc) for doc in items]
+        results = MixSearchResults(docs=[self.to_simple_payload(doc) for doc in items], sources=sources)
+
+        # Partial results are not cached, the failed sources deserve another try
+        if self.cache_ttl and not results.incomplete_sources:
+            cache.set(cache_key, results.docs, timeout=self.cache_ttl)
+        return results
+
+    @property
+    def _source_types(self) -> List[str]:
+        return [searcher.source_type or type(searcher).__name__ for searcher in self.searchers]
+
+    def _search_all(self, keyword: str):
+        search_results: List[List[SearchDocumentary]] = []
+        sources: Dict[str, SearchSourceStatus] = {}
+        if not self.searchers:
+            return search_results, sources
+
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.searchers)))
+        try:
+            started_at = time.monotonic()
+            futures = [executor.submit(searcher.search, keyword) for searcher in self.searchers]
+            for source_type, future in zip(self._source_types, futures, strict=True):
+                timeout = max(0.0, started_at + self.deadline - time.monotonic())
+                try:
+                    search_results.append(future.result(timeout=timeout).docs)
+                except FutureTimeoutError:
+                    logger.warning("searcher %s did not finish in %s seconds", source_type, self.deadline)
+                    sources[source_type] = SearchSourceStatus.TIMEOUT
+                except Exception:
+                    logger.exception("searcher %s failed, keyword: %s", source_type, keyword)
+                    sources[source_type] = SearchSourceStatus.ERROR
+                else:
+                    sources[source_type] = SearchSourceStatus.OK
+        finally:
+            # Do not wait for the timed out searchers
+            executor.shutdown(wait=False, cancel_futures=True)
+        return search_results, sources
+
+    def _make_cache_key(self, keyword: str) -> str:
+        digest = hashlib.sha256(self.normalize_keyword(keyword).encode()).hexdigest()
+        return f"mix_search:{digest}"
@@ -15,5 +15,15 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
+from blue_krill.data_types.enum import EnumField, StrStructuredEnum
+
 HL_TAG_START = "<bk-highlight-mark>"
 HL_TAG_END = "</bk-highlight-mark>"
+
+
+class SearchSourceStatus(StrStructuredEnum):
+    """The status of a search source in a mixed search"""
+
+    OK = EnumField("ok")
+    TIMEOUT = EnumField("timeout")
+    ERROR = EnumField("error")
@@ -46,7 +46,12 @@ class MixDocumentSearch(ViewSet):
         slz = DocumentSearchWordSLZ(data=request.GET)
         slz.is_valid(raise_exception=True)
         keyword = slz.validated_data["keyword"]
-        return Response(MixSearcher().search(keyword))
+        results = MixSearcher().search_with_status(keyword)
+        response = Response(results.docs)
+        # Sources which failed or timed out are skipped, let the client know the results are incomplete
+        if incomplete_sources := results.incomplete_sources:
+            response["X-Search-Incomplete-Sources"] = ",".join(incomplete_sources)
+        return response
 
 
 class ApplicationsSearchViewset(ViewSet):
@@ -90,7 +90,8 @@ class ApplicationListOutputSLZ(serializers.Serializer):
 class ApplicationListFilterInputSLZ(serializers.Serializer):
     """应用列表过滤器序列化器"""
 
-    valid_order_by_fields = {"created", "updated", "is_active"}
+    # memory 为应用各环境进程的内存配额总和，来自资源配额账本
+    valid_order_by_fields = {"created", "updated", "is_active", "memory"}
 
     search = serializers.CharField(required=False, help_text="应用名称/ID 关键字搜索")
     name = serializers.CharField(required=False, help_text="应用名称")
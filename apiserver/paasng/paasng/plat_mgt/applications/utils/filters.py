@@ -15,11 +15,14 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
+from typing import Optional
+
 from django.db.models import Q
 from rest_framework.filters import BaseFilterBackend
 
 from paasng.plat_mgt.applications import serializers as slzs
 from paasng.platform.applications.models import Application
+from paasng.utils.models import OrderByField
 
 
 class ApplicationFilterBackend(BaseFilterBackend):
@@ -68,12 +71,26 @@ class ApplicationFilterBackend(BaseFilterBackend):
         if category is not None:
             queryset = queryset.filter(extra_info__tag_id=category)
 
-        # 处理排序
-        # 仅在未指定 app_status 时才按 -is_active 排序
+        return self._order_queryset(queryset, params)
+
+    @staticmethod
+    def _order_queryset(queryset, params):
+        """处理排序，仅在未指定 app_status 时才按 -is_active 排序
+
+        按内存配额（memory）排序需读取资源配额账本，无法在查询集中完成，由视图分页时处理，见 `get_memory_ordering`
+        """
         order_fields = ["-is_active"] if params.get("app_status") is None else []
-        if order_by := params.get("order_by"):
-            order_fields.extend(order_by)
+        order_fields += [f for f in params.get("order_by", []) if OrderByField.from_string(f).name != "memory"]
         if order_fields:
             queryset = queryset.order_by(*order_fields)
-
         return queryset
+
+    @staticmethod
+    def get_memory_ordering(request) -> Optional[OrderByField]:
+        """获取请求中按内存配额排序的字段，未指定时返回 None"""
+        slz = slzs.ApplicationListFilterInputSLZ(data=request.query_params)
+        slz.is_valid(raise_exception=True)
+        for field in slz.validated_data.get("order_by", []):
+            if (f := OrderByField.from_string(field)).name == "memory":
+                return f
+        return None
@@ -45,6 +45,7 @@ from paasng.plat_mgt.applications.utils.filters import ApplicationFilterBackend
 from paasng.plat_mgt.bk_plugins.views import is_plugin_instance_exist, is_user_plugin_admin
 from paasng.platform.applications.constants import ApplicationRole, ApplicationType
 from paasng.platform.applications.models import Application
+from paasng.platform.applications.quotas import MemoryOrderedApplications
 from paasng.utils.error_codes import error_codes
 
 logger = logging.getLogger(__name__)
@@ -67,6 +68,9 @@ class ApplicationListViewSet(viewsets.GenericViewSet):
         """获取应用列表"""
         queryset = self.get_queryset()
         filter_queryset = self.filter_queryset(queryset)
+        # 按内存配额排序时，由资源配额账本分页
+        if memory_ordering := ApplicationFilterBackend.get_memory_ordering(request):
+            filter_queryset = MemoryOrderedApplications(filter_queryset, descending=memory_ordering.is_descending)
 
         page = self.paginate_queryset(filter_queryset)
 
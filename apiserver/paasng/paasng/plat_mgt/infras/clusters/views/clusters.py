@@ -37,7 +37,12 @@ from paas_wl.infras.cluster.models import (
     ClusterElasticSearchConfig,
 )
 from paas_wl.infras.resources.base.base import get_client_by_cluster_name, invalidate_global_configuration_pool
-from paas_wl.workloads.networking.egress.cluster_state import generate_state, sync_state_to_nodes
+from paas_wl.workloads.networking.egress.cluster_state import (
+    NodeLabelStatus,
+    generate_state,
+    get_nodes,
+    sync_state_to_nodes,
+)
 from paas_wl.workloads.networking.egress.models import RegionClusterState
 from paas_wl.workloads.networking.entrance.constants import AddressType
 from paasng.core.tenant.user import get_tenant
@@ -402,8 +407,14 @@ class ClusterViewSet(viewsets.GenericViewSet):
         client = get_client_by_cluster_name(cluster_name=cluster.name)
 
         ignore_labels = {"node-role.kubernetes.io/master": "true"}
-        state = generate_state(cluster.name, client, ignore_labels, cluster.tenant_id)
-        sync_state_to_nodes(client, state)
+        # 节点只查询一次，生成状态和更新节点标签共用
+        nodes = get_nodes(client)
+        state = generate_state(cluster.name, client, ignore_labels, cluster.tenant_id, nodes=nodes)
+        results = sync_state_to_nodes(client, state, nodes=nodes)
+
+        if failed_results := [r for r in results if r.status == NodeLabelStatus.FAILED]:
+            errors = "; ".join(f"{r.name}: {r.error}" for r in failed_results)
+            raise error_codes.CANNOT_SYNC_CLUSTER_NODES.f(_("部分节点标签更新失败：{}").format(errors))
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -25,6 +25,8 @@ class SandboxStatus(StrStructuredEnum):
     RUNNING = EnumField("running", label="ready to execute commands")
     STOPPED = EnumField("stopped", label="stopped and can become running")
     DELETED = EnumField("deleted", label="deleted and no longer available")
+    # The sandbox is running in the warm pool, waiting to be claimed by a session
+    POOLED = EnumField("pooled", label="idle in the warm pool")
 
     # Abnormal status
     ERR_CREATING = EnumField("err_creating", label="unable to create")
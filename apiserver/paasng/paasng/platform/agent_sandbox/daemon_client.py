@@ -17,10 +17,15 @@
 
 """HTTP client for communicating with the sandbox daemon service."""
 
-from typing import Any, Self
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import IO, Any, Iterator, Self
 
 import requests
 from attrs import define
+from requests.adapters import HTTPAdapter
 
 from paas_wl.bk_app.agent_sandbox.constants import DAEMON_BIND_PORT
 
@@ -29,6 +34,12 @@ from .exceptions import SandboxDaemonAPIError, SandboxExecTimeout, SandboxServic
 # Default timeout for HTTP requests (in seconds)
 DEFAULT_REQUEST_TIMEOUT = 60
 
+# The chunk size for streaming file transfer, the memory usage of a transfer is bounded by it
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# The max number of keep-alive connections of one daemon client
+DEFAULT_POOL_MAXSIZE = 10
+
 
 @define
 class ExecuteResult:
@@ -62,6 +73,7 @@ class SandboxDaemonClient:
         self.base_url = f"http://{router_endpoint}"
         self.timeout = DEFAULT_REQUEST_TIMEOUT
         self._session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=DEFAULT_POOL_MAXSIZE))
         self._session.headers["Authorization"] = f"Bearer {token}"
         self._session.headers["X-Sandbox-ID"] = sandbox_name
         self._session.headers["X-Sandbox-Namespace"] = sandbox_namespace
@@ -116,6 +128,60 @@ class SandboxDaemonClient:
         resp = self._request("GET", "/files/download", params={"path": path}, timeout=timeout)
         return resp.content
 
+    def upload_stream(
+        self,
+        fileobj: IO[bytes],
+        dest_path: str,
+        offset: int = 0,
+        chunk_size: int = STREAM_CHUNK_SIZE,
+        timeout: int | None = None,
+    ) -> None:
+        """Upload a file to the sandbox by streaming, the content is never fully loaded into memory.
+
+        :param fileobj: The file object to read the content from, starting from its current position.
+        :param dest_path: The destination path in the sandbox.
+        :param offset: The resume offset, when greater than 0 the content is appended to the existing
+            file whose size must be equal to the offset.
+        :param chunk_size: The size of each chunk read from the file object.
+        :param timeout: Timeout for the upload in seconds.
+        """
+        fields = {"destPath": dest_path}
+        if offset:
+            fields["offset"] = str(offset)
+
+        boundary = uuid.uuid4().hex
+        filename = dest_path.rsplit("/", maxsplit=1)[-1]
+        self._request(
+            "POST",
+            "/files/upload",
+            data=_iter_multipart_body(boundary, fields, filename, fileobj, chunk_size),
+            headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            timeout=timeout,
+        )
+
+    def download_stream(
+        self, path: str, offset: int = 0, chunk_size: int = STREAM_CHUNK_SIZE, timeout: int | None = None
+    ) -> Iterator[bytes]:
+        """Download a file from the sandbox by streaming.
+
+        The request is sent eagerly so that errors are raised by this call, while the content is
+        read chunk by chunk when iterating the result.
+
+        :param path: The path of the file to download.
+        :param offset: The resume offset, the content before it is skipped.
+        :param chunk_size: The size of each chunk.
+        :param timeout: Timeout for the download in seconds.
+        :returns: An iterator of content chunks.
+        """
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        resp = self._request(
+            "GET", "/files/download", params={"path": path}, headers=headers, stream=True, timeout=timeout
+        )
+        if offset and resp.status_code != 206:
+            resp.close()
+            raise SandboxDaemonAPIError(f"ranged download is not supported on {path}", status_code=resp.status_code)
+        return self._iter_content(resp, chunk_size)
+
     def delete_file(self, path: str, recursive: bool = False) -> None:
         """Delete a file or folder from the sandbox.
 
@@ -177,16 +243,148 @@ class SandboxDaemonClient:
             # daemon 在命令执行超时时返回 HTTP 408 (RequestTimeoutResponse)
             if exc.response.status_code == 408:
                 raise SandboxExecTimeout(f"Command execution timed out on {path}")
+            message = _extract_error_message(exc.response)
             raise SandboxDaemonAPIError(
-                f"HTTP error {exc.response.status_code} on {path}: {exc.response.json().get('message')}"
+                f"HTTP error {exc.response.status_code} on {path}: {message}",
+                status_code=exc.response.status_code,
+                detail=message,
             )
         except requests.RequestException as exc:
             raise SandboxDaemonAPIError(f"Request failed: {exc}")
         else:
             return resp
 
+    @staticmethod
+    def _iter_content(resp: requests.Response, chunk_size: int) -> Iterator[bytes]:
+        """Iterate the content of a streaming response, the response is always closed afterwards."""
+        try:
+            yield from resp.iter_content(chunk_size=chunk_size)
+        except requests.RequestException as exc:
+            raise SandboxDaemonAPIError(f"Stream interrupted: {exc}")
+        finally:
+            resp.close()
+
     def __enter__(self) -> Self:
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         self.close()
+
+
+class DaemonClientPool:
+    """The cache of daemon clients, one client per sandbox.
+
+    Each cached client keeps its keep-alive connections to the router, so that successive calls
+    to the same sandbox skip the TCP setup cost. Clients idle for longer than ``idle_timeout``
+    are closed and evicted, and the least recently used one is evicted when the pool is full.
+
+    :param idle_timeout: The idle timeout of a client, in seconds.
+    :param max_size: The max number of cached clients.
+    :param clock: The monotonic clock, customizable for testing.
+    """
+
+    def __init__(self, idle_timeout: float = 300, max_size: int = 256, clock=time.monotonic):
+        self.idle_timeout = idle_timeout
+        self.max_size = max_size
+        self.clock = clock
+        self._lock = threading.Lock()
+        # {key: (client, last_used_at)}, the least recently used comes first
+        self._clients: OrderedDict[tuple, tuple[SandboxDaemonClient, float]] = OrderedDict()
+
+    def get(
+        self,
+        router_endpoint: str,
+        token: str,
+        sandbox_name: str,
+        sandbox_namespace: str,
+        sandbox_daemon_port: int = DAEMON_BIND_PORT,
+        router_auth_token: str | None = None,
+    ) -> SandboxDaemonClient:
+        """Get the cached client of a sandbox, a new one is created if absent."""
+        key = (router_endpoint, sandbox_namespace, sandbox_name, sandbox_daemon_port, token, router_auth_token)
+        now = self.clock()
+        with self._lock:
+            evicted = self._pop_idle(now)
+            if key in self._clients:
+                client, _ = self._clients.pop(key)
+            else:
+                client = SandboxDaemonClient(
+                    router_endpoint=router_endpoint,
+                    token=token,
+                    sandbox_name=sandbox_name,
+                    sandbox_namespace=sandbox_namespace,
+                    sandbox_daemon_port=sandbox_daemon_port,
+                    router_auth_token=router_auth_token,
+                )
+            self._clients[key] = (client, now)
+            while len(self._clients) > self.max_size:
+                _, (lru_client, _) = self._clients.popitem(last=False)
+                evicted.append(lru_client)
+
+        for c in evicted:
+            c.close()
+        return client
+
+    def evict(self, sandbox_name: str, sandbox_namespace: str) -> None:
+        """Close and evict the clients of a sandbox, usually called after the sandbox is deleted."""
+        with self._lock:
+            keys = [k for k in self._clients if k[1] == sandbox_namespace and k[2] == sandbox_name]
+            evicted = [self._clients.pop(k)[0] for k in keys]
+        for c in evicted:
+            c.close()
+
+    def evict_idle(self) -> None:
+        """Close and evict all the idle clients."""
+        with self._lock:
+            evicted = self._pop_idle(self.clock())
+        for c in evicted:
+            c.close()
+
+    def clear(self) -> None:
+        with self._lock:
+            evicted = [c for c, _ in self._clients.values()]
+            self._clients.clear()
+        for c in evicted:
+            c.close()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def _pop_idle(self, now: float) -> list[SandboxDaemonClient]:
+        evicted = []
+        # Clients are ordered by last used time, stop at the first active one
+        while self._clients:
+            key, (client, last_used_at) = next(iter(self._clients.items()))
+            if now - last_used_at <= self.idle_timeout:
+                break
+            del self._clients[key]
+            evicted.append(client)
+        return evicted
+
+
+daemon_client_pool = DaemonClientPool()
+
+
+def _iter_multipart_body(
+    boundary: str, fields: dict[str, str], filename: str, fileobj: IO[bytes], chunk_size: int
+) -> Iterator[bytes]:
+    """Generate a "multipart/form-data" body chunk by chunk, the file part is the last one."""
+    for name, value in fields.items():
+        yield f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+
+    filename = filename.replace('"', "%22")
+    yield (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/octet-stream\r\n\r\n"
+    ).encode()
+    while chunk := fileobj.read(chunk_size):
+        yield chunk
+    yield f"\r\n--{boundary}--\r\n".encode()
+
+
+def _extract_error_message(resp: requests.Response) -> str | None:
+    """Extract the error message from the daemon's response, the body may not be JSON (e.g. 416)."""
+    try:
+        return resp.json().get("message")
+    except ValueError:
+        return resp.text[:200] or None
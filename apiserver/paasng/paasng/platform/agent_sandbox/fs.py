@@ -16,6 +16,7 @@
 """File system related operations in agent sandbox"""
 
 from abc import ABC, abstractmethod
+from typing import IO, Iterator
 
 
 class SandboxFS(ABC):
@@ -31,6 +32,11 @@ class SandboxFS(ABC):
         """Upload a file to the sandbox."""
         raise NotImplementedError
 
+    @abstractmethod
+    def upload_fileobj(self, fileobj: IO[bytes], remote_path: str, offset: int = 0, timeout: int = 30 * 60) -> None:
+        """Upload a file to the sandbox by streaming, appending at ``offset`` when resuming."""
+        raise NotImplementedError
+
     @abstractmethod
     def delete_file(self, path: str, recursive: bool = False) -> None:
         """Delete a file or folder from the sandbox."""
@@ -40,3 +46,8 @@ class SandboxFS(ABC):
     def download_file(self, remote_path: str, timeout: int = 30 * 60) -> bytes:
         """Download a file from the sandbox."""
         raise NotImplementedError
+
+    @abstractmethod
+    def download_stream(self, remote_path: str, offset: int = 0, timeout: int = 30 * 60) -> Iterator[bytes]:
+        """Download a file from the sandbox by streaming, skipping the content before ``offset``."""
+        raise NotImplementedError
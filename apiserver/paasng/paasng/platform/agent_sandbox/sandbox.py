@@ -19,10 +19,14 @@ import copy
 import logging
 import re
 import shlex
+import threading
 import uuid
+from datetime import timedelta
 from decimal import Decimal
+from typing import IO, Iterator
 
 from django.conf import settings
+from django.db import close_old_connections
 from django.utils import timezone
 from kubernetes.client.exceptions import ApiException
 
@@ -49,7 +53,7 @@ from paasng.platform.agent_sandbox.constants import (
     SANDBOX_DEFAULT_TTL_SECONDS,
     SandboxStatus,
 )
-from paasng.platform.agent_sandbox.daemon_client import SandboxDaemonClient
+from paasng.platform.agent_sandbox.daemon_client import SandboxDaemonClient, daemon_client_pool
 from paasng.platform.agent_sandbox.entities import CodeRunResult, ExecResult
 from paasng.platform.agent_sandbox.exceptions import (
     SandboxCreateError,
@@ -63,6 +67,7 @@ from paasng.platform.agent_sandbox.fs import SandboxFS
 from paasng.platform.agent_sandbox.image_validator import check_snapshot_image_exists
 from paasng.platform.agent_sandbox.models import Sandbox, SandboxAppSettings, Volume
 from paasng.platform.agent_sandbox.process import SandboxProcess
+from paasng.platform.agent_sandbox.warm_pool import WarmPoolSpec, WarmSandboxPool
 from paasng.platform.applications.models import Application
 from paasng.utils.error_codes import error_codes
 
@@ -153,16 +158,29 @@ def create_sandbox(
         (each item: ``{"volume_id": UUID, "mount_path": str}``). Persisted to
         the Sandbox DB record and resolved into Pod spec mounts during provision.
     """
+    snapshot_image = snapshot or settings.AGENT_SANDBOX_DEFAULT_IMAGE
+    # 资源限制不由用户指定, 而是按 app 级配置回退平台默认值解析
+    cpu, memory = resolve_sandbox_resources(application)
+
+    # name、env_vars 与 volume_mounts 在 Pod 启动时即已固化, 只有未指定它们的请求才能从预热池领取沙箱
+    if settings.AGENT_SANDBOX_WARM_POOL_ENABLED and not (name or env_vars or volume_mounts):
+        spec = WarmPoolSpec(
+            application_id=str(application.id),
+            snapshot=snapshot_image,
+            snapshot_entrypoint=tuple(snapshot_entrypoint or ()),
+            workspace=workspace,
+            cpu=cpu,
+            memory=memory,
+        )
+        if sandbox_obj := _claim_warm_sandbox(spec, creator=creator, ttl_seconds=ttl_seconds):
+            return sandbox_obj
+
     # Pre-validate that the snapshot image exists in the registry before creating resources.
     # This avoids a long timeout when the pod tries to pull a non-existent image.
     # Skip validation for the default image — it is platform-maintained and expected to exist.
-    snapshot_image = snapshot or settings.AGENT_SANDBOX_DEFAULT_IMAGE
     if snapshot:
         check_snapshot_image_exists(snapshot_image)
 
-    # 资源限制不由用户指定, 而是按 app 级配置回退平台默认值解析
-    cpu, memory = resolve_sandbox_resources(application)
-
     sandbox_obj = Sandbox.objects.new(
         application=application,
         name=name,
@@ -176,8 +194,17 @@ def create_sandbox(
         cpu=cpu,
         memory=memory,
     )
+    _run_sandbox(sandbox_obj, SandboxStatus.RUNNING)
+    return sandbox_obj
+
+
+def _run_sandbox(sandbox_obj: Sandbox, status: SandboxStatus) -> None:
+    """Provision the resources of a sandbox record and mark it as started.
 
-    mgr = AgentSandboxResManager(application, sandbox_obj.target)
+    :param sandbox_obj: The sandbox record in PENDING status.
+    :param status: The status to set after the sandbox started, RUNNING or POOLED.
+    """
+    mgr = AgentSandboxResManager(sandbox_obj.application, sandbox_obj.target)
     try:
         mgr.provision(sandbox_obj)
     except SandboxError:
@@ -186,10 +213,25 @@ def create_sandbox(
         raise
 
     # The sandbox started successfully and running.
-    sandbox_obj.status = SandboxStatus.RUNNING.value
+    sandbox_obj.status = status.value
     sandbox_obj.started_at = timezone.now()
     sandbox_obj.save(update_fields=["status", "started_at", "updated"])
-    return sandbox_obj
+
+
+def _claim_warm_sandbox(spec: WarmPoolSpec, creator: str, ttl_seconds: int) -> Sandbox | None:
+    """Claim an idle sandbox from the warm pool and hand it over to the creator.
+
+    :return: The claimed sandbox, None if there is no idle sandbox of the spec.
+    """
+    sandbox_uuid = get_warm_pool().claim(spec)
+    if sandbox_uuid is None:
+        return None
+
+    now = timezone.now()
+    Sandbox.objects.filter(uuid=sandbox_uuid).update(
+        creator=creator, expired_at=now + timedelta(seconds=ttl_seconds), updated=now
+    )
+    return Sandbox.objects.get(uuid=sandbox_uuid)
 
 
 def delete_sandbox(sandbox_obj: Sandbox) -> None:
@@ -204,6 +246,7 @@ def delete_sandbox(sandbox_obj: Sandbox) -> None:
         sandbox_obj.status = SandboxStatus.ERR_DELETING.value
         sandbox_obj.save(update_fields=["status"])
         raise
+    daemon_client_pool.evict(sandbox_obj.name, mgr.kres_app.namespace)
     # TODO: delete the sandbox record?
     sandbox_obj.status = SandboxStatus.DELETED.value
     sandbox_obj.deleted_at = timezone.now()
@@ -220,6 +263,81 @@ def get_sandbox_client(sandbox_obj: Sandbox) -> "KubernetesPodSandbox":
     return mgr.get_from_db_record(sandbox_obj)
 
 
+class WarmSandboxCluster:
+    """The warm pool backend which keeps idle sandboxes as ``POOLED`` Sandbox records.
+
+    Claiming is a compare-and-set on the record's status, so an idle sandbox is never handed
+    out twice even when multiple processes share the same database.
+    """
+
+    # Idle sandboxes which are about to expire are not handed out, avoid racing with the cleanup
+    claim_expiry_margin = timedelta(seconds=60)
+
+    def provision(self, spec: WarmPoolSpec) -> str:
+        # Provisioning runs in the background threads of the pool
+        close_old_connections()
+        application = Application.objects.get(pk=spec.application_id)
+        sandbox_obj = Sandbox.objects.new(
+            application=application,
+            creator="",
+            snapshot=spec.snapshot,
+            snapshot_entrypoint=list(spec.snapshot_entrypoint),
+            workspace=spec.workspace,
+            ttl_seconds=settings.AGENT_SANDBOX_WARM_POOL_IDLE_TTL_SECONDS,
+            cpu=spec.cpu,
+            memory=spec.memory,
+        )
+        _run_sandbox(sandbox_obj, SandboxStatus.POOLED)
+        return sandbox_obj.uuid.hex
+
+    def claim_idle(self, spec: WarmPoolSpec) -> str | None:
+        for sandbox_uuid in self._list_idle(spec):
+            updated = Sandbox.objects.filter(uuid=sandbox_uuid, status=SandboxStatus.POOLED.value).update(
+                status=SandboxStatus.RUNNING.value
+            )
+            if updated:
+                return sandbox_uuid.hex
+        return None
+
+    def count_idle(self, spec: WarmPoolSpec) -> int:
+        return len(self._list_idle(spec))
+
+    def _list_idle(self, spec: WarmPoolSpec) -> list[uuid.UUID]:
+        """List the uuids of idle sandboxes of the spec, the oldest comes first."""
+        qs = Sandbox.objects.filter(
+            application_id=spec.application_id,
+            status=SandboxStatus.POOLED.value,
+            snapshot=spec.snapshot,
+            workspace=spec.workspace,
+            cpu=spec.cpu,
+            memory=spec.memory,
+            expired_at__gt=timezone.now() + self.claim_expiry_margin,
+        ).order_by("created")
+        # JSON 字段在不同数据库上的等值查询行为不一致, 因此 entrypoint 在内存中比较
+        entrypoint = list(spec.snapshot_entrypoint)
+        return [u for u, ep in qs.values_list("uuid", "snapshot_entrypoint") if (ep or []) == entrypoint]
+
+
+_warm_pool: WarmSandboxPool | None = None
+_warm_pool_lock = threading.Lock()
+
+
+def get_warm_pool() -> WarmSandboxPool:
+    """Get the process-wide warm sandbox pool, the pool is created on first use."""
+    global _warm_pool
+
+    if _warm_pool is None:
+        with _warm_pool_lock:
+            if _warm_pool is None:
+                _warm_pool = WarmSandboxPool(
+                    WarmSandboxCluster(),
+                    min_size=settings.AGENT_SANDBOX_WARM_POOL_MIN_SIZE,
+                    max_size=settings.AGENT_SANDBOX_WARM_POOL_MAX_SIZE,
+                    initial_provision_seconds=AgentSandboxResManager.create_timeout / 4,
+                )
+    return _warm_pool
+
+
 class AgentSandboxResManager:
     """The class helps managing agent sandbox resources.
 
@@ -416,11 +534,10 @@ class KubernetesPodSandbox(SandboxProcess, SandboxFS):
         cmd_str = self._build_command_string(cmd, env_vars)
 
         try:
-            with self.daemon_client() as client:
-                result = client.execute(command=cmd_str, cwd=cwd, timeout=timeout)
-                # The daemon API returns combined output, we put it in stdout
-                # and leave stderr empty since the daemon doesn't separate them
-                return ExecResult(stdout=result.output, stderr="", exit_code=result.exit_code)
+            result = self.daemon_client().execute(command=cmd_str, cwd=cwd, timeout=timeout)
+            # The daemon API returns combined output, we put it in stdout
+            # and leave stderr empty since the daemon doesn't separate them
+            return ExecResult(stdout=result.output, stderr="", exit_code=result.exit_code)
         except SandboxDaemonAPIError as exc:
             raise SandboxExecError(f"failed to execute command: {exc}")
 
@@ -440,8 +557,7 @@ class KubernetesPodSandbox(SandboxProcess, SandboxFS):
         :param mode: The permission mode (e.g., "0755").
         """
         try:
-            with self.daemon_client() as client:
-                client.create_folder(path=path, mode=mode)
+            self.daemon_client().create_folder(path=path, mode=mode)
         except SandboxDaemonAPIError as exc:
             raise SandboxFileError(f"failed to create folder: {exc}")
 
@@ -453,8 +569,21 @@ class KubernetesPodSandbox(SandboxProcess, SandboxFS):
         :param timeout: The timeout for the upload in seconds.
         """
         try:
-            with self.daemon_client() as client:
-                client.upload_file(file_content=file, dest_path=remote_path, timeout=timeout)
+            self.daemon_client().upload_file(file_content=file, dest_path=remote_path, timeout=timeout)
+        except SandboxDaemonAPIError as exc:
+            raise SandboxFileError(f"failed to upload file: {exc}")
+
+    def upload_fileobj(self, fileobj: IO[bytes], remote_path: str, offset: int = 0, timeout: int = 30 * 60) -> None:
+        """Upload a file to the sandbox by streaming, with constant memory usage.
+
+        :param fileobj: The file object to read the content from.
+        :param remote_path: The destination path in the sandbox.
+        :param offset: The resume offset, when greater than 0 the content is appended to the
+            existing file whose size must be equal to the offset.
+        :param timeout: The timeout for the upload in seconds.
+        """
+        try:
+            self.daemon_client().upload_stream(fileobj, dest_path=remote_path, offset=offset, timeout=timeout)
         except SandboxDaemonAPIError as exc:
             raise SandboxFileError(f"failed to upload file: {exc}")
 
@@ -465,8 +594,7 @@ class KubernetesPodSandbox(SandboxProcess, SandboxFS):
         :param recursive: Must be True to delete directories recursively.
         """
         try:
-            with self.daemon_client() as client:
-                client.delete_file(path=path, recursive=recursive)
+            self.daemon_client().delete_file(path=path, recursive=recursive)
         except SandboxDaemonAPIError as exc:
             raise SandboxFileError(f"failed to delete file: {exc}")
 
@@ -478,16 +606,28 @@ class KubernetesPodSandbox(SandboxProcess, SandboxFS):
         :returns: The file content as bytes.
         """
         try:
-            with self.daemon_client() as client:
-                return client.download_file(path=remote_path, timeout=timeout)
+            return self.daemon_client().download_file(path=remote_path, timeout=timeout)
         except SandboxDaemonAPIError as exc:
             raise SandboxFileError(f"failed to download file: {exc}")
 
-    def daemon_client(self) -> SandboxDaemonClient:
-        """Get the daemon client for this sandbox."""
+    def download_stream(self, remote_path: str, offset: int = 0, timeout: int = 30 * 60) -> Iterator[bytes]:
+        """Download a file from the sandbox by streaming, with constant memory usage.
+
+        :param remote_path: The path of the file to download.
+        :param offset: The resume offset, the content before it is skipped.
+        :param timeout: The timeout for the download in seconds.
+        :returns: An iterator of content chunks.
+        """
+        try:
+            return self.daemon_client().download_stream(path=remote_path, offset=offset, timeout=timeout)
+        except SandboxDaemonAPIError as exc:
+            raise SandboxFileError(f"failed to download file: {exc}")
 
-        # TODO: 将 SandboxDaemonClient 缓存为实例属性（lazy init），或者至少在 KubernetesPodSandbox 级别共享同一个 session?
-        return SandboxDaemonClient(
+    def daemon_client(self) -> SandboxDaemonClient:
+        """Get the daemon client for this sandbox, the client is shared by calls to the same
+        sandbox to reuse keep-alive connections, so it must not be closed by callers.
+        """
+        return daemon_client_pool.get(
             router_endpoint=self.router_endpoint,
             token=self.daemon_token,
             sandbox_name=self.entity.name,
@@ -305,6 +305,12 @@ class SandboxUploadFileInputSLZ(serializers.Serializer):
 
     path = serializers.CharField(label="远端路径", help_text="文件在沙箱中的目标路径")
     file = serializers.FileField(label="文件", help_text="待上传文件内容")
+    offset = serializers.IntegerField(
+        label="续传偏移量",
+        min_value=0,
+        default=0,
+        help_text="断点续传时传入沙箱中已有文件的大小，文件内容将追加到已有文件之后；为 0 时覆盖写入",
+    )
 
 
 class SandboxDeleteFileInputSLZ(serializers.Serializer):
@@ -323,6 +329,9 @@ class SandboxDownloadFileInputSLZ(serializers.Serializer):
     """The serializer for downloading file from sandbox."""
 
     path = serializers.CharField(label="路径", help_text="待下载文件路径")
+    offset = serializers.IntegerField(
+        label="续传偏移量", min_value=0, default=0, help_text="断点续传时传入已下载的字节数，仅返回该偏移量之后的内容"
+    )
 
 
 class SandboxExecInputSLZ(serializers.Serializer):
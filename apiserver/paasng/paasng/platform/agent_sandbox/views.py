@@ -22,7 +22,7 @@ from pathlib import PurePosixPath
 from urllib.parse import urlencode, urlparse
 
 from django.conf import settings
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from django.utils.translation import gettext as _
@@ -407,7 +407,8 @@ class AgentSandboxFSViewSet(SandboxViewMixin, viewsets.GenericViewSet):
         data = slz.validated_data
 
         try:
-            get_sandbox_client(sandbox).upload_file(file=data["file"].read(), remote_path=data["path"])
+            # 上传的文件直接流式转发至沙箱, 避免大文件整体读入内存
+            get_sandbox_client(sandbox).upload_fileobj(data["file"], remote_path=data["path"], offset=data["offset"])
         except SandboxServiceNotReady:
             raise error_codes.AGENT_SANDBOX_SERVICE_NOT_READY
         except SandboxError:
@@ -441,7 +442,7 @@ class AgentSandboxFSViewSet(SandboxViewMixin, viewsets.GenericViewSet):
         data = slz.validated_data
 
         try:
-            content = get_sandbox_client(sandbox).download_file(remote_path=data["path"])
+            content = get_sandbox_client(sandbox).download_stream(remote_path=data["path"], offset=data["offset"])
         except SandboxServiceNotReady:
             raise error_codes.AGENT_SANDBOX_SERVICE_NOT_READY
         except SandboxError:
@@ -449,7 +450,7 @@ class AgentSandboxFSViewSet(SandboxViewMixin, viewsets.GenericViewSet):
             raise error_codes.AGENT_SANDBOX_FILE_OPERATION_FAILED
 
         filename = PurePosixPath(data["path"]).name or "sandbox-file"
-        response = HttpResponse(content, content_type="application/octet-stream")
+        response = StreamingHttpResponse(content, content_type="application/octet-stream")
         response["Content-Disposition"] = f'attachment; filename="{filename}"'
         response["Access-Control-Expose-Headers"] = "Content-Disposition"
         return response
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+"""Pre-warmed sandbox pool.
+
+Creating a sandbox pays pod scheduling, image pulling and daemon boot latency. The pool keeps
+some idle, ready sandboxes for each image/spec tuple so that a session can start by claiming
+one of them instead of waiting for a brand-new pod.
+
+The pool itself only decides *how many* sandboxes to keep and *when* to refill, the idle
+inventory lives in a :class:`WarmPoolCluster` backend, so that multiple apiserver processes
+sharing the same backend never hand out the same sandbox twice.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Protocol
+
+from paasng.platform.agent_sandbox.constants import DEFAULT_SANDBOX_CPU, DEFAULT_SANDBOX_MEMORY
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class WarmPoolSpec:
+    """The image/spec tuple of a sandbox, sandboxes with the same spec are interchangeable.
+
+    :param application_id: The id of the application, sandboxes are always running in the
+        namespace of their application.
+    :param snapshot: The snapshot(image) of the sandbox.
+    :param snapshot_entrypoint: The entrypoint of the snapshot.
+    :param workspace: The workspace path.
+    :param cpu: The cpu limit, in cores.
+    :param memory: The memory limit, in GB.
+    """
+
+    application_id: str
+    snapshot: str
+    snapshot_entrypoint: tuple[str, ...] = ()
+    workspace: str | None = None
+    cpu: Decimal = DEFAULT_SANDBOX_CPU
+    memory: Decimal = DEFAULT_SANDBOX_MEMORY
+
+
+class WarmPoolCluster(Protocol):
+    """The backend which actually holds the idle sandboxes of the pool."""
+
+    def provision(self, spec: WarmPoolSpec) -> str:
+        """Create a sandbox and block until it's ready, return the id of the sandbox."""
+
+    def claim_idle(self, spec: WarmPoolSpec) -> str | None:
+        """Atomically take an idle sandbox out of the backend, return None if there is none."""
+
+    def count_idle(self, spec: WarmPoolSpec) -> int:
+        """Count the idle sandboxes of given spec."""
+
+
+@dataclass
+class WarmPoolStats:
+    """The statistics of a spec in the pool"""
+
+    idle: int
+    provisioning: int
+    target: int
+    hits: int
+    misses: int
+    claim_rate: float
+
+
+class WarmSandboxPool:
+    """A pool which keeps idle sandboxes for each spec and refills them in the background.
+
+    The target size of a spec follows Little's law: sandboxes claimed during one provisioning
+    period must be covered by the idle ones, so ``target = claim_rate * provision_seconds``,
+    clamped into ``[min_size, max_size]``. A spec that has not been claimed for a whole
+    ``rate_window`` shrinks back to ``min_size``.
+
+    :param cluster: The backend which holds the idle sandboxes.
+    :param min_size: The minimum number of idle sandboxes for each spec which has been used.
+    :param max_size: The maximum number of idle sandboxes for each spec.
+    :param rate_window: The sliding window for calculating the claim rate, in seconds.
+    :param initial_provision_seconds: The estimated provisioning duration before any samples.
+    :param max_workers: The maximum number of concurrent provisioning jobs.
+    :param clock: The monotonic clock, customizable for testing.
+    """
+
+    # The smoothing factor of the provisioning duration EWMA
+    provision_seconds_alpha = 0.3
+
+    def __init__(
+        self,
+        cluster: WarmPoolCluster,
+        min_size: int = 1,
+        max_size: int = 5,
+        rate_window: float = 300,
+        initial_provision_seconds: float = 30,
+        max_workers: int = 4,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if min_size < 0 or max_size < min_size:
+            raise ValueError("invalid pool size, expect 0 <= min_size <= max_size")
+
+        self.cluster = cluster
+        self.min_size = min_size
+        self.max_size = max_size
+        self.rate_window = rate_window
+        self.clock = clock
+
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sandbox-warm-pool")
+        self._specs: set[WarmPoolSpec] = set()
+        self._claims: dict[WarmPoolSpec, deque[float]] = defaultdict(deque)
+        self._provisioning: dict[WarmPoolSpec, int] = defaultdict(int)
+        self._hits: dict[WarmPoolSpec, int] = defaultdict(int)
+        self._misses: dict[WarmPoolSpec, int] = defaultdict(int)
+        self._provision_seconds: dict[WarmPoolSpec, float] = defaultdict(lambda: initial_provision_seconds)
+
+    def claim(self, spec: WarmPoolSpec) -> str | None:
+        """Claim an idle sandbox of given spec, a refill is always scheduled afterwards.
+
+        :return: The id of the claimed sandbox, None if the pool is empty.
+        """
+        with self._lock:
+            self._specs.add(spec)
+            self._claims[spec].append(self.clock())
+
+        sandbox_id = self.cluster.claim_idle(spec)
+        with self._lock:
+            if sandbox_id is None:
+                self._misses[spec] += 1
+            else:
+                self._hits[spec] += 1
+
+        self.refill(spec)
+        return sandbox_id
+
+    def register(self, spec: WarmPoolSpec) -> None:
+        """Start keeping idle sandboxes for given spec, even if it has never been claimed."""
+        with self._lock:
+            self._specs.add(spec)
+        self.refill(spec)
+
+    def claim_rate(self, spec: WarmPoolSpec) -> float:
+        """The claim rate of given spec in the recent window, in claims per second."""
+        with self._lock:
+            return self._claim_rate(spec)
+
+    def target_size(self, spec: WarmPoolSpec) -> int:
+        """The number of idle sandboxes the pool wants to keep for given spec."""
+        with self._lock:
+            return self._target_size(spec)
+
+    def refill(self, spec: WarmPoolSpec) -> int:
+        """Schedule background provisioning to top up the idle sandboxes of given spec.
+
+        :return: The number of provisioning jobs scheduled.
+        """
+        idle = self.cluster.count_idle(spec)
+        with self._lock:
+            deficit = self._target_size(spec) - idle - self._provisioning[spec]
+            if deficit <= 0:
+                return 0
+            self._provisioning[spec] += deficit
+
+        for _ in range(deficit):
+            self._executor.submit(self._provision, spec)
+        return deficit
+
+    def refill_all(self) -> int:
+        """Schedule refilling for all known specs, return the number of scheduled jobs."""
+        with self._lock:
+            specs = list(self._specs)
+        return sum(self.refill(spec) for spec in specs)
+
+    def stats(self, spec: WarmPoolSpec) -> WarmPoolStats:
+        idle = self.cluster.count_idle(spec)
+        with self._lock:
+            return WarmPoolStats(
+                idle=idle,
+                provisioning=self._provisioning[spec],
+                target=self._target_size(spec),
+                hits=self._hits[spec],
+                misses=self._misses[spec],
+                claim_rate=self._claim_rate(spec),
+            )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the pool, pending provisioning jobs are cancelled unless ``wait`` is True."""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _provision(self, spec: WarmPoolSpec) -> None:
+        started_at = self.clock()
+        try:
+            self.cluster.provision(spec)
+        except Exception:
+            logger.exception("failed to provision warm sandbox, spec: %s", spec)
+        else:
+            duration = self.clock() - started_at
+            with self._lock:
+                alpha = self.provision_seconds_alpha
+                self._provision_seconds[spec] = alpha * duration + (1 - alpha) * self._provision_seconds[spec]
+        finally:
+            with self._lock:
+                self._provisioning[spec] -= 1
+
+    def _claim_rate(self, spec: WarmPoolSpec) -> float:
+        claims = self._claims[spec]
+        expired_before = self.clock() - self.rate_window
+        while claims and claims[0] < expired_before:
+            claims.popleft()
+        return len(claims) / self.rate_window
+
+    def _target_size(self, spec: WarmPoolSpec) -> int:
+        if spec not in self._specs:
+            return 0
+        wanted = math.ceil(self._claim_rate(spec) * self._provision_seconds[spec])
+        return max(self.min_size, min(wanted, self.max_size))
@@ -16,15 +16,22 @@
 # to the current version of the project delivered to anyone in the future.
 
 import logging
+from functools import partial
+from typing import Iterable, Optional
 
 import boto3
 from bkstorages.backends.rgw import RGWBoto3Storage
 from botocore.exceptions import ClientError
 from django.conf import settings
 from django.core.files.storage import Storage
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from paas_wl.bk_app.applications.models import WlApp
+from paas_wl.bk_app.cnative.specs.signals import post_cnative_env_deploy, post_cnative_proc_scaled
+from paas_wl.bk_app.processes.models import ProcessSpec
+from paas_wl.bk_app.processes.signals import post_process_specs_synced
 from paas_wl.infras.cluster.constants import ClusterFeatureFlag
 from paas_wl.infras.cluster.shim import get_app_prod_env_cluster
 from paasng.core.region.app import S3BucketRegionHelper
@@ -33,7 +40,8 @@ from paasng.infras.iam.exceptions import BKIAMGatewayServiceError
 from paasng.misc.metrics import NEW_APP_COUNTER
 from paasng.platform.applications.constants import AppFeatureFlag as AppFeatureFlagConst
 from paasng.platform.applications.helpers import register_builtin_user_groups_and_grade_manager
-from paasng.platform.applications.models import Application
+from paasng.platform.applications.models import Application, ModuleEnvironment
+from paasng.platform.applications.search_index import SEARCH_FIELDS, on_app_deleted, on_app_saved
 from paasng.platform.applications.signals import (
     application_logo_updated,
     before_finishing_application_creation,
@@ -41,6 +49,7 @@ from paasng.platform.applications.signals import (
     post_create_application,
 )
 from paasng.platform.applications.specs import AppSpecs
+from paasng.platform.applications.tasks import refresh_env_resource_quota
 from paasng.platform.engine.constants import JobStatus
 from paasng.platform.engine.models import Deployment
 from paasng.utils.blobstore import get_storage_by_bucket
@@ -196,6 +205,55 @@ def initialize_app_logo_metadata(storage: Storage, bucket_name: str, key: str):
         logger.exception("update key: %s's metadata failed", key)
 
 
+# Resource quotas ledger handlers start
+
+
+def _refresh_env_quotas_on_commit(env_ids: Iterable[int], using: Optional[str] = None):
+    for env_id in env_ids:
+        transaction.on_commit(partial(refresh_env_resource_quota.delay, env_id), using=using)
+
+
+@receiver([post_save, post_delete], sender=ProcessSpec)
+def on_process_spec_changed(sender, instance: ProcessSpec, **kwargs):
+    """进程规格或副本数变更后（普通应用），更新所属环境的资源配额"""
+    env_ids = ModuleEnvironment.objects.filter(engine_app_id=instance.engine_app_id).values_list("id", flat=True)
+    _refresh_env_quotas_on_commit(list(env_ids), using=kwargs.get("using"))
+
+
+@receiver(post_process_specs_synced)
+def on_process_specs_synced(sender: WlApp, **kwargs):
+    """部署时批量同步进程规格后（普通应用），更新所属环境的资源配额"""
+    env_ids = ModuleEnvironment.objects.filter(engine_app_id=sender.pk).values_list("id", flat=True)
+    _refresh_env_quotas_on_commit(list(env_ids))
+
+
+@receiver(post_cnative_proc_scaled)
+@receiver(post_cnative_env_deploy)
+def on_cnative_processes_changed(sender: ModuleEnvironment, **kwargs):
+    """云原生应用部署或进程扩缩容后，更新环境的资源配额"""
+    _refresh_env_quotas_on_commit([sender.pk])
+
+
+@receiver(module_environment_offline_success)
+def on_environment_offline_refresh_quota(sender, offline_instance, **kwargs):
+    """环境下架后，更新环境的资源配额"""
+    _refresh_env_quotas_on_commit([offline_instance.app_environment.pk])
+
+
+@receiver(post_save, sender=Application)
+def on_application_saved_update_search_index(sender, instance: Application, update_fields=None, **kwargs):
+    """应用代号或名称变更后，更新应用搜索索引"""
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    on_app_saved(instance, committed=False)
+    transaction.on_commit(partial(on_app_saved, instance, committed=True), using=kwargs.get("using"))
+
+
+@receiver(post_delete, sender=Application)
+def on_application_deleted_update_search_index(sender, instance: Application, **kwargs):
+    transaction.on_commit(partial(on_app_deleted, instance), using=kwargs.get("using"))
+
+
 def turn_on_bk_log_feature(application: Application):
     """根据集群特性开启应用的日志采集 FeatureFlag
 
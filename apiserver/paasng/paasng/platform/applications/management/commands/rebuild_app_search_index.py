@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+"""重建应用搜索的三元组表，在启用 "db" 搜索索引前执行"""
+
+from django.core.management.base import BaseCommand
+
+from paasng.platform.applications.search_index import rebuild_app_trigrams
+
+
+class Command(BaseCommand):
+    help = "重建应用搜索的三元组表"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", dest="batch_size", type=int, default=1000, help="每批读取的应用数量")
+
+    def handle(self, batch_size, *args, **options):
+        count = rebuild_app_trigrams(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"重建完成，共索引 {count} 个应用"))
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-19 10:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0022_remove_application_is_isolated_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationSearchTrigram',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('trigram', models.CharField(db_index=True, max_length=3, verbose_name='三元组')),
+                ('tenant_id', models.CharField(db_index=True, default='default', help_text='本条数据的所属租户', max_length=32, verbose_name='租户 ID')),
+                ('application', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, to='applications.application')),
+            ],
+            options={
+                'unique_together': {('application', 'trigram')},
+            },
+        ),
+    ]
@@ -99,9 +99,17 @@ class ApplicationQuerySet(models.QuerySet):
         return self.filter(filters)
 
     def search_by_code_or_name(self, search_term):
-        return self.filter(
+        from paasng.platform.applications.search_index import search_app_ids
+
+        qs = self.filter(
             Q(code__icontains=search_term) | Q(name_en__icontains=search_term) | Q(name__icontains=search_term)
         )
+        # Narrow down by the search index first, the conditions above are still required because
+        # the index may return more IDs than the real matches
+        app_ids = search_app_ids(search_term)
+        if app_ids is not None:
+            qs = qs.filter(id__in=app_ids)
+        return qs
 
     def only_active(self):
         return self.filter(is_active=True)
@@ -786,6 +794,18 @@ class SMartAppExtraInfo(models.Model):
         return self.artifact_metadata.base_image_id
 
 
+class ApplicationSearchTrigram(models.Model):
+    """应用搜索的三元组（trigram）倒排索引，仅在 APPLICATION_SEARCH_INDEX_BACKEND 为 "db" 时使用"""
+
+    application = models.ForeignKey(Application, on_delete=models.CASCADE, db_constraint=False)
+    trigram = models.CharField(verbose_name="三元组", max_length=3, db_index=True)
+
+    tenant_id = tenant_id_field_factory()
+
+    class Meta:
+        unique_together = ("application", "trigram")
+
+
 class ReservedPrefixAuthCode(TimestampedModel):
     """用于创建具有保留 ID 前缀的应用程序的授权码.
 
@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+"""The ledger of applications' resource quotas, used for sorting applications by resource usage.
+
+The quota of an environment is the sum of "resource limits * target replicas" of its processes. The
+ledger keeps the quota of every environment and the totals of every application in Redis:
+
+- the per-env quotas are updated incrementally when process specs or replicas changed, the totals
+  of the application are adjusted by the difference atomically
+- a periodic reconcile rebuilds the whole ledger, the quotas of default applications are calculated
+  by a bulk aggregate query, cloud-native applications are read from the cluster only when missing
+- the totals are stored in sorted sets, so that applications can be paged by memory usage, see
+  :class:`MemoryOrderedApplications`
+"""
+
+import logging
+from dataclasses import dataclass
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from django.db.models import QuerySet, Sum
+from kubernetes.utils.quantity import parse_quantity
+from redis import Redis
+
+from paas_wl.bk_app.processes.models import ProcessSpec, ProcessSpecPlan
+from paas_wl.bk_app.processes.processes import ProcessManager
+from paasng.core.core.storages.redisdb import get_default_redis
+from paasng.platform.applications.constants import ApplicationType
+from paasng.platform.applications.models import Application, ModuleEnvironment
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ResQuota:
+    """The resource quota, cpu is in "m" and memory is in "Mi" """
+
+    cpu: int = 0
+    memory: int = 0
+
+    def __add__(self, other: "ResQuota") -> "ResQuota":
+        return ResQuota(cpu=self.cpu + other.cpu, memory=self.memory + other.memory)
+
+
+def limits_to_quota(limits: dict, replicas: int = 1) -> ResQuota:
+    """Convert the resource limits(such as {"cpu": "500m", "memory": "1Gi"}) to quota"""
+    return ResQuota(
+        cpu=int(parse_quantity(limits.get("cpu", 0)) * 1000) * replicas,
+        memory=int(parse_quantity(limits.get("memory", 0)) / (1024 * 1024)) * replicas,
+    )
+
+
+def calculate_env_quota(env: ModuleEnvironment) -> ResQuota:
+    """Calculate the quota of the environment, processes of cloud-native applications are read from the cluster"""
+    quota = ResQuota()
+    for specs in ProcessManager(env).list_processes_specs():
+        quota += ResQuota(
+            cpu=specs["resource_limit_quota"]["cpu"] * specs["target_replicas"],
+            memory=specs["resource_limit_quota"]["memory"] * specs["target_replicas"],
+        )
+    return quota
+
+
+# Set the quota of an env and adjust the totals of its application by the difference
+#   KEYS: env cpu hash, env memory hash, app cpu zset, app memory zset
+#   ARGV: env id, app code, cpu, memory
+_UPDATE_ENV_SCRIPT = """
+local old_cpu = tonumber(redis.call('HGET', KEYS[1], ARGV[1]) or '0')
+local old_memory = tonumber(redis.call('HGET', KEYS[2], ARGV[1]) or '0')
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[3])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[4])
+redis.call('ZINCRBY', KEYS[3], tonumber(ARGV[3]) - old_cpu, ARGV[2])
+redis.call('ZINCRBY', KEYS[4], tonumber(ARGV[4]) - old_memory, ARGV[2])
+"""
+
+
+class ResQuotaLedger:
+    """The ledger of resource quotas, stored in Redis
+
+    :param redis_db: The redis client, default to the default redis.
+    :param key_prefix: The prefix of redis keys.
+    """
+
+    def __init__(self, redis_db: Optional[Redis] = None, key_prefix: str = "quotas::ledger"):
+        self.redis_db = redis_db or get_default_redis()
+        self.key_prefix = key_prefix
+        self._update_env_script = self.redis_db.register_script(_UPDATE_ENV_SCRIPT)
+
+    def update_env(self, env: ModuleEnvironment, quota: ResQuota):
+        """Set the quota of the environment"""
+        self._update_env_script(
+            keys=self._keys(),
+            args=[env.pk, env.application.code, quota.cpu, quota.memory],
+        )
+
+    def refresh_env(self, env: ModuleEnvironment):
+        """Recalculate the quota of the environment"""
+        self.update_env(env, calculate_env_quota(env))
+
+    def get_app_quotas(self, app_codes: Sequence[str]) -> Dict[str, ResQuota]:
+        """Get the total quotas of the applications, the applications not in the ledger are omitted"""
+        if not app_codes:
+            return {}
+
+        pipe = self.redis_db.pipeline(transaction=False)
+        for code in app_codes:
+            pipe.zscore(self._app_cpu_key, code)
+            pipe.zscore(self._app_memory_key, code)
+        scores = pipe.execute()
+        return {
+            code: ResQuota(cpu=int(cpu or 0), memory=int(memory))
+            for code, cpu, memory in zip(app_codes, scores[::2], scores[1::2], strict=True)
+            if memory is not None
+        }
+
+    def list_app_codes_by_memory(self, offset: int = 0, limit: int = 100, descending: bool = True) -> List[str]:
+        """Page the codes of applications by their memory quotas, ties are ordered by code"""
+        range_func = self.redis_db.zrevrange if descending else self.redis_db.zrange
+        return [code.decode() for code in range_func(self._app_memory_key, offset, offset + limit - 1)]
+
+    def reconcile(self) -> int:
+        """Rebuild the whole ledger, return the number of environments
+
+        NOTE: Updates of environments during the rebuilding may be overwritten, they will be fixed by the next round.
+        """
+        env_quotas = self._collect_env_quotas()
+
+        app_quotas: Dict[str, ResQuota] = {}
+        for (_, app_code), quota in env_quotas.items():
+            app_quotas[app_code] = app_quotas.get(app_code, ResQuota()) + quota
+
+        keys = self._keys()
+        tmp_keys = [f"{k}::tmp" for k in keys]
+        pipe = self.redis_db.pipeline()
+        pipe.delete(*tmp_keys)
+        if env_quotas:
+            pipe.hset(tmp_keys[0], mapping={env_id: q.cpu for (env_id, _), q in env_quotas.items()})
+            pipe.hset(tmp_keys[1], mapping={env_id: q.memory for (env_id, _), q in env_quotas.items()})
+            pipe.zadd(tmp_keys[2], {code: q.cpu for code, q in app_quotas.items()})
+            pipe.zadd(tmp_keys[3], {code: q.memory for code, q in app_quotas.items()})
+            for tmp_key, key in zip(tmp_keys, keys, strict=True):
+                pipe.rename(tmp_key, key)
+        else:
+            pipe.delete(*keys)
+        pipe.execute()
+        return len(env_quotas)
+
+    def _collect_env_quotas(self) -> Dict[Tuple[int, str], ResQuota]:
+        envs = list(
+            ModuleEnvironment.objects.filter(application__is_deleted=False).values(
+                "id", "engine_app_id", "application__code", "application__type"
+            )
+        )
+        default_quotas = self._aggregate_default_quotas()
+        cnative_quotas = self._get_recorded_quotas(
+            e["id"] for e in envs if e["application__type"] == ApplicationType.CLOUD_NATIVE
+        )
+
+        results: Dict[Tuple[int, str], ResQuota] = {}
+        for e in envs:
+            if e["application__type"] != ApplicationType.CLOUD_NATIVE:
+                quota = default_quotas.get(str(e["engine_app_id"]), ResQuota())
+            elif (recorded := cnative_quotas.get(e["id"])) is not None:
+                quota = recorded
+            else:
+                # The processes of cloud-native applications are only available in the cluster
+                quota = self._calculate_env_quota_safely(e["id"])
+            results[(e["id"], e["application__code"])] = quota
+        return results
+
+    @staticmethod
+    def _aggregate_default_quotas() -> Dict[str, ResQuota]:
+        """Aggregate the quotas by all process specs in one query, return {engine_app_id: quota}"""
+        plan_quotas = {plan.pk: limits_to_quota(plan.limits) for plan in ProcessSpecPlan.objects.all()}
+        rows = ProcessSpec.objects.values("engine_app_id", "plan_id").annotate(replicas=Sum("target_replicas"))
+
+        results: Dict[str, ResQuota] = {}
+        for row in rows:
+            plan_quota = plan_quotas.get(row["plan_id"], ResQuota())
+            quota = ResQuota(cpu=plan_quota.cpu * row["replicas"], memory=plan_quota.memory * row["replicas"])
+            key = str(row["engine_app_id"])
+            results[key] = results.get(key, ResQuota()) + quota
+        return results
+
+    def _get_recorded_quotas(self, env_ids: Iterable[int]) -> Dict[int, ResQuota]:
+        env_ids = list(env_ids)
+        if not env_ids:
+            return {}
+
+        pipe = self.redis_db.pipeline(transaction=False)
+        pipe.hmget(self._env_cpu_key, env_ids)
+        pipe.hmget(self._env_memory_key, env_ids)
+        cpus, memories = pipe.execute()
+        return {
+            env_id: ResQuota(cpu=int(cpu), memory=int(memory))
+            for env_id, cpu, memory in zip(env_ids, cpus, memories, strict=True)
+            if cpu is not None and memory is not None
+        }
+
+    @staticmethod
+    def _calculate_env_quota_safely(env_id: int) -> ResQuota:
+        env = ModuleEnvironment.objects.get(pk=env_id)
+        try:
+            return calculate_env_quota(env)
+        except Exception:
+            logger.exception("failed to calculate the resource quota of env %s", env)
+            return ResQuota()
+
+    @property
+    def _env_cpu_key(self) -> str:
+        return f"{self.key_prefix}::env::cpu"
+
+    @property
+    def _env_memory_key(self) -> str:
+        return f"{self.key_prefix}::env::memory"
+
+    @property
+    def _app_cpu_key(self) -> str:
+        return f"{self.key_prefix}::app::cpu"
+
+    @property
+    def _app_memory_key(self) -> str:
+        return f"{self.key_prefix}::app::memory"
+
+    def _keys(self) -> List[str]:
+        return [self._env_cpu_key, self._env_memory_key, self._app_cpu_key, self._app_memory_key]
+
+
+class MemoryOrderedApplications:
+    """The applications of a queryset, ordered by their memory quotas in the ledger
+
+    It can be paged like a queryset. The ledger is range-read in batches from the beginning, each batch
+    is intersected with the queryset, until the requested page is filled. So the cost of a page grows
+    with its offset and the selectivity of the filters, but the applications out of the page are never
+    loaded. Ties are ordered by code, the applications missing in the ledger(not calculated yet) are
+    placed at the end, in the order of the queryset.
+
+    :param queryset: The filtered applications.
+    :param descending: Whether to put the applications using more memory first.
+    :param batch_size: The number of codes read from the ledger at a time.
+    """
+
+    def __init__(
+        self,
+        queryset: QuerySet,
+        descending: bool = True,
+        ledger: Optional[ResQuotaLedger] = None,
+        batch_size: int = 500,
+    ):
+        self.queryset = queryset
+        self.descending = descending
+        self.ledger = ledger or ResQuotaLedger()
+        self.batch_size = batch_size
+
+    def count(self) -> int:
+        return self.queryset.count()
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __getitem__(self, key: slice) -> List[Application]:
+        codes = list(islice(self._iter_codes(), key.start or 0, key.stop))
+        apps = {app.code: app for app in self.queryset.filter(code__in=codes)}
+        return [apps[code] for code in codes if code in apps]
+
+    def _iter_codes(self) -> Iterator[str]:
+        ledger_codes: List[str] = []
+        while batch := self.ledger.list_app_codes_by_memory(len(ledger_codes), self.batch_size, self.descending):
+            ledger_codes.extend(batch)
+            matched = set(self.queryset.filter(code__in=batch).values_list("code", flat=True))
+            yield from (code for code in batch if code in matched)
+        # Reached only when the whole ledger has been read
+        yield from self.queryset.exclude(code__in=ledger_codes).values_list("code", flat=True)
@@ -0,0 +1,348 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+"""The trigram index for searching applications by code or name.
+
+Searching applications by keyword used to be three ``icontains`` conditions, which can not use
+any index and scan the whole application table. This module keeps a trigram inverted index over
+the code, name and name_en of applications:
+
+- a keyword with 3+ characters only needs to verify the applications which contain all of its
+  trigrams, shorter keywords scan the in-memory documents instead of the table
+- the matched IDs are intersected with the permission filters of the queryset in the same SQL,
+  no application rows are loaded before that
+- the index is updated incrementally by the signals of Application, the changed IDs are published
+  through the cache so that other processes reload exactly those applications, see
+  :class:`ApplicationSearchIndex` for details
+
+The index is disabled by default. When ``APPLICATION_SEARCH_INDEX_BACKEND`` is "memory", every
+process loads the whole application table on the first search; when it's "db", the trigrams are
+stored in the :class:`ApplicationSearchTrigram` table instead, all processes then share the same index.
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, QuerySet
+
+from paasng.platform.applications.models import Application, ApplicationSearchTrigram
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 3
+
+# The searchable fields of application
+SEARCH_FIELDS = ("code", "name", "name_en")
+
+
+class SearchIndexBackend:
+    """The backends of the application search index"""
+
+    MEMORY = "memory"
+    DB = "db"
+
+
+def make_ngrams(text: str, n: int = NGRAM_SIZE) -> Set[str]:
+    """Split the lower-cased text into n-grams, return an empty set if the text is too short"""
+    text = text.lower()
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+def get_app_terms(app: Application) -> Tuple[str, ...]:
+    """Get the lower-cased searchable terms of the application"""
+    return tuple(getattr(app, field).lower() for field in SEARCH_FIELDS if getattr(app, field))
+
+
+class ApplicationSearchIndex:
+    """The in-process trigram index of applications.
+
+    The index is built lazily on the first search. After a change of an application is committed,
+    its ID is published to a change log in the cache: a sequence number plus one entry for each
+    sequence. When a search finds that the sequence has moved, the applications of the new entries
+    are reloaded, so that the indexes of all processes converge. The index is rebuilt if any entry
+    has expired or there are too many of them.
+
+    An application may hold the terms of several versions(e.g. a renaming in an uncommitted
+    transaction), the index therefore may return more IDs than the real matches, but never fewer.
+    Callers must filter the IDs with the original conditions again, which is done by
+    :meth:`ApplicationQuerySet.search_by_code_or_name`.
+
+    :param max_candidates: Give up when the matched IDs are more than this, a huge "IN" clause is
+        slower than scanning the table.
+    :param max_sync_changes: Rebuild the whole index instead of reloading more changes than this.
+    :param loader: Load the (id, code, name, name_en) rows of applications, customizable for testing.
+    """
+
+    change_seq_cache_key = "app_search_index:change_seq"
+    change_cache_key_tmpl = "app_search_index:change:{seq}"
+    # The change entries only need to live until all processes have synced
+    change_ttl = 3600
+
+    def __init__(
+        self,
+        max_candidates: int = 5000,
+        max_sync_changes: int = 1000,
+        loader: Optional[Callable[[Q], Iterable[Tuple]]] = None,
+    ):
+        self.max_candidates = max_candidates
+        self.max_sync_changes = max_sync_changes
+        self.loader = loader or _load_app_rows
+
+        self._lock = threading.RLock()
+        self._built = False
+        self._synced_seq = 0
+        # application id -> terms
+        self._docs: Dict[UUID, Tuple[str, ...]] = {}
+        # trigram -> application ids
+        self._postings: Dict[str, Set[UUID]] = {}
+
+    def search(self, keyword: str, within: Optional[Iterable[UUID]] = None) -> Optional[Set[UUID]]:
+        """Search the IDs of applications whose code or name contains the keyword.
+
+        :param within: The IDs which the result should be limited to, such as the applications
+            the user is permitted to, they are intersected with the postings before verifying.
+        :return: The matched IDs, None if there are too many of them.
+        """
+        keyword = keyword.lower()
+        self.sync()
+        with self._lock:
+            candidates = self._get_candidates(keyword, within)
+            matched = set()
+            for app_id in candidates:
+                if any(keyword in term for term in self._docs.get(app_id, ())):
+                    matched.add(app_id)
+                    if len(matched) > self.max_candidates:
+                        return None
+            return matched
+
+    def add(self, app_id: UUID, terms: Tuple[str, ...], merge: bool = False):
+        """Add or replace the terms of an application
+
+        :param merge: Keep the existing terms of the application.
+        """
+        with self._lock:
+            if merge:
+                terms = tuple(dict.fromkeys(self._docs.get(app_id, ()) + terms))
+            self._remove(app_id)
+            self._docs[app_id] = terms
+            for gram in set().union(*(make_ngrams(term) for term in terms)):
+                self._postings.setdefault(gram, set()).add(app_id)
+
+    def remove(self, app_id: UUID):
+        with self._lock:
+            self._remove(app_id)
+
+    def build(self):
+        """Build the whole index from the database"""
+        # Read the sequence before loading, changes made during loading will be reloaded by next sync
+        seq = self._get_change_seq()
+        rows = list(self.loader(Q()))
+        with self._lock:
+            self._docs.clear()
+            self._postings.clear()
+            self._load_rows(rows)
+            self._built = True
+            self._synced_seq = seq
+        logger.info("application search index built, %d applications loaded", len(rows))
+
+    def sync(self):
+        """Build the index if it has not been built, or reload the applications changed by other processes"""
+        if not self._built:
+            self.build()
+            return
+
+        seq = self._get_change_seq()
+        if seq == self._synced_seq:
+            return
+
+        app_ids = self._get_changes(self._synced_seq, seq)
+        if app_ids is None:
+            self.build()
+            return
+
+        rows = list(self.loader(Q(id__in=app_ids)))
+        with self._lock:
+            # The applications which are not found have been deleted
+            for app_id in app_ids - {row[0] for row in rows}:
+                self._remove(app_id)
+            self._load_rows(rows)
+            self._synced_seq = seq
+
+    def clear(self):
+        with self._lock:
+            self._docs.clear()
+            self._postings.clear()
+            self._built = False
+            self._synced_seq = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    @classmethod
+    def publish_change(cls, app_id: UUID):
+        """Notify all processes that the application has been changed, call it after committing"""
+        cache.add(cls.change_seq_cache_key, 0, timeout=None)
+        try:
+            seq = cache.incr(cls.change_seq_cache_key)
+        except ValueError:
+            # The key has been evicted between "add" and "incr", processes ahead of it will rebuild
+            seq = 1
+            cache.set(cls.change_seq_cache_key, seq, timeout=None)
+        cache.set(cls.change_cache_key_tmpl.format(seq=seq), str(app_id), timeout=cls.change_ttl)
+
+    def _get_change_seq(self) -> int:
+        return cache.get(self.change_seq_cache_key, 0)
+
+    def _get_changes(self, since: int, until: int) -> Optional[Set[UUID]]:
+        """Get the IDs of the applications changed in (since, until], None if the changes are incomplete"""
+        if until < since or until - since > self.max_sync_changes:
+            return None
+
+        keys = [self.change_cache_key_tmpl.format(seq=seq) for seq in range(since + 1, until + 1)]
+        values = cache.get_many(keys)
+        if len(values) < len(keys):
+            return None
+        return {UUID(value) for value in values.values()}
+
+    def _get_candidates(self, keyword: str, within: Optional[Iterable[UUID]]) -> Iterable[UUID]:
+        grams = make_ngrams(keyword)
+        scope = set(within) if within is not None else None
+        if not grams:
+            # The keyword is too short to use the postings, scan the documents instead
+            return scope if scope is not None else list(self._docs)
+
+        sets = [self._postings.get(gram, set()) for gram in grams]
+        if scope is not None:
+            sets.append(scope)
+        # Intersect from the smallest set, so that the candidates shrink as early as possible
+        sets.sort(key=len)
+        candidates = set(sets[0])
+        for s in sets[1:]:
+            if not candidates:
+                break
+            candidates &= s
+        return candidates
+
+    def _load_rows(self, rows: Iterable[Tuple]):
+        for app_id, *values in rows:
+            self.add(app_id, tuple(v.lower() for v in values if v))
+
+    def _remove(self, app_id: UUID):
+        terms = self._docs.pop(app_id, None)
+        if not terms:
+            return
+        for gram in set().union(*(make_ngrams(term) for term in terms)):
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            posting.discard(app_id)
+            if not posting:
+                del self._postings[gram]
+
+
+def _load_app_rows(filters: Q) -> Iterable[Tuple]:
+    # Deleted applications are also indexed, they will be filtered out by the queryset
+    return Application.default_objects.filter(filters).values_list("id", *SEARCH_FIELDS).iterator()
+
+
+_index = ApplicationSearchIndex()
+
+
+def get_app_search_index() -> ApplicationSearchIndex:
+    return _index
+
+
+def get_search_backend() -> str:
+    return settings.APPLICATION_SEARCH_INDEX_BACKEND
+
+
+def search_app_ids(keyword: str) -> Optional[QuerySet | List[UUID]]:
+    """Search the IDs of applications by keyword with the configured backend.
+
+    :return: The IDs or a subquery of IDs, None if the index can not help.
+    """
+    backend = get_search_backend()
+    if backend == SearchIndexBackend.MEMORY:
+        matched = get_app_search_index().search(keyword)
+        return None if matched is None else list(matched)
+    if backend == SearchIndexBackend.DB:
+        grams = make_ngrams(keyword)
+        if not grams:
+            return None
+        return (
+            ApplicationSearchTrigram.objects.filter(trigram__in=grams)
+            .values("application_id")
+            .annotate(hits=Count("trigram"))
+            .filter(hits=len(grams))
+            .values("application_id")
+        )
+    return None
+
+
+def on_app_saved(app: Application, committed: bool):
+    """Update the indexes after an application has been saved
+
+    :param committed: Whether the transaction has been committed. Before committing, the new
+        terms are merged with the old ones, because the transaction may be rolled back.
+    """
+    backend = get_search_backend()
+    if backend == SearchIndexBackend.MEMORY:
+        get_app_search_index().add(app.id, get_app_terms(app), merge=not committed)
+        if committed:
+            ApplicationSearchIndex.publish_change(app.id)
+    elif backend == SearchIndexBackend.DB and not committed:
+        # The trigram table is in the same transaction with the application
+        sync_app_trigrams(app)
+
+
+def on_app_deleted(app: Application):
+    """Update the indexes after the deletion of an application has been committed, the application
+    stays in the index until then, because the transaction may be rolled back.
+    """
+    if get_search_backend() == SearchIndexBackend.MEMORY:
+        get_app_search_index().remove(app.id)
+        ApplicationSearchIndex.publish_change(app.id)
+    # The trigram rows are deleted by cascading
+
+
+def sync_app_trigrams(app: Application):
+    """Rewrite the rows of the application in the trigram table"""
+    grams = set().union(*(make_ngrams(term) for term in get_app_terms(app)))
+    existing = set(ApplicationSearchTrigram.objects.filter(application=app).values_list("trigram", flat=True))
+    if stale := existing - grams:
+        ApplicationSearchTrigram.objects.filter(application=app, trigram__in=stale).delete()
+    if missing := grams - existing:
+        ApplicationSearchTrigram.objects.bulk_create(
+            [ApplicationSearchTrigram(application=app, trigram=gram, tenant_id=app.tenant_id) for gram in missing],
+            ignore_conflicts=True,
+        )
+
+
+def rebuild_app_trigrams(batch_size: int = 1000) -> int:
+    """Rebuild the whole trigram table, return the number of applications indexed"""
+    count = 0
+    started_at = time.monotonic()
+    for app in Application.default_objects.only("id", "tenant_id", *SEARCH_FIELDS).iterator(chunk_size=batch_size):
+        sync_app_trigrams(app)
+        count += 1
+    logger.info("application trigram table rebuilt, %d applications, %.2fs", count, time.monotonic() - started_at)
+    return count
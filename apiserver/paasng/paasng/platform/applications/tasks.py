@@ -16,7 +16,6 @@
 # to the current version of the project delivered to anyone in the future.
 
 import logging
-from collections import OrderedDict
 from typing import cast
 
 from celery import shared_task
@@ -24,9 +23,8 @@ from celery import shared_task
 from paasng.accessories.servicehub.exceptions import ServiceObjNotFound
 from paasng.accessories.servicehub.manager import LocalServiceObj, mixed_service_mgr
 from paasng.accessories.servicehub.models import ServiceEngineAppAttachment
-from paasng.core.core.storages.redisdb import DefaultRediStore
-from paasng.platform.applications.models import Application
-from paasng.platform.applications.utils import ResQuotasAggregation
+from paasng.platform.applications.models import Application, ModuleEnvironment
+from paasng.platform.applications.quotas import ResQuotaLedger
 
 logger = logging.getLogger(__name__)
 
@@ -65,16 +63,19 @@ def sync_developers_to_sentry(application_id):
 
 @shared_task
 def cal_app_resource_quotas():
-    """Calculate resource quotas for all apps for sorting display of app list pages.
-    Testing 1000 apps, takes about 30s and needs to be put into the redis cache.
+    """Reconcile the resource quotas ledger of all apps, for sorting display of app list pages.
+
+    The ledger is updated incrementally when processes changed, reconciling only fixes the drifts.
     """
-    app_resource_quotas = OrderedDict()
-    for app in Application.objects.all():
-        quotas = ResQuotasAggregation(app).get_resource_quotas()
-        app_resource_quotas[app.code] = quotas
-    # Sort by memory usage size
-    sorted_app_quotas = OrderedDict(sorted(app_resource_quotas.items(), key=lambda x: x[1]["memory"], reverse=True))
+    env_count = ResQuotaLedger().reconcile()
+    logger.info("resource quotas ledger reconciled, %d envs in total", env_count)
+
 
-    # Save to redis
-    store = DefaultRediStore(rkey="quotas::app")
-    store.save(sorted_app_quotas)
+@shared_task
+def refresh_env_resource_quota(env_id: int):
+    """Recalculate the resource quota of the env in the ledger"""
+    try:
+        env = ModuleEnvironment.objects.get(pk=env_id)
+    except ModuleEnvironment.DoesNotExist:
+        return
+    ResQuotaLedger().refresh_env(env)
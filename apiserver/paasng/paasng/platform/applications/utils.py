@@ -16,8 +16,6 @@
 # to the current version of the project delivered to anyone in the future.
 
 import logging
-from collections import defaultdict
-from dataclasses import dataclass
 from typing import Optional
 
 from django.conf import settings
@@ -261,27 +259,3 @@ def get_latest_deployment_basic_info(application: Application, env: ModuleEnviro
         "operator": latest_dp.operator.username,
         "deploy_time": latest_dp.created.isoformat(sep=" ", timespec="seconds"),
     }
-
-
-@dataclass
-class ResQuotasAggregation:
-    app: Application
-
-    def get_resource_quotas(self) -> dict:
-        quotas: dict = {"prod": defaultdict(int), "stag": defaultdict(int)}
-        for app_env in self.app.get_app_envs():
-            processes_specs = ProcessManager(app_env).list_processes_specs()
-
-            for _specs in processes_specs:
-                quotas[app_env.environment]["memory_total"] += (
-                    _specs["resource_limit_quota"]["memory"] * _specs["target_replicas"]
-                )
-                quotas[app_env.environment]["cpu_total"] += (
-                    _specs["resource_limit_quota"]["cpu"] * _specs["target_replicas"]
-                )
-
-        # cpu 的单位从默认的 m 转为 核
-        cpu = sum([v["cpu_total"] for v in quotas.values()]) // 1000
-        # 内存的单位从默认的 Mi 转为 G
-        memory = sum([v["memory_total"] for v in quotas.values()]) // 1024
-        return {"cpu": cpu, "memory": memory}
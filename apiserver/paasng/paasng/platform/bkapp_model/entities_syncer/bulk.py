@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from django.db import models, transaction
+
+from .result import CommonSyncResult
+
+# The key of a row, consists of the values of the key fields
+RowKey = Tuple[Any, ...]
+
+
+class KeyedBulkSyncer:
+    """Reconcile the rows of a model with the desired data, rows are identified by the key fields.
+
+    The existing rows are loaded by one query, then the rows to create, update and delete are
+    computed in memory, rows whose fields are unchanged are skipped. The changes are applied by
+    `bulk_create`, `bulk_update` and a single delete in one transaction, so the number of queries
+    does not grow with the number of rows.
+
+    :param queryset: The existing rows in the scope of syncing, e.g. all rows of a module.
+    :param key_fields: The fields which identify a row in the scope, e.g. ("environment_name", "key").
+    :param create_defaults: The extra field values of every created row, e.g. {"module": module}.
+    """
+
+    def __init__(
+        self,
+        queryset: models.QuerySet,
+        key_fields: Sequence[str],
+        create_defaults: Optional[Dict[str, Any]] = None,
+    ):
+        self.queryset = queryset
+        self.model = queryset.model
+        self.key_fields = tuple(key_fields)
+        self.create_defaults = create_defaults or {}
+        self._existing: Optional[Dict[RowKey, models.Model]] = None
+
+    def get_existing_keys(self) -> Set[RowKey]:
+        """Get the keys of the existing rows, the rows are loaded only once"""
+        return set(self._load_existing())
+
+    def sync(self, desired: Dict[RowKey, Dict[str, Any]]) -> CommonSyncResult:
+        """Sync the desired rows, existing rows that are not in the desired data will be deleted.
+
+        :param desired: The desired rows, {key: {field name: value}}, the fields which are absent
+            in the values are left untouched for existing rows.
+        :return: sync result, rows that exist are counted as updated even if nothing changed.
+        """
+        ret = CommonSyncResult()
+        existing = dict(self._load_existing())
+
+        to_create: List[models.Model] = []
+        to_update: List[models.Model] = []
+        update_fields: Set[str] = set()
+        for key, values in desired.items():
+            obj = existing.pop(key, None)
+            if obj is None:
+                to_create.append(
+                    self.model(**self.create_defaults, **dict(zip(self.key_fields, key, strict=True)), **values)
+                )
+                continue
+
+            ret.updated_num += 1
+            changed_fields = [name for name, value in values.items() if getattr(obj, name) != value]
+            if not changed_fields:
+                continue
+            for name in changed_fields:
+                setattr(obj, name, values[name])
+            to_update.append(obj)
+            update_fields.update(changed_fields)
+
+        ret.created_num = len(to_create)
+        with transaction.atomic(using=self.queryset.db):
+            if to_create:
+                self.queryset.bulk_create(to_create)
+            if to_update:
+                self.queryset.bulk_update(to_update, self._with_auto_now_fields(to_update, update_fields))
+            if existing:
+                ret.deleted_num, _ = self.queryset.filter(pk__in=[obj.pk for obj in existing.values()]).delete()
+
+        # The loaded rows are stale now
+        self._existing = None
+        return ret
+
+    def _load_existing(self) -> Dict[RowKey, models.Model]:
+        if self._existing is None:
+            self._existing = {self._get_key(obj): obj for obj in self.queryset}
+        return self._existing
+
+    def _get_key(self, obj: models.Model) -> RowKey:
+        return tuple(getattr(obj, name) for name in self.key_fields)
+
+    def _with_auto_now_fields(self, objs: List[models.Model], fields: Set[str]) -> List[str]:
+        """`bulk_update` does not touch the "auto_now" fields like `save`, set them manually"""
+        result = sorted(fields)
+        for field in self.model._meta.concrete_fields:
+            if getattr(field, "auto_now", False) and field.name not in fields:
+                for obj in objs:
+                    field.pre_save(obj, add=False)
+                result.append(field.name)
+        return result
@@ -15,7 +15,7 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
-from typing import List
+from typing import Any, List
 
 from paasng.platform.bkapp_model.entities import EnvVar, EnvVarOverlay
 from paasng.platform.engine.constants import ConfigVarEnvName
@@ -23,6 +23,7 @@ from paasng.platform.engine.models.preset_envvars import PresetEnvVariable
 from paasng.platform.modules.models import Module
 from paasng.utils.structure import NotSetType
 
+from .bulk import KeyedBulkSyncer
 from .result import CommonSyncResult
 
 
@@ -39,43 +40,29 @@ def sync_env_vars(
     :param overlay_env_vars: The environment-specified variables
     :return: sync result
     """
-    ret = CommonSyncResult()
     if isinstance(overlay_env_vars, NotSetType):
         overlay_env_vars = []
 
-    # Build the index of existing data first to remove data later.
-    # Data structure: {(env_name, key): pk}
-    existing_index: dict[tuple[str, str], int] = {}
-    for var_obj in PresetEnvVariable.objects.filter(module=module):
-        existing_index[(var_obj.environment_name, var_obj.key)] = var_obj.pk
-
-    # Upsert the input data
+    # Data structure: {(env_name, key): values}
+    desired: dict[tuple[str, str], dict[str, Any]] = {}
     for var in env_vars:
-        env_name = ConfigVarEnvName.GLOBAL
-        _, created = PresetEnvVariable.objects.update_or_create(
-            module=module,
-            environment_name=env_name.value,
-            key=var.name,
-            defaults={"value": var.value, "description": var.description, "tenant_id": module.tenant_id},
-        )
-        ret.incr_by_created_flag(created)
-        existing_index.pop((env_name.value, var.name), None)
-
+        desired[(ConfigVarEnvName.GLOBAL.value, var.name)] = {
+            "value": var.value,
+            "description": var.description,
+            "tenant_id": module.tenant_id,
+        }
     for overlay_var in overlay_env_vars:
         env_name = ConfigVarEnvName(overlay_var.env_name)
-        _, created = PresetEnvVariable.objects.update_or_create(
-            module=module,
-            environment_name=env_name.value,
-            key=overlay_var.name,
-            defaults={
-                "value": overlay_var.value,
-                "description": overlay_var.description,
-                "tenant_id": module.tenant_id,
-            },
-        )
-        ret.incr_by_created_flag(created)
-        existing_index.pop((env_name.value, overlay_var.name), None)
+        desired[(env_name.value, overlay_var.name)] = {
+            "value": overlay_var.value,
+            "description": overlay_var.description,
+            "tenant_id": module.tenant_id,
+        }
 
-    # Remove existing data that is not touched.
-    ret.deleted_num, _ = PresetEnvVariable.objects.filter(module=module, id__in=existing_index.values()).delete()
-    return ret
+    # Upsert the input data and remove existing data that is not touched.
+    syncer = KeyedBulkSyncer(
+        PresetEnvVariable.objects.filter(module=module),
+        key_fields=["environment_name", "key"],
+        create_defaults={"module": module},
+    )
+    return syncer.sync(desired)
@@ -21,6 +21,7 @@ from paasng.platform.bkapp_model.models import DeployHookType, ModuleDeployHook
 from paasng.platform.modules.models import Module
 from paasng.utils.structure import NOTSET, NotSetType
 
+from .bulk import KeyedBulkSyncer
 from .result import CommonSyncResult
 
 
@@ -44,30 +45,21 @@ def sync_hooks(module: Module, hooks: Hooks | NotSetType | None, manager: fieldm
         ret.deleted_num, _ = ModuleDeployHook.objects.filter(module=module).delete()
         return ret
 
-    # Build the index of existing data first to remove data later.
-    # Data structure: {hook type: pk}
-    existing_index = {}
-    for hook in ModuleDeployHook.objects.filter(module=module):
-        existing_index[hook.type] = hook.pk
-
-    # Update or create data
+    # Data structure: {(hook type,): values}
+    desired = {}
     if pre_release_hook := hooks.pre_release:
-        _, created = ModuleDeployHook.objects.update_or_create(
-            module=module,
-            type=DeployHookType.PRE_RELEASE_HOOK,
-            defaults={
-                "enabled": True,
-                "command": pre_release_hook.command,
-                "args": pre_release_hook.args,
-                "proc_command": None,
-                "tenant_id": module.tenant_id,
-            },
-        )
-        ret.incr_by_created_flag(created)
-        # Move out from the index
-        existing_index.pop(DeployHookType.PRE_RELEASE_HOOK, None)
+        desired[(DeployHookType.PRE_RELEASE_HOOK.value,)] = {
+            "enabled": True,
+            "command": pre_release_hook.command,
+            "args": pre_release_hook.args,
+            "proc_command": None,
+            "tenant_id": module.tenant_id,
+        }
 
-    # Remove existing data that is not touched.
-    ret.deleted_num, _ = ModuleDeployHook.objects.filter(module=module, id__in=existing_index.values()).delete()
+    # Update or create data, existing data that is not touched will be removed
+    syncer = KeyedBulkSyncer(
+        ModuleDeployHook.objects.filter(module=module), key_fields=["type"], create_defaults={"module": module}
+    )
+    ret = syncer.sync(desired)
     field_mgr.set(manager)
     return ret
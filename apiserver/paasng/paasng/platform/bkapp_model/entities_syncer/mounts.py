@@ -15,7 +15,7 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
-from typing import List
+from typing import Any, List
 
 from paas_wl.bk_app.cnative.specs.constants import MountEnvName
 from paas_wl.bk_app.cnative.specs.crd import bk_app
@@ -26,6 +26,7 @@ from paasng.platform.modules.models import Module
 from paasng.utils.camel_converter import dict_to_camel
 from paasng.utils.structure import NotSetType
 
+from .bulk import KeyedBulkSyncer
 from .result import CommonSyncResult
 
 
@@ -40,36 +41,22 @@ def sync_mounts(
     :return: sync result.
     """
     # TODO: handle fields manager related logic
-    existing_mounts = MountDB.objects.filter(module_id=module.id)
-    existing_index = {(m.mount_path, m.environment_name): m.id for m in existing_mounts}
+    if isinstance(overlay_mounts, NotSetType):
+        overlay_mounts = []
 
-    ret = CommonSyncResult()
+    # Data structure: {(mount_path, environment_name): values}
+    desired: dict[tuple[str, str], dict[str, Any]] = {}
     for mount in mounts:
         source_config = bk_app.VolumeSource(**dict_to_camel(mount.source.dict()))
-        _, created = MountDB.objects.update_or_create(
-            module_id=module.id,
-            mount_path=mount.mount_path,
-            environment_name=MountEnvName.GLOBAL.value,
-            defaults={"source_config": source_config},
-        )
-        ret.incr_by_created_flag(created)
-        # Remove it from index if it already exists
-        existing_index.pop((mount.mount_path, MountEnvName.GLOBAL.value), None)
-
-    if isinstance(overlay_mounts, NotSetType):
-        overlay_mounts = []
+        desired[(mount.mount_path, MountEnvName.GLOBAL.value)] = {"source_config": source_config}
     for overlay_mount in overlay_mounts:
         source_config = bk_app.VolumeSource(**dict_to_camel(overlay_mount.source.dict()))
-        _, created = MountDB.objects.update_or_create(
-            module_id=module.id,
-            mount_path=overlay_mount.mount_path,
-            environment_name=overlay_mount.env_name,
-            defaults={"source_config": source_config},
-        )
-        ret.incr_by_created_flag(created)
-        # Remove it from index if it already exists
-        existing_index.pop((overlay_mount.mount_path, overlay_mount.env_name), None)
-
-    # Remove existing relations that is not touched.
-    ret.deleted_num, _ = MountDB.objects.filter(id__in=existing_index.values()).delete()
-    return ret
+        desired[(overlay_mount.mount_path, overlay_mount.env_name)] = {"source_config": source_config}
+
+    # Upsert the input relations and remove existing relations that is not touched.
+    syncer = KeyedBulkSyncer(
+        MountDB.objects.filter(module_id=module.id),
+        key_fields=["mount_path", "environment_name"],
+        create_defaults={"module_id": module.id},
+    )
+    return syncer.sync(desired)
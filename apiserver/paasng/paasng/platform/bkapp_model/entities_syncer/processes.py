@@ -15,7 +15,7 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
-from typing import Any, Dict, Iterable, List
+from typing import Any, Dict, Iterable, List, Tuple
 
 from paas_wl.bk_app.cnative.specs.constants import DEFAULT_RES_QUOTA_PLAN_NAME
 from paasng.platform.bkapp_model import fieldmgr
@@ -25,6 +25,7 @@ from paasng.platform.bkapp_model.models import ModuleProcessSpec
 from paasng.platform.modules.models import Module
 from paasng.utils.structure import NOTSET, NotSetType
 
+from .bulk import KeyedBulkSyncer
 from .result import CommonSyncResult
 
 
@@ -41,21 +42,18 @@ def sync_processes(
         argument should be set to True.
     :return: sync result
     """
-    ret = CommonSyncResult()
+    syncer = KeyedBulkSyncer(
+        ModuleProcessSpec.objects.filter(module=module), key_fields=["name"], create_defaults={"module": module}
+    )
+    existing_procs = {name for (name,) in syncer.get_existing_keys()}
 
-    # Build the index of existing data first to remove data later.
-    # Data structure: {process name: pk}
-    existing_index = {}
-    for proc_spec in ModuleProcessSpec.objects.filter(module=module):
-        existing_index[proc_spec.name] = proc_spec.pk
-
-    managed_values = ManagedFieldValues(module, processes, manager, set(existing_index.keys()))
+    managed_values = ManagedFieldValues(module, processes, manager, existing_procs)
     target_replicas_map, r_reset_procs = managed_values.get_target_replicas()
     autoscaling_map, a_reset_procs = managed_values.get_autoscaling()
 
-    # Update or create data
+    desired: Dict[Tuple[str], Dict[str, Any]] = {}
     for process in processes:
-        defaults: Dict[str, Any] = {
+        values: Dict[str, Any] = {
             "proc_command": process.proc_command,
             "port": process.target_port,
             "plan_name": process.res_quota_plan or DEFAULT_RES_QUOTA_PLAN_NAME,
@@ -66,21 +64,16 @@ def sync_processes(
             "components": process.components,
         }
         if not use_proc_command:
-            defaults.update({"command": process.command, "args": process.args})
+            values.update({"command": process.command, "args": process.args})
         if process.name in target_replicas_map:
-            defaults.update({"target_replicas": target_replicas_map[process.name]})
+            values.update({"target_replicas": target_replicas_map[process.name]})
         if process.name in autoscaling_map:
             as_config = autoscaling_map[process.name]
-            defaults.update({"autoscaling": bool(as_config), "scaling_config": as_config})
-
-        _, created = ModuleProcessSpec.objects.update_or_create(module=module, name=process.name, defaults=defaults)
-
-        ret.incr_by_created_flag(created)
-        # Move out from the index
-        existing_index.pop(process.name, None)
+            values.update({"autoscaling": bool(as_config), "scaling_config": as_config})
+        desired[(process.name,)] = values
 
-    # Remove existing data that is not touched.
-    ret.deleted_num, _ = ModuleProcessSpec.objects.filter(module=module, id__in=existing_index.values()).delete()
+    # Update or create data, existing data that is not touched will be removed
+    ret = syncer.sync(desired)
 
     # Set and reset field managers
     managed_values.set_field_mgr_target_replicas(target_replicas_map.keys())
@@ -20,6 +20,7 @@ from paasng.platform.bkapp_model.models import SvcDiscConfig as SvcDiscConfigDB
 from paasng.platform.modules.models import Module
 from paasng.utils.structure import NOTSET, NotSetType
 
+from .bulk import KeyedBulkSyncer
 from .result import CommonSyncResult
 
 
@@ -56,10 +57,12 @@ def sync_svc_discovery(
         ret.deleted_num, _ = SvcDiscConfigDB.objects.filter(application=module.application).delete()
         return ret
 
-    _, created = SvcDiscConfigDB.objects.update_or_create(
-        application=module.application,
-        defaults={"bk_saas": svc_disc.bk_saas},
+    # The config is unique per application, so the key is always empty
+    syncer = KeyedBulkSyncer(
+        SvcDiscConfigDB.objects.filter(application=module.application),
+        key_fields=[],
+        create_defaults={"application": module.application},
     )
-    ret.incr_by_created_flag(created)
+    ret = syncer.sync({(): {"bk_saas": svc_disc.bk_saas}})
     field_mgr.set(manager)
     return ret
@@ -26,6 +26,7 @@ from celery import shared_task
 from paas_wl.bk_app.applications.entities import BuildMetadata
 from paas_wl.bk_app.applications.models.build import BuildProcess
 from paas_wl.bk_app.deploy.app_res.controllers import BuildHandler
+from paasng.accessories.smart_advisor.tagging import StreamingFailureMatcher
 from paasng.core.core.storages.redisdb import get_default_redis
 from paasng.platform.engine.constants import BuildStatus
 from paasng.platform.engine.deploy.bg_build.executors import (
@@ -69,18 +70,22 @@ def start_bg_build_process(
     if stream_channel_id:
         stream_channel = StreamChannel(stream_channel_id, redis_db=get_default_redis())
         stream_channel.initialize()
-        stream = RedisWithModelStream(build_process.output_stream, stream_channel)
+        # The builder outputs most of the logs, match the failure patterns while writing them
+        matcher = StreamingFailureMatcher(str(deploy_id))
+        stream = RedisWithModelStream(build_process.output_stream, stream_channel, on_message=matcher.feed)
     else:
         stream = ConsoleStream()
 
     build_metadata = cattr.structure(metadata, BuildMetadata)
-    if use_bk_ci_pipeline:
-        logger.info("deployment %s, build process %s use bk_ci pipeline to build image", deploy_id, bp_id)
-        pipeline_bp_executor = PipelineBuildProcessExecutor(deployment, build_process, stream)
-        pipeline_bp_executor.execute(metadata=build_metadata)
-    else:
-        bp_executor = DefaultBuildProcessExecutor(deployment, build_process, stream)
-        bp_executor.execute(metadata=build_metadata)
+    # The builder outputs lots of lines, buffer them to write as segments in batches
+    with build_process.output_stream.buffered():
+        if use_bk_ci_pipeline:
+            logger.info("deployment %s, build process %s use bk_ci pipeline to build image", deploy_id, bp_id)
+            pipeline_bp_executor = PipelineBuildProcessExecutor(deployment, build_process, stream)
+            pipeline_bp_executor.execute(metadata=build_metadata)
+        else:
+            bp_executor = DefaultBuildProcessExecutor(deployment, build_process, stream)
+            bp_executor.execute(metadata=build_metadata)
 
 
 def interrupt_build_proc(bp_id: UUID) -> bool:
@@ -24,6 +24,7 @@ from celery import shared_task
 from paas_wl.bk_app.deploy.actions.exec import AppCommandExecutor
 from paas_wl.workloads.release_controller.hooks.entities import CommandTemplate
 from paas_wl.workloads.release_controller.hooks.models import Command
+from paasng.accessories.smart_advisor.tagging import StreamingFailureMatcher
 from paasng.core.core.storages.redisdb import get_default_redis
 from paasng.platform.applications.models import ModuleEnvironment
 from paasng.platform.engine.deploy.bg_command.bkapp_hook import PreReleaseDummyExecutor, generate_pre_release_hook_name
@@ -70,12 +71,15 @@ def execute_bg_command(uuid: str, stream_channel_id: Optional[str] = None, extra
     if stream_channel_id:
         stream_channel = StreamChannel(stream_channel_id, redis_db=get_default_redis())
         stream_channel.initialize()
-        stream = RedisWithModelStream(command.output_stream, stream_channel)
+        # The channel of a deployment is named by its ID, match the failure patterns for it
+        matcher = StreamingFailureMatcher(stream_channel_id)
+        stream = RedisWithModelStream(command.output_stream, stream_channel, on_message=matcher.feed)
     else:
         stream = ConsoleStream()
 
     executor = AppCommandExecutor(command=command, stream=stream, extra_envs=extra_envs or {})
-    executor.perform()
+    with command.output_stream.buffered():
+        executor.perform()
 
 
 @shared_task
@@ -55,7 +55,7 @@ from paasng.platform.engine.deploy.release import start_release_step
 from paasng.platform.engine.exceptions import HandleAppDescriptionError, InitDeployDescHandlerError
 from paasng.platform.engine.models import Deployment
 from paasng.platform.engine.models.phases import DeployPhaseTypes
-from paasng.platform.engine.phases_steps.steps import update_step_by_line
+from paasng.platform.engine.phases_steps.steps import StepTransitionTracker
 from paasng.platform.engine.signals import post_phase_end, pre_appenv_build, pre_phase_start
 from paasng.platform.engine.utils.output import Style
 from paasng.platform.engine.utils.source import (
@@ -472,17 +472,16 @@ class BuildProcessPoller(DeployPoller):
         """Update deploy steps by processing all log lines of build process."""
         # Update deploy steps by log line
         phase = deployment.deployphase_set.get(type=DeployPhaseTypes.BUILD)
-        pattern_maps = {
-            JobStatus.PENDING: phase.get_started_pattern_map(),
-            JobStatus.SUCCESSFUL: phase.get_finished_pattern_map(),
-        }
+        tracker = StepTransitionTracker(phase)
         started_at = time.time()
         logger.info("Update deployment steps by log lines, deployment: %s", self.params["deployment_id"])
 
         # TODO: Use a flag value to indicate the progress of the scanning of the log,
         # so that we won't need to scan the log from the beginning every time.
-        for line in build_proc.output_stream.lines.all().values_list("line", flat=True):
-            update_step_by_line(line, pattern_maps, phase)
+        for log in build_proc.output_stream.iter_lines():
+            if tracker.finished:
+                break
+            tracker.feed(log.line)
 
         logger.info(
             "Finished updating deployment steps, deployment: %s, cost: %s",
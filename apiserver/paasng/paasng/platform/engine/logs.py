@@ -46,9 +46,14 @@ def make_channel_stream(
     if not db_stream:
         raise ValueError("The output stream object does not exist")
 
+    # Avoid circular import, the tagging module reads the logs by `get_all_logs`
+    from paasng.accessories.smart_advisor.tagging import StreamingFailureMatcher
+
     redis_channel = StreamChannel(stream_channel_id or deployment.id, redis_db=get_default_redis())
     redis_channel.initialize()
-    return RedisWithModelStream(db_stream, redis_channel)
+    # Match the failure patterns while writing, the hints are ready as soon as the deployment fails
+    matcher = StreamingFailureMatcher(str(deployment.id))
+    return RedisWithModelStream(db_stream, redis_channel, on_message=matcher.feed)
 
 
 class DeploymentLogStreams:
@@ -147,4 +152,4 @@ def get_all_logs(d: Deployment) -> str:
 
 def serialize_stream_logs(output_stream: OutputStream) -> List[str]:
     """Serialize all logs of the given output_stream object."""
-    return [line.line for line in output_stream.lines.all().order_by("created")]
+    return [log.line for log in output_stream.iter_lines()]
@@ -65,23 +65,15 @@ def deployment_is_frozen(deployment: Deployment, since: datetime.datetime) -> bo
 
     log_streams = DeploymentLogStreams(deployment)
     # TODO: Include more streams besides the building process stream
-    if s := log_streams.build_proc_stream:
-        log_lines = list(s.lines.all())
-    else:
-        log_lines = []
+    s = log_streams.build_proc_stream
+    last_line_created = s.get_last_line_created() if s else None
 
     # Deployment with no logs lines was frozen
-    if not log_lines:
+    if last_line_created is None:
         return True
 
     # Deployment which has no new lines in `edge_seconds` was frozen
-    last_log_line = log_lines[-1]
-    try:
-        last_line_created = arrow.get(last_log_line.created)
-    except KeyError:
-        # Backward compatibility
-        return False
-    return last_line_created < arrow.get(since)
+    return arrow.get(last_line_created) < arrow.get(since)
 
 
 class FrozenDeploymentsMetric:
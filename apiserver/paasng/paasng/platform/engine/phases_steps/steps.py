@@ -17,12 +17,18 @@
 
 import logging
 import re
+from collections import Counter
 from contextlib import suppress
-from typing import TYPE_CHECKING, Dict, List
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Pattern, Tuple
 
 from paasng.platform.applications.constants import ApplicationType
-from paasng.platform.engine.constants import DOCKER_BUILD_STEPSET_NAME, IMAGE_RELEASE_STEPSET_NAME, RuntimeType
-from paasng.platform.engine.exceptions import DuplicateNameInSamePhaseError, StepNotInPresetListError
+from paasng.platform.engine.constants import (
+    DOCKER_BUILD_STEPSET_NAME,
+    IMAGE_RELEASE_STEPSET_NAME,
+    JobStatus,
+    RuntimeType,
+)
 from paasng.platform.engine.models.phases import DeployPhaseTypes
 from paasng.platform.engine.models.steps import StepMetaSet
 from paasng.platform.engine.utils.output import RedisChannelStream
@@ -83,36 +89,112 @@ class DeployStepPicker:
             return StepMetaSet.objects.filter(is_default=True, name="default").order_by("-created").first()
 
 
-def update_step_by_line(line: str, pattern_maps: Dict, phase: "DeployPhase"):
-    """Try to find a match for the given log line in the given pattern maps. If a
-    match is found, update the step status and write to stream.
+class StepTransition(NamedTuple):
+    """A compiled pattern which transits a step to the given status when matched"""
+
+    status: JobStatus
+    regex: Pattern
+    step_name: str
+
+
+@lru_cache(maxsize=128)
+def compile_transitions(items: Tuple[Tuple[JobStatus, str, str], ...]) -> Tuple[StepTransition, ...]:
+    """Compile the patterns, the result is cached so that phases bound to the same `StepMetaSet`
+    share the compiled patterns.
+
+    :param items: A tuple of (status, pattern, step name).
+    """
+    return tuple(
+        StepTransition(status, re.compile(pattern, flags=re.IGNORECASE), step_name)
+        for status, pattern, step_name in items
+    )
+
+
+class StepTransitionTracker:
+    """Update the steps of a phase by matching the log lines, line by line.
+
+    The steps are loaded once and kept in memory, the patterns of a step are not evaluated any more
+    once the step has completed.
 
-    :param line: The log line to match.
-    :param patterns_maps: The pattern maps to match against.
     :param phase: The deployment phase.
+    :param pattern_maps: The pattern maps to match against, {status: {pattern: step name}}, defaults to
+        the started and finished patterns of the phase.
     """
-    for job_status, pattern_map in pattern_maps.items():
-        for pattern, step_name in pattern_map.items():
-            # When the line is too long(>10k), the pattern matching will take too long
-            # complete. To improve the performance, we only try to find the pattern in
-            # the first 1k characters.
-            #
-            # This won't affect the matching result because most patterns only occur
-            # at the beginning of the line.
-            p = re.compile(pattern, flags=re.IGNORECASE)
-            if not p.search(line[:1024]):
-                continue
 
-            try:
-                step_obj = phase.get_step_by_name(step_name)
-            except (StepNotInPresetListError, DuplicateNameInSamePhaseError):
-                logger.debug("Step not found or duplicated, name: %s", step_name)
+    # When the line is too long(>10k), the pattern matching will take too long
+    # complete. To improve the performance, we only try to find the pattern in
+    # the first 1k characters.
+    #
+    # This won't affect the matching result because most patterns only occur
+    # at the beginning of the line.
+    max_search_length = 1024
+
+    def __init__(self, phase: "DeployPhase", pattern_maps: Optional[Dict] = None):
+        self.phase = phase
+        if pattern_maps is None:
+            pattern_maps = {
+                JobStatus.PENDING: phase.get_started_pattern_map(),
+                JobStatus.SUCCESSFUL: phase.get_finished_pattern_map(),
+            }
+
+        steps = list(phase.steps.all())
+        name_counts = Counter(step.name for step in steps)
+        self._steps: Dict[str, "DeployStep"] = {step.name: step for step in steps if name_counts[step.name] == 1}
+
+        items = []
+        for job_status, pattern_map in pattern_maps.items():
+            for pattern, step_name in pattern_map.items():
+                if step_name not in self._steps:
+                    logger.debug("Step not found or duplicated, name: %s", step_name)
+                    continue
+                items.append((job_status, pattern, step_name))
+        self._transitions = [t for t in compile_transitions(tuple(items)) if not self._is_completed(t.step_name)]
+        self._stream: Optional[RedisChannelStream] = None
+
+    @property
+    def finished(self) -> bool:
+        """Whether all the steps with patterns have completed"""
+        return not self._transitions
+
+    def feed(self, line: str):
+        """Match the line, update the step status and write to stream if a match is found"""
+        text = line[: self.max_search_length]
+        completed = False
+        for t in self._transitions:
+            if not t.regex.search(text):
                 continue
 
+            step_obj = self._steps[t.step_name]
             # 由于日志会被重复处理，所以肯定会重复判断，当状态一致或处于已结束状态时，跳过
-            if step_obj.status == job_status.value or step_obj.is_completed:
+            if step_obj.status == t.status.value or step_obj.is_completed:
                 continue
 
-            logger.info("[%s] going to mark & write to stream", phase.deployment.id)
+            logger.info("[%s] going to mark & write to stream", self.phase.deployment.id)
             # 更新 step 状态，并写到输出流
-            step_obj.mark_and_write_to_stream(RedisChannelStream.from_deployment_id(phase.deployment.id), job_status)
+            step_obj.mark_and_write_to_stream(self.stream, t.status)
+            completed = completed or step_obj.is_completed
+
+        if completed:
+            self._transitions = [t for t in self._transitions if not self._is_completed(t.step_name)]
+
+    @property
+    def stream(self) -> RedisChannelStream:
+        if self._stream is None:
+            self._stream = RedisChannelStream.from_deployment_id(self.phase.deployment.id)
+        return self._stream
+
+    def _is_completed(self, step_name: str) -> bool:
+        return self._steps[step_name].is_completed
+
+
+def update_step_by_line(line: str, pattern_maps: Dict, phase: "DeployPhase"):
+    """Try to find a match for the given log line in the given pattern maps. If a
+    match is found, update the step status and write to stream.
+
+    NOTE: The steps are loaded for each call, use `StepTransitionTracker` to process multiple lines.
+
+    :param line: The log line to match.
+    :param patterns_maps: The pattern maps to match against.
+    :param phase: The deployment phase.
+    """
+    StepTransitionTracker(phase, pattern_maps).feed(line)
@@ -17,7 +17,7 @@
 import abc
 import json
 import sys
-from typing import Optional, Protocol
+from typing import Callable, Optional, Protocol
 
 from blue_krill.data_types.enum import StrStructuredEnum
 from blue_krill.redis_tools.messaging import StreamChannel
@@ -186,15 +186,25 @@ class RedisWithModelStream(RedisChannelStream):
 
     :param model: A model which has output_stream field
     :param steam_channel: A redis channel stream
+    :param on_message: An optional callback which receives every message written, such as
+        matching the failure patterns while the deployment is running
     """
 
-    def __init__(self, model: MessageWriter, stream_channel: StreamChannel):
+    def __init__(
+        self,
+        model: MessageWriter,
+        stream_channel: StreamChannel,
+        on_message: Optional[Callable[[str], None]] = None,
+    ):
         self.model_stream = ModelStream(model)
+        self.on_message = on_message
         super().__init__(stream_channel)
 
     def write_message(self, message, stream="STDOUT"):
         self.model_stream.write_message(message, stream)
         super().write_message(message, stream)
+        if self.on_message:
+            self.on_message(sanitize_message(message))
 
 
 def get_default_stream(deployment: Deployment) -> RedisChannelStream:
@@ -15,13 +15,14 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
-from typing import TYPE_CHECKING
+import hashlib
+from typing import TYPE_CHECKING, Optional
 
 from django.db.models import ObjectDoesNotExist
 from django.utils.translation import gettext_lazy as _
 
 from paasng.accessories.publish.market.models import Product
-from paasng.core.core.protections.base import BaseCondition, BaseConditionChecker
+from paasng.core.core.protections.base import BaseCondition, ConcurrentConditionChecker
 from paasng.core.core.protections.exceptions import ConditionNotMatched
 from paasng.infras.iam.helpers import fetch_user_roles
 from paasng.platform.applications.constants import AppEnvironment
@@ -29,6 +30,7 @@ from paasng.platform.bkapp_model.models import ModuleProcessSpec
 from paasng.platform.engine.constants import DeployConditions, RuntimeType
 from paasng.platform.environments.constants import EnvRoleOperation
 from paasng.platform.environments.exceptions import RoleNotAllowError
+from paasng.platform.environments.models import EnvRoleProtection
 from paasng.platform.environments.utils import env_role_protection_check
 from paasng.platform.modules.specs import ModuleSpecs
 from paasng.platform.sourcectl.exceptions import (
@@ -55,6 +57,22 @@ class DeployCondition(BaseCondition):
         self.user = user
         self.env = env
 
+    def get_cache_key(self) -> Optional[str]:
+        version = self.get_cache_version()
+        if version is None:
+            return None
+        digest = hashlib.sha256(f"{self.user.pk}:{self.env.pk}:{version}".encode()).hexdigest()
+        return f"deploy_condition:{type(self).__name__}:{digest}"
+
+    def get_cache_version(self) -> Optional[str]:
+        """The version of the models which the condition relies on, a matched result is cached
+        only if the version is not None, and it expires once the version changed.
+        """
+        return None
+
+    def __str__(self):
+        return f"{type(self).__name__}<{self.env}>"
+
 
 class ProductInfoCondition(DeployCondition):
     """检查是否已经完善应用信息"""
@@ -68,9 +86,39 @@ class ProductInfoCondition(DeployCondition):
             raise ConditionNotMatched(_("未完善应用市场信息"), self.action_name)
 
 
+class EnvProtectionCondition(DeployCondition):
+    """检查该用户是否有该模块环境的部署权限"""
+
+    action_name = DeployConditions.CHECK_ENV_PROTECTION.value
+    timeout = 10
+    # 权限检查的结果不缓存，回收的角色需要立即生效
+
+    def validate(self):
+        # 未开启任何保护时无需查询用户角色
+        if not self._get_allowed_roles():
+            return
+
+        roles = fetch_user_roles(self.env.application.code, get_username_by_bkpaas_user_id(self.user.pk))
+        try:
+            env_role_protection_check(operation=EnvRoleOperation.DEPLOY.value, env=self.env, roles=roles)
+        except RoleNotAllowError as e:
+            message = _("当前用户无部署该环境的权限, 请联系应用管理员")
+            raise ConditionNotMatched(message, self.action_name) from e
+
+    def _get_allowed_roles(self) -> list:
+        return list(
+            EnvRoleProtection.objects.filter(operation=EnvRoleOperation.DEPLOY.value, module_env=self.env).values_list(
+                "allowed_role", flat=True
+            )
+        )
+
+
 class RepoAccessCondition(DeployCondition):
     """检查用户是否有该模块的源码仓库的访问权限"""
 
+    timeout = 15
+    cache_ttl = 60
+
     def validate(self):
         try:
             # TODO: We should also check the return value.
@@ -98,19 +146,15 @@ class RepoAccessCondition(DeployCondition):
             action = DeployConditions.NEED_TO_CORRECT_REPO_INFO.value
             raise ConditionNotMatched(message, action) from e
 
+    def get_cache_version(self) -> Optional[str]:
+        # The OAuth tokens of the user are not versioned, a change takes effect after the cache expired
+        module = self.env.module
+        return f"{module.source_origin}:{module.source_type}:{module.source_repo_id}:{module.updated.isoformat()}"
 
-class EnvProtectionCondition(DeployCondition):
-    """检查该用户是否有该模块环境的部署权限"""
-
-    action_name = DeployConditions.CHECK_ENV_PROTECTION.value
-
-    def validate(self):
-        roles = fetch_user_roles(self.env.application.code, get_username_by_bkpaas_user_id(self.user.pk))
-        try:
-            env_role_protection_check(operation=EnvRoleOperation.DEPLOY.value, env=self.env, roles=roles)
-        except RoleNotAllowError as e:
-            message = _("当前用户无部署该环境的权限, 请联系应用管理员")
-            raise ConditionNotMatched(message, self.action_name) from e
+    def make_timeout_error(self) -> ConditionNotMatched:
+        return ConditionNotMatched(
+            _("获取源码仓库信息超时，请稍后重试"), DeployConditions.NEED_TO_CORRECT_REPO_INFO.value
+        )
 
 
 class ProcfileCondition(DeployCondition):
@@ -167,8 +211,10 @@ class ApplicationExtraInfoCondition(DeployCondition):
             raise ConditionNotMatched(_("未完善应用基本信息"), self.action_name)
 
 
-class ModuleEnvDeployInspector(BaseConditionChecker):
-    """Prepare to deploy a ModuleEnvironment"""
+class ModuleEnvDeployInspector(ConcurrentConditionChecker):
+    """Prepare to deploy a ModuleEnvironment, the conditions which rely on remote services
+    (IAM, VCS) are evaluated concurrently.
+    """
 
     condition_classes = [
         ProductInfoCondition,
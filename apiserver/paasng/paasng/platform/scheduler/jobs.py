@@ -30,22 +30,26 @@ from paasng.accessories.servicehub.models import (
     ServiceBindingPolicy,
     ServiceBindingPrecedencePolicy,
 )
-from paasng.accessories.servicehub.remote.collector import fetch_all_remote_services
-from paasng.accessories.servicehub.remote.store import get_remote_store
+from paasng.accessories.servicehub.remote.collector import get_remote_services_refresher
 from paasng.core.core.storages.redisdb import get_default_redis
 from paasng.core.tenant.user import get_init_tenant_id
+from paasng.platform.applications.tasks import cal_app_resource_quotas
 
 logger = logging.getLogger(__name__)
 scheduler = Scheduler()
 
 
-@scheduler.scheduled_job("interval", minutes=settings.REMOTE_SERVICES_UPDATE_INTERVAL_MINUTES)
+@scheduler.scheduled_job("interval", seconds=settings.REMOTE_SERVICES_REFRESH_INTERVAL_SECONDS)
 def update_remote_services():
-    """Update remote services periodically"""
-    remote_store = get_remote_store()
+    """Update remote services periodically, only the changed services are updated"""
     logger.debug("Start updating remote services...")
-    for ret in fetch_all_remote_services():
-        remote_store.bulk_upsert(ret.data, meta_info=ret.meta_info, source_config=ret.config)
+    get_remote_services_refresher().refresh()
+
+
+@scheduler.scheduled_job("interval", minutes=settings.APP_RESOURCE_QUOTAS_RECONCILE_INTERVAL_MINUTES)
+def reconcile_app_resource_quotas():
+    """Reconcile the resource quotas ledger periodically, fix the drifts of incremental updates"""
+    cal_app_resource_quotas.delay()
 
 
 @contextmanager
@@ -176,6 +176,9 @@ class BareGitRepoController(BaseGitRepoController):
         """
         raise NotImplementedError
 
+    def list_file_hashes(self, version_info: VersionInfo) -> Dict[str, str]:
+        raise NotImplementedError
+
     def read_file(self, file_path, version_info: VersionInfo) -> bytes:
         """读取目标文件"""
         with generate_temp_dir() as temp_dir:
@@ -139,6 +139,10 @@ class SvnRepoController:
         """
         raise NotImplementedError
 
+    def list_file_hashes(self, version_info: VersionInfo) -> Dict[str, str]:
+        """bk_svn 不支持该功能"""
+        raise NotImplementedError
+
     def read_file(self, file_path: str, version_info: VersionInfo) -> bytes:
         """从当前仓库指定版本(version_info)的代码中读取指定文件(file_path) 的内容"""
         target_branch, revision = self.extract_version_info(version_info)
@@ -176,6 +176,12 @@ class GiteeRepoController(BaseGitRepoController):
             git_client.commit(dest_dir, message=commit_message, envs=envs)
             git_client.push(dest_dir, envs=envs)
 
+    def list_file_hashes(self, version_info: VersionInfo) -> Dict[str, str]:
+        """一次性列举指定分支（version_info）中所有文件的 git blob sha1"""
+        target_branch, _revision = self.extract_version_info(version_info)
+        tree = self.api_client.repo_list_tree(self.project, ref=target_branch)
+        return {item["path"]: item["sha"] for item in tree if item["type"] == "blob"}
+
     def read_file(self, file_path: str, version_info: VersionInfo) -> bytes:
         """从当前仓库指定版本（version_info）的代码中读取指定文件（file_path）的内容"""
         target_branch, revision = self.extract_version_info(version_info)
@@ -218,6 +218,13 @@ class GitlabRepoController(BaseGitRepoController):
         """
         raise NotImplementedError
 
+    @error_converter
+    def list_file_hashes(self, version_info: VersionInfo) -> Dict[str, str]:
+        """一次性列举指定分支(version_info)中所有文件的 git blob sha1"""
+        tag_or_branch, _revision = self.extract_version_info(version_info)
+        tree = self.api_client.repo_list_tree(self.project, ref=tag_or_branch)
+        return {item["path"]: item["id"] for item in tree if item["type"] == "blob"}
+
     @error_converter
     def read_file(self, file_path: str, version_info: VersionInfo) -> bytes:
         """从当前仓库指定版本(version_info)的代码中读取指定文件(file_path) 的内容"""
@@ -73,6 +73,13 @@ class GitHubApiClient(BaseGitApiClient):
 
         return base64.b64decode(resp["content"])
 
+    def repo_list_tree(self, project: GitProject, ref: str = DEFAULT_REPO_REF) -> List[Dict]:
+        """递归获取指定版本的全部文件树
+        https://docs.github.com/en/rest/git/trees#get-a-tree
+        """
+        url = urljoin(self.api_url, f"repos/{project.path_with_namespace}/git/trees/{ref}")
+        return self._request_with_retry(url, params={"recursive": 1})["tree"]
+
     def repo_list_branches(self, project: GitProject, **kwargs) -> List[Dict]:
         """获取指定仓库所有的 branch
         https://docs.github.com/en/rest/branches/branches#list-branches
@@ -68,6 +68,16 @@ class GitLabApiClient:
             raise ReadFileNotFoundError(f"file: {file_path} not found")
         return base64.b64decode(file.attributes["content"])
 
+    def repo_list_tree(self, project: GitProject, ref="master") -> List[dict]:
+        """
+        递归获取指定版本的全部文件树
+        :param project: 项目对象
+        :param ref: branch 或 commit 的 hash 值
+        :return: 包含文件信息字典的列表，其中 id 为 blob sha1，具体内容看 gitlab 文档
+        """
+        project_obj = self.gl.projects.get(project.path_with_namespace)
+        return project_obj.repository_tree(ref=ref, recursive=True, all=True)
+
     def repo_list_branches(self, project: GitProject, **kwargs) -> List[dict]:
         """
         获取仓库的所有 branches
@@ -133,6 +133,12 @@ class RepoController(Protocol):
         :param commit_email: 提交人邮箱，不传则使用平台的默认值
         """
 
+    def list_file_hashes(self, version_info: VersionInfo) -> Dict[str, str]:
+        """一次性列举指定版本(version_info)中所有文件的 git blob sha1，用于判断文件内容是否有变化
+
+        :return: {文件路径: blob sha1}
+        """
+
     @abc.abstractmethod
     def read_file(self, file_path: str, version_info: VersionInfo) -> bytes:
         """从当前仓库指定版本(version_info)的代码中读取指定文件(file_path) 的内容
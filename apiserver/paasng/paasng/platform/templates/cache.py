@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+"""Node-local cache of the downloaded template source.
+
+Downloading a template (from the blob store, or exporting it from the VCS for plugin templates)
+and uncompressing it is repeated on every module creation. The cache keeps a pristine copy of the
+template source on local disk, keyed by the template name and a fingerprint of where the source
+comes from, each render works on a private copy which is linked from the pristine one.
+
+Layout of the cache directory::
+
+    <root>/entries/<key>/tree     the pristine source tree
+    <root>/entries/<key>/size     total bytes of the tree, its mtime is the last access time
+    <root>/locks/<key>.lock       the per-key lock, shared between processes of the node
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Iterator, List, Tuple
+
+from django.conf import settings
+
+from paasng.misc.metrics import TEMPLATE_SOURCE_CACHE_COUNTER
+from paasng.platform.templates.constants import TemplateType
+from paasng.platform.templates.models import Template
+
+logger = logging.getLogger(__name__)
+
+_UNSAFE_KEY_CHARS = re.compile(r"[^\w.-]")
+
+# A function which downloads the template source to a new local directory
+FetchFunc = Callable[[], Path]
+
+
+@dataclass
+class TemplateCacheStats:
+    """The statistics of the cache in current process"""
+
+    hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TemplateSourceCache:
+    """A size-bounded cache of template source on local disk.
+
+    :param root: The directory of the cache.
+    :param max_bytes: The maximum total size of cached trees, the least recently used ones are
+        evicted when exceeded. 0 disables the cache.
+    :param vcs_ttl: The seconds a tree exported from the VCS is considered fresh.
+    :param clock: The wall clock, customizable for testing.
+    """
+
+    def __init__(self, root: Path, max_bytes: int, vcs_ttl: int, clock: Callable[[], float] = time.time):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.vcs_ttl = vcs_ttl
+        self.clock = clock
+
+        self._stats_lock = threading.Lock()
+        self._stats = TemplateCacheStats()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def get_key(self, template: Template) -> str:
+        """Get the cache key of the template, the key changes once the source is changed."""
+        if template.type == TemplateType.PLUGIN:
+            # Plugin templates are exported from the default branch of the repository, whose revision
+            # can not be resolved without remote calls, so the tree expires periodically instead.
+            epoch = int(self.clock() // max(self.vcs_ttl, 1))
+            parts = [template.repo_type, template.repo_url, template.source_dir, str(epoch)]
+        else:
+            parts = [json.dumps(template.blob_url, sort_keys=True)]
+        parts.append(template.updated.isoformat() if template.updated else "")
+
+        fingerprint = hashlib.sha256("\0".join(parts).encode()).hexdigest()[:16]
+        return f"{_UNSAFE_KEY_CHARS.sub('_', template.name)}-{fingerprint}"
+
+    @contextmanager
+    def checkout(self, template: Template, fetch: FetchFunc) -> Iterator[Path]:
+        """Get a private copy of the template source, the copy is removed on exit.
+
+        The files of the copy may be hard links of the pristine ones, they must not be modified in place.
+        """
+        if not self.enabled:
+            source_path = fetch()
+            try:
+                yield source_path
+            finally:
+                _remove_path(source_path)
+            return
+
+        key = self.get_key(template)
+        work_dir = Path(tempfile.mkdtemp())
+        try:
+            # Most renders hit the cache, they only need to hold the shared lock while linking
+            with self._lock(key, exclusive=False):
+                hit = self._touch(key)
+                if hit:
+                    self._record(template, hit=True)
+                    _link_tree(self._tree_path(key), work_dir)
+            if not hit:
+                with self._lock(key, exclusive=True):
+                    self._ensure(key, template, fetch)
+                    _link_tree(self._tree_path(key), work_dir)
+            yield work_dir
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def warm_up(self, template: Template, fetch: FetchFunc) -> bool:
+        """Make sure the source of the template is cached.
+
+        :return: Whether the source has already been cached.
+        """
+        key = self.get_key(template)
+        with self._lock(key, exclusive=True):
+            return self._ensure(key, template, fetch)
+
+    def stats(self) -> TemplateCacheStats:
+        with self._stats_lock:
+            return TemplateCacheStats(hits=self._stats.hits, misses=self._stats.misses)
+
+    def list_entries(self) -> List[Tuple[str, int, float]]:
+        """List the cached entries, each item is a tuple of (key, size, last accessed time)."""
+        entries_dir = self.root / "entries"
+        if not entries_dir.exists():
+            return []
+
+        results = []
+        for entry in entries_dir.iterdir():
+            size_file = entry / "size"
+            try:
+                results.append((entry.name, int(size_file.read_text()), size_file.stat().st_mtime))
+            except (OSError, ValueError):
+                # The entry is being installed or evicted
+                continue
+        return results
+
+    def _ensure(self, key: str, template: Template, fetch: FetchFunc) -> bool:
+        """Make sure the entry exists, the caller must hold the exclusive lock of the key."""
+        if self._touch(key):
+            self._record(template, hit=True)
+            return True
+
+        self._record(template, hit=False)
+        self._install(key, fetch)
+        self._evict(keep=key)
+        return False
+
+    def _touch(self, key: str) -> bool:
+        """Mark the entry as recently used, return False if it does not exist"""
+        try:
+            os.utime(self.root / "entries" / key / "size")
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _install(self, key: str, fetch: FetchFunc):
+        entry_dir = self.root / "entries" / key
+        # The entry might be left half-installed by a crashed process
+        shutil.rmtree(entry_dir, ignore_errors=True)
+
+        source_path = fetch()
+        try:
+            staging_dir = self.root / "staging" / f"{key}-{os.getpid()}-{threading.get_ident()}"
+            staging_dir.parent.mkdir(parents=True, exist_ok=True)
+            shutil.rmtree(staging_dir, ignore_errors=True)
+            shutil.move(str(source_path), str(staging_dir))
+
+            entry_dir.mkdir(parents=True)
+            os.rename(staging_dir, entry_dir / "tree")
+        finally:
+            _remove_path(source_path)
+
+        # Write the size file at last, an entry without it is considered missing
+        (entry_dir / "size").write_text(str(_get_tree_size(entry_dir / "tree")))
+
+    def _evict(self, keep: str):
+        entries = self.list_entries()
+        total = sum(size for _, size, _ in entries)
+        for key, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+
+            try:
+                with self._lock(key, exclusive=True, blocking=False):
+                    shutil.rmtree(self.root / "entries" / key, ignore_errors=True)
+            except BlockingIOError:
+                # The entry is being used by others
+                continue
+            total -= size
+            logger.info("template source cache %s is evicted, size: %s", key, size)
+
+    def _record(self, template: Template, hit: bool):
+        with self._stats_lock:
+            if hit:
+                self._stats.hits += 1
+            else:
+                self._stats.misses += 1
+        TEMPLATE_SOURCE_CACHE_COUNTER.labels(template=template.name, result="hit" if hit else "miss").inc()
+
+    def _tree_path(self, key: str) -> Path:
+        return self.root / "entries" / key / "tree"
+
+    @contextmanager
+    def _lock(self, key: str, exclusive: bool, blocking: bool = True) -> Iterator[None]:
+        """Acquire the lock of the key, the lock works across both threads and processes."""
+        lock_path = self.root / "locks" / f"{key}.lock"
+        lock_path.parent.mkdir(parents=True, exist_ok=True)
+
+        operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+        with open(lock_path, "a") as fp:
+            fcntl.flock(fp, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(fp, fcntl.LOCK_UN)
+
+
+@lru_cache(maxsize=None)
+def _make_cache(root: str, max_bytes: int, vcs_ttl: int) -> TemplateSourceCache:
+    return TemplateSourceCache(Path(root), max_bytes=max_bytes, vcs_ttl=vcs_ttl)
+
+
+def get_template_source_cache() -> TemplateSourceCache:
+    """Get the template source cache of current process"""
+    return _make_cache(
+        settings.TEMPLATE_SOURCE_CACHE_DIR,
+        settings.TEMPLATE_SOURCE_CACHE_MAX_BYTES,
+        settings.TEMPLATE_SOURCE_CACHE_VCS_TTL,
+    )
+
+
+def _link_tree(src: Path, dst: Path):
+    """Copy the tree, files are hard linked when supported"""
+    shutil.copytree(src, dst, symlinks=True, copy_function=_link_or_copy, dirs_exist_ok=True)
+
+
+def _link_or_copy(src: str, dst: str):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _get_tree_size(path: Path) -> int:
+    size = 0
+    for root, _, files in os.walk(path):
+        for filename in files:
+            size += os.lstat(os.path.join(root, filename)).st_size
+    return size
+
+
+def _remove_path(path: Path):
+    if not path.exists():
+        return
+    if path.is_file():
+        path.unlink()
+    else:
+        shutil.rmtree(path)
@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+"""预热节点本地的模板代码缓存，通常在节点启动后执行"""
+
+from django.core.management.base import BaseCommand
+
+from paasng.platform.templates.cache import get_template_source_cache
+from paasng.platform.templates.models import Template
+from paasng.platform.templates.templater import TemplateRenderer
+
+
+class Command(BaseCommand):
+    help = "预热节点本地的模板代码缓存"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--name", dest="names", action="append", help="模板名称，可指定多个，默认预热所有模板")
+        parser.add_argument("--include-hidden", dest="include_hidden", action="store_true", help="同时预热隐藏的模板")
+
+    def handle(self, names, include_hidden, *args, **options):
+        cache = get_template_source_cache()
+        if not cache.enabled:
+            self.stderr.write(self.style.WARNING("模板代码缓存未启用（TEMPLATE_SOURCE_CACHE_MAX_BYTES 为 0）"))
+            return
+
+        templates = Template.objects.all()
+        if names:
+            templates = templates.filter(name__in=names)
+        if not include_hidden:
+            templates = templates.filter(is_hidden=False)
+
+        failed_count = 0
+        for template in templates.order_by("name"):
+            renderer = TemplateRenderer(template.name, context={})
+            try:
+                cached = cache.warm_up(template, renderer.download_source)
+            except Exception as e:  # noqa: BLE001
+                failed_count += 1
+                self.stdout.write(self.style.ERROR(f"模板 {template.name} 预热失败: {e}"))
+                continue
+            self.stdout.write(f"模板 {template.name} {'已在缓存中' if cached else '已缓存'}")
+
+        entries = cache.list_entries()
+        self.stdout.write(
+            f"\n预热完成: 失败 {failed_count} 个，缓存中共 {len(entries)} 项，"
+            f"占用 {sum(size for _, size, _ in entries)} 字节，命中率 {cache.stats().hit_rate:.2%}"
+        )
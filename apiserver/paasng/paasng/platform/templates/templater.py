@@ -29,6 +29,7 @@ from django.core.exceptions import ObjectDoesNotExist
 
 from paasng.platform.sourcectl.source_types import get_sourcectl_type
 from paasng.platform.sourcectl.utils import compress_directory, generate_temp_dir, generate_temp_file
+from paasng.platform.templates.cache import get_template_source_cache
 from paasng.platform.templates.command import EnhancedTemplateCommand
 from paasng.platform.templates.constants import RenderMethod, TemplateType
 from paasng.platform.templates.exceptions import TmplNotExists
@@ -147,28 +148,23 @@ class TemplateRenderer:
                     processes=self.template.processes
                 )
 
+    def download_source(self) -> Path:
+        """下载模板代码到本地的临时目录"""
+        # 插件模板的代码存放在代码仓库中
+        if self.template.type == TemplateType.PLUGIN:
+            return self.download_from_vcs_repository()
+        # 模板代码默认存放在对象存储中
+        return self.download_from_blob_storage()
+
     def write_to_dir(self, target_path: Path):
         """下载模板并将渲染后写入目标目录，包含以下步骤：
-        - 下载模板代码到本地
+        - 下载模板代码到本地（优先使用节点本地的模板缓存）
         - 将模板中的变量用 context 渲染
 
         :param target_path: 模板代码写入的路径，是已存在的空目录
         """
-        try:
-            # 插件模板的代码存放在代码仓库中
-            if self.template.type == TemplateType.PLUGIN:
-                source_path = self.download_from_vcs_repository()
-            else:
-                # 模板代码默认存放在对象存储中
-                source_path = self.download_from_blob_storage()
-
+        with get_template_source_cache().checkout(self.template, self.download_source) as source_path:
             self.render_template(source_path, target_path)
-        finally:
-            if "source_path" in locals() and source_path.exists():
-                if source_path.is_file():
-                    source_path.unlink()
-                else:
-                    shutil.rmtree(source_path)
 
 
 def generate_initial_code(template_name: str, context: dict) -> Path:
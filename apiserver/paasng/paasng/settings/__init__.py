@@ -779,6 +779,11 @@ HEALTHZ_PROBES = settings.get(
     ],
 )
 
+# 探针的默认执行间隔（秒），探针在后台定期执行，healthz 接口返回最近一次的诊断结果
+HEALTHZ_PROBE_INTERVAL = settings.get("HEALTHZ_PROBE_INTERVAL", default=30, cast="@int")
+# 探针的默认超时时间（秒），超时的探针将被视为致命问题
+HEALTHZ_PROBE_TIMEOUT = settings.get("HEALTHZ_PROBE_TIMEOUT", default=10, cast="@int")
+
 # 蓝鲸的组件 API 的 Healthz 地址
 COMPONENT_SYSTEM_HEALTHZ_URL = settings.get("COMPONENT_SYSTEM_HEALTHZ_URL", "http://localhost:8080")
 # API 网关的 Healthz 地址
@@ -1088,6 +1093,15 @@ BLOBSTORE_BUCKET_TEMPLATES = settings.get("BLOBSTORE_BUCKET_TEMPLATES", "bkpaas3
 # Bucket 名称：存储源码包
 BLOBSTORE_BUCKET_AP_PACKAGES = settings.get("BLOBSTORE_BUCKET_AP_PACKAGES", "bkpaas3-source-packages")
 
+# 节点本地的模板代码缓存：缓存目录、最大占用空间（字节，0 表示不缓存）、代码仓库中模板的缓存有效期（秒）
+TEMPLATE_SOURCE_CACHE_DIR = settings.get("TEMPLATE_SOURCE_CACHE_DIR", "/tmp/bkpaas_template_cache")
+TEMPLATE_SOURCE_CACHE_MAX_BYTES = settings.get("TEMPLATE_SOURCE_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+TEMPLATE_SOURCE_CACHE_VCS_TTL = settings.get("TEMPLATE_SOURCE_CACHE_VCS_TTL", 600)
+
+# 应用搜索索引：默认为空，不使用索引；memory 为进程内的三元组索引（每个进程首次搜索时会加载全部应用），
+# db 为数据库中的三元组表（多进程共享，启用前需执行 rebuild_app_search_index 命令）
+APPLICATION_SEARCH_INDEX_BACKEND = settings.get("APPLICATION_SEARCH_INDEX_BACKEND", "")
+
 # S-Mart 应用默认增强服务配置信息
 SMART_APP_DEFAULT_SERVICES_CONFIG = settings.get("SMART_APP_DEFAULT_SERVICES_CONFIG", {"mysql": {}})
 
@@ -1142,6 +1156,12 @@ SERVICES_VENDOR_CONFIGS: Dict[str, Dict] = settings.get("SERVICES_VENDOR_CONFIGS
 
 # 后端轮询任务：刷新远程增强服务信息 - 默认轮询间隔
 REMOTE_SERVICES_UPDATE_INTERVAL_MINUTES = 5
+# 增量刷新远程增强服务的间隔（秒），未变更的服务端点仅需一次 304 请求；
+# 不支持 ETag 的服务端点仍按 REMOTE_SERVICES_UPDATE_INTERVAL_MINUTES 拉取
+REMOTE_SERVICES_REFRESH_INTERVAL_SECONDS = settings.get("REMOTE_SERVICES_REFRESH_INTERVAL_SECONDS", 30)
+
+# 后端轮询任务：校正应用资源配额账本的间隔（分钟），账本平时随进程变更增量更新
+APP_RESOURCE_QUOTAS_RECONCILE_INTERVAL_MINUTES = settings.get("APP_RESOURCE_QUOTAS_RECONCILE_INTERVAL_MINUTES", 60)
 
 # 是否禁用定时任务调度器
 DISABLE_PERIODICAL_JOBS = settings.get("DISABLE_PERIODICAL_JOBS", False)
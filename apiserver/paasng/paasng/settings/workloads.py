@@ -128,6 +128,15 @@ AGENT_SANDBOX_VOLUME_CSI_DRIVER = settings.get("AGENT_SANDBOX_VOLUME_CSI_DRIVER"
 # NFS 示例: {"server": "10.0.0.1", "share": "/data"}
 AGENT_SANDBOX_VOLUME_CSI_ATTRIBUTES = settings.get("AGENT_SANDBOX_VOLUME_CSI_ATTRIBUTES", {})
 
+# Agent Sandbox 预热池：为每种 镜像/规格 组合预先启动若干空闲沙箱，创建沙箱时直接领取，跳过调度与启动耗时
+# 仅对未指定 name、env_vars、volume_mounts 的创建请求生效（这些参数在 Pod 启动时即已固化）
+AGENT_SANDBOX_WARM_POOL_ENABLED = settings.get("AGENT_SANDBOX_WARM_POOL_ENABLED", False)
+# 每种规格至少保留的空闲沙箱数量，实际数量会根据领取速率在 [MIN_SIZE, MAX_SIZE] 之间自动调整
+AGENT_SANDBOX_WARM_POOL_MIN_SIZE = settings.get("AGENT_SANDBOX_WARM_POOL_MIN_SIZE", 1)
+AGENT_SANDBOX_WARM_POOL_MAX_SIZE = settings.get("AGENT_SANDBOX_WARM_POOL_MAX_SIZE", 5)
+# 空闲沙箱的最长存活时间（秒），超时未被领取的沙箱由过期清理命令回收
+AGENT_SANDBOX_WARM_POOL_IDLE_TTL_SECONDS = settings.get("AGENT_SANDBOX_WARM_POOL_IDLE_TTL_SECONDS", 60 * 60)
+
 # ---------------
 # 资源命名配置
 # ---------------
@@ -169,6 +178,9 @@ MUL_MODULE_VOLUME_HOST_PATH_APP_LOGGING_DIR = settings.get(
 K8S_DEFAULT_CONNECT_TIMEOUT = 5
 K8S_DEFAULT_READ_TIMEOUT = 60
 
+# 主动探测不健康 apiserver 地址的间隔（秒），探测成功后立即恢复该地址，为 0 时不进行探测
+K8S_UNHEALTHY_ENDPOINT_PROBE_INTERVAL = settings.get("K8S_UNHEALTHY_ENDPOINT_PROBE_INTERVAL", 5)
+
 # 指定 kubectl 使用的 config.yaml 文件路径，容器化交付时由 secret 挂载而来
 KUBE_CONFIG_FILE = settings.get("KUBE_CONFIG_FILE", "/data/kubelet/conf/kubeconfig.yaml")
 
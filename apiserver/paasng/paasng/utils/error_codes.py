@@ -225,6 +225,7 @@ class ErrorCodes:
     CANNOT_CREATE_CLUSTER = ErrorCode(_("无法创建应用集群"))
     CANNOT_UPDATE_CLUSTER = ErrorCode(_("无法更新应用集群"))
     CANNOT_DELETE_CLUSTER = ErrorCode(_("无法删除应用集群"))
+    CANNOT_SYNC_CLUSTER_NODES = ErrorCode(_("无法同步集群节点"))
     # 集群组件
     CANNOT_UPSERT_CLUSTER_COMPONENT = ErrorCode(_("无法更新集群组件"))
     CANNOT_GET_CLUSTER_STATUS = ErrorCode(_("无法获取集群状态"))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import threading
+import weakref
+from functools import partial
+from typing import Callable, ClassVar, Dict, Generic, Optional, Tuple, TypeVar
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+T = TypeVar("T")
+
+
+class VersionedCache(Generic[T]):
+    """进程内缓存由数据库数据构建的对象（如编译结果、索引），通过共享缓存中的版本戳保证多进程间的一致性
+
+    数据发生变更时（一般在 post_save/post_delete 信号中）调用 `bump_version_on_commit`，
+    各进程在获取对象时比对版本戳，不一致则重新构建。
+
+    :param name: 缓存名称，用于生成版本戳的缓存键
+    :param build: 根据 key 构建对象的函数，不区分 key 的缓存可忽略该参数
+    :param version_per_key: 每个 key 是否有独立的版本戳，为 False 时任意变更都会使所有 key 失效
+    """
+
+    _instances: ClassVar["weakref.WeakSet[VersionedCache]"] = weakref.WeakSet()
+
+    def __init__(self, name: str, build: Callable[[str], T], version_per_key: bool = True):
+        self.name = name
+        self.build = build
+        self.version_per_key = version_per_key
+
+        self._lock = threading.Lock()
+        self._values: Dict[str, Tuple[str, T]] = {}
+        self._instances.add(self)
+
+    def get(self, key: str = "") -> T:
+        version = self._get_version(key)
+        cached = self._values.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        # 先读取版本再构建，构建期间若有变更，下次获取时会因版本不一致而重新构建
+        value = self.build(key)
+        with self._lock:
+            self._values[key] = (version, value)
+        return value
+
+    def clear(self, key: Optional[str] = None):
+        """清空当前进程中的对象，未指定 key 时清空全部"""
+        with self._lock:
+            if key is None:
+                self._values.clear()
+            else:
+                self._values.pop(key, None)
+
+    def bump_version(self, key: str = ""):
+        """更新版本戳，使所有进程中的对象失效"""
+        cache.set(self._version_cache_key(key), uuid4().hex, timeout=None)
+        self.clear(key if self.version_per_key else None)
+
+    def bump_version_on_commit(self, key: str = "", using: Optional[str] = None):
+        """立即清空当前进程中的对象，并在事务提交后更新版本戳，避免其他进程使用未提交的数据重新构建"""
+        self.clear(key if self.version_per_key else None)
+        transaction.on_commit(partial(self.bump_version, key), using=using)
+
+    @classmethod
+    def clear_all(cls):
+        """清空当前进程中所有缓存的对象"""
+        for instance in list(cls._instances):
+            instance.clear()
+
+    def _get_version(self, key: str) -> str:
+        cache_key = self._version_cache_key(key)
+        if version := cache.get(cache_key):
+            return version
+
+        cache.add(cache_key, uuid4().hex, timeout=None)
+        return cache.get(cache_key) or ""
+
+    def _version_cache_key(self, key: str) -> str:
+        if not self.version_per_key:
+            return f"versioned_cache:{self.name}:version"
+        return f"versioned_cache:{self.name}:{key}:version"
@@ -40,6 +40,7 @@ from paasng.platform.applications.models import (
     SMartAppExtraInfo,
     UserMarkedApplication,
 )
+from paasng.platform.applications.quotas import ResQuotaLedger
 from paasng.platform.engine.models import EngineApp
 from tests.utils.helpers import override_settings
 
@@ -197,6 +198,38 @@ class TestApplicationListView:
             {"tenant_id": "tenant2", "app_count": 1},
         ]
 
+        # 按内存配额排序不影响统计结果
+        rsp = plat_mgt_api_client.get(url, {"order_by": ["-memory"]})
+        assert rsp.status_code == 200
+        assert rsp.data == [
+            {"tenant_id": "tenant1", "app_count": 3},
+            {"tenant_id": "tenant2", "app_count": 2},
+        ]
+
+    def test_order_by_memory(self, plat_mgt_api_client, prepare_applications):
+        """测试按内存配额排序"""
+        # single-app3 尚未记录到资源配额账本中
+        ledger_codes = ["global-app2", "single-app1", "global-app1", "single-app2"]
+
+        def list_app_codes_by_memory(offset, limit, descending):
+            codes = ledger_codes if descending else ledger_codes[::-1]
+            return codes[offset : offset + limit]
+
+        url = reverse("plat_mgt.applications.list_applications")
+        with mock.patch.object(ResQuotaLedger, "list_app_codes_by_memory", side_effect=list_app_codes_by_memory):
+            rsp = plat_mgt_api_client.get(url, {"order_by": ["-memory"], "type": "default", "limit": 1})
+            assert rsp.data["count"] == 2
+            assert [item["code"] for item in rsp.data["results"]] == ["global-app2"]
+
+            rsp = plat_mgt_api_client.get(url, {"order_by": ["memory"]})
+            assert [item["code"] for item in rsp.data["results"]] == [
+                "single-app2",
+                "global-app1",
+                "single-app1",
+                "global-app2",
+                "single-app3",
+            ]
+
 
 @pytest.mark.django_db(databases=["default", "workloads"])
 class TestApplicationDetailView:
@@ -34,6 +34,7 @@ from paas_wl.infras.cluster.constants import (
 )
 from paas_wl.infras.cluster.entities import Domain, IngressConfig
 from paas_wl.infras.cluster.models import Cluster
+from paas_wl.workloads.networking.egress.cluster_state import NodeLabelResult, NodeLabelStatus
 from paas_wl.workloads.networking.egress.models import RCStateAppBinding, RegionClusterState
 from paasng.core.tenant.user import DEFAULT_TENANT_ID, OP_TYPE_TENANT_ID
 from paasng.platform.applications.constants import AppEnvironment
@@ -737,19 +738,19 @@ class TestSyncClusterNodes:
 
         with (
             patch(
-                "paas_wl.workloads.networking.egress.cluster_state.get_nodes",
+                "paasng.plat_mgt.infras.clusters.views.clusters.get_nodes",
                 return_value=[
                     Node(metadata=Metadata(name=name)) for name in ["127.0.0.11", "127.0.0.12", "127.0.0.13"]
                 ],
-            ),
-            patch(
-                "paasng.plat_mgt.infras.clusters.views.clusters.sync_state_to_nodes",
-                return_value=None,
-            ),
+            ) as self.mocked_get_nodes,
+            patch("paasng.plat_mgt.infras.clusters.views.clusters.sync_state_to_nodes") as self.mocked_sync,
         ):
             yield
 
     def test_sync_cluster_nodes(self, init_system_cluster, plat_mgt_api_client):
+        self.mocked_sync.return_value = [
+            NodeLabelResult(name, NodeLabelStatus.PATCHED) for name in ["127.0.0.11", "127.0.0.12", "127.0.0.13"]
+        ]
         url = reverse(
             "plat_mgt.infras.cluster.sync_nodes",
             kwargs={"cluster_name": init_system_cluster.name},
@@ -757,6 +758,22 @@ class TestSyncClusterNodes:
         resp = plat_mgt_api_client.post(url)
         assert resp.status_code == status.HTTP_204_NO_CONTENT
         assert RegionClusterState.objects.filter(cluster_name=init_system_cluster.name).count() == 2
+        # The nodes are listed only once
+        assert self.mocked_get_nodes.call_count == 1
+        assert self.mocked_sync.call_args.kwargs["nodes"] == self.mocked_get_nodes.return_value
+
+    def test_sync_cluster_nodes_failed(self, init_system_cluster, plat_mgt_api_client):
+        self.mocked_sync.return_value = [
+            NodeLabelResult("127.0.0.11", NodeLabelStatus.PATCHED),
+            NodeLabelResult("127.0.0.12", NodeLabelStatus.FAILED, error="forbidden"),
+        ]
+        url = reverse(
+            "plat_mgt.infras.cluster.sync_nodes",
+            kwargs={"cluster_name": init_system_cluster.name},
+        )
+        resp = plat_mgt_api_client.post(url)
+        assert resp.status_code == status.HTTP_400_BAD_REQUEST
+        assert "127.0.0.12: forbidden" in resp.json()["detail"]
 
 
 class TestClusterNodesState:
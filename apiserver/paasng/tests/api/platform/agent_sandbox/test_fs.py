@@ -58,7 +58,7 @@ class TestAgentSandboxFSViewSet:
         download_file_url = reverse("agent_sandbox.fs.download_file", kwargs={"sandbox_id": sandbox_id})
         download_file_resp = api_client.get(download_file_url, data={"path": file_path})
         assert download_file_resp.status_code == status.HTTP_200_OK
-        assert download_file_resp.content == payload
+        assert b"".join(download_file_resp.streaming_content) == payload
         assert download_file_resp["Content-Disposition"] == 'attachment; filename="hello.txt"'
 
         # Delete the file
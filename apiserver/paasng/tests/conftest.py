@@ -53,6 +53,7 @@ from paasng.infras.sysapi_client.constants import ClientRole
 from paasng.infras.sysapi_client.models import ClientPrivateToken, SysAPIClient
 from paasng.platform.applications.handlers import post_create_application, turn_on_bk_log_feature_for_app
 from paasng.platform.applications.models import Application, ModuleEnvironment
+from paasng.platform.applications.search_index import get_app_search_index
 from paasng.platform.modules.manager import make_app_metadata as make_app_metadata_stub
 from paasng.platform.modules.models.module import Module
 from paasng.platform.sourcectl.models import SourceTypeSpecConfig
@@ -60,6 +61,7 @@ from paasng.platform.sourcectl.source_types import refresh_sourcectl_types
 from paasng.platform.sourcectl.svn.client import LocalClient, RemoteClient, RepoProvider
 from paasng.platform.sourcectl.utils import generate_temp_dir
 from paasng.utils.blobstore import S3Store, make_blob_store
+from paasng.utils.versioned_cache import VersionedCache
 from tests.paasng.platform.engine.setup_utils import create_fake_deployment
 from tests.utils import mock
 from tests.utils.auth import create_user
@@ -102,6 +104,16 @@ def pytest_addoption(parser):
     parser.addoption(
         "--run-e2e-test", dest="run_e2e_test", action="store_true", default=False, help="是否执行 e2e 测试"
     )
+    parser.addoption(
+        "--run-benchmark", dest="run_benchmark", action="store_true", default=False, help="是否执行性能基准测试"
+    )
+
+
+@pytest.fixture(autouse=True)
+def _skip_benchmark(request):
+    """Handle @pytest.mark.benchmark, the timing-based tests are flaky on shared machines, skip them by default"""
+    if request.keywords.get("benchmark") and not request.config.getvalue("run_benchmark"):
+        pytest.skip("run_benchmark is disabled, skip benchmark")
 
 
 @pytest.fixture(autouse=True, scope="session")
@@ -220,6 +232,13 @@ def _skip_bk_audit_add_event():
         yield
 
 
+@pytest.fixture(autouse=True)
+def _clear_process_caches():
+    """The rollback of test transactions does not send signals, clear the per-process caches to avoid stale data"""
+    VersionedCache.clear_all()
+    get_app_search_index().clear()
+
+
 @pytest.fixture(autouse=True)
 def _sqlalchemy_transaction(request):
     """为使用了 sqlalchemy 操作 legacy db 的单元测试提供自动回滚，保证单元测试前后的状态一致"""
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import threading
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+
+from paas_wl.bk_app.applications.constants import ArtifactType
+from paas_wl.bk_app.applications.managers.image_gc import ImageGCCheckpoint, RegistryImageCollector
+from paas_wl.bk_app.applications.models.build import Build
+from paas_wl.infras.cluster.entities import AppImageRegistry
+from paasng.utils.moby_distribution.registry.exceptions import ResourceNotFound
+
+pytestmark = [pytest.mark.django_db(databases=["default", "workloads"]), pytest.mark.usefixtures("_with_wl_apps")]
+
+REGISTRY = AppImageRegistry(
+    host="registry.example.com", skip_tls_verify=False, namespace="bkapps", username="foo", password="bar"
+)
+
+
+class FakeRegistryClient:
+    """A fake registry client, the manifests are stored as {(repo, tag): digest}"""
+
+    api_base_url = "https://registry.example.com"
+
+    def __init__(self, manifests: dict):
+        self.manifests = manifests
+        self.deleted_digests: list[str] = []
+        self._lock = threading.Lock()
+
+    def head(self, url, **kwargs):
+        repo, tag = self._parse(url)
+        if (repo, tag) not in self.manifests:
+            raise ResourceNotFound
+        # A digest of None means the registry does not return the header
+        digest = self.manifests[(repo, tag)]
+        return mock.MagicMock(headers={"Docker-Content-Digest": digest} if digest else {})
+
+    def delete(self, url, **kwargs):
+        repo, digest = self._parse(url)
+        with self._lock:
+            self.deleted_digests.append(digest)
+            for key in [k for k, v in self.manifests.items() if k[0] == repo and v == digest]:
+                self.manifests.pop(key)
+        return mock.MagicMock(ok=True)
+
+    def _parse(self, url: str):
+        repo, reference = url.removeprefix(f"{self.api_base_url}/v2/").split("/manifests/")
+        return repo, reference
+
+
+@pytest.fixture()
+def build_maker(bk_module, bk_stag_env):
+    def _make(tag: str, module_id=None) -> Build:
+        return Build.objects.create(
+            module_id=module_id or bk_module.id,
+            app=bk_stag_env.wl_app,
+            artifact_type=ArtifactType.IMAGE,
+            image=f"registry.example.com/bkapps/foo:{tag}",
+            tenant_id=bk_module.tenant_id,
+        )
+
+    return _make
+
+
+@pytest.fixture()
+def fake_client():
+    client = FakeRegistryClient({})
+    with (
+        mock.patch("paas_wl.bk_app.applications.managers.image_gc.get_image_registry_by_app", return_value=REGISTRY),
+        mock.patch(
+            "paas_wl.bk_app.applications.managers.image_gc.DockerRegistryV2Client.from_api_endpoint",
+            return_value=client,
+        ) as from_api_endpoint,
+    ):
+        client.from_api_endpoint = from_api_endpoint
+        yield client
+
+
+class TestRegistryImageCollector:
+    def test_collect(self, bk_module, build_maker):
+        builds = [build_maker(f"v{i}") for i in range(5)]
+        other_module_build = build_maker("other", module_id="00000000-0000-0000-0000-000000000000")
+
+        candidates = RegistryImageCollector().collect([bk_module.id, other_module_build.module_id], 2)
+        # The latest 2 builds of each module are reserved
+        assert {b.uuid for b in candidates} == {b.uuid for b in builds[:3]}
+
+    def test_run(self, bk_module, build_maker, fake_client):
+        builds = [build_maker(f"v{i}") for i in range(6)]
+        fake_client.manifests = {
+            # v0 and v1 share the same manifest
+            ("bkapps/foo", "v0"): "sha256:a",
+            ("bkapps/foo", "v1"): "sha256:a",
+            # v2 has been removed from the registry
+            ("bkapps/foo", "v3"): "sha256:c",
+            ("bkapps/foo", "v4"): "sha256:d",
+            ("bkapps/foo", "v5"): "sha256:e",
+        }
+
+        res = RegistryImageCollector(max_workers=4).run([bk_module.id], 2)
+
+        assert res.deleted == 4
+        assert res.failed == 0
+        assert sorted(fake_client.deleted_digests) == ["sha256:a", "sha256:c"]
+        assert fake_client.from_api_endpoint.call_count == 1
+        remaining = Build.objects.filter(module_id=bk_module.id, artifact_deleted=False)
+        assert {b.uuid for b in remaining} == {b.uuid for b in builds[4:]}
+
+    def test_failed_deletion(self, bk_module, build_maker, fake_client):
+        for i in range(3):
+            build_maker(f"v{i}")
+        fake_client.manifests = {("bkapps/foo", "v0"): "sha256:a", ("bkapps/foo", "v1"): "sha256:b"}
+
+        with mock.patch.object(fake_client, "delete", side_effect=RuntimeError("boom")):
+            res = RegistryImageCollector().run([bk_module.id], 1)
+
+        assert res == (0, 2)
+        assert Build.objects.filter(module_id=bk_module.id, artifact_deleted=False).count() == 3
+
+    def test_missing_digest(self, bk_module, build_maker, fake_client):
+        for i in range(3):
+            build_maker(f"v{i}")
+        fake_client.manifests = {("bkapps/foo", "v0"): None, ("bkapps/foo", "v1"): "sha256:b"}
+
+        res = RegistryImageCollector().run([bk_module.id], 1)
+
+        # The tag without digest is not regarded as deleted
+        assert res == (1, 1)
+        assert fake_client.deleted_digests == ["sha256:b"]
+        assert Build.objects.filter(module_id=bk_module.id, artifact_deleted=False).count() == 2
+
+    def test_resume_from_checkpoint(self, bk_module, build_maker, fake_client):
+        for i in range(3):
+            build_maker(f"v{i}")
+        checkpoint = ImageGCCheckpoint(key="test:image_gc")
+        checkpoint.add([bk_module.id])
+
+        res = RegistryImageCollector(checkpoint=checkpoint).run([bk_module.id], 1)
+
+        assert res == (0, 0)
+        assert not fake_client.from_api_endpoint.called
+
+        checkpoint.clear()
+        res = RegistryImageCollector(checkpoint=checkpoint).run([bk_module.id], 1)
+        assert res == (2, 0)
+        assert checkpoint.load() == {str(bk_module.id)}
+
+
+class TestImageGCCheckpoint:
+    @pytest.fixture()
+    def checkpoint(self):
+        checkpoint = ImageGCCheckpoint(key="test:image_gc")
+        yield checkpoint
+        checkpoint.clear()
+
+    def test_add(self, checkpoint):
+        checkpoint.add(["a", "b"])
+        checkpoint.add(["b", "c"])
+        checkpoint.add([])
+        assert checkpoint.load() == {"a", "b", "c"}
+
+    def test_add_only_sends_new_members(self, checkpoint):
+        checkpoint.add(["a"])
+        with mock.patch.object(checkpoint.redis, "pipeline") as pipeline:
+            checkpoint.add(["b"])
+        pipeline.return_value.sadd.assert_called_once_with(checkpoint.key, "b")
+
+
+class TestDeleteRedundantImagesCommand:
+    @pytest.fixture()
+    def checkpoint(self):
+        checkpoint = ImageGCCheckpoint()
+        checkpoint.add(["finished-module"])
+        yield checkpoint
+        checkpoint.clear()
+
+    def test_dry_run_keeps_checkpoint(self, bk_module, build_maker, fake_client, checkpoint):
+        for i in range(3):
+            build_maker(f"v{i}")
+
+        call_command(
+            "delete_redundant_images", max_reserved_num=1, dry_run=True, app_codes=[bk_module.application.code]
+        )
+
+        assert checkpoint.load() == {"finished-module"}
+        assert not fake_client.deleted_digests
+
+    def test_run_clears_checkpoint(self, bk_module, build_maker, fake_client, checkpoint):
+        build_maker("v0")
+
+        call_command("delete_redundant_images", max_reserved_num=1, app_codes=[bk_module.application.code])
+
+        assert checkpoint.load() == set()
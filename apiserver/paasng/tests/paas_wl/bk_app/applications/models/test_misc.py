@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import datetime
+import time
+
+import pytest
+from django.core.management import call_command
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from paas_wl.bk_app.applications.log_segments import LogLine, LogSegmentBuffer, decode_segment, encode_segment
+from paas_wl.bk_app.applications.models.misc import OutputStream, OutputStreamLine, OutputStreamSegment
+
+pytestmark = pytest.mark.django_db(databases=["default", "workloads"])
+
+
+@pytest.fixture()
+def output_stream() -> OutputStream:
+    return OutputStream.objects.create()
+
+
+def make_lines(count: int, prefix: str = "line") -> list[str]:
+    return [f"{prefix}-{i}\n" for i in range(count)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestLogSegments:
+    def test_encode_decode(self):
+        lines = [LogLine("STDOUT", "foo\n"), LogLine("STDERR", "中文\n")]
+        assert decode_segment(encode_segment(lines)) == lines
+
+    def test_unknown_codec(self):
+        with pytest.raises(ValueError, match="unsupported"):
+            decode_segment(encode_segment([]), codec="zstd")
+
+    def test_buffer_thresholds(self):
+        flushed: list[list[LogLine]] = []
+        clock = FakeClock()
+        buffer = LogSegmentBuffer(flushed.append, max_lines=3, max_bytes=1024, max_interval=5, clock=clock)
+
+        for i in range(4):
+            buffer.append(LogLine("STDOUT", f"{i}\n"))
+        assert [len(lines) for lines in flushed] == [3]
+
+        # The interval is reached
+        clock.now += 5
+        buffer.append(LogLine("STDOUT", "4\n"))
+        assert [len(lines) for lines in flushed] == [3, 2]
+
+        buffer.append(LogLine("STDOUT", "x" * 1024))
+        assert [len(lines) for lines in flushed] == [3, 2, 1]
+
+        buffer.flush()
+        assert len(flushed) == 3, "empty buffer should not be flushed"
+
+
+class TestOutputStream:
+    def test_write_unbuffered(self, output_stream):
+        output_stream.write("foo")
+        output_stream.write("bar\n", stream="STDERR")
+
+        assert output_stream.segments.count() == 2
+        assert list(output_stream.iter_lines()) == [LogLine("STDOUT", "foo\n"), LogLine("STDERR", "bar\n")]
+
+    def test_write_unbuffered_single_insert(self, output_stream):
+        output_stream.write("foo")
+
+        with CaptureQueriesContext(connections["workloads"]) as ctx:
+            output_stream.write("bar")
+        # The position is remembered, no lock and no query of the last segment
+        assert [q["sql"].split()[0] for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]] == ["INSERT"]
+
+    def test_write_with_other_writer(self, output_stream):
+        other = OutputStream.objects.get(pk=output_stream.pk)
+        output_stream.write("foo")
+        other.write("bar")
+        # The remembered position has been taken by the other writer
+        output_stream.write("baz")
+
+        assert list(output_stream.segments.values_list("seq", "start_offset")) == [(0, 0), (1, 1), (2, 2)]
+        assert [log.line for log in output_stream.iter_lines()] == ["foo\n", "bar\n", "baz\n"]
+
+    def test_write_buffered(self, output_stream):
+        with output_stream.buffered(max_lines=100):
+            for line in make_lines(250):
+                output_stream.write(line)
+            # Lines which have not reached the thresholds are still in the buffer
+            assert output_stream.count_lines() == 200
+
+        assert list(output_stream.segments.values_list("start_offset", "end_offset")) == [
+            (0, 100),
+            (100, 200),
+            (200, 250),
+        ]
+        assert [log.line for log in output_stream.iter_lines()] == make_lines(250)
+
+    @pytest.mark.parametrize(
+        ("start", "end"),
+        [(0, None), (0, 10), (95, 105), (120, 121), (240, None), (250, None), (30, 20)],
+    )
+    def test_iter_lines_range(self, output_stream, start, end):
+        lines = make_lines(250)
+        with output_stream.buffered(max_lines=100):
+            for line in lines:
+                output_stream.write(line)
+
+        assert [log.line for log in output_stream.iter_lines(start, end)] == lines[start:end]
+
+    @pytest.mark.parametrize(("start", "end"), [(0, None), (3, 8), (5, None), (7, 8)])
+    def test_iter_lines_with_legacy(self, output_stream, start, end):
+        legacy_lines = make_lines(5, "legacy")
+        for line in legacy_lines:
+            OutputStreamLine.objects.create(output_stream=output_stream, line=line, stream="STDOUT")
+        with output_stream.buffered():
+            for line in make_lines(5):
+                output_stream.write(line)
+
+        expected = (legacy_lines + make_lines(5))[start:end]
+        with CaptureQueriesContext(connections["workloads"]) as ctx:
+            assert [log.line for log in output_stream.iter_lines(start, end)] == expected
+        assert not any("COUNT(" in q["sql"].upper() for q in ctx.captured_queries)
+        assert output_stream.count_lines() == 10
+
+    def test_get_last_line_created(self, output_stream):
+        assert output_stream.get_last_line_created() is None
+
+        legacy = OutputStreamLine.objects.create(output_stream=output_stream, line="legacy\n", stream="STDOUT")
+        assert output_stream.get_last_line_created() == legacy.created
+
+        output_stream.write("foo")
+        assert output_stream.get_last_line_created() == output_stream.segments.get().created
+
+    def test_drop_lines(self, output_stream):
+        OutputStreamLine.objects.create(output_stream=output_stream, line="legacy\n", stream="STDOUT")
+        with output_stream.buffered(max_lines=10):
+            for line in make_lines(35):
+                output_stream.write(line)
+
+        assert output_stream.drop_lines() == 36
+        assert output_stream.count_lines() == 0
+        assert list(output_stream.iter_lines()) == []
+
+
+class TestArchiveOutputStreamLines:
+    def test_migrate(self, output_stream):
+        created = timezone.now() - datetime.timedelta(days=1)
+        for line in make_lines(12):
+            obj = OutputStreamLine.objects.create(output_stream=output_stream, line=line, stream="STDOUT")
+            OutputStreamLine.objects.filter(pk=obj.pk).update(created=created)
+
+        call_command("archive_outputstream_lines", segment_size=5)
+
+        assert not OutputStreamLine.objects.filter(output_stream=output_stream).exists()
+        assert list(output_stream.segments.values_list("start_offset", "end_offset")) == [(0, 5), (5, 10), (10, 12)]
+        assert [log.line for log in output_stream.iter_lines()] == make_lines(12)
+        assert output_stream.get_last_line_created() == created
+
+        # New lines are appended after the migrated segments
+        output_stream.write("new")
+        assert output_stream.count_lines() == 13
+
+    def test_skip_streams_with_segments(self, output_stream):
+        OutputStreamLine.objects.create(output_stream=output_stream, line="legacy\n", stream="STDOUT")
+        output_stream.write("foo")
+
+        call_command("archive_outputstream_lines")
+
+        assert OutputStreamLine.objects.filter(output_stream=output_stream).count() == 1
+        assert [log.line for log in output_stream.iter_lines()] == ["legacy\n", "foo\n"]
+
+
+@pytest.mark.benchmark
+class TestOutputStreamBenchmark:
+    """Compare the per-line rows with the buffered segments, in queries and time."""
+
+    line_count = 2000
+
+    def test_insert_and_read(self, output_stream):
+        lines = make_lines(self.line_count)
+        legacy_stream = OutputStream.objects.create()
+        conn = connections["workloads"]
+
+        started_at = time.perf_counter()
+        with CaptureQueriesContext(conn) as legacy_insert:
+            for line in lines:
+                OutputStreamLine.objects.create(output_stream=legacy_stream, line=line, stream="STDOUT")
+        legacy_insert_seconds = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        with CaptureQueriesContext(conn) as segment_insert, output_stream.buffered(max_lines=500):
+            for line in lines:
+                output_stream.write(line)
+        segment_insert_seconds = time.perf_counter() - started_at
+
+        assert OutputStreamSegment.objects.filter(output_stream=output_stream).count() == 4
+        assert len(segment_insert) * 50 < len(legacy_insert)
+        assert segment_insert_seconds < legacy_insert_seconds
+
+        # Reading a range only loads the overlapping segment
+        with CaptureQueriesContext(conn) as segment_read:
+            tail = [log.line for log in output_stream.iter_lines(1900, 1950)]
+        assert tail == lines[1900:1950]
+        assert len(segment_read) == 2
+
+        # Reading everything
+        started_at = time.perf_counter()
+        legacy_all = [log.line for log in legacy_stream.iter_lines()]
+        legacy_read_seconds = time.perf_counter() - started_at
+        started_at = time.perf_counter()
+        segment_all = [log.line for log in output_stream.iter_lines()]
+        segment_read_seconds = time.perf_counter() - started_at
+
+        assert legacy_all == segment_all == lines
+        assert segment_read_seconds < legacy_read_seconds * 2
@@ -15,10 +15,19 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
+from unittest import mock
+
 import pytest
 
-from paas_wl.bk_app.cnative.specs.addresses import AddrResourceManager, save_addresses, to_domain, to_shared_tls_domain
+from paas_wl.bk_app.cnative.specs.addresses import (
+    AddrResourceManager,
+    save_addresses,
+    to_domain,
+    to_shared_tls_domain,
+    to_shared_tls_domains,
+)
 from paas_wl.bk_app.cnative.specs.addresses import Domain as MappingDomain
+from paas_wl.workloads.networking.ingress.certs import pick_shared_certs
 from paas_wl.workloads.networking.ingress.constants import AppDomainProtocol, AppDomainSource, AppSubpathSource
 from paas_wl.workloads.networking.ingress.models import AppDomain, AppDomainSharedCert, AppSubpath, Domain
 from paasng.platform.modules.constants import ExposedURLType
@@ -114,6 +123,30 @@ class TestToSharedTLSDomain:
         assert d.tlsSecretName is not None
         assert len(d.tlsSecretName) > 0
 
+    def test_bulk(self, bk_stag_wl_app):
+        AppDomainSharedCert.objects.create(
+            tenant_id=bk_stag_wl_app.tenant_id,
+            name="foo",
+            cert_data="",
+            key_data="",
+            auto_match_cns="*-foo.example.com",
+        )
+        domains = [
+            MappingDomain(host="x-foo.example.com", pathPrefixList=["/"]),
+            MappingDomain(host="bar.example.com", pathPrefixList=["/"]),
+        ]
+
+        with mock.patch(
+            "paas_wl.bk_app.cnative.specs.addresses.pick_shared_certs",
+            wraps=pick_shared_certs,
+        ) as mocked_pick:
+            domains = to_shared_tls_domains(domains, bk_stag_wl_app)
+
+        # The certs of all hosts are picked by one call
+        mocked_pick.assert_called_once_with(bk_stag_wl_app.tenant_id, ["x-foo.example.com", "bar.example.com"])
+        assert domains[0].tlsSecretName
+        assert domains[1].tlsSecretName is None
+
 
 class TestAddrResourceManager:
     def test_integrated(self, bk_module, bk_stag_env, bk_stag_wl_app):
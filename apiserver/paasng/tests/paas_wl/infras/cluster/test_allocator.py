@@ -18,6 +18,7 @@
 import pytest
 from django_dynamic_fixture import G
 
+from paas_wl.infras.cluster.allocator import allocation_policy_cache
 from paas_wl.infras.cluster.constants import (
     ClusterAllocationPolicyCondType,
     ClusterAllocationPolicyType,
@@ -202,6 +203,49 @@ class TestClusterAllocator:
         with pytest.raises(ValueError, match="no cluster found for policy"):
             ClusterAllocator(ctx).get_default()
 
+    @pytest.mark.usefixtures("_rule_based_policy")
+    @pytest.mark.parametrize(
+        ("region", "environment", "username", "usage"),
+        [
+            ("default", AppEnvironment.STAGING, None, None),
+            ("default", AppEnvironment.PRODUCTION, None, None),
+            ("tencent", AppEnvironment.STAGING, None, None),
+            ("blueking", AppEnvironment.PRODUCTION, None, None),
+            ("blueking", AppEnvironment.PRODUCTION, "zhangsan", None),
+            ("default", AppEnvironment.STAGING, None, ClusterUsage.AGENT_SANDBOX),
+            ("default", AppEnvironment.PRODUCTION, None, ClusterUsage.AI_AGENT),
+        ],
+    )
+    def test_compiled_policy_same_as_allocator(self, random_tenant_id, region, environment, username, usage):
+        ctx = AllocationContext(
+            tenant_id=random_tenant_id, region=region, environment=environment, username=username, usage=usage
+        )
+        expected = [c.name for c in ClusterAllocator(ctx).list()]
+
+        assert allocation_policy_cache.get(random_tenant_id).list_names(ctx) == expected
+        assert allocation_policy_cache.get_default_name(ctx) == expected[0]
+
+    def test_compiled_policy_without_policy(self, random_tenant_id):
+        ctx = AllocationContext(tenant_id=random_tenant_id, region="default", environment=AppEnvironment.STAGING)
+
+        with pytest.raises(ValueError, match="got no cluster"):
+            allocation_policy_cache.get_default_name(ctx)
+
+    @pytest.mark.usefixtures("_uniform_policy")
+    def test_compiled_policy_invalidated(self, random_tenant_id):
+        ctx = AllocationContext(tenant_id=random_tenant_id, region="default", environment=AppEnvironment.STAGING)
+        assert allocation_policy_cache.get_default_name(ctx) == "random-sz0"
+
+        policy = ClusterAllocationPolicy.objects.get(tenant_id=random_tenant_id)
+        policy.allocation_policy = AllocationPolicy(env_specific=False, clusters=["random-sz1", "random-sz0"])
+        policy.save()
+        assert allocation_policy_cache.get_default_name(ctx) == "random-sz1"
+
+        # The cluster is no longer available for the tenant
+        Cluster.objects.filter(name="random-sz1").update(tenant_id="tencent")
+        Cluster.objects.get(name="random-sz1").save()
+        assert allocation_policy_cache.get_default_name(ctx) == "random-sz0"
+
 
 class TestAllocationContext:
     def test_from_module_env_with_ai_agent_app(self, bk_app, bk_stag_env):
@@ -258,3 +302,15 @@ class TestEnvClusterService:
         assert ctx.region == bk_app.region
         assert ctx.environment == AppEnvironment.STAGING
         assert ctx.usage is None
+
+    def test_resolve_many(self, bk_app, bk_stag_env, bk_prod_env):
+        cfg = bk_prod_env.wl_app.latest_config
+        cfg.cluster = ""
+        cfg.save()
+
+        cluster_names = EnvClusterService.resolve_many([bk_stag_env, bk_prod_env])
+
+        assert cluster_names == {
+            bk_stag_env.pk: EnvClusterService(bk_stag_env).get_cluster_name(),
+            bk_prod_env.pk: EnvClusterService(bk_prod_env).get_cluster_name(),
+        }
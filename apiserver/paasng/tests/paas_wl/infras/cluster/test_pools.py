@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import pytest
+from blue_krill.connections.ha_endpoint_pool import Endpoint
+from django_dynamic_fixture import G
+
+from paas_wl.infras.cluster.models import APIServer, Cluster
+from paas_wl.infras.cluster.pools import ClusterPoolRegistry, copy_endpoint_health
+
+pytestmark = pytest.mark.django_db(databases=["workloads"])
+
+
+def create_cluster(name: str, hosts: list[str]) -> Cluster:
+    cluster = G(Cluster, name=name, ca_data=None, cert_data=None, key_data=None, token_value=None)
+    for host in hosts:
+        APIServer.objects.create(cluster=cluster, host=host, tenant_id=cluster.tenant_id)
+    return cluster
+
+
+class TestClusterPoolRegistry:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        Cluster.objects.all().delete()
+        create_cluster("foo", ["https://foo-a:6443", "https://foo-b:6443"])
+        create_cluster("bar", ["https://bar-a:6443"])
+
+    def test_get_pools(self):
+        registry = ClusterPoolRegistry()
+        pools = registry.get_pools("v1")
+
+        assert set(pools.keys()) == {"foo", "bar"}
+        assert {ep.raw.host for ep in pools["foo"].endpoints} == {"https://foo-a:6443", "https://foo-b:6443"}
+        # Same version, no refresh
+        assert registry.get_pools("v1") is pools
+
+    def test_only_changed_clusters_rebuilt(self):
+        registry = ClusterPoolRegistry()
+        pools = registry.get_pools("v1")
+        foo_pool, bar_pool = pools["foo"], pools["bar"]
+
+        bar = Cluster.objects.get(name="bar")
+        APIServer.objects.create(cluster=bar, host="https://bar-b:6443", tenant_id=bar.tenant_id)
+        pools = registry.get_pools("v2")
+
+        assert pools["foo"] is foo_pool
+        assert pools["bar"] is not bar_pool
+        assert len(pools["bar"].endpoints) == 2
+
+    def test_deleted_cluster_removed(self):
+        registry = ClusterPoolRegistry()
+        registry.get_pools("v1")
+
+        Cluster.objects.filter(name="bar").delete()
+
+        assert set(registry.get_pools("v2").keys()) == {"foo"}
+
+    def test_health_states_carried_over(self):
+        registry = ClusterPoolRegistry()
+        pool = registry.get_pools("v1")["foo"]
+        pool.elect(next(ep for ep in pool.endpoints if ep.raw.host == "https://foo-a:6443"))
+        for _ in range(3):
+            pool.fail()
+        pool.elect()
+        assert pool.get().host == "https://foo-b:6443"
+
+        Cluster.objects.get(name="foo").save()
+        new_pool = registry.get_pools("v2")["foo"]
+
+        assert new_pool is not pool
+        assert new_pool.get().host == "https://foo-b:6443"
+        unhealthy = next(ep for ep in new_pool.endpoints if ep.raw.host == "https://foo-a:6443")
+        assert unhealthy.is_unhealthy()
+        assert unhealthy.failure_count == 3
+        assert unhealthy.score == next(ep for ep in pool.endpoints if ep.raw.host == "https://foo-a:6443").score
+        # The last-known-good endpoint comes first
+        assert new_pool.endpoints[0].raw.host == "https://foo-b:6443"
+
+    @pytest.mark.parametrize(("available", "expected_unhealthy"), [(True, False), (False, True)])
+    def test_probe_unhealthy(self, available, expected_unhealthy):
+        probed = []
+
+        def probe(cfg):
+            probed.append(cfg.host)
+            return available
+
+        registry = ClusterPoolRegistry(probe=probe)
+        pool = registry.get_pools("v1")["bar"]
+        for _ in range(3):
+            pool.fail()
+
+        registry.probe_unhealthy()
+
+        assert probed == ["https://bar-a:6443"]
+        assert pool.endpoints[0].is_unhealthy() is expected_unhealthy
+
+
+@pytest.mark.parametrize("score", [150, 120, 100, 30, -50])
+def test_copy_endpoint_health(score):
+    src = Endpoint(raw=None)
+    if score < src.score:
+        src.fail(score_delta=src.score - score)
+    else:
+        src.succeed(score_delta=score - src.score)
+    src.success_count, src.failure_count = 7, 3
+    src.set_unhealthy()
+
+    dest = Endpoint(raw=None)
+    copy_endpoint_health(src, dest)
+
+    assert dest.score == score
+    assert (dest.success_count, dest.failure_count) == (7, 3)
+    assert dest.unhealthy_at == src.unhealthy_at
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+from unittest import mock
+
+import pytest
+from kubernetes.dynamic.resource import ResourceInstance
+
+from paas_wl.infras.resources.base.exceptions import ResourceMissing
+from paas_wl.infras.resources.base.kres import PatchType
+from paas_wl.workloads.networking.egress.cluster_state import NodeLabeler, NodeLabelStatus
+
+LABELS = {"eng-cstate-foo-1": "1"}
+
+
+def make_node(name: str, labels: dict) -> ResourceInstance:
+    return ResourceInstance(None, {"metadata": {"name": name, "labels": labels}})
+
+
+@pytest.fixture()
+def knode_patch():
+    with mock.patch("paas_wl.workloads.networking.egress.cluster_state.KNode") as knode_cls:
+        yield knode_cls.return_value.ops_name.patch
+
+
+@pytest.fixture()
+def labeler(knode_patch):
+    return NodeLabeler(mock.MagicMock(), max_workers=4)
+
+
+class TestNodeLabeler:
+    def test_only_patch_nodes_lacking_labels(self, labeler, knode_patch):
+        patch = knode_patch
+        nodes = [
+            make_node("labeled", {"foo": "bar", **LABELS}),
+            make_node("unlabeled", {"foo": "bar"}),
+            make_node("stale", {"eng-cstate-foo-1": "0"}),
+        ]
+
+        results = labeler.sync(["labeled", "unlabeled", "stale", "removed"], LABELS, nodes=nodes)
+
+        assert [(r.name, r.status) for r in results] == [
+            ("labeled", NodeLabelStatus.UNCHANGED),
+            ("unlabeled", NodeLabelStatus.PATCHED),
+            ("stale", NodeLabelStatus.PATCHED),
+            ("removed", NodeLabelStatus.MISSING),
+        ]
+        assert sorted(c.args[0] for c in patch.call_args_list) == ["stale", "unlabeled"]
+        for c in patch.call_args_list:
+            # Only the missing labels are sent, other labels are kept by the strategic merge
+            assert c.args[1] == {"metadata": {"labels": LABELS}}
+            assert c.kwargs["ptype"] == PatchType.STRATEGIC
+
+    def test_patch_failures(self, labeler, knode_patch):
+        patch = knode_patch
+
+        def _patch(name, body, ptype):
+            if name == "gone":
+                raise ResourceMissing(namespace=None, name=name)
+            if name == "broken":
+                raise ValueError("boom")
+
+        patch.side_effect = _patch
+        nodes = [make_node(name, {}) for name in ["ok", "gone", "broken"]]
+
+        results = labeler.sync(["ok", "gone", "broken"], LABELS, nodes=nodes)
+
+        assert [(r.name, r.status) for r in results] == [
+            ("ok", NodeLabelStatus.PATCHED),
+            ("gone", NodeLabelStatus.MISSING),
+            ("broken", NodeLabelStatus.FAILED),
+        ]
+        assert results[2].error == "boom"
+
+    def test_many_nodes(self, labeler, knode_patch):
+        patch = knode_patch
+        names = [f"node-{i}" for i in range(2000)]
+        nodes = [make_node(name, LABELS if i % 2 else {}) for i, name in enumerate(names)]
+
+        results = labeler.sync(names, LABELS, nodes=nodes)
+
+        assert patch.call_count == 1000
+        assert sum(r.status == NodeLabelStatus.UNCHANGED for r in results) == 1000
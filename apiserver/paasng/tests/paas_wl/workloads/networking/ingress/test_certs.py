@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import pytest
+
+from paas_wl.workloads.networking.ingress.certs import SharedCertIndex, pick_shared_cert, pick_shared_certs
+from paas_wl.workloads.networking.ingress.models import AppDomainSharedCert
+
+pytestmark = pytest.mark.django_db(databases=["workloads"])
+
+
+class TestSharedCertIndex:
+    @pytest.mark.parametrize(
+        "cns",
+        ["*.foo.com;bar.com", "*.*.foo.com", "a-*.foo.com;*.bar.*.com", "foo.com;*.foo.com", "*"],
+    )
+    @pytest.mark.parametrize(
+        "hostname",
+        [
+            "bar.com",
+            "baz.foo.com",
+            "foo.com",
+            "foobar.com",
+            "a.b.foo.com",
+            "a-x.foo.com",
+            "a-.foo.com",
+            "x.bar.y.com",
+            "x_y.foo.com",
+            ".foo.com",
+            "localhost",
+        ],
+    )
+    def test_consistent_with_match_hostname(self, cns, hostname):
+        cert = AppDomainSharedCert.objects.create(name="foo", auto_match_cns=cns)
+        index = SharedCertIndex([cert])
+        assert (index.match(hostname) == cert) is cert.match_hostname(hostname)
+
+    def test_smallest_pk_wins(self):
+        certs = [
+            AppDomainSharedCert.objects.create(name="a", auto_match_cns="x-*.foo.com"),
+            AppDomainSharedCert.objects.create(name="b", auto_match_cns="*.foo.com"),
+            AppDomainSharedCert.objects.create(name="c", auto_match_cns="x-1.foo.com;*.bar.com"),
+        ]
+        index = SharedCertIndex(reversed(certs))
+
+        assert index.match("x-1.foo.com") == certs[0]
+        assert index.match("y.foo.com") == certs[1]
+        assert index.match("y.bar.com") == certs[2]
+        assert index.match("bar.com") is None
+
+    def test_match_many(self):
+        cert = AppDomainSharedCert.objects.create(name="foo", auto_match_cns="*.foo.com")
+        hosts = [f"app-{i}.foo.com" for i in range(3000)] + ["foo.com", "app-0.foo.com"]
+
+        results = SharedCertIndex([cert]).match_many(hosts)
+
+        assert len(results) == 3001
+        assert sum(c == cert for c in results.values()) == 3000
+        assert results["foo.com"] is None
+
+
+class TestPickSharedCert:
+    def test_per_tenant(self):
+        cert = AppDomainSharedCert.objects.create(name="foo", tenant_id="t1", auto_match_cns="*.foo.com")
+
+        assert pick_shared_cert("t1", "a.foo.com") == cert
+        assert pick_shared_cert("t2", "a.foo.com") is None
+
+    def test_rebuild_on_change(self):
+        assert pick_shared_cert("t1", "a.foo.com") is None
+
+        cert = AppDomainSharedCert.objects.create(name="foo", tenant_id="t1", auto_match_cns="*.foo.com")
+        assert pick_shared_certs("t1", ["a.foo.com", "a.bar.com"]) == {"a.foo.com": cert, "a.bar.com": None}
+
+        cert.auto_match_cns = "*.bar.com"
+        cert.save()
+        assert pick_shared_certs("t1", ["a.foo.com", "a.bar.com"]) == {"a.foo.com": None, "a.bar.com": cert}
+
+        cert.delete()
+        assert pick_shared_cert("t1", "a.bar.com") is None
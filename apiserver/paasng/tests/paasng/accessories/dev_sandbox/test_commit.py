@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+from unittest import mock
+
+import pytest
+
+from paas_wl.bk_app.dev_sandbox.entities import DevSandboxEnvVarList
+from paasng.accessories.dev_sandbox.commit import DevSandboxCodeCommit
+from paasng.accessories.dev_sandbox.exceptions import DevServerFileApiUnsupported
+from paasng.accessories.dev_sandbox.models import DevSandbox
+from paasng.platform.modules.models import Module
+from paasng.platform.sourcectl.exceptions import CallGitApiFailed
+from paasng.platform.sourcectl.models import VersionInfo
+
+pytestmark = pytest.mark.django_db(databases=["default", "workloads"])
+
+
+FILES = {
+    "app.py": b"print('hello')\n",
+    "big.bin": b"x" * (2 * 1024 * 1024),
+}
+
+
+@pytest.fixture()
+def dev_sandbox(bk_cnative_app, bk_module, bk_user) -> DevSandbox:
+    version_info = VersionInfo(revision="...", version_name="master", version_type="branch")
+    return DevSandbox.objects.create(
+        module=bk_module,
+        owner=bk_user,
+        env_vars=DevSandboxEnvVarList([]),
+        version_info=version_info,
+        enable_code_editor=True,
+        enabled_addons_services=[],
+    )
+
+
+@pytest.fixture()
+def repo_ctrl():
+    ctrl = mock.MagicMock()
+    ctrl.build_url.return_value = "https://git.example.com/foo.git"
+    ctrl.list_file_hashes.return_value = {}
+    with mock.patch("paasng.accessories.dev_sandbox.commit.get_repo_controller", return_value=ctrl):
+        yield ctrl
+
+
+@pytest.fixture()
+def api_client():
+    client = mock.MagicMock()
+    client.iter_diffs.return_value = iter(
+        [
+            {"path": "app.py", "action": "modified", "hash": "a1"},
+            {"path": "big.bin", "action": "added", "hash": "b2"},
+            {"path": "removed.py", "action": "deleted"},
+        ]
+    )
+    client.download_file.side_effect = lambda path, fp: fp.write(FILES[path])
+    with mock.patch("paasng.accessories.dev_sandbox.commit.DevSandboxApiClient", return_value=client):
+        yield client
+
+
+@pytest.fixture()
+def committed(repo_ctrl):
+    files = {}
+
+    def commit_files(commit_info):
+        # The content is only readable before the temporary files are closed
+        files.update({f.path: f.content for f in commit_info.add_files + commit_info.edit_files})
+        files.update({f.path: None for f in commit_info.delete_files})
+
+    repo_ctrl.commit_files.side_effect = commit_files
+    return files
+
+
+@pytest.fixture()
+def commit(bk_module, bk_user, dev_sandbox):
+    with mock.patch.object(Module, "get_source_obj") as get_source_obj:
+        get_source_obj.return_value.get_source_dir.return_value = ""
+        yield lambda: DevSandboxCodeCommit(bk_module, bk_user).commit("foo")
+
+
+INLINE_DIFFS = [
+    {"path": "app.py", "action": "modified", "content": FILES["app.py"].decode()},
+    {"path": "removed.py", "action": "deleted", "content": ""},
+]
+
+
+class TestDevSandboxCodeCommit:
+    def test_commit(self, commit, committed, api_client):
+        repo_url = commit()
+
+        assert repo_url == "https://git.example.com/foo/tree/master"
+        assert committed == {
+            "app.py": FILES["app.py"].decode(),
+            "big.bin": FILES["big.bin"].decode(),
+            "removed.py": None,
+        }
+        assert [c.args[0] for c in api_client.download_file.call_args_list] == ["app.py", "big.bin"]
+        api_client.commit.assert_called_once_with("foo")
+
+    def test_content_returned_inline(self, commit, committed, api_client):
+        # The devserver ignores the content param
+        api_client.iter_diffs.return_value = iter(INLINE_DIFFS)
+
+        commit()
+
+        assert committed == {"app.py": FILES["app.py"].decode(), "removed.py": None}
+        assert not api_client.download_file.called
+
+    @pytest.mark.parametrize(
+        "diffs",
+        [
+            # The hash is missing
+            [{"path": "app.py", "action": "modified"}],
+            # The files API is not found
+            [{"path": "app.py", "action": "modified", "hash": "a1"}],
+        ],
+    )
+    def test_fallback_to_inline_content(self, commit, committed, api_client, diffs):
+        api_client.iter_diffs.side_effect = lambda with_content=False: iter(INLINE_DIFFS if with_content else diffs)
+        api_client.download_file.side_effect = DevServerFileApiUnsupported("404")
+
+        commit()
+
+        assert committed == {"app.py": FILES["app.py"].decode(), "removed.py": None}
+        assert api_client.iter_diffs.call_args_list == [mock.call(), mock.call(with_content=True)]
+
+    def test_skip_unchanged_files(self, commit, committed, repo_ctrl, api_client):
+        # "app.py" is in the target branch with the same content, "big.bin" with a different one
+        repo_ctrl.list_file_hashes.return_value = {"app.py": "a1", "big.bin": "b1"}
+
+        commit()
+
+        assert committed == {"big.bin": FILES["big.bin"].decode(), "removed.py": None}
+        assert [c.args[0] for c in api_client.download_file.call_args_list] == ["big.bin"]
+        # The file hashes are listed by one call instead of once for every file
+        repo_ctrl.list_file_hashes.assert_called_once()
+        assert not repo_ctrl.read_file.called
+
+    def test_all_files_unchanged(self, commit, repo_ctrl, api_client):
+        repo_ctrl.list_file_hashes.return_value = {"app.py": "a1", "big.bin": "b2"}
+        api_client.iter_diffs.return_value = iter(
+            [
+                {"path": "app.py", "action": "modified", "hash": "a1"},
+                {"path": "big.bin", "action": "added", "hash": "b2"},
+            ]
+        )
+
+        commit()
+
+        assert not repo_ctrl.commit_files.called
+        api_client.commit.assert_called_once_with("foo")
+
+    @pytest.mark.parametrize("error", [NotImplementedError, CallGitApiFailed])
+    def test_list_file_hashes_failed(self, commit, committed, repo_ctrl, error):
+        repo_ctrl.list_file_hashes.side_effect = error
+
+        commit()
+
+        assert set(committed) == {"app.py", "big.bin", "removed.py"}
@@ -19,9 +19,11 @@ import logging
 
 import pytest
 from django.conf import settings
+from django.core.management import call_command
 from django_dynamic_fixture import G
 
 from paasng.accessories.publish.market.models import Product
+from paasng.accessories.publish.sync_market.engine import BulkRemoteAppSyncer
 from paasng.accessories.publish.sync_market.handlers import (
     on_change_application_name,
     on_product_deploy_success,
@@ -227,3 +229,30 @@ class TestProduct:
             console_app = AppManger(session).get(bk_app_full.code)
             assert console_app.is_already_online == 1
             assert console_app.open_mode == "new_tab"
+
+    def test_bulk_sync(self, bk_app_full, create_default_tag):
+        product = Product.objects.create_default_product(bk_app_full)
+        on_product_deploy_success(product, "prod")
+
+        product.name_zh_cn = "bulk-synced"
+        product.save(update_fields=["name_zh_cn"])
+        with console_db.session_scope() as session:
+            syncer = BulkRemoteAppSyncer(session, batch_size=10)
+            products = Product.objects.filter(pk=product.pk)
+            assert syncer.sync(products, ["name", "open_mode"]) == 1
+            # Nothing changed
+            assert syncer.sync(products, ["name", "open_mode"]) == 0
+
+        with console_db.session_scope() as session:
+            assert AppManger(session).get(bk_app_full.code).name == "bulk-synced"
+
+    def test_sync_command(self, bk_app_full, create_default_tag):
+        product = Product.objects.create_default_product(bk_app_full)
+        on_product_deploy_success(product, "prod")
+
+        product.name_zh_cn = "synced-by-command"
+        product.save(update_fields=["name_zh_cn"])
+        call_command("sync_products_to_console", app_codes=[bk_app_full.code], batch_size=10)
+
+        with console_db.session_scope() as session:
+            assert AppManger(session).get(bk_app_full.code).name == "synced-by-command"
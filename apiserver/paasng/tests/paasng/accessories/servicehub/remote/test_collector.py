@@ -15,12 +15,17 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
+import time
+from copy import deepcopy
+from typing import Optional
 from unittest import mock
 
 import pytest
+import requests
 from django.core.exceptions import ImproperlyConfigured
 from django.test import override_settings
 
+from paasng.accessories.servicehub.remote import collector
 from paasng.accessories.servicehub.remote.collector import initialize_remote_services
 from tests.paasng.accessories.servicehub import data_mocks
 from tests.utils.api import mock_json_response
@@ -46,3 +51,142 @@ class TestInitialize:
         assert mocked_store.bulk_upsert.call_count == len(service_remote_endpoints)
         assert mocked_get.called
         assert mocked_get.call_args[0][0] == "http://faked-host/services/"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _make_services_response(services, etag: Optional[str] = None):
+    resp = mock_json_response(services)
+    if etag:
+        resp.headers["ETag"] = etag
+    return resp
+
+
+class TestRemoteServicesRefresher:
+    @pytest.fixture()
+    def services(self):
+        return deepcopy(data_mocks.OBJ_STORE_REMOTE_SERVICES_JSON)
+
+    @pytest.fixture()
+    def mocked_get(self, config, services):
+        """Serve the services with ETag "v1", respond 304 if the ETag matches"""
+
+        def get(url, headers=None, **kwargs):
+            if url == config.meta_info_url:
+                return mock_json_response({"version": "1.0.0"})
+            if (headers or {}).get("If-None-Match") == "v1":
+                return mock_json_response({}, status_code=304)
+            return _make_services_response(services, etag="v1")
+
+        with mock.patch("requests.get", side_effect=get) as mocked_get:
+            yield mocked_get
+
+    @pytest.fixture()
+    def mocked_send(self):
+        with mock.patch.object(collector.remote_services_changed, "send") as mocked_send:
+            yield mocked_send
+
+    @pytest.fixture()
+    def refresher(self, raw_store):
+        yield collector.RemoteServicesRefresher(raw_store)
+        raw_store.empty()
+
+    def test_not_modified(self, config, services, refresher, mocked_get, mocked_send):
+        uuids = [svc["uuid"] for svc in services]
+        (result,) = refresher.refresh([config])
+        assert result.created == uuids
+        assert mocked_send.call_args.kwargs["created"] == uuids
+        assert refresher.store.get(uuids[0])["_meta_info"] == {"version": "1.0.0"}
+
+        mocked_send.reset_mock()
+        with mock.patch.object(refresher.store, "bulk_upsert") as bulk_upsert:
+            (result,) = refresher.refresh([config])
+
+        assert result.not_modified
+        assert result.unchanged == uuids
+        assert not bulk_upsert.called
+        assert not mocked_send.called
+        assert mocked_get.call_args.kwargs["headers"] == {"If-None-Match": "v1"}
+
+    def test_apply_diffs(self, config, services, refresher, mocked_get, mocked_send):
+        refresher.refresh([config])
+
+        services[0]["name"] = "renamed"
+        mocked_get.side_effect = lambda url, **kwargs: (
+            mock_json_response({"version": "1.0.0"})
+            if url == config.meta_info_url
+            else _make_services_response(services, etag="v2")
+        )
+        with mock.patch.object(refresher.store, "bulk_upsert") as bulk_upsert:
+            (result,) = refresher.refresh([config])
+
+        assert result.updated == [services[0]["uuid"]]
+        assert result.unchanged == [svc["uuid"] for svc in services[1:]]
+        assert [svc["uuid"] for svc in bulk_upsert.call_args.args[0]] == [services[0]["uuid"]]
+        assert mocked_send.call_args.kwargs["updated"] == [services[0]["uuid"]]
+
+    def test_compare_with_store_after_restarting(self, config, raw_store, refresher, mocked_get, mocked_send):
+        refresher.refresh([config])
+        mocked_send.reset_mock()
+
+        (result,) = collector.RemoteServicesRefresher(raw_store).refresh([config])
+        assert not result.changed
+        assert not mocked_send.called
+
+    def test_full_refresh_interval(self, config, raw_store, mocked_get):
+        clock = FakeClock()
+        refresher = collector.RemoteServicesRefresher(raw_store, full_refresh_interval=60, clock=clock)
+        try:
+            refresher.refresh([config])
+            clock.now += 61
+            (result,) = refresher.refresh([config])
+        finally:
+            raw_store.empty()
+
+        assert not result.not_modified
+        assert not result.changed
+        assert mocked_get.call_args_list[-2].kwargs["headers"] == {}
+
+    def test_fallback_interval_without_etag(self, config, services, raw_store):
+        clock = FakeClock()
+        refresher = collector.RemoteServicesRefresher(raw_store, fallback_interval=300, clock=clock)
+        with mock.patch("requests.get", return_value=_make_services_response(services)) as mocked_get:
+            try:
+                refresher.refresh([config])
+                fetched_count = mocked_get.call_count
+
+                # The endpoint returned no ETag, it is not fetched again until the fallback interval
+                clock.now += 30
+                assert refresher.refresh([config]) == []
+                assert mocked_get.call_count == fetched_count
+
+                clock.now += 300
+                (result,) = refresher.refresh([config])
+            finally:
+                raw_store.empty()
+
+        assert not result.changed
+        assert mocked_get.call_count > fetched_count
+
+    def test_timeout(self, config, services, refresher):
+        slow_config = collector.RemoteSvcConfig.from_json(
+            {**config.to_json(), "name": "slow", "endpoint_url": "http://slow-host"}
+        )
+
+        def get(url, **kwargs):
+            if url.startswith("http://slow-host"):
+                time.sleep(0.5)
+                raise requests.ConnectionError("slow")
+            return _make_services_response(services)
+
+        refresher.timeout = 0.1
+        with mock.patch("requests.get", side_effect=get):
+            results = refresher.refresh([slow_config, config])
+
+        assert [result.config.name for result in results] == [config.name]
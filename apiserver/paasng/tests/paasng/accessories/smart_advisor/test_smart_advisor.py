@@ -16,6 +16,9 @@
 # to the current version of the project delivered to anyone in the future.
 
 import logging
+import random
+import time
+from collections import defaultdict
 from dataclasses import asdict
 from unittest import mock
 
@@ -23,7 +26,7 @@ import pytest
 from django_dynamic_fixture import G
 
 from paasng.accessories.smart_advisor import AppPLTag, AppSDKTag, PlatPanelTag
-from paasng.accessories.smart_advisor.advisor import DocumentaryLinkAdvisor
+from paasng.accessories.smart_advisor.advisor import DocumentaryLinkAdvisor, DocumentaryLinkIndex
 from paasng.accessories.smart_advisor.models import DocumentaryLink
 from paasng.accessories.smart_advisor.utils import DeploymentFailureHint, get_failure_hint
 from tests.paasng.platform.engine.setup_utils import create_fake_deployment
@@ -90,6 +93,93 @@ class TestDocumentaryLinkAdvisor:
         links = advisor.search_by_tags(tags)
         assert list(map(str, links)) == link_names
 
+    def test_index_rebuilt_on_change(self):
+        self.setup_data()
+        advisor = DocumentaryLinkAdvisor()
+        assert list(map(str, advisor.search_by_tags([AppPLTag("nodejs")]))) == []
+
+        G(DocumentaryLink, title_zh_cn="nodejs_tutorial", affinity_tags=["app-pl:nodejs"])
+        assert list(map(str, advisor.search_by_tags([AppPLTag("nodejs")]))) == ["nodejs_tutorial"]
+
+
+def _search_by_scanning(links, tags, limit=5):
+    """The reference implementation, which scores every link"""
+    subject_tags_by_type = defaultdict(set)
+    for tag in tags:
+        subject_tags_by_type[tag.tag_type].add(tag)
+
+    results = []
+    for link in links:
+        score = 0
+        for tag_type in subject_tags_by_type:
+            link_tags = link.get_affinity_tags_by_type(tag_type)
+            if not link_tags:
+                continue
+            common_tags = set(link_tags) & subject_tags_by_type[tag_type]
+            score += 10 * len(common_tags) if common_tags else -100
+        if score > 0:
+            results.append({"score": score * link.priority, "link": link})
+    results.sort(key=lambda item: item["score"], reverse=True)
+    return [item["link"] for item in results[:limit]]
+
+
+class TestDocumentaryLinkIndexSynthetic:
+    """Compare the inverted index with scanning over 10k synthetic links"""
+
+    @pytest.fixture()
+    def rand(self):
+        return random.Random(42)
+
+    @pytest.fixture()
+    def links(self, rand):
+        all_tags = (
+            [f"app-pl:pl{i}" for i in range(20)]
+            + [f"app-sdk:sdk{i}" for i in range(50)]
+            + [f"deploy-failure:failure{i}" for i in range(200)]
+        )
+        return [
+            DocumentaryLink(
+                id=i + 1,
+                title_zh_cn=f"link-{i + 1}",
+                affinity_tags=rand.sample(all_tags, rand.randint(1, 4)),
+                priority=rand.randint(1, 5),
+            )
+            for i in range(10000)
+        ]
+
+    @pytest.fixture()
+    def queries(self, rand, links):
+        return [[AppPLTag(f"pl{rand.randrange(20)}"), AppSDKTag(f"sdk{rand.randrange(50)}")] for _ in range(50)]
+
+    def test_same_as_scanning(self, links, queries):
+        index = DocumentaryLinkIndex(links)
+        assert [index.search(tags) for tags in queries] == [_search_by_scanning(links, tags) for tags in queries]
+
+    @pytest.mark.benchmark
+    def test_faster_than_scanning(self, links, queries):
+        started_at = time.perf_counter()
+        index = DocumentaryLinkIndex(links)
+        build_duration = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        for tags in queries:
+            index.search(tags)
+        index_duration = time.perf_counter() - started_at
+
+        started_at = time.perf_counter()
+        for tags in queries:
+            _search_by_scanning(links, tags)
+        scan_duration = time.perf_counter() - started_at
+
+        logger.info(
+            "10k links, build index: %.3fs, %d queries with index: %.3fs, by scanning: %.3fs",
+            build_duration,
+            len(queries),
+            index_duration,
+            scan_duration,
+        )
+        assert index_duration < scan_duration
+
 
 class TestDeploymentFailureHint:
     def test_render_links(self):
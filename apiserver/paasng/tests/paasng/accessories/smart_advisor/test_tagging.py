@@ -16,6 +16,7 @@
 # to the current version of the project delivered to anyone in the future.
 
 import logging
+import re
 import tempfile
 from pathlib import Path
 from textwrap import dedent
@@ -26,7 +27,15 @@ from django_dynamic_fixture import G
 
 from paasng.accessories.smart_advisor.constants import DeployFailurePatternType
 from paasng.accessories.smart_advisor.models import DeployFailurePattern
-from paasng.accessories.smart_advisor.tagging import dig_tags_local_repo, get_deployment_tags
+from paasng.accessories.smart_advisor.tagging import (
+    CompiledFailurePattern,
+    CompiledFailurePatterns,
+    DeploymentFailureHits,
+    StreamingFailureMatcher,
+    dig_tags_local_repo,
+    failure_patterns_cache,
+    get_deployment_tags,
+)
 from paasng.accessories.smart_advisor.tags import DeploymentFailureTag, force_tag
 from tests.paasng.platform.engine.setup_utils import create_fake_deployment
 
@@ -115,3 +124,140 @@ class TestGetDeploymentTags:
         with mock.patch("paasng.accessories.smart_advisor.tagging.get_all_logs", return_value=logs):
             results = get_deployment_tags(deployment)
             assert results == tags
+
+    def test_pattern_changed(self, bk_module):
+        self.setup_data()
+        deployment = create_fake_deployment(bk_module)
+        with mock.patch("paasng.accessories.smart_advisor.tagging.get_all_logs", return_value="oom killed"):
+            assert get_deployment_tags(deployment) == []
+
+            G(
+                DeployFailurePattern,
+                type=DeployFailurePatternType.REGULAR_EXPRESSION,
+                value="OOM",
+                tag_str="deploy-failure:oom",
+            )
+            assert get_deployment_tags(deployment) == [DeploymentFailureTag("oom")]
+
+
+class TestStreamingFailureMatcher:
+    @pytest.fixture()
+    def deployment(self, bk_module):
+        for value, tag_str in [
+            ("Procfile error:", "deploy-failure:fix_procfile"),
+            (r"No matching distribution found for \S+", "deploy-failure:pip_install"),
+            ("OOM", "deploy-failure:oom"),
+        ]:
+            G(DeployFailurePattern, type=DeployFailurePatternType.REGULAR_EXPRESSION, value=value, tag_str=tag_str)
+        deployment = create_fake_deployment(bk_module)
+        yield deployment
+        DeploymentFailureHits(str(deployment.id)).clear()
+
+    def test_tags_from_fed_logs(self, deployment):
+        matcher = StreamingFailureMatcher(str(deployment.id))
+        for line in ["Collecting foo==1.0", "ERROR: No matching distribution found for foo==1.0", "Procfile error:"]:
+            matcher.feed(line)
+
+        # The logs are not scanned again
+        with mock.patch("paasng.accessories.smart_advisor.tagging.get_all_logs") as get_all_logs:
+            assert get_deployment_tags(deployment) == [
+                DeploymentFailureTag("fix_procfile"),
+                DeploymentFailureTag("pip_install"),
+            ]
+            assert not get_all_logs.called
+
+    def test_nothing_matched(self, deployment):
+        StreamingFailureMatcher(str(deployment.id)).feed("no errors")
+        with mock.patch("paasng.accessories.smart_advisor.tagging.get_all_logs") as get_all_logs:
+            assert get_deployment_tags(deployment) == []
+            assert not get_all_logs.called
+
+    def test_hits_of_multiple_matchers(self, deployment):
+        # Such as the matchers of the main stream and the build task
+        StreamingFailureMatcher(str(deployment.id)).feed("Procfile error:")
+        StreamingFailureMatcher(str(deployment.id)).feed("OOM killed")
+        assert get_deployment_tags(deployment) == [DeploymentFailureTag("fix_procfile"), DeploymentFailureTag("oom")]
+
+    def test_err_detail(self, deployment):
+        StreamingFailureMatcher(str(deployment.id)).feed("no errors")
+        deployment.err_detail = "OOM killed"
+        assert get_deployment_tags(deployment) == [DeploymentFailureTag("oom")]
+
+    def test_fallback_when_never_fed(self, deployment):
+        with mock.patch("paasng.accessories.smart_advisor.tagging.get_all_logs", return_value="OOM killed"):
+            assert get_deployment_tags(deployment) == [DeploymentFailureTag("oom")]
+
+    def test_fallback_when_record_failed(self, deployment):
+        matcher = StreamingFailureMatcher(str(deployment.id))
+        with mock.patch.object(matcher.hits, "add", side_effect=RuntimeError):
+            matcher.feed("Procfile error:")
+        # Stop matching after the failure
+        with mock.patch.object(matcher.patterns, "match") as match:
+            matcher.feed("OOM killed")
+            assert not match.called
+
+        with mock.patch("paasng.accessories.smart_advisor.tagging.get_all_logs", return_value="Procfile error:"):
+            assert get_deployment_tags(deployment) == [DeploymentFailureTag("fix_procfile")]
+
+
+class TestCompiledFailurePatterns:
+    @pytest.fixture()
+    def patterns(self):
+        pattern_data = [
+            ("Procfile error:", "deploy-failure:fix_procfile"),
+            (r"No matching distribution found for \S+", "deploy-failure:pip_install"),
+            (r"exit code: \d+", "deploy-failure:exit_code"),
+            ("(invalid", "deploy-failure:invalid"),
+        ]
+        for value, tag_str in pattern_data:
+            G(DeployFailurePattern, type=DeployFailurePatternType.REGULAR_EXPRESSION, value=value, tag_str=tag_str)
+        return failure_patterns_cache.get()
+
+    def test_compile(self, patterns):
+        # The invalid expression is skipped
+        assert [p.tag_str for p in patterns.patterns] == [
+            "deploy-failure:fix_procfile",
+            "deploy-failure:pip_install",
+            "deploy-failure:exit_code",
+        ]
+        assert patterns.patterns[0].literal == "procfile error:"
+        assert patterns.patterns[1].literal is None
+
+    def test_match(self, patterns):
+        logs = "Collecting foo==1.0\nERROR: No matching distribution found for foo==1.0\nBuild failed, exit code: 1\n"
+        assert patterns.match(logs) == [1, 2]
+        assert patterns.match(logs, skipped=[1]) == [2]
+        assert patterns.match("no errors") == []
+
+    @pytest.mark.parametrize(
+        "values",
+        [
+            # Both patterns match at the same position
+            [r"exit code: \d+", r"exit code: 1\b"],
+            # The second match starts inside the span of the first one
+            [r"failed, exit code: \d+", r"code: \d"],
+        ],
+    )
+    def test_match_overlapped(self, values):
+        patterns = CompiledFailurePatterns(
+            [
+                CompiledFailurePattern(v, f"deploy-failure:{i}", re.compile(v, re.IGNORECASE))
+                for i, v in enumerate(values)
+            ]
+        )
+        assert patterns.match("Build failed, exit code: 1\n") == [0, 1]
+
+    def test_scan_once_when_nothing_matched(self, patterns):
+        with mock.patch.object(patterns, "_get_combined", wraps=patterns._get_combined) as get_combined:
+            assert patterns.match("no errors\n" * 1000) == []
+        # One pass with all the expressions, instead of one pass for each of them
+        get_combined.assert_called_once_with(patterns._regex_indexes)
+
+    def test_compiled_patterns_are_cached(self, patterns):
+        with mock.patch.object(CompiledFailurePatterns, "compile") as mocked_compile:
+            assert failure_patterns_cache.get() is patterns
+            assert not mocked_compile.called
+
+            failure_patterns_cache.bump_version()
+            failure_patterns_cache.get()
+            assert mocked_compile.called
@@ -253,8 +253,8 @@ def gray_release_approval_service():
 
 @pytest.fixture()
 def thirdparty_client():
-    with mock.patch("paasng.bk_plugins.pluginscenter.thirdparty.utils.DynamicClient") as cls:
-        yield cls().with_group().with_bkapi_authorization().with_i18n_hook().group
+    with mock.patch("paasng.bk_plugins.pluginscenter.thirdparty.utils.get_client_registry") as get_registry:
+        yield get_registry().get().make_group()
 
 
 @pytest.fixture()
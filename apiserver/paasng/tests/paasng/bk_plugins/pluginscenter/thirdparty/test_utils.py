@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import threading
+import time
+from unittest import mock
+
+import pytest
+from blue_krill.web.std_error import APIError
+from django.utils.translation import get_language, override
+
+from paasng.bk_plugins.pluginscenter.definitions import PluginBackendAPIResource
+from paasng.bk_plugins.pluginscenter.thirdparty.utils import (
+    APIClientRegistry,
+    ConcurrencyLimiter,
+    call_concurrently,
+    make_client,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestAPIClientRegistry:
+    def test_reuse(self):
+        registry = APIClientRegistry()
+        client = registry.get("foo", "prod", "admin")
+
+        assert registry.get("foo", "prod", "admin") is client
+        assert registry.get("foo", "prod", "other") is not client
+        assert registry.get("foo", "stag", "admin") is not client
+        assert len(registry) == 3
+
+    def test_bounded(self):
+        registry = APIClientRegistry(max_size=2)
+        first = registry.get("foo", "prod", "user-1")
+        registry.get("foo", "prod", "user-2")
+        # Touch the first one, so that the second one is the least recently used
+        registry.get("foo", "prod", "user-1")
+        registry.get("foo", "prod", "user-3")
+
+        assert len(registry) == 2
+        assert registry.get("foo", "prod", "user-1") is first
+
+    def test_evict_idle(self):
+        clock = FakeClock()
+        registry = APIClientRegistry(idle_timeout=60, clock=clock)
+        idle = registry.get("foo", "prod", "user-1")
+        clock.now += 30
+        active = registry.get("foo", "prod", "user-2")
+
+        clock.now += 40
+        with mock.patch.object(idle.session, "close") as close:
+            assert registry.get("foo", "prod", "user-2") is active
+        assert close.called
+        assert len(registry) == 1
+        assert registry.get("foo", "prod", "user-1") is not idle
+
+    def test_limiter_per_api(self):
+        registry = APIClientRegistry()
+        assert registry.get_limiter("foo") is registry.get_limiter("foo")
+        assert registry.get_limiter("foo") is not registry.get_limiter("bar")
+
+
+class TestConcurrencyLimiter:
+    def test_too_many_requests(self):
+        limiter = ConcurrencyLimiter("foo", max_concurrency=1, acquire_timeout=0.05)
+        started, finish = threading.Event(), threading.Event()
+
+        def slow_call():
+            started.set()
+            finish.wait(timeout=5)
+
+        thread = threading.Thread(target=limiter.wrap(slow_call))
+        thread.start()
+        started.wait(timeout=5)
+        try:
+            with pytest.raises(APIError) as exc:
+                limiter.wrap(lambda: None)()
+            assert exc.value.code == "TooManyRequests"
+        finally:
+            finish.set()
+            thread.join()
+
+        # The slot has been released
+        assert limiter.wrap(lambda: "ok")() == "ok"
+
+
+def test_make_client_reuse_client():
+    registry = APIClientRegistry()
+    resource = PluginBackendAPIResource(apiName="foo", path="bar/", method="GET")
+    with mock.patch("paasng.bk_plugins.pluginscenter.thirdparty.utils.get_client_registry", return_value=registry):
+        first = make_client(resource, bk_username="admin")
+        second = make_client(resource, bk_username="admin")
+
+    assert first is not second
+    assert len(registry) == 1
+
+
+class TestCallConcurrently:
+    def test_order_and_concurrency(self):
+        def make_op(i):
+            def op():
+                time.sleep(0.2)
+                return i
+
+            return op
+
+        started_at = time.monotonic()
+        assert call_concurrently([make_op(i) for i in range(4)]) == [0, 1, 2, 3]
+        assert time.monotonic() - started_at < 0.2 * 4
+
+    def test_language_passed(self):
+        with override("en"):
+            assert call_concurrently([get_language, get_language]) == ["en", "en"]
+
+    def test_raise_error(self):
+        def broken():
+            raise APIError(code="APIError", message="boom")
+
+        with pytest.raises(APIError):
+            call_concurrently([lambda: 1, broken])
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+import pytest
+
+from paasng.core.core.protections.base import BaseCondition, ConcurrentConditionChecker
+from paasng.core.core.protections.exceptions import ConditionNotMatched
+
+
+class FakeCondition(BaseCondition):
+    timeout = 1.0
+
+    def __init__(self, name: str, ok: bool = True, delay: float = 0, cache_key: Optional[str] = None):
+        self.name = name
+        self.ok = ok
+        self.delay = delay
+        self.cache_key = cache_key
+        self.calls = 0
+
+    def validate(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        if not self.ok:
+            raise ConditionNotMatched(f"{self.name} failed", self.name)
+
+    def get_cache_key(self) -> Optional[str]:
+        return self.cache_key
+
+
+class LocalCondition(FakeCondition):
+    timeout = None
+
+
+class SlowCondition(FakeCondition):
+    timeout = 0.1
+    depends_on = (LocalCondition,)
+
+
+class CachedCondition(FakeCondition):
+    cache_ttl = 60
+
+
+class Checker(ConcurrentConditionChecker):
+    def __init__(self, conditions: List[BaseCondition]):
+        self.conditions = conditions
+
+
+class TestConcurrentConditionChecker:
+    def test_preserve_order(self):
+        conditions = [
+            FakeCondition("a", ok=False, delay=0.05),
+            LocalCondition("b", ok=False),
+            FakeCondition("c", ok=False),
+        ]
+        status = Checker(conditions).perform()
+        assert [c.action_name for c in status.failed_conditions] == ["a", "b", "c"]
+
+    def test_run_concurrently(self):
+        thread_names = set()
+
+        class RecordingCondition(FakeCondition):
+            def validate(self):
+                thread_names.add(threading.current_thread().name)
+                super().validate()
+
+        conditions = [RecordingCondition(str(i), delay=0.2) for i in range(5)]
+        started_at = time.monotonic()
+        assert Checker(conditions).all_matched
+        assert time.monotonic() - started_at < 0.2 * 3
+        assert len(thread_names) == 5
+
+    def test_timeout(self):
+        status = Checker([SlowCondition("slow", delay=0.5)]).perform()
+        assert [c.action_name for c in status.failed_conditions] == ["slow"]
+
+    @pytest.mark.parametrize(("local_ok", "expected"), [(True, ["slow"]), (False, ["local"])])
+    def test_depends_on(self, local_ok, expected):
+        slow = SlowCondition("slow", ok=False)
+        status = Checker([slow, LocalCondition("local", ok=local_ok)]).perform()
+        assert [c.action_name for c in status.failed_conditions] == expected
+        assert slow.calls == (1 if local_ok else 0)
+
+    def test_circular_dependencies(self):
+        class A(LocalCondition):
+            depends_on = (SlowCondition,)
+
+        with pytest.raises(ValueError, match="circular"):
+            Checker([A("a"), SlowCondition("slow")]).perform()
+
+    def test_cache_matched_only(self):
+        key = f"test_condition:{uuid.uuid4().hex}"
+        cond_ok = CachedCondition("ok", cache_key=key)
+        for _ in range(2):
+            assert Checker([cond_ok]).all_matched
+        assert cond_ok.calls == 1
+
+        cond_failed = CachedCondition("failed", ok=False, cache_key=f"{key}:failed")
+        for _ in range(2):
+            assert not Checker([cond_failed]).all_matched
+        assert cond_failed.calls == 2
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import time
+from typing import List
+
+import pytest
+from blue_krill.monitoring.probe.base import Issue, VirtualProbe
+
+from paasng.core.core.storages.redisdb import get_default_redis
+from paasng.misc.monitoring.healthz.prober import HealthProber
+from tests.utils.basic import generate_random_string
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class CountingProbe(VirtualProbe):
+    name = "counting"
+    is_core = True
+    calls = 0
+
+    def diagnose(self) -> List[Issue]:
+        CountingProbe.calls += 1
+        return []
+
+
+class SlowProbe(VirtualProbe):
+    name = "slow"
+    is_core = True
+    probe_timeout = 0.2
+
+    def diagnose(self) -> List[Issue]:
+        time.sleep(1)
+        return []
+
+
+class SleepyProbe(VirtualProbe):
+    name = "sleepy"
+    is_core = False
+
+    def diagnose(self) -> List[Issue]:
+        time.sleep(0.3)
+        return []
+
+
+class BrokenProbe(VirtualProbe):
+    name = "broken"
+    is_core = False
+
+    def diagnose(self) -> List[Issue]:
+        raise RuntimeError("boom")
+
+
+@pytest.fixture(autouse=True)
+def _reset_calls():
+    CountingProbe.calls = 0
+
+
+@pytest.fixture()
+def make_prober():
+    probers = []
+
+    def _make(probes, **kwargs) -> HealthProber:
+        kwargs.setdefault("default_interval", 30)
+        kwargs.setdefault("default_timeout", 5)
+        prober = HealthProber(probes, key_prefix=f"healthz::test::{generate_random_string(8)}", **kwargs)
+        probers.append(prober)
+        return prober
+
+    yield _make
+    redis_db = get_default_redis()
+    for prober in probers:
+        prober.stop(timeout=1)
+        for key in redis_db.scan_iter(f"{prober.key_prefix}*"):
+            redis_db.delete(key)
+
+
+class TestHealthProber:
+    def test_run_concurrently(self, make_prober):
+        prober = make_prober([SleepyProbe, CountingProbe])
+        sleepy = type("SleepyProbe2", (SleepyProbe,), {"name": "sleepy-2"})
+
+        started_at = time.monotonic()
+        reports = prober.run([SleepyProbe, sleepy, CountingProbe])
+
+        assert time.monotonic() - started_at < 0.6
+        assert [r.system_name for r in reports] == ["sleepy", "sleepy-2", "counting"]
+
+    def test_timeout_is_fatal(self, make_prober):
+        prober = make_prober([SlowProbe])
+
+        started_at = time.monotonic()
+        diagnosis = prober.get_diagnosis()
+
+        assert time.monotonic() - started_at < 0.8
+        assert diagnosis.is_death
+        assert "timed out" in diagnosis.get_fatal_report()["slow"]
+
+    def test_failed_probe_is_fatal(self, make_prober):
+        (report,) = make_prober([BrokenProbe]).run([BrokenProbe])
+
+        assert not report.alive
+        assert "boom" in report.issues[0].description
+
+    def test_serve_from_cache(self, make_prober):
+        prober = make_prober([CountingProbe])
+
+        # The first call bootstraps the missing diagnosis synchronously
+        assert not prober.get_diagnosis().is_death
+        assert CountingProbe.calls == 1
+        for _ in range(3):
+            assert not prober.get_diagnosis().is_death
+        assert CountingProbe.calls == 1
+
+    def test_cache_shared_by_probers(self, make_prober):
+        prober = make_prober([CountingProbe])
+        prober.run([CountingProbe])
+
+        other = HealthProber([CountingProbe], key_prefix=prober.key_prefix)
+        (report,) = other.get_diagnosis().items
+
+        assert report.system_name == "counting"
+        assert CountingProbe.calls == 1
+
+    def test_stale_diagnosis_is_fatal(self, make_prober):
+        clock = FakeClock()
+        prober = make_prober([CountingProbe], default_interval=30, stale_intervals=3, clock=clock)
+        prober.run([CountingProbe])
+
+        clock.now += 60
+        assert not prober.get_diagnosis().is_death
+
+        clock.now += 60
+        diagnosis = prober.get_diagnosis()
+        assert diagnosis.is_death
+        assert "stale" in diagnosis.get_fatal_report()["counting"]
+
+    def test_stale_diagnosis_rerun_on_first_call(self, make_prober):
+        clock = FakeClock()
+        prober = make_prober([CountingProbe], default_interval=30, stale_intervals=3, clock=clock)
+        prober.run([CountingProbe])
+
+        # Such as a process started long after the diagnosis was saved
+        clock.now += 120
+        other = HealthProber([CountingProbe], key_prefix=prober.key_prefix, stale_intervals=3, clock=clock)
+        assert not other.get_diagnosis().is_death
+        assert CountingProbe.calls == 2
+
+        # Only the first call examines the stale diagnosis
+        clock.now += 120
+        assert other.get_diagnosis().is_death
+        assert CountingProbe.calls == 2
+
+    def test_saved_diagnosis_expires(self, make_prober):
+        prober = make_prober([CountingProbe], default_interval=30, stale_intervals=3)
+        prober.run([CountingProbe])
+
+        assert 0 < get_default_redis().ttl(prober.key_prefix) <= 90
+
+    def test_run_due_once_per_interval(self, make_prober):
+        prober = make_prober([CountingProbe])
+        other = HealthProber([CountingProbe], key_prefix=prober.key_prefix)
+
+        assert len(prober.run_due()) == 1
+        assert other.run_due() == []
+        assert prober.run_due() == []
+        assert CountingProbe.calls == 1
+
+    def test_background_thread(self, make_prober):
+        prober = make_prober([CountingProbe], default_interval=1, tick=0.05)
+        prober.start()
+        prober.start()
+
+        deadline = time.monotonic() + 3
+        while CountingProbe.calls < 2 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        prober.stop(timeout=1)
+
+        assert CountingProbe.calls >= 2
+        assert not prober.get_diagnosis().is_death
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import time
+from unittest import mock
+
+import pytest
+
+from paasng.misc.search.backends import (
+    BaseSearcher,
+    BKDocumentSearcher,
+    MixSearcher,
+    SearchDocResults,
+    SearchDocumentary,
+)
+from paasng.misc.search.constants import SearchSourceStatus
+from tests.utils.basic import generate_random_string
+
+
+class FakeSearcher(BaseSearcher):
+    source_type = "fake"
+    delay = 0.0
+    calls = 0
+
+    def search(self, keyword: str) -> SearchDocResults:
+        type(self).calls += 1
+        time.sleep(self.delay)
+        docs = [
+            SearchDocumentary(
+                source_type=self.source_type, title=f"{keyword}-{i}", url=f"http://{self.source_type}/{i}"
+            )
+            for i in range(2)
+        ]
+        return SearchDocResults(docs=docs, count=len(docs))
+
+
+class SlowSearcher(FakeSearcher):
+    source_type = "slow"
+    delay = 0.5
+
+
+class BrokenSearcher(FakeSearcher):
+    source_type = "broken"
+
+    def search(self, keyword: str) -> SearchDocResults:
+        raise ConnectionError("boom")
+
+
+@pytest.fixture()
+def keyword():
+    return generate_random_string(8)
+
+
+def _patch_searchers(*searcher_cls):
+    return mock.patch("paasng.misc.search.backends.SEARCHER_CLS", list(searcher_cls))
+
+
+class TestMixSearcher:
+    def test_mix_results(self, keyword):
+        class AnotherSearcher(FakeSearcher):
+            source_type = "another"
+
+        with _patch_searchers(FakeSearcher, AnotherSearcher):
+            results = MixSearcher(cache_ttl=0).search_with_status(keyword)
+
+        assert [doc["source_type"] for doc in results.docs] == ["fake", "another", "fake", "another"]
+        assert results.sources == {"fake": SearchSourceStatus.OK, "another": SearchSourceStatus.OK}
+        assert results.incomplete_sources == []
+
+    def test_searchers_run_concurrently(self, keyword):
+        class AnotherSlowSearcher(SlowSearcher):
+            source_type = "another_slow"
+
+        with _patch_searchers(SlowSearcher, AnotherSlowSearcher):
+            started_at = time.monotonic()
+            results = MixSearcher(cache_ttl=0).search_with_status(keyword)
+
+        assert time.monotonic() - started_at < SlowSearcher.delay * 2
+        assert len(results.docs) == 4
+
+    def test_partial_results(self, keyword):
+        with _patch_searchers(FakeSearcher, SlowSearcher, BrokenSearcher):
+            started_at = time.monotonic()
+            results = MixSearcher(deadline=0.1, cache_ttl=0).search_with_status(keyword)
+
+        assert time.monotonic() - started_at < SlowSearcher.delay
+        assert [doc["source_type"] for doc in results.docs] == ["fake", "fake"]
+        assert results.sources == {
+            "fake": SearchSourceStatus.OK,
+            "slow": SearchSourceStatus.TIMEOUT,
+            "broken": SearchSourceStatus.ERROR,
+        }
+        assert results.incomplete_sources == ["slow", "broken"]
+
+    def test_searcher_timeout_capped_by_deadline(self):
+        with _patch_searchers(FakeSearcher):
+            searcher = MixSearcher(deadline=3).searchers[0]
+        assert searcher.timeout == 3
+
+    def test_cache_by_normalized_keyword(self, keyword):
+        FakeSearcher.calls = 0
+        with _patch_searchers(FakeSearcher):
+            first = MixSearcher().search(keyword)
+            second = MixSearcher().search(f"  {keyword.upper()} ")
+
+        assert first == second
+        assert FakeSearcher.calls == 1
+
+    def test_partial_results_not_cached(self, keyword):
+        BrokenSearcher.calls = 0
+        FakeSearcher.calls = 0
+        with _patch_searchers(FakeSearcher, BrokenSearcher):
+            MixSearcher().search(keyword)
+            MixSearcher().search(keyword)
+
+        assert FakeSearcher.calls == 2
+
+
+class TestBKDocumentSearcher:
+    def test_session_shared(self):
+        assert BKDocumentSearcher().session is BKDocumentSearcher().session
+        assert BKDocumentSearcher().session is not FakeSearcher().session
+
+    def test_search(self):
+        searcher = BKDocumentSearcher()
+        resp = mock.MagicMock(status_code=200)
+        resp.json.return_value = [{"url": "/foo", "title": "Foo", "digest": "foo bar"}]
+        with mock.patch.object(searcher.session, "get", return_value=resp) as mocked_get:
+            results = searcher.search("foo")
+
+        assert mocked_get.call_args.kwargs["timeout"] == searcher.timeout
+        assert results.count == 1
+        assert results.docs[0].source_type == "bk_document"
@@ -21,9 +21,14 @@ This module provides stub implementations of sandbox components for testing,
 enabling unit and API tests without real K8s/daemon dependencies.
 """
 
-from typing import Self
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import IO, Iterator, Self
 
 from paasng.platform.agent_sandbox.daemon_client import ExecuteResult
+from paasng.platform.agent_sandbox.warm_pool import WarmPoolSpec
 
 # The default working directory in sandbox container
 DEFAULT_WORKDIR = "/workspace"
@@ -88,6 +93,20 @@ class StubDaemonClient:
             raise SandboxDaemonAPIError(f"File not found: {path}")
         return self._files[path]
 
+    def upload_stream(self, fileobj: IO[bytes], dest_path: str, offset: int = 0, timeout: int | None = None) -> None:
+        """Upload a file to the in-memory storage, appending at offset when resuming."""
+        from paasng.platform.agent_sandbox.exceptions import SandboxDaemonAPIError
+
+        if offset and len(self._files.get(dest_path, b"")) != offset:
+            raise SandboxDaemonAPIError(f"offset mismatch: {dest_path}", status_code=409)
+        existing = self._files.get(dest_path, b"") if offset else b""
+        self._files[dest_path] = existing + fileobj.read()
+
+    def download_stream(self, path: str, offset: int = 0, timeout: int | None = None) -> Iterator[bytes]:
+        """Download a file from the in-memory storage, skipping the content before offset."""
+        content = self.download_file(path, timeout=timeout)
+        return iter([content[offset:]])
+
     def delete_file(self, path: str, recursive: bool = False) -> None:
         """Delete a file or folder from the in-memory storage."""
         if path in self._files:
@@ -220,3 +239,33 @@ class StubResidentDaemonClient:
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         self.close()
+
+
+class FakeSandboxCluster:
+    """In-memory fake of the warm pool backend, for testing the pool without a real cluster.
+
+    :param provision_seconds: How long a provisioning blocks, to simulate the scheduling and boot latency.
+    """
+
+    def __init__(self, provision_seconds: float = 0):
+        self.provision_seconds = provision_seconds
+        self.provisioned_count = 0
+        self._lock = threading.Lock()
+        # {spec: [sandbox_id, ...]}, the oldest comes first
+        self._idle: dict[WarmPoolSpec, list[str]] = defaultdict(list)
+
+    def provision(self, spec: WarmPoolSpec) -> str:
+        time.sleep(self.provision_seconds)
+        sandbox_id = uuid.uuid4().hex
+        with self._lock:
+            self._idle[spec].append(sandbox_id)
+            self.provisioned_count += 1
+        return sandbox_id
+
+    def claim_idle(self, spec: WarmPoolSpec) -> str | None:
+        with self._lock:
+            return self._idle[spec].pop(0) if self._idle[spec] else None
+
+    def count_idle(self, spec: WarmPoolSpec) -> int:
+        with self._lock:
+            return len(self._idle[spec])
@@ -15,12 +15,18 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
+import io
 from unittest import mock
 
 import pytest
 import requests
 
-from paasng.platform.agent_sandbox.daemon_client import DEFAULT_REQUEST_TIMEOUT, ExecuteResult, SandboxDaemonClient
+from paasng.platform.agent_sandbox.daemon_client import (
+    DEFAULT_REQUEST_TIMEOUT,
+    DaemonClientPool,
+    ExecuteResult,
+    SandboxDaemonClient,
+)
 from paasng.platform.agent_sandbox.exceptions import SandboxDaemonAPIError, SandboxExecTimeout, SandboxServiceNotReady
 
 
@@ -118,6 +124,52 @@ class TestSandboxDaemonClient:
                 params={"path": "/workspace/test.txt"},
             )
 
+    def test_upload_stream(self, client: SandboxDaemonClient):
+        """Test streaming upload sends a chunked multipart body."""
+        mock_response = mock.MagicMock()
+
+        with mock.patch.object(client._session, "request", return_value=mock_response) as mock_request:
+            client.upload_stream(io.BytesIO(b"0123456789"), "/workspace/test.txt", offset=5, chunk_size=4)
+
+            call_kwargs = mock_request.call_args[1]
+            chunks = list(call_kwargs["data"])
+            boundary = call_kwargs["headers"]["Content-Type"].split("boundary=")[1]
+
+        # The file content is streamed in chunks of chunk_size
+        assert b"0123" in chunks
+        assert b"89" in chunks
+        body = b"".join(chunks)
+        assert b'name="destPath"\r\n\r\n/workspace/test.txt\r\n' in body
+        assert b'name="offset"\r\n\r\n5\r\n' in body
+        assert b'filename="test.txt"' in body
+        assert body.endswith(f"\r\n--{boundary}--\r\n".encode())
+
+    def test_download_stream(self, client: SandboxDaemonClient):
+        """Test streaming download iterates chunks and closes the response."""
+        mock_response = mock.MagicMock()
+        mock_response.status_code = 206
+        mock_response.iter_content.return_value = iter([b"abc", b"def"])
+
+        with mock.patch.object(client._session, "request", return_value=mock_response) as mock_request:
+            chunks = client.download_stream("/workspace/test.txt", offset=10)
+
+            call_kwargs = mock_request.call_args[1]
+            assert call_kwargs["headers"] == {"Range": "bytes=10-"}
+            assert call_kwargs["stream"] is True
+            assert b"".join(chunks) == b"abcdef"
+            mock_response.close.assert_called_once()
+
+    def test_download_stream_range_not_supported(self, client: SandboxDaemonClient):
+        """Test that a full response to a ranged request raises error."""
+        mock_response = mock.MagicMock()
+        mock_response.status_code = 200
+
+        with (
+            mock.patch.object(client._session, "request", return_value=mock_response),
+            pytest.raises(SandboxDaemonAPIError, match="ranged download is not supported"),
+        ):
+            client.download_stream("/workspace/test.txt", offset=10)
+
     def test_delete_file(self, client: SandboxDaemonClient):
         """Test file deletion."""
         mock_response = mock.MagicMock()
@@ -213,6 +265,55 @@ class TestSandboxDaemonClient:
             assert client.base_url == "http://agent-sbx-router.example.com"
 
 
+class TestDaemonClientPool:
+    """Test the per-sandbox daemon client cache."""
+
+    @pytest.fixture()
+    def clock(self) -> mock.MagicMock:
+        return mock.MagicMock(return_value=1000.0)
+
+    def test_reuse_client(self, clock):
+        pool = DaemonClientPool(clock=clock)
+        c1 = pool.get("router.example.com", "token", "sbx-1", "ns-1")
+        c2 = pool.get("router.example.com", "token", "sbx-1", "ns-1")
+        c3 = pool.get("router.example.com", "token", "sbx-2", "ns-1")
+
+        assert c1 is c2
+        assert c1 is not c3
+        assert len(pool) == 2
+
+    def test_evict_idle(self, clock):
+        pool = DaemonClientPool(idle_timeout=60, clock=clock)
+        c1 = pool.get("router.example.com", "token", "sbx-1", "ns-1")
+
+        clock.return_value += 61
+        with mock.patch.object(c1, "close") as mock_close:
+            c2 = pool.get("router.example.com", "token", "sbx-1", "ns-1")
+            mock_close.assert_called_once()
+        assert c1 is not c2
+
+    def test_evict_lru_when_full(self, clock):
+        pool = DaemonClientPool(max_size=2, clock=clock)
+        c1 = pool.get("router.example.com", "token", "sbx-1", "ns-1")
+        pool.get("router.example.com", "token", "sbx-2", "ns-1")
+        # Touch sbx-1 so that sbx-2 becomes the least recently used one
+        pool.get("router.example.com", "token", "sbx-1", "ns-1")
+        pool.get("router.example.com", "token", "sbx-3", "ns-1")
+
+        assert len(pool) == 2
+        assert pool.get("router.example.com", "token", "sbx-1", "ns-1") is c1
+
+    def test_evict_sandbox(self, clock):
+        pool = DaemonClientPool(clock=clock)
+        c1 = pool.get("router.example.com", "token", "sbx-1", "ns-1")
+        pool.get("router.example.com", "token", "sbx-2", "ns-1")
+
+        with mock.patch.object(c1, "close") as mock_close:
+            pool.evict("sbx-1", "ns-1")
+            mock_close.assert_called_once()
+        assert len(pool) == 1
+
+
 class TestExecuteResult:
     """Test ExecuteResult data class."""
 
@@ -15,6 +15,8 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
+import io
+
 import pytest
 
 from paasng.platform.agent_sandbox.exceptions import SandboxError, SandboxFileError
@@ -61,6 +63,25 @@ class TestKubernetesPodSandboxWithStub:
         downloaded = stub_k8s_sandbox.download_file(remote_path)
         assert downloaded == payload
 
+    def test_resumable_stream_transfer(self, stub_k8s_sandbox, stub_daemon_client):
+        """Test streaming upload and download with resume offsets."""
+        remote_path = f"{DEFAULT_WORKDIR}/resumable.bin"
+
+        stub_k8s_sandbox.upload_fileobj(io.BytesIO(b"hello "), remote_path)
+        stub_k8s_sandbox.upload_fileobj(io.BytesIO(b"world"), remote_path, offset=6)
+        assert stub_daemon_client._files[remote_path] == b"hello world"
+
+        assert b"".join(stub_k8s_sandbox.download_stream(remote_path)) == b"hello world"
+        assert b"".join(stub_k8s_sandbox.download_stream(remote_path, offset=6)) == b"world"
+
+    def test_resume_upload_offset_mismatch(self, stub_k8s_sandbox):
+        """Test that resuming with a wrong offset raises error."""
+        remote_path = f"{DEFAULT_WORKDIR}/mismatch.bin"
+        stub_k8s_sandbox.upload_fileobj(io.BytesIO(b"hello "), remote_path)
+
+        with pytest.raises(SandboxFileError, match="failed to upload file"):
+            stub_k8s_sandbox.upload_fileobj(io.BytesIO(b"world"), remote_path, offset=3)
+
     def test_delete_file(self, stub_k8s_sandbox, stub_daemon_client):
         """Test file deletion from sandbox."""
         remote_path = f"{DEFAULT_WORKDIR}/to_delete.txt"
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.conf import settings
+from django.utils import timezone
+
+from paasng.platform.agent_sandbox.constants import SandboxStatus
+from paasng.platform.agent_sandbox.models import Sandbox
+from paasng.platform.agent_sandbox.sandbox import WarmSandboxCluster
+from paasng.platform.agent_sandbox.warm_pool import WarmPoolSpec, WarmSandboxPool
+from paasng.platform.applications.models import Application
+
+from .stubs import FakeSandboxCluster
+
+SPEC = WarmPoolSpec(application_id="app-1", snapshot="bkpaas/agent-sandbox:latest")
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestWarmSandboxPool:
+    def test_claim_miss_then_refill(self):
+        cluster = FakeSandboxCluster()
+        pool = WarmSandboxPool(cluster, min_size=2, max_size=5)
+
+        assert pool.claim(SPEC) is None
+        pool.shutdown(wait=True)
+
+        assert cluster.count_idle(SPEC) == 2
+        stats = pool.stats(SPEC)
+        assert stats.misses == 1
+        assert stats.provisioning == 0
+
+    def test_claim_hit_skips_provision_latency(self):
+        cluster = FakeSandboxCluster(provision_seconds=0.2)
+        pool = WarmSandboxPool(cluster, min_size=1, max_size=1)
+        for _ in range(2):
+            cluster.provision(SPEC)
+
+        started_at = time.monotonic()
+        sandbox_id = pool.claim(SPEC)
+        latency = time.monotonic() - started_at
+
+        assert sandbox_id is not None
+        assert latency < cluster.provision_seconds
+        pool.shutdown(wait=True)
+
+    def test_concurrent_claims_are_unique(self):
+        cluster = FakeSandboxCluster()
+        pool = WarmSandboxPool(cluster, min_size=0, max_size=0)
+        for _ in range(20):
+            cluster.provision(SPEC)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: pool.claim(SPEC), range(30)))
+        pool.shutdown(wait=True)
+
+        claimed = [r for r in results if r is not None]
+        assert len(claimed) == 20
+        assert len(set(claimed)) == 20
+        assert pool.stats(SPEC).hits == 20
+
+    def test_unregistered_spec_is_not_refilled(self):
+        cluster = FakeSandboxCluster()
+        pool = WarmSandboxPool(cluster, min_size=2)
+
+        assert pool.refill(SPEC) == 0
+        pool.register(SPEC)
+        pool.shutdown(wait=True)
+        assert cluster.count_idle(SPEC) == 2
+
+    @pytest.mark.parametrize(
+        ("claims", "expected"),
+        [
+            # 0.1 claims/s * 10s provisioning
+            (1, 1),
+            # 0.3 claims/s * 10s provisioning
+            (3, 3),
+            # Capped by max_size
+            (20, 5),
+        ],
+    )
+    def test_target_size_follows_claim_rate(self, claims, expected):
+        clock = FakeClock()
+        pool = WarmSandboxPool(
+            FakeSandboxCluster(), min_size=1, max_size=5, rate_window=10, initial_provision_seconds=10, clock=clock
+        )
+        pool.register(SPEC)
+        for _ in range(claims):
+            pool._claims[SPEC].append(clock())
+
+        assert pool.target_size(SPEC) == expected
+        pool.shutdown(wait=False)
+
+    def test_target_size_shrinks_when_idle(self):
+        clock = FakeClock()
+        pool = WarmSandboxPool(
+            FakeSandboxCluster(), min_size=1, max_size=5, rate_window=10, initial_provision_seconds=10, clock=clock
+        )
+        pool.register(SPEC)
+        for _ in range(4):
+            pool._claims[SPEC].append(clock())
+        assert pool.target_size(SPEC) == 4
+
+        clock.now += 11
+        assert pool.target_size(SPEC) == 1
+        pool.shutdown(wait=False)
+
+
+def create_idle_sandbox(application: Application, spec: WarmPoolSpec, **kwargs) -> Sandbox:
+    """Create a POOLED sandbox record of given spec, the k8s resources are not created."""
+    sandbox_obj = Sandbox.objects.new(
+        application=application,
+        creator="",
+        snapshot=spec.snapshot,
+        snapshot_entrypoint=list(spec.snapshot_entrypoint),
+        workspace=spec.workspace,
+        ttl_seconds=settings.AGENT_SANDBOX_WARM_POOL_IDLE_TTL_SECONDS,
+        cpu=spec.cpu,
+        memory=spec.memory,
+    )
+    sandbox_obj.status = SandboxStatus.POOLED.value
+    for key, value in kwargs.items():
+        setattr(sandbox_obj, key, value)
+    sandbox_obj.save()
+    return sandbox_obj
+
+
+def fake_run_sandbox(sandbox_obj: Sandbox, status: SandboxStatus):
+    sandbox_obj.status = status.value
+    sandbox_obj.started_at = timezone.now()
+    sandbox_obj.save(update_fields=["status", "started_at", "updated"])
+
+
+class TestWarmSandboxCluster:
+    @pytest.fixture()
+    def spec(self, bk_app) -> WarmPoolSpec:
+        return WarmPoolSpec(application_id=str(bk_app.id), snapshot="bkpaas/agent-sandbox:latest")
+
+    @pytest.mark.django_db(databases=["default", "workloads"])
+    def test_claim_pooled(self, bk_app, spec):
+        oldest = create_idle_sandbox(bk_app, spec, created=timezone.now() - timedelta(minutes=1))
+        newer = create_idle_sandbox(bk_app, spec)
+        # Neither the sandbox of another spec nor the one about to expire is claimed
+        create_idle_sandbox(bk_app, spec, snapshot="python:3.11-alpine")
+        create_idle_sandbox(bk_app, spec, expired_at=timezone.now() + timedelta(seconds=30))
+
+        cluster = WarmSandboxCluster()
+        assert cluster.count_idle(spec) == 2
+        assert cluster.claim_idle(spec) == oldest.uuid.hex
+        assert cluster.claim_idle(spec) == newer.uuid.hex
+        assert cluster.claim_idle(spec) is None
+
+        oldest.refresh_from_db()
+        assert oldest.status == SandboxStatus.RUNNING.value
+
+    @pytest.mark.django_db(databases=["default", "workloads"])
+    def test_racing_claims(self, bk_app, spec):
+        sandbox_obj = create_idle_sandbox(bk_app, spec)
+
+        # Both processes have listed the idle sandbox before any of them claims it
+        with mock.patch.object(WarmSandboxCluster, "_list_idle", return_value=[sandbox_obj.uuid]):
+            assert WarmSandboxCluster().claim_idle(spec) == sandbox_obj.uuid.hex
+            assert WarmSandboxCluster().claim_idle(spec) is None
+
+    # The sandboxes are provisioned by the threads of the pool, which must see the committed records
+    @pytest.mark.django_db(databases=["default", "workloads"], transaction=True)
+    def test_refill_after_claim(self, bk_app, spec):
+        sandbox_obj = create_idle_sandbox(bk_app, spec)
+        cluster = WarmSandboxCluster()
+        pool = WarmSandboxPool(cluster, min_size=1, max_size=1)
+
+        with mock.patch("paasng.platform.agent_sandbox.sandbox._run_sandbox", side_effect=fake_run_sandbox):
+            assert pool.claim(spec) == sandbox_obj.uuid.hex
+            pool.shutdown(wait=True)
+
+        assert cluster.count_idle(spec) == 1
+        assert pool.stats(spec).hits == 1
+        assert Sandbox.objects.filter(application_id=spec.application_id).count() == 2
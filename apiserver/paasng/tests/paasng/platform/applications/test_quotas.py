@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+import uuid
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from django_dynamic_fixture import G
+
+from paas_wl.bk_app.processes.models import ProcessSpec, ProcessSpecManager, ProcessSpecPlan
+from paasng.platform.applications.models import Application
+from paasng.platform.applications.quotas import MemoryOrderedApplications, ResQuota, ResQuotaLedger, limits_to_quota
+from paasng.platform.engine.models.deployment import ProcessTmpl
+from tests.utils.basic import generate_random_string
+
+pytestmark = pytest.mark.django_db(databases=["default", "workloads"])
+
+
+def fake_env(env_id: int, app_code: str):
+    return SimpleNamespace(pk=env_id, application=SimpleNamespace(code=app_code))
+
+
+@pytest.fixture()
+def ledger():
+    ledger = ResQuotaLedger(key_prefix=f"test::quotas::{uuid.uuid4().hex}")
+    yield ledger
+    ledger.redis_db.delete(*ledger._keys())
+
+
+def test_limits_to_quota():
+    assert limits_to_quota({"cpu": "500m", "memory": "1Gi"}, replicas=2) == ResQuota(cpu=1000, memory=2048)
+    assert limits_to_quota({}) == ResQuota()
+
+
+class TestResQuotaLedger:
+    def test_update_env_adjusts_app_totals(self, ledger):
+        ledger.update_env(fake_env(1, "foo"), ResQuota(cpu=1000, memory=1024))
+        ledger.update_env(fake_env(2, "foo"), ResQuota(cpu=2000, memory=2048))
+        assert ledger.get_app_quotas(["foo"]) == {"foo": ResQuota(cpu=3000, memory=3072)}
+
+        ledger.update_env(fake_env(2, "foo"), ResQuota(cpu=0, memory=512))
+        assert ledger.get_app_quotas(["foo", "bar"]) == {"foo": ResQuota(cpu=1000, memory=1536)}
+
+    def test_list_app_codes_by_memory(self, ledger):
+        for i, (code, memory) in enumerate([("small", 256), ("large", 4096), ("medium", 1024)]):
+            ledger.update_env(fake_env(i, code), ResQuota(cpu=1000, memory=memory))
+
+        assert ledger.list_app_codes_by_memory(0, 2) == ["large", "medium"]
+        assert ledger.list_app_codes_by_memory(2, 2) == ["small"]
+        assert ledger.list_app_codes_by_memory(0, 2, descending=False) == ["small", "medium"]
+        assert ledger.list_app_codes_by_memory(3, 2) == []
+
+    @pytest.mark.usefixtures("_with_wl_apps")
+    def test_reconcile_default_app(self, ledger, bk_app, bk_stag_env):
+        plan = G(ProcessSpecPlan, max_replicas=5, limits={"cpu": "500m", "memory": "256Mi"})
+        for name, replicas in [("web", 2), ("worker", 1)]:
+            G(ProcessSpec, engine_app=bk_stag_env.wl_app, name=name, plan=plan, target_replicas=replicas)
+        ledger.update_env(fake_env(-1, "removed-app"), ResQuota(cpu=1000, memory=1024))
+
+        ledger.reconcile()
+
+        assert ledger.get_app_quotas([bk_app.code, "removed-app"]) == {bk_app.code: ResQuota(cpu=1500, memory=768)}
+
+    def test_reconcile_cnative_app(self, ledger, bk_cnative_app):
+        stag_env = bk_cnative_app.get_default_module().get_envs("stag")
+        ledger.update_env(stag_env, ResQuota(cpu=1000, memory=1024))
+
+        with mock.patch(
+            "paasng.platform.applications.quotas.calculate_env_quota", return_value=ResQuota(cpu=2000, memory=512)
+        ) as calculate:
+            ledger.reconcile()
+
+        # Only the env missing in the ledger is read from the cluster
+        assert calculate.call_count == 1
+        assert ledger.get_app_quotas([bk_cnative_app.code]) == {bk_cnative_app.code: ResQuota(cpu=3000, memory=1536)}
+
+
+class TestMemoryOrderedApplications:
+    @pytest.fixture()
+    def apps(self, ledger):
+        apps = [G(Application, code=f"app-{generate_random_string(6)}") for _ in range(4)]
+        # The last application is not in the ledger
+        for i, memory in enumerate([256, 4096, 1024]):
+            ledger.update_env(fake_env(i, apps[i].code), ResQuota(cpu=1000, memory=memory))
+        return apps
+
+    def test_page(self, ledger, apps):
+        queryset = Application.objects.filter(code__in=[app.code for app in apps]).order_by("code")
+
+        ordered = MemoryOrderedApplications(queryset, ledger=ledger, batch_size=2)
+        assert ordered.count() == 4
+        assert ordered[0:2] == [apps[1], apps[2]]
+        assert ordered[2:4] == [apps[0], apps[3]]
+
+        ordered = MemoryOrderedApplications(queryset, descending=False, ledger=ledger, batch_size=2)
+        assert ordered[0:4] == [apps[0], apps[2], apps[1], apps[3]]
+
+    def test_filtered(self, ledger, apps):
+        queryset = Application.objects.filter(code__in=[apps[0].code, apps[3].code])
+
+        ordered = MemoryOrderedApplications(queryset, ledger=ledger, batch_size=1)
+        assert ordered[0:1] == [apps[0]]
+        assert ordered[1:5] == [apps[3]]
+
+    def test_page_reads_ledger_range(self, ledger, apps):
+        queryset = Application.objects.filter(code__in=[app.code for app in apps])
+
+        with mock.patch.object(
+            ledger, "list_app_codes_by_memory", wraps=ledger.list_app_codes_by_memory
+        ) as range_read:
+            assert MemoryOrderedApplications(queryset, ledger=ledger, batch_size=1)[0:1] == [apps[1]]
+        # Only the first batch of the ledger is read for the first page
+        assert range_read.call_args_list == [mock.call(0, 1, True)]
+
+
+@pytest.mark.usefixtures("_with_wl_apps")
+def test_sync_process_specs_refreshes_quota(bk_stag_env, django_capture_on_commit_callbacks):
+    with (
+        mock.patch("paasng.platform.applications.handlers.refresh_env_resource_quota") as refresh,
+        django_capture_on_commit_callbacks(execute=True),
+    ):
+        ProcessSpecManager(bk_stag_env.wl_app).sync([ProcessTmpl(name="web", command="start web")])
+
+    refresh.delay.assert_called_once_with(bk_stag_env.pk)
@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import logging
+import random
+import string
+import time
+import uuid
+
+import pytest
+from django.db.models import Q
+from django.db.models.signals import post_delete
+from django.test.utils import override_settings
+
+from paasng.platform.applications.models import Application, ApplicationSearchTrigram
+from paasng.platform.applications.search_index import (
+    ApplicationSearchIndex,
+    get_app_search_index,
+    make_ngrams,
+    rebuild_app_trigrams,
+    search_app_ids,
+)
+from tests.utils.basic import generate_random_string
+
+logger = logging.getLogger(__name__)
+
+pytestmark = pytest.mark.django_db
+
+
+def _make_rows(count: int, seed: int = 0):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(count):
+        code = "".join(rnd.choices(string.ascii_lowercase, k=8)) + str(i)
+        rows.append((uuid.UUID(int=i + 1), code, f"应用{code[:4]}", f"App {code[:6]}"))
+    return rows
+
+
+def _make_index(rows, **kwargs) -> ApplicationSearchIndex:
+    return ApplicationSearchIndex(loader=lambda filters: rows, **kwargs)
+
+
+def _scan(rows, keyword: str):
+    keyword = keyword.lower()
+    return {app_id for app_id, *values in rows if any(keyword in v.lower() for v in values)}
+
+
+class TestMakeNgrams:
+    @pytest.mark.parametrize(
+        ("text", "expected"),
+        [("ab", set()), ("abc", {"abc"}), ("AbCd", {"abc", "bcd"}), ("蓝鲸应用", {"蓝鲸应", "鲸应用"})],
+    )
+    def test_make(self, text, expected):
+        assert make_ngrams(text) == expected
+
+
+class TestApplicationSearchIndex:
+    @pytest.fixture()
+    def rows(self):
+        return [
+            (uuid.UUID(int=1), "awesome-app", "超棒的应用", "Awesome App"),
+            (uuid.UUID(int=2), "foo", "awesome", ""),
+            (uuid.UUID(int=3), "bar", "普通应用", "Bar"),
+        ]
+
+    @pytest.mark.parametrize(
+        ("keyword", "expected"),
+        [
+            ("awesome", {1, 2}),
+            ("AWESOME-", {1}),
+            ("应用", {1, 3}),
+            ("o", {1, 2}),
+            ("not-exists", set()),
+        ],
+    )
+    def test_search(self, rows, keyword, expected):
+        index = _make_index(rows)
+        assert index.search(keyword) == {uuid.UUID(int=i) for i in expected}
+
+    def test_search_within(self, rows):
+        index = _make_index(rows)
+        assert index.search("awesome", within=[uuid.UUID(int=2), uuid.UUID(int=3)]) == {uuid.UUID(int=2)}
+        assert index.search("a", within=[uuid.UUID(int=3)]) == {uuid.UUID(int=3)}
+
+    def test_too_many_candidates(self, rows):
+        index = _make_index(rows, max_candidates=1)
+        assert index.search("awesome") is None
+        assert index.search("bar") == {uuid.UUID(int=3)}
+
+    def test_add_and_remove(self, rows):
+        index = _make_index(rows)
+        index.search("foo")
+
+        index.add(uuid.UUID(int=3), ("bar", "renamed"))
+        assert index.search("renamed") == {uuid.UUID(int=3)}
+        assert index.search("普通") == set()
+
+        index.remove(uuid.UUID(int=3))
+        assert index.search("renamed") == set()
+        assert len(index) == 2
+
+    def test_merge_keeps_old_terms(self, rows):
+        index = _make_index(rows)
+        index.search("foo")
+
+        index.add(uuid.UUID(int=2), ("renamed",), merge=True)
+        assert index.search("foo") == {uuid.UUID(int=2)}
+        assert index.search("renamed") == {uuid.UUID(int=2)}
+
+    def test_reload_changed_by_others(self, rows):
+        loaded = []
+
+        def loader(filters):
+            loaded.append(filters)
+            return rows if len(loaded) == 1 else [(uuid.UUID(int=3), "bar", "renamed-by-others", "")]
+
+        index = ApplicationSearchIndex(loader=loader)
+        assert index.search("renamed") == set()
+        assert index.search("renamed") == set()
+        assert len(loaded) == 1
+
+        # Only the changed applications are reloaded
+        ApplicationSearchIndex.publish_change(uuid.UUID(int=3))
+        ApplicationSearchIndex.publish_change(uuid.UUID(int=2))
+        assert index.search("renamed") == {uuid.UUID(int=3)}
+        assert loaded[1] == Q(id__in={uuid.UUID(int=2), uuid.UUID(int=3)})
+        # The application which is not found has been deleted
+        assert index.search("foo") == set()
+
+    def test_rebuild_when_changes_incomplete(self, rows):
+        loaded = []
+
+        def loader(filters):
+            loaded.append(filters)
+            return rows
+
+        index = ApplicationSearchIndex(loader=loader, max_sync_changes=1)
+        index.search("foo")
+
+        ApplicationSearchIndex.publish_change(uuid.UUID(int=1))
+        ApplicationSearchIndex.publish_change(uuid.UUID(int=2))
+        index.search("foo")
+        assert loaded == [Q(), Q()]
+
+
+@override_settings(APPLICATION_SEARCH_INDEX_BACKEND="memory")
+class TestSearchByCodeOrName:
+    def test_created(self, bk_app):
+        assert set(Application.objects.search_by_code_or_name(bk_app.code[2:])) == {bk_app}
+
+    def test_renamed(self, bk_app):
+        # Build the index before renaming
+        Application.objects.search_by_code_or_name(bk_app.code).count()
+
+        old_name, bk_app.name = bk_app.name, generate_random_string(12)
+        bk_app.save(update_fields=["name", "updated"])
+        assert set(Application.objects.search_by_code_or_name(bk_app.name)) == {bk_app}
+        # The old name is still in the index before committing, but it's filtered out by the queryset
+        assert set(Application.objects.search_by_code_or_name(old_name)) == set()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_renamed_by_others(self, bk_app):
+        # Another process is simulated by an index which does not receive the signals
+        other = ApplicationSearchIndex()
+        assert other.search(bk_app.code) == {bk_app.id}
+
+        # The rename views do not update the "updated" field
+        bk_app.name = generate_random_string(12)
+        bk_app.save(update_fields=["name", "name_en"])
+        assert other.search(bk_app.name) == {bk_app.id}
+
+    def test_deleted(self, bk_app, django_capture_on_commit_callbacks):
+        index = get_app_search_index()
+        assert index.search(bk_app.code) == {bk_app.id}
+        size = len(index)
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            post_delete.send(sender=Application, instance=bk_app)
+            # The deletion may be rolled back, the application is kept before committing
+            assert index.search(bk_app.code) == {bk_app.id}
+
+        for callback in callbacks:
+            callback()
+        assert len(index) == size - 1
+
+    def test_index_disabled(self, bk_app):
+        with override_settings(APPLICATION_SEARCH_INDEX_BACKEND=""):
+            assert search_app_ids(bk_app.code) is None
+            assert set(Application.objects.search_by_code_or_name(bk_app.code)) == {bk_app}
+
+
+@override_settings(APPLICATION_SEARCH_INDEX_BACKEND="db")
+class TestDBBackend:
+    def test_search(self, bk_app):
+        rebuild_app_trigrams()
+        assert set(ApplicationSearchTrigram.objects.filter(application=bk_app).values_list("trigram", flat=True)) == (
+            make_ngrams(bk_app.code) | make_ngrams(bk_app.name) | make_ngrams(bk_app.name_en)
+        )
+        assert set(Application.objects.search_by_code_or_name(bk_app.code)) == {bk_app}
+
+    def test_renamed(self, bk_app):
+        bk_app.name_en = generate_random_string(12)
+        bk_app.save()
+        assert set(search_app_ids(bk_app.name_en)) == {bk_app.id}
+
+    def test_short_keyword(self, bk_app):
+        assert search_app_ids(bk_app.code[:2]) is None
+
+
+@pytest.mark.benchmark
+class TestBenchmark:
+    """Compare the index with scanning all applications, 100k applications in total"""
+
+    def test_100k_apps(self):
+        rows = _make_rows(100_000)
+        index = _make_index(rows, max_candidates=100_000)
+
+        started_at = time.perf_counter()
+        index.build()
+        build_seconds = time.perf_counter() - started_at
+
+        keywords = [rows[i][1][2:7] for i in range(0, 100_000, 5000)] + ["app", "应用", "not-exists"]
+        permitted = [app_id for app_id, *_ in random.Random(1).sample(rows, 200)]
+
+        index_seconds, scan_seconds = 0.0, 0.0
+        for keyword in keywords:
+            started_at = time.perf_counter()
+            matched = index.search(keyword)
+            index_seconds += time.perf_counter() - started_at
+
+            started_at = time.perf_counter()
+            expected = _scan(rows, keyword)
+            scan_seconds += time.perf_counter() - started_at
+
+            assert matched == expected
+            assert index.search(keyword, within=permitted) == expected & set(permitted)
+
+        logger.info(
+            "build: %.2fs, %d searches: index %.1fms, scan %.1fms",
+            build_seconds,
+            len(keywords),
+            index_seconds * 1000,
+            scan_seconds * 1000,
+        )
+        assert index_seconds < scan_seconds
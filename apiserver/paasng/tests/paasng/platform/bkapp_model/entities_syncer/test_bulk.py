@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django_dynamic_fixture import G
+
+from paasng.platform.bkapp_model.entities import EnvVar
+from paasng.platform.bkapp_model.entities_syncer import sync_env_vars
+from paasng.platform.bkapp_model.entities_syncer.bulk import KeyedBulkSyncer
+from paasng.platform.engine.models.preset_envvars import PresetEnvVariable
+
+pytestmark = pytest.mark.django_db
+
+
+class TestKeyedBulkSyncer:
+    def test_integrated(self, bk_module):
+        unchanged = G(PresetEnvVariable, module=bk_module, environment_name="_global_", key="A", value="a")
+        changed = G(PresetEnvVariable, module=bk_module, environment_name="_global_", key="B", value="b")
+        G(PresetEnvVariable, module=bk_module, environment_name="stag", key="C", value="c")
+
+        syncer = KeyedBulkSyncer(
+            PresetEnvVariable.objects.filter(module=bk_module),
+            key_fields=["environment_name", "key"],
+            create_defaults={"module": bk_module},
+        )
+        assert syncer.get_existing_keys() == {("_global_", "A"), ("_global_", "B"), ("stag", "C")}
+
+        ret = syncer.sync(
+            {
+                ("_global_", "A"): {"value": "a"},
+                ("_global_", "B"): {"value": "b2"},
+                ("prod", "D"): {"value": "d", "tenant_id": bk_module.tenant_id},
+            }
+        )
+        assert (ret.created_num, ret.updated_num, ret.deleted_num) == (1, 2, 1)
+
+        values = {(v.environment_name, v.key): v.value for v in PresetEnvVariable.objects.filter(module=bk_module)}
+        assert values == {("_global_", "A"): "a", ("_global_", "B"): "b2", ("prod", "D"): "d"}
+        # Unchanged rows are not written
+        assert PresetEnvVariable.objects.get(pk=unchanged.pk).updated == unchanged.updated
+        assert PresetEnvVariable.objects.get(pk=changed.pk).updated > changed.updated
+
+    def test_constant_queries(self, bk_module):
+        def count_queries(size: int) -> int:
+            PresetEnvVariable.objects.filter(module=bk_module).delete()
+            for i in range(size):
+                G(PresetEnvVariable, module=bk_module, environment_name="_global_", key=f"OLD_{i}")
+            env_vars = [EnvVar(name=f"KEY_{i}", value=str(i)) for i in range(size)]
+            env_vars += [EnvVar(name=f"OLD_{i}", value="new") for i in range(size // 2)]
+
+            with CaptureQueriesContext(connection) as ctx:
+                sync_env_vars(bk_module, env_vars, [])
+            return len(ctx.captured_queries)
+
+        assert count_queries(2) == count_queries(50)
@@ -15,12 +15,22 @@
 # We undertake not to change the open source license (MIT license) applicable
 # to the current version of the project delivered to anyone in the future.
 
+from unittest import mock
+
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from paasng.platform.engine.constants import JobStatus
 from paasng.platform.engine.models import Deployment, DeployPhase, DeployPhaseTypes
 from paasng.platform.engine.models.steps import DeployStep, DeployStepMeta, StepMetaSet
-from paasng.platform.engine.phases_steps.steps import DeployStepPicker, update_step_by_line
+from paasng.platform.engine.phases_steps.step_meta_data import DEFAULT_SET
+from paasng.platform.engine.phases_steps.steps import (
+    DeployStepPicker,
+    StepTransitionTracker,
+    compile_transitions,
+    update_step_by_line,
+)
 from paasng.platform.modules.helpers import ModuleRuntimeBinder
 from paasng.platform.modules.models import AppSlugBuilder, AppSlugRunner
 
@@ -132,33 +142,34 @@ class TestDeployStepPicker:
         assert meta_set.is_default
 
 
-class TestUpdateStepByLine:
-    """Test update_step_by_line function"""
+@pytest.fixture()
+def phase_factory(bk_deployment):
+    """Return a factory function to create a phase"""
 
-    @pytest.fixture()
-    def phase_factory(self, bk_deployment):
-        """Return a factory function to create a phase"""
-
-        def _make(phase_type: DeployPhaseTypes, pattern_maps: dict):
-            phase = DeployPhase.objects.create(
-                type=phase_type.value,
-                engine_app=bk_deployment.get_engine_app(),
-                deployment=bk_deployment,
-                tenant_id=bk_deployment.tenant_id,
+    def _make(phase_type: DeployPhaseTypes, pattern_maps: dict):
+        phase = DeployPhase.objects.create(
+            type=phase_type.value,
+            engine_app=bk_deployment.get_engine_app(),
+            deployment=bk_deployment,
+            tenant_id=bk_deployment.tenant_id,
+        )
+
+        for step_name, patterns in pattern_maps.items():
+            meta = DeployStepMeta.objects.create(
+                phase=phase_type.value,
+                name=step_name,
+                started_patterns=patterns[0],
+                finished_patterns=patterns[1],
             )
 
-            for step_name, patterns in pattern_maps.items():
-                meta = DeployStepMeta.objects.create(
-                    phase=phase_type.value,
-                    name=step_name,
-                    started_patterns=patterns[0],
-                    finished_patterns=patterns[1],
-                )
+            DeployStep.objects.create(name=step_name, phase=phase, meta=meta)
+        return phase
+
+    return _make
 
-                DeployStep.objects.create(name=step_name, phase=phase, meta=meta)
-            return phase
 
-        return _make
+class TestUpdateStepByLine:
+    """Test update_step_by_line function"""
 
     @pytest.mark.parametrize(
         ("lines", "pattern_maps", "expected"),
@@ -253,3 +264,119 @@ class TestUpdateStepByLine:
             steps_status[x["name"]] = x["status"]
 
         assert steps_status == expected
+
+
+class TestStepTransitionTracker:
+    @pytest.fixture()
+    def phase(self, phase_factory):
+        return phase_factory(
+            DeployPhaseTypes.BUILD,
+            {
+                "aa": (["xxx"], ["yyy"]),
+                "bb": (["qqq"], ["www"]),
+            },
+        )
+
+    def test_feed(self, phase):
+        tracker = StepTransitionTracker(phase)
+        with mock.patch(
+            "paasng.platform.engine.phases_steps.steps.RedisChannelStream.from_deployment_id"
+        ) as from_deployment_id:
+            for line in ["xxx", "yyy", "qqq", "xxx"]:
+                tracker.feed(line)
+
+        # A single stream handle is used for all the updates
+        assert from_deployment_id.call_count == 1
+        assert from_deployment_id.return_value.write_event.call_count == 3
+        assert dict(phase.steps.values_list("name", "status")) == {"aa": "successful", "bb": "pending"}
+        assert not tracker.finished
+
+        tracker.feed("www")
+        assert tracker.finished
+
+    def test_completed_steps_are_skipped(self, phase):
+        phase.steps.filter(name="aa").update(status=JobStatus.SUCCESSFUL.value)
+
+        tracker = StepTransitionTracker(phase)
+        assert {t.step_name for t in tracker._transitions} == {"bb"}
+
+    def test_compiled_patterns_are_shared(self, phase):
+        compile_transitions.cache_clear()
+        StepTransitionTracker(phase)
+        StepTransitionTracker(phase)
+        assert compile_transitions.cache_info().hits == 1
+
+
+class CountingRegex:
+    """Wrap a compiled pattern to count the evaluations"""
+
+    def __init__(self, regex, counter: list):
+        self.regex = regex
+        self.counter = counter
+
+    def search(self, text: str):
+        self.counter.append(1)
+        return self.regex.search(text)
+
+
+class TestStepTransitionTrackerReplay:
+    """Replay a 50k-line buildpack log with the steps of the default step set"""
+
+    line_count = 50000
+
+    @pytest.fixture()
+    def phase(self, phase_factory):
+        metas = [m for m in DEFAULT_SET if m.phase == DeployPhaseTypes.BUILD.value]
+        return phase_factory(
+            DeployPhaseTypes.BUILD,
+            {m.name: (m.started_patterns or [], m.finished_patterns or []) for m in metas},
+        )
+
+    def make_log(self) -> list[str]:
+        milestones = [
+            "-----> Downloading app source code\n",
+            "-----> Restoring cache...\n",
+            "-----> Compiling app...\n",
+            "-----> Discovering process types\n",
+            "-----> Compiled slug size is 120M\n",
+            "-----> Checking for changes inside the cache directory...\n",
+            "-----> Done: Uploaded cache\n",
+        ]
+        interval = self.line_count // len(milestones)
+        lines = []
+        for i in range(self.line_count):
+            if i % interval == 0 and i // interval < len(milestones):
+                lines.append(milestones[i // interval])
+            else:
+                lines.append(f"       Collecting package-{i}==1.0.{i % 10} (from -r requirements.txt (line {i}))\n")
+        return lines
+
+    def test_replay(self, phase):
+        lines = self.make_log()
+        evaluations: list = []
+
+        def counting_compile(items):
+            return tuple(t._replace(regex=CountingRegex(t.regex, evaluations)) for t in compile_transitions(items))
+
+        with mock.patch("paasng.platform.engine.phases_steps.steps.compile_transitions", side_effect=counting_compile):
+            tracker = StepTransitionTracker(phase)
+        transition_count = len(tracker._transitions)
+
+        with (
+            CaptureQueriesContext(connection) as queries,
+            mock.patch("paasng.platform.engine.phases_steps.steps.RedisChannelStream.from_deployment_id"),
+        ):
+            for line in lines:
+                tracker.feed(line)
+
+        assert set(phase.steps.values_list("status", flat=True)) == {JobStatus.SUCCESSFUL.value}
+        assert tracker.finished
+        # Only the status updates hit the database, 2 transitions for each of the 6 steps
+        assert len(queries) <= 12
+        # The patterns of completed steps are dropped, instead of evaluating all of them for every line
+        assert len(evaluations) < len(lines) * transition_count
+
+        evaluations.clear()
+        for line in lines[:1000]:
+            tracker.feed(line)
+        assert not evaluations
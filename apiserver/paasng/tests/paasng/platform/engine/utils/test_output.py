@@ -54,12 +54,19 @@ class TestMixStream:
         bps = RedisWithModelStream(build_proc.output_stream, mock.MagicMock())
         bps.write_message("message")
         bps.write_message("write \n message test")
-        assert build_proc.output_stream.lines.count() == 2
-        assert list(build_proc.output_stream.lines.values_list("line", flat=True)) == [
+        assert build_proc.output_stream.count_lines() == 2
+        assert [log.line for log in build_proc.output_stream.iter_lines()] == [
             "message\n",
             "write \n message test\n",
         ]
 
+    def test_on_message(self, build_proc):
+        on_message = mock.MagicMock()
+        bps = RedisWithModelStream(build_proc.output_stream, mock.MagicMock(), on_message=on_message)
+        bps.write_message("message")
+        bps.write_title("title")
+        on_message.assert_called_once_with("message")
+
     def test_write_title(self, build_proc):
         RedisWithModelStream(build_proc, mock.MagicMock()).write_title("title")
-        assert build_proc.output_stream.lines.count() == 0, "title should not be saved"
+        assert build_proc.output_stream.count_lines() == 0, "title should not be saved"
@@ -316,3 +316,41 @@ class TestModuleEnvDeployInspector:
         inspector = ModuleEnvDeployInspector(bk_user, env)
         assert [item.action_name for item in inspector.perform().failed_conditions] == [c.value for c in expected]
         assert inspector.all_matched is not len(expected)
+
+    def test_cache_matched_repo_access(self, bk_user, bk_module, git_client):
+        bk_module.source_type = get_sourcectl_names().GitLab
+        bk_module.save()
+        profile = G(UserProfile, user=bk_user)
+        G(Oauth2TokenHolder, user=profile, provider=get_sourcectl_names().GitLab)
+
+        env = bk_module.get_envs("stag")
+        for _ in range(2):
+            ModuleEnvDeployInspector(bk_user, env).perform()
+        assert git_client.get_project_info.call_count == 1
+
+        # Updating the module invalidates the cached result
+        bk_module.save()
+        ModuleEnvDeployInspector(bk_user, bk_module.get_envs("stag")).perform()
+        assert git_client.get_project_info.call_count == 2
+
+    def test_env_protection_not_cached(self, bk_user, bk_module):
+        application = bk_module.application
+        env = bk_module.get_envs("stag")
+        EnvRoleProtection.objects.create(
+            allowed_role=ApplicationRole.DEVELOPER.value, module_env=env, operation=EnvRoleOperation.DEPLOY.value
+        )
+        remove_user_all_roles(application.code, bk_user.username)
+        add_role_members(application.code, ApplicationRole.DEVELOPER, bk_user.username)
+
+        inspector = ModuleEnvDeployInspector(bk_user, env)
+        inspector.conditions = [EnvProtectionCondition(bk_user, env)]
+        assert not inspector.perform().failed_conditions
+
+        # The revoked role takes effect at once
+        remove_user_all_roles(application.code, bk_user.username)
+        add_role_members(application.code, ApplicationRole.OPERATOR, bk_user.username)
+        inspector = ModuleEnvDeployInspector(bk_user, env)
+        inspector.conditions = [EnvProtectionCondition(bk_user, env)]
+        assert [item.action_name for item in inspector.perform().failed_conditions] == [
+            EnvProtectionCondition.action_name
+        ]
@@ -278,6 +278,15 @@ class TestGithubRepoController:
         controller = GitHubRepoController("", github_repo_url, user_credentials)
         assert controller.read_file("/fake_path", version) == b"file content..."
 
+    def test_list_file_hashes(self, client, github_repo_url, user_credentials, version):
+        client.repo_list_tree.return_value = [
+            {"path": "app", "type": "tree", "sha": "t1"},
+            {"path": "app/main.py", "type": "blob", "sha": "b1"},
+        ]
+        controller = GitHubRepoController("", github_repo_url, user_credentials)
+        assert controller.list_file_hashes(version) == {"app/main.py": "b1"}
+        client.repo_list_tree.assert_called_once_with(controller.project, ref="master")
+
 
 class TestGiteebRepoController:
     @pytest.fixture()
@@ -385,6 +394,15 @@ class TestGiteebRepoController:
         controller = GiteeRepoController("", gitee_repo_url, user_credentials)
         assert controller.read_file("/fake_path", version) == b"file content..."
 
+    def test_list_file_hashes(self, client, gitee_repo_url, user_credentials, version):
+        client.repo_list_tree.return_value = [
+            {"path": "app", "type": "tree", "sha": "t1"},
+            {"path": "app/main.py", "type": "blob", "sha": "b1"},
+        ]
+        controller = GiteeRepoController("", gitee_repo_url, user_credentials)
+        assert controller.list_file_hashes(version) == {"app/main.py": "b1"}
+        client.repo_list_tree.assert_called_once_with(controller.project, ref="master")
+
 
 class TestControllerUtils:
     @pytest.fixture()
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from paasng.platform.templates.cache import TemplateSourceCache
+from paasng.platform.templates.constants import TemplateType
+from paasng.platform.templates.models import Template
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class Fetcher:
+    """Download a fake template source with given files"""
+
+    def __init__(self, files: dict):
+        self.files = files
+        self.calls = 0
+
+    def __call__(self) -> Path:
+        self.calls += 1
+        path = Path(tempfile.mkdtemp())
+        for name, content in self.files.items():
+            (path / name).parent.mkdir(parents=True, exist_ok=True)
+            (path / name).write_text(content)
+        return path
+
+
+@pytest.fixture()
+def template():
+    return Template(name="dj2_with_auth", type=TemplateType.NORMAL, blob_url="s3://tmpls/dj2_with_auth.tar.gz")
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    return TemplateSourceCache(tmp_path / "cache", max_bytes=1024, vcs_ttl=600, clock=FakeClock())
+
+
+class TestTemplateSourceCache:
+    def test_checkout_hit(self, cache, template):
+        fetch = Fetcher({"app.py-tpl": "{{ app_code }}", "bin/post-compile": "echo"})
+
+        for _ in range(3):
+            with cache.checkout(template, fetch) as source_path:
+                assert (source_path / "app.py-tpl").read_text() == "{{ app_code }}"
+                assert (source_path / "bin/post-compile").exists()
+            # The private copy is removed on exit
+            assert not source_path.exists()
+
+        assert fetch.calls == 1
+        stats = cache.stats()
+        assert (stats.hits, stats.misses) == (2, 1)
+        assert stats.hit_rate == pytest.approx(2 / 3)
+
+    def test_checkout_copy_is_isolated(self, cache, template):
+        fetch = Fetcher({"app.py": "print()"})
+        with cache.checkout(template, fetch) as source_path:
+            (source_path / "app.py").unlink()
+            (source_path / "extra.py").write_text("")
+
+        with cache.checkout(template, fetch) as source_path:
+            assert sorted(p.name for p in source_path.iterdir()) == ["app.py"]
+
+    def test_key_changes_with_source(self, cache, template):
+        key = cache.get_key(template)
+        template.blob_url = "s3://tmpls/dj2_with_auth_v2.tar.gz"
+        assert cache.get_key(template) != key
+
+    def test_vcs_template_expires(self, cache):
+        template = Template(
+            name="bk-saas-plugin-python", type=TemplateType.PLUGIN, repo_type="github", repo_url="http://x/y.git"
+        )
+        key = cache.get_key(template)
+        cache.clock.now += 300
+        assert cache.get_key(template) == key
+        cache.clock.now += 600
+        assert cache.get_key(template) != key
+
+    def test_evict_least_recently_used(self, cache):
+        templates = [Template(name=f"tmpl-{i}", type=TemplateType.NORMAL, blob_url=f"file:///{i}") for i in range(3)]
+        for t in templates:
+            cache.warm_up(t, Fetcher({"data": "x" * 400}))
+
+        # Only 2 entries fit in 1024 bytes, the first one is evicted
+        keys = {key for key, _, _ in cache.list_entries()}
+        assert keys == {cache.get_key(templates[1]), cache.get_key(templates[2])}
+
+    def test_concurrent_checkout_fetch_once(self, cache, template):
+        fetch = Fetcher({"app.py": "print()"})
+
+        def render(_):
+            with cache.checkout(template, fetch) as source_path:
+                return (source_path / "app.py").read_text()
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(render, range(16)))
+
+        assert results == ["print()"] * 16
+        assert fetch.calls == 1
+
+    def test_disabled(self, tmp_path, template):
+        cache = TemplateSourceCache(tmp_path / "cache", max_bytes=0, vcs_ttl=600)
+        fetch = Fetcher({"app.py": "print()"})
+        for _ in range(2):
+            with cache.checkout(template, fetch) as source_path:
+                assert (source_path / "app.py").exists()
+            assert not source_path.exists()
+
+        assert fetch.calls == 2
+        assert not (tmp_path / "cache").exists()
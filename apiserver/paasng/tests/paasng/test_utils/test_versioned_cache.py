@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+from unittest import mock
+
+import pytest
+from django.db import transaction
+
+from paasng.utils.versioned_cache import VersionedCache
+from tests.utils.basic import generate_random_string
+
+
+@pytest.fixture()
+def build():
+    return mock.MagicMock(side_effect=lambda key: object())
+
+
+@pytest.fixture()
+def versioned_cache(build) -> VersionedCache:
+    return VersionedCache(generate_random_string(8), build)
+
+
+class TestVersionedCache:
+    def test_get_cached(self, versioned_cache, build):
+        assert versioned_cache.get("foo") is versioned_cache.get("foo")
+        assert versioned_cache.get("foo") is not versioned_cache.get("bar")
+        assert build.call_count == 2
+
+    def test_bump_version(self, versioned_cache, build):
+        value = versioned_cache.get("foo")
+        bar = versioned_cache.get("bar")
+
+        versioned_cache.bump_version("foo")
+
+        assert versioned_cache.get("foo") is not value
+        assert versioned_cache.get("bar") is bar
+
+    def test_bump_version_of_all_keys(self, build):
+        versioned_cache = VersionedCache(generate_random_string(8), build, version_per_key=False)
+        other = VersionedCache(versioned_cache.name, build, version_per_key=False)
+        value = other.get("foo")
+
+        versioned_cache.bump_version()
+
+        assert other.get("foo") is not value
+
+    def test_shared_by_processes(self, versioned_cache, build):
+        # Another process is simulated by an instance with the same name
+        other = VersionedCache(versioned_cache.name, build)
+        value = other.get()
+
+        versioned_cache.bump_version()
+
+        assert other.get() is not value
+
+    @pytest.mark.django_db(transaction=True)
+    def test_bump_version_on_commit(self, versioned_cache, build):
+        other = VersionedCache(versioned_cache.name, build)
+        value = other.get()
+
+        with transaction.atomic():
+            versioned_cache.bump_version_on_commit()
+            assert other.get() is value
+        assert other.get() is not value
+
+    def test_clear_all(self, versioned_cache, build):
+        value = versioned_cache.get()
+
+        VersionedCache.clear_all()
+
+        assert versioned_cache.get() is not value
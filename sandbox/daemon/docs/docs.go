@@ -336,7 +336,7 @@ const docTemplate = `{
         },
         "/files/upload": {
             "post": {
-                "description": "Upload a file to the specified destination path",
+                "description": "Upload a file to the specified destination path. When offset is given, the content is appended to the existing file, whose size must be equal to the offset, otherwise 409 is returned",
                 "consumes": [
                     "multipart/form-data"
                 ],
@@ -362,6 +362,12 @@ const docTemplate = `{
                         "name": "destPath",
                         "in": "formData",
                         "required": true
+                    },
+                    {
+                        "type": "integer",
+                        "description": "Resume offset, the current size of the destination file",
+                        "name": "offset",
+                        "in": "formData"
                     }
                 ],
                 "responses": {
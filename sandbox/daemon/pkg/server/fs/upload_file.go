@@ -2,21 +2,30 @@ package fs
 
 import (
 	"errors"
+	"fmt"
+	"io"
+	"mime/multipart"
+	"os"
+	"strconv"
 
 	"github.com/gin-gonic/gin"
 
 	"github.com/TencentBlueking/blueking-paas/sandbox/daemon/pkg/server/httputil"
 )
 
+// errOffsetMismatch is returned when the resume offset does not match the size of the existing file
+var errOffsetMismatch = errors.New("offset mismatch")
+
 // UploadFile godoc
 //
 //	@Summary		Upload a file
-//	@Description	Upload a file to the specified destination path
+//	@Description	Upload a file to the specified destination path. When offset is given, the content is appended to the existing file, whose size must be equal to the offset, otherwise 409 is returned
 //	@Tags			files
 //	@Accept			multipart/form-data
 //	@Produce		json
 //	@Param			file		formData	file	true	"File to upload"
 //	@Param			destPath	formData	string	true	"Destination path for the uploaded file"
+//	@Param			offset		formData	integer	false	"Resume offset, the current size of the destination file"
 //	@Success		204
 //	@Router			/files/upload [post]
 //
@@ -28,16 +37,67 @@ func UploadFile(c *gin.Context) {
 		return
 	}
 
+	var offset int64
+	if raw := c.PostForm("offset"); raw != "" {
+		parsed, err := strconv.ParseInt(raw, 10, 64)
+		if err != nil || parsed < 0 {
+			httputil.BadRequestResponse(c, fmt.Errorf("invalid offset: %s", raw))
+			return
+		}
+		offset = parsed
+	}
+
 	file, err := c.FormFile("file")
 	if err != nil {
 		httputil.BadRequestResponse(c, err)
 		return
 	}
 
-	if err = c.SaveUploadedFile(file, dst); err != nil {
+	if offset == 0 {
+		err = c.SaveUploadedFile(file, dst)
+	} else {
+		err = appendUploadedFile(file, dst, offset)
+	}
+	if err != nil {
+		if errors.Is(err, errOffsetMismatch) {
+			httputil.ConflictResponse(c, err)
+			return
+		}
 		httputil.BadRequestResponse(c, err)
 		return
 	}
 
 	httputil.NoContentResponse(c)
 }
+
+// appendUploadedFile appends the uploaded file to dst, the size of dst must be equal to offset
+func appendUploadedFile(file *multipart.FileHeader, dst string, offset int64) error {
+	src, err := file.Open()
+	if err != nil {
+		return err
+	}
+	defer src.Close() // nolint
+
+	out, err := os.OpenFile(dst, os.O_WRONLY, 0)
+	if err != nil {
+		if os.IsNotExist(err) {
+			return fmt.Errorf("%w: destination file does not exist", errOffsetMismatch)
+		}
+		return err
+	}
+	defer out.Close() // nolint
+
+	info, err := out.Stat()
+	if err != nil {
+		return err
+	}
+	if info.Size() != offset {
+		return fmt.Errorf("%w: current size is %d, got offset %d", errOffsetMismatch, info.Size(), offset)
+	}
+
+	if _, err = out.Seek(offset, io.SeekStart); err != nil {
+		return err
+	}
+	_, err = io.Copy(out, src)
+	return err
+}
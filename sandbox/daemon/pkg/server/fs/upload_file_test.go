@@ -134,6 +134,61 @@ var _ = Describe("UploadFile", func() {
 		})
 	})
 
+	Context("resume upload", func() {
+		createResumeRequest := func(destPath, offset, content string) *http.Request {
+			body := &bytes.Buffer{}
+			writer := multipart.NewWriter(body)
+
+			Expect(writer.WriteField("destPath", destPath)).To(Succeed())
+			Expect(writer.WriteField("offset", offset)).To(Succeed())
+
+			part, err := writer.CreateFormFile("file", "part.bin")
+			Expect(err).NotTo(HaveOccurred())
+			_, err = io.WriteString(part, content)
+			Expect(err).NotTo(HaveOccurred())
+			Expect(writer.Close()).To(Succeed())
+
+			req, _ := http.NewRequest("POST", url, body)
+			req.Header.Set("Content-Type", writer.FormDataContentType())
+			return req
+		}
+
+		It("should append content at offset", func() {
+			destPath := filepath.Join(tmpDir, "partial.txt")
+			Expect(os.WriteFile(destPath, []byte("hello "), 0o644)).To(Succeed())
+
+			router.ServeHTTP(w, createResumeRequest(destPath, "6", "world"))
+
+			Expect(w.Code).To(Equal(http.StatusNoContent))
+			data, err := os.ReadFile(destPath)
+			Expect(err).NotTo(HaveOccurred())
+			Expect(string(data)).To(Equal("hello world"))
+		})
+
+		It("should reject offset mismatch", func() {
+			destPath := filepath.Join(tmpDir, "partial.txt")
+			Expect(os.WriteFile(destPath, []byte("hello "), 0o644)).To(Succeed())
+
+			router.ServeHTTP(w, createResumeRequest(destPath, "3", "world"))
+
+			Expect(w.Code).To(Equal(http.StatusConflict))
+			Expect(w.Body.String()).To(ContainSubstring("current size is 6"))
+		})
+
+		It("should reject resuming a missing file", func() {
+			router.ServeHTTP(w, createResumeRequest(filepath.Join(tmpDir, "missing.txt"), "6", "world"))
+
+			Expect(w.Code).To(Equal(http.StatusConflict))
+		})
+
+		It("should reject invalid offset", func() {
+			router.ServeHTTP(w, createResumeRequest(filepath.Join(tmpDir, "file.txt"), "-1", "world"))
+
+			Expect(w.Code).To(Equal(http.StatusBadRequest))
+			Expect(w.Body.String()).To(ContainSubstring("invalid offset"))
+		})
+	})
+
 	Context("parameter validation", func() {
 		It("should reject request without destPath parameter", func() {
 			body := &bytes.Buffer{}
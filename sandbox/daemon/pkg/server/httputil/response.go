@@ -60,6 +60,11 @@ func RequestTimeoutResponse(c *gin.Context, err error) {
 	c.AbortWithError(http.StatusRequestTimeout, err) // nolint
 }
 
+// ConflictResponse sends a conflict (409) response
+func ConflictResponse(c *gin.Context, err error) {
+	c.AbortWithError(http.StatusConflict, err) // nolint
+}
+
 // PayloadTooLargeResponse sends a payload too large (413) response
 func PayloadTooLargeResponse(c *gin.Context, err error) {
 	c.AbortWithError(http.StatusRequestEntityTooLarge, err) // nolint
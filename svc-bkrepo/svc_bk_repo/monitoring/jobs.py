@@ -16,13 +16,21 @@
 # to the current version of the project delivered to anyone in the future.
 
 import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
 
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
 from paas_service.models import ServiceInstance
 
+from svc_bk_repo.monitoring.metrics import quota_collect_duration_gauge
 from svc_bk_repo.monitoring.models import RepoQuotaStatistics
 from svc_bk_repo.shared.scheduler import scheduler
-from svc_bk_repo.vendor.helper import get_repo_manager
+from svc_bk_repo.vendor.helper import BKGenericRepoManager, get_repo_manager
+from svc_bk_repo.vendor.models import RepoQuota
 
 logger = logging.getLogger(__name__)
 
@@ -31,23 +39,61 @@ logger = logging.getLogger(__name__)
 def update_bkrepo_quota_statistics():
     """Update bkrepo quota statistics periodically"""
     logger.info("Starting update bkrepo quota.")
-    for instance in ServiceInstance.objects.all():
-        manager = get_repo_manager(instance.plan_id)
-
-        credentials = instance.get_credentials()
-        private_bucket = credentials["private_bucket"]
-        public_bucket = credentials["public_bucket"]
-        private_quota = manager.get_repo_quota(private_bucket)
-        public_quota = manager.get_repo_quota(public_bucket)
-
-        RepoQuotaStatistics.objects.update_or_create(
-            instance=instance,
-            repo_name=private_bucket,
-            defaults={"max_size": private_quota.max_size, "used": private_quota.used},
-        )
-        RepoQuotaStatistics.objects.update_or_create(
-            instance=instance,
-            repo_name=public_bucket,
-            defaults={"max_size": public_quota.max_size, "used": public_quota.used},
-        )
-    logger.info("bkrepo quota updated.")
+    started_at = time.perf_counter()
+
+    instances = list(ServiceInstance.objects.all())
+    # 同一个 Plan 的实例共用一个 manager（及其会话），在主线程中提前准备好，避免工作线程访问数据库
+    managers = {plan_id: get_repo_manager(plan_id) for plan_id in {i.plan_id for i in instances}}
+
+    quotas: Dict[Tuple[int, str], RepoQuota] = {}
+    with ThreadPoolExecutor(max_workers=settings.BKREPO_COLLECT_MAX_WORKERS) as executor:
+        futures = [
+            (instance, executor.submit(_fetch_instance_quotas, managers[instance.plan_id], instance))
+            for instance in instances
+        ]
+        for instance, future in futures:
+            try:
+                for repo_name, quota in future.result():
+                    quotas[(instance.pk, repo_name)] = quota
+            except Exception:
+                logger.exception("Failed to get bkrepo quota of instance %s", instance.uuid)
+
+    _save_quota_statistics(quotas)
+
+    duration = time.perf_counter() - started_at
+    quota_collect_duration_gauge.set(duration)
+    logger.info("bkrepo quota updated, %d repos in %.2f seconds.", len(quotas), duration)
+
+
+def _fetch_instance_quotas(manager: BKGenericRepoManager, instance: ServiceInstance) -> List[Tuple[str, RepoQuota]]:
+    """查询实例下所有仓库的配额"""
+    credentials = instance.get_credentials()
+    return [
+        (bucket, manager.get_repo_quota(bucket))
+        for bucket in (credentials["private_bucket"], credentials["public_bucket"])
+    ]
+
+
+def _save_quota_statistics(quotas: Dict[Tuple[int, str], RepoQuota]):
+    """批量写入仓库配额统计，已存在的记录更新，其余新建"""
+    now = timezone.now()
+    existing = {(stat.instance_id, stat.repo_name): stat for stat in RepoQuotaStatistics.objects.all()}
+
+    to_update, to_create = [], []
+    for (instance_id, repo_name), quota in quotas.items():
+        # 未设置配额时 max_size 为 inf, 入库时记为 null
+        max_size = None if math.isinf(quota.max_size) else quota.max_size
+        stat = existing.get((instance_id, repo_name))
+        if stat is None:
+            to_create.append(
+                RepoQuotaStatistics(
+                    instance_id=instance_id, repo_name=repo_name, max_size=max_size, used=quota.used, updated=now
+                )
+            )
+        else:
+            stat.max_size, stat.used, stat.updated = max_size, quota.used, now
+            to_update.append(stat)
+
+    with transaction.atomic():
+        RepoQuotaStatistics.objects.bulk_update(to_update, ["max_size", "used", "updated"], batch_size=500)
+        RepoQuotaStatistics.objects.bulk_create(to_create, batch_size=500)
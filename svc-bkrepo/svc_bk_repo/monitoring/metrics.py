@@ -17,7 +17,7 @@
 
 import datetime
 
-from prometheus_client import Counter
+from prometheus_client import Counter, Gauge
 from prometheus_client.core import CollectorRegistry, GaugeMetricFamily
 
 global_registry = CollectorRegistry()
@@ -29,6 +29,13 @@ auto_expand_counter = Counter(
     ["service_id", "instance_id", "repo_name"],
 )
 
+# 仅在执行采集任务的 worker 中更新, 多进程模式下取存活 worker 中的最大值, 避免每个 worker 各暴露一个样本
+quota_collect_duration_gauge = Gauge(
+    "bkrepo_quota_collect_duration_seconds",
+    "Duration of the last bkrepo quota statistics collection",
+    multiprocess_mode="livemax",
+)
+
 
 class BKRepoMetricsCollector:
     def collect(self):
@@ -251,6 +251,8 @@ METRIC_CLIENT_TOKEN_DICT = {
 }
 
 BKREPO_COLLECT_INTERVAL_MINUTES = env.int("BKREPO_COLLECT_INTERVAL_MINUTES", default=30)
+# 采集仓库配额时的最大并发数
+BKREPO_COLLECT_MAX_WORKERS = env.int("BKREPO_COLLECT_MAX_WORKERS", default=8)
 
 SENTRY_DSN = env.str("SENTRY_DSN", default="")
 
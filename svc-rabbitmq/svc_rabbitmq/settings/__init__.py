@@ -280,6 +280,10 @@ RABBITMQ_DEFAULT_DEAD_LETTER_EXCHANGE_DURABLE = env.bool("RABBITMQ_DEFAULT_DEAD_
 RABBITMQ_DEFAULT_DEAD_LETTER_QUEUE = env.str("RABBITMQ_DEFAULT_DEAD_LETTER_QUEUE", "dlx.queue")
 RABBITMQ_DEFAULT_DEAD_LETTER_QUEUE_DURABLE = env.bool("RABBITMQ_DEFAULT_DEAD_LETTER_QUEUE_DURABLE", False)
 RABBITMQ_MANAGEMENT_API_CACHE_SECONDS = env.int("RABBITMQ_MANAGEMENT_API_CACHE_SECONDS", 3)
+# 巡检任务对单个集群管理接口的最大并发请求数
+RABBITMQ_MANAGEMENT_API_MAX_INFLIGHT = env.int("RABBITMQ_MANAGEMENT_API_MAX_INFLIGHT", 4)
+# 巡检任务分页拉取管理接口数据时的分页大小
+RABBITMQ_MANAGEMENT_API_PAGE_SIZE = env.int("RABBITMQ_MANAGEMENT_API_PAGE_SIZE", 500)
 RABBITMQ_HA_POLICY_ENABLED = env.bool("RABBITMQ_HA_POLICY_ENABLED", True)
 
 MODEL_TAG_CLUSTER = "cluster"
@@ -17,14 +17,14 @@
 
 import logging
 from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 from django.conf import settings
 from django.core.management import call_command
 from paas_service.models import ServiceInstance
-from vendor.client import Client
-from vendor.exceptions import ResourceNotFound
+from vendor.client import Client, cluster_clients
 from vendor.helper import InstanceHelper
 from vendor.models import Cluster
 
@@ -65,6 +65,19 @@ class InstanceResult(ClusterResult):
         return labels + ["bk_instance", "vhost"]
 
 
+def group_instances_by_cluster() -> "Dict[int, Dict[str, ServiceInstance]]":
+    """将实例按集群分组，组内以 vhost 为键"""
+    grouped_instances: "Dict[int, Dict[str, ServiceInstance]]" = defaultdict(dict)
+    for i in ServiceInstance.objects.filter(to_be_deleted=False):
+        try:
+            helper = InstanceHelper(i)
+            credentials = helper.get_credentials()
+            grouped_instances[helper.get_cluster_id()][credentials.vhost] = i
+        except Exception:
+            logger.exception("parse instance %s failed", i.uuid)
+    return grouped_instances
+
+
 class CronCheckClustersAlive(Task):
     @classmethod
     def apply(cls) -> "Dict[str, CheckClusterAlive.Result]":
@@ -85,7 +98,7 @@ class CheckClusterAlive(Task):
     def apply(cls, cluster: "Cluster", virtual_host: "str" = "/") -> "CheckClusterAlive.Result":
         """check cluster is alive in vhost"""
         logger.debug("checking cluster %s if is alive", cluster)
-        client = Client.from_cluster(cluster)
+        client = cluster_clients.get(cluster)
         ok = None
         try:
             ok = client.alive(virtual_host)
@@ -95,39 +108,91 @@ class CheckClusterAlive(Task):
         return cls.Result(cluster_id=cluster.pk, ok=ok)
 
 
-class CheckInstanceAlive(Task):
+class CheckClusterInstances(Task):
+    """检查同一集群下的实例，每个集群只拉取一次管理接口数据，再在本地按 vhost 拆分结果"""
+
+    # 单个实例的检查需要请求管理接口时，在线程池中并发检查，线程数不超过集群的最大并发请求数
+    concurrent = False
+
+    @classmethod
+    def scrape(cls, client: "Client") -> "Any":
+        """拉取整个集群的数据"""
+        return None
+
+    @classmethod
+    def check(
+        cls, client: "Client", cluster_id: "int", instance: "ServiceInstance", vhost: "str", scraped: "Any"
+    ) -> "Optional[InstanceResult]":
+        """根据集群数据生成单个实例的检查结果，返回 None 表示没有结果"""
+        raise NotImplementedError
+
+    @classmethod
+    def apply(cls, cluster_id: "int", instances: "Dict[str, ServiceInstance]") -> "Dict[str, InstanceResult]":
+        logger.debug("checking %d rabbitmq instances of cluster %s", len(instances), cluster_id)
+        client = cluster_clients.get(Cluster.objects.get(pk=cluster_id))
+        scraped = cls.scrape(client)
+
+        def check(item: "Tuple[str, ServiceInstance]") -> "Optional[InstanceResult]":
+            vhost, instance = item
+            try:
+                return cls.check(client, cluster_id, instance, vhost, scraped)
+            except Exception:
+                logger.exception("check instance %s failed", instance.uuid)
+                return None
+
+        max_workers = min(settings.RABBITMQ_MANAGEMENT_API_MAX_INFLIGHT or 1, len(instances))
+        if cls.concurrent and max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                checked = list(executor.map(check, instances.items()))
+        else:
+            checked = [check(item) for item in instances.items()]
+
+        results = {}
+        for instance, result in zip(instances.values(), checked, strict=True):
+            if result is not None:
+                results[str(instance.uuid)] = result
+        return results
+
+
+class CheckInstanceAlive(CheckClusterInstances):
     @dataclass
     class Result(InstanceResult):
         ok: "bool"
 
+    # aliveness-test 需要在 vhost 内真实收发消息，无法批量检查，各 vhost 并发检查
+    concurrent = True
+
     @classmethod
-    def apply(cls, instance: "ServiceInstance") -> "CheckInstanceAlive.Result":
+    def check(
+        cls, client: "Client", cluster_id: "int", instance: "ServiceInstance", vhost: "str", scraped: "Any"
+    ) -> "CheckInstanceAlive.Result":
         """check instance vhost if is available"""
-        logger.debug("checking rabbitmq instance %s if is alive", instance)
-        helper = InstanceHelper(instance)
-        cluster = helper.get_cluster()
-        credentials = helper.get_credentials()
-        result = CheckClusterAlive.apply(cluster, credentials.vhost)
-        return cls.Result(instance_id=instance.pk, cluster_id=result.cluster_id, vhost=credentials.vhost, ok=result.ok)
+        ok = None
+        try:
+            ok = client.alive(vhost)
+        except Exception:
+            logger.exception("check instance %s alive failed", instance.uuid)
+
+        return cls.Result(instance_id=instance.pk, cluster_id=cluster_id, vhost=vhost, ok=ok)
 
 
 class CheckInstancesCronTask(Task):
-    task: "Task"
+    task: "CheckClusterInstances"
     name: "str"
 
     @classmethod
     def apply(cls):
         logger.info("checking instances task %s", cls.name)
         tasks = []
-        for i in ServiceInstance.objects.filter(to_be_deleted=False):
-            tasks.append((i, cls.task.apply_async(i)))
+        for cluster_id, instances in group_instances_by_cluster().items():
+            tasks.append((cluster_id, cls.task.apply_async(cluster_id, instances)))
 
         results = {}
-        for i, t in tasks:
+        for cluster_id, t in tasks:
             try:
-                results[str(i.uuid)] = t.get()
+                results.update(t.get())
             except Exception:
-                logger.exception("check instance %s alive failed", i.uuid)
+                logger.exception("check instances task %s for cluster %s failed", cls.name, cluster_id)
 
         return results
 
@@ -192,29 +257,30 @@ class CheckQueueStatusMixin:
         )
 
 
-class CheckInstanceQueueStatus(CheckQueueStatusMixin, Task):
+class CheckInstanceQueueStatus(CheckQueueStatusMixin, CheckClusterInstances):
     @dataclass
     class Result(InstanceResult):
         queues: "List[CheckInstanceQueueStatus.QueueStatus]"
 
     @classmethod
-    def apply(cls, instance: "ServiceInstance") -> "CheckInstanceQueueStatus.Result":
-        logger.debug("checking rabbitmq instance %s queue status", instance)
-
-        helper = InstanceHelper(instance)
-        cluster = helper.get_cluster()
-        credentials = helper.get_credentials()
-        client = Client.from_cluster(cluster)
-        vhost = credentials.vhost
-        status = []
+    def scrape(cls, client: "Client") -> "Dict[str, List[dict]]":
+        queues = defaultdict(list)
+        for queue in client.queue.list(show_all=True, page_size=settings.RABBITMQ_MANAGEMENT_API_PAGE_SIZE):
+            queues[queue.get("vhost")].append(queue)
+        return queues
 
-        for queue in client.queue.list(vhost):
+    @classmethod
+    def check(
+        cls, client: "Client", cluster_id: "int", instance: "ServiceInstance", vhost: "str", scraped: "Any"
+    ) -> "CheckInstanceQueueStatus.Result":
+        status = []
+        for queue in scraped.get(vhost, []):
             try:
                 status.append(cls.get_queue_status(queue))
             except Exception:
                 logger.exception("collecting queue status %s failed", queue)
 
-        return cls.Result(queues=status, cluster_id=cluster.id, instance_id=instance.pk, vhost=vhost)
+        return cls.Result(queues=status, cluster_id=cluster_id, instance_id=instance.pk, vhost=vhost)
 
 
 class CronCheckInstancesQueueStatus(CheckInstancesCronTask):
@@ -222,27 +288,30 @@ class CronCheckInstancesQueueStatus(CheckInstancesCronTask):
     name = "queue status"
 
 
-class CheckInstanceDLXQueueStatus(CheckQueueStatusMixin, Task):
+class CheckInstanceDLXQueueStatus(CheckQueueStatusMixin, CheckClusterInstances):
+    queue_name = settings.RABBITMQ_DEFAULT_DEAD_LETTER_QUEUE
+
     @dataclass
     class Result(InstanceResult):
         status: "CheckInstanceDLXQueueStatus.QueueStatus"
 
     @classmethod
-    def apply(
-        cls,
-        instance: "ServiceInstance",
-        name: "str" = settings.RABBITMQ_DEFAULT_DEAD_LETTER_QUEUE,
+    def scrape(cls, client: "Client") -> "Dict[str, dict]":
+        # 管理接口的 name 参数为模糊匹配，需要在本地再精确过滤一次
+        queues = client.queue.list(
+            show_all=True, name=cls.queue_name, page_size=settings.RABBITMQ_MANAGEMENT_API_PAGE_SIZE
+        )
+        return {queue.get("vhost"): queue for queue in queues if queue.get("name") == cls.queue_name}
+
+    @classmethod
+    def check(
+        cls, client: "Client", cluster_id: "int", instance: "ServiceInstance", vhost: "str", scraped: "Any"
     ) -> "Optional[CheckInstanceDLXQueueStatus.Result]":
-        helper = InstanceHelper(instance)
-        cluster = helper.get_cluster()
-        credentials = helper.get_credentials()
-        client = Client.from_cluster(cluster)
-        try:
-            queue = client.queue.get(name, credentials.vhost)
-        except ResourceNotFound:
+        queue = scraped.get(vhost)
+        if queue is None:
             return None
         status = cls.get_queue_status(queue)
-        return cls.Result(status=status, cluster_id=cluster.id, instance_id=instance.pk, vhost=credentials.vhost)
+        return cls.Result(status=status, cluster_id=cluster_id, instance_id=instance.pk, vhost=vhost)
 
 
 class CronCheckInstanceDLXQueueStatus(CheckInstancesCronTask):
@@ -264,7 +333,7 @@ class CheckClusterConnectionStatus(Task):
     def apply(cls, cluster: "Cluster") -> "List[CronCheckInstanceConnectionStatus.ConnectionStatus]":
         logger.debug("checking rabbitmq connections status for cluster %s", cluster.name)
         connections = defaultdict(Counter)
-        client = Client.from_cluster(cluster)
+        client = cluster_clients.get(cluster)
         for connection in client.connection.list():
             state = connection.get("state", "unknown")
             connections[connection["vhost"]].update([state])
@@ -294,14 +363,8 @@ class CronCheckInstanceConnectionStatus(Task):
 
     @classmethod
     def apply(cls):
-        grouped_instances = defaultdict(dict)
-        for i in ServiceInstance.objects.filter(to_be_deleted=False):
-            helper = InstanceHelper(i)
-            credentials = helper.get_credentials()
-            grouped_instances[helper.get_cluster_id()][credentials.vhost] = i
-
         results = {}
-        for cluster_id, instances in grouped_instances.items():
+        for cluster_id, instances in group_instances_by_cluster().items():
             try:
                 status = CheckClusterConnectionStatus.apply(Cluster.objects.get(pk=cluster_id))
             except Exception:
@@ -327,32 +390,27 @@ class CronCheckInstanceConnectionStatus(Task):
         return results
 
 
-class CheckInstanceLimits(Task):
+class CheckInstanceLimits(CheckClusterInstances):
     @dataclass
     class Result(InstanceResult):
         connections: "float"
         queues: "float"
 
     @classmethod
-    def apply(cls, instance: "ServiceInstance") -> "CheckInstanceLimits.Result":
-        logger.debug("checking rabbitmq instance %s if is alive", instance)
-        helper = InstanceHelper(instance)
-        cluster = helper.get_cluster()
-        credentials = helper.get_credentials()
-        client = Client.from_cluster(cluster)
-        vhost = credentials.vhost
-        connections, queues = inf, inf
-
-        for policy in client.limit_policy.get(vhost):
-            if policy["vhost"] == vhost:
-                value = policy["value"]
-                connections = value.get("max-connections", inf)
-                queues = value.get("max-queues", inf)
-                break
+    def scrape(cls, client: "Client") -> "Dict[str, dict]":
+        return {policy["vhost"]: policy["value"] for policy in client.limit_policy.list()}
+
+    @classmethod
+    def check(
+        cls, client: "Client", cluster_id: "int", instance: "ServiceInstance", vhost: "str", scraped: "Any"
+    ) -> "CheckInstanceLimits.Result":
+        value = scraped.get(vhost, {})
+        connections = value.get("max-connections", inf)
+        queues = value.get("max-queues", inf)
 
         return cls.Result(
             instance_id=instance.pk,
-            cluster_id=cluster.id,
+            cluster_id=cluster_id,
             vhost=vhost,
             connections=connections,
             queues=queues,
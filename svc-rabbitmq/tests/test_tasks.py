@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from uuid import uuid4
+
+from tasks.tasks import (
+    CheckInstanceAlive,
+    CheckInstanceDLXQueueStatus,
+    CheckInstanceLimits,
+    CheckInstanceQueueStatus,
+)
+from vendor.client import API
+
+
+def make_instance() -> MagicMock:
+    instance = MagicMock()
+    instance.pk = instance.uuid = uuid4()
+    return instance
+
+
+class TestCheckClusterInstances:
+    def test_queue_status_partitioned_by_vhost(self, mock_client):
+        mock_client.queue.list.return_value = [
+            {"name": "q1", "vhost": "vh1", "messages": 1},
+            {"name": "q2", "vhost": "vh1", "messages": 2},
+            {"name": "q3", "vhost": "vh2", "messages": 3},
+        ]
+        instance_1, instance_2, instance_3 = make_instance(), make_instance(), make_instance()
+
+        scraped = CheckInstanceQueueStatus.scrape(mock_client)
+        result_1 = CheckInstanceQueueStatus.check(mock_client, 1, instance_1, "vh1", scraped)
+        result_2 = CheckInstanceQueueStatus.check(mock_client, 1, instance_2, "vh2", scraped)
+        result_3 = CheckInstanceQueueStatus.check(mock_client, 1, instance_3, "vh3", scraped)
+
+        assert mock_client.queue.list.call_count == 1
+        assert [q.name for q in result_1.queues] == ["q1", "q2"]
+        assert [q.messages for q in result_2.queues] == [3]
+        assert result_3.queues == []
+
+    def test_dlx_queue_exact_match(self, mock_client):
+        name = CheckInstanceDLXQueueStatus.queue_name
+        mock_client.queue.list.return_value = [
+            {"name": name, "vhost": "vh1", "messages": 1},
+            {"name": f"{name}.backup", "vhost": "vh2", "messages": 2},
+        ]
+
+        scraped = CheckInstanceDLXQueueStatus.scrape(mock_client)
+
+        assert CheckInstanceDLXQueueStatus.check(mock_client, 1, make_instance(), "vh1", scraped).status.messages == 1
+        assert CheckInstanceDLXQueueStatus.check(mock_client, 1, make_instance(), "vh2", scraped) is None
+
+    def test_limits(self, mock_client):
+        mock_client.limit_policy.list.return_value = [{"vhost": "vh1", "value": {"max-connections": 10}}]
+
+        scraped = CheckInstanceLimits.scrape(mock_client)
+        result_1 = CheckInstanceLimits.check(mock_client, 1, make_instance(), "vh1", scraped)
+        result_2 = CheckInstanceLimits.check(mock_client, 1, make_instance(), "vh2", scraped)
+
+        assert (result_1.connections, result_1.queues) == (10, float("inf"))
+        assert (result_2.connections, result_2.queues) == (float("inf"), float("inf"))
+
+    def test_alive_checked_concurrently(self, mock_client, settings):
+        settings.RABBITMQ_MANAGEMENT_API_MAX_INFLIGHT = 2
+        lock = threading.Lock()
+        inflight, peak = 0, 0
+
+        def alive(vhost):
+            nonlocal inflight, peak
+            with lock:
+                inflight += 1
+                peak = max(peak, inflight)
+            time.sleep(0.05)
+            with lock:
+                inflight -= 1
+            return vhost != "vh3"
+
+        mock_client.alive.side_effect = alive
+        instances = {f"vh{i}": make_instance() for i in range(6)}
+        with patch("tasks.tasks.Cluster"), patch("tasks.tasks.cluster_clients.get", return_value=mock_client):
+            results = CheckInstanceAlive.apply(1, instances)
+
+        # The checks overlap, but never exceed the limit of the cluster
+        assert peak == 2
+        assert {r.vhost: r.ok for r in results.values()} == {f"vh{i}": i != 3 for i in range(6)}
+
+
+def test_api_max_inflight():
+    api = API("http://127.0.0.1:15672/api/", "admin", "password", verify=None, cert=None, timeout=1, max_inflight=2)
+    lock = threading.Lock()
+    inflight, peak = 0, 0
+
+    def fake_request(*args, **kwargs):
+        nonlocal inflight, peak
+        with lock:
+            inflight += 1
+            peak = max(peak, inflight)
+        time.sleep(0.05)
+        with lock:
+            inflight -= 1
+
+    with patch("amqpstorm.management.http_client.HTTPClient._request", side_effect=fake_request):
+        threads = [threading.Thread(target=api.get, args=("overview",)) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    assert peak == 2
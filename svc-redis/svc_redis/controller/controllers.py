@@ -16,13 +16,13 @@
 # to the current version of the project delivered to anyone in the future.
 
 import logging
-import time
 from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING
 
 from svc_redis.cluster.models import TencentCLBListener
 from svc_redis.resources.base.base import get_client_by_cluster_name
 from svc_redis.resources.base.crd import KServiceMonitor, Redis, RedisReplication
+from svc_redis.resources.base.exceptions import WaitResourceTimeout
 from svc_redis.resources.base.kres import KNamespace, KSecret, KService, KStatefulSet
 from svc_redis.vendor.redis_crd.constants import DEFAULT_REDIS_PORT, RedisType
 
@@ -156,32 +156,28 @@ class RedisInstanceController:
         因此通过 StatefulSet 就绪副本数，判断 Redis 实例状态，而不是 Redis Ping
         paas apiserver 侧超时时间为 5 分钟， 故此函数默认设置了 4 分钟的超时时间
 
-        :param wait_seconds: 最大等待 Redis 就绪的总时间（秒）
+        通过 watch StatefulSet 等待就绪，副本就绪时立即返回，无需轮询
+
+        :param timeout_seconds: 最大等待 Redis 就绪的总时间（秒）
         :raises RedisReadinessTimeout: 如果超过最大时间仍未就绪，则抛出该异常
         """
-        last_exc = None
-        deadline = time.monotonic() + timeout_seconds
-
-        poll_interval = 0.5
-        while deadline > time.monotonic():
-            try:
-                sts: ResourceInstance | None = KStatefulSet(self.client).get(
-                    name=generate_redis_name(), namespace=self.namespace
-                )
-
-                status: ResourceField | None = getattr(sts, "status", None)
-                replicas = getattr(status, "replicas", 0) or 0
-                ready_replicas = getattr(status, "readyReplicas", 0) or 0
-
-                if replicas > 0 and replicas == ready_replicas:
-                    return
-            except Exception as e:  # noqa: BLE001
-                last_exc = e
-                logger.debug("Error while checking Redis status, %s", e)
-            time.sleep(poll_interval)
-            poll_interval = min(poll_interval * 2, 4)
-
-        raise RedisReadinessTimeout from last_exc
+        try:
+            KStatefulSet(self.client).wait_for(
+                name=generate_redis_name(),
+                predicate=_is_statefulset_ready,
+                namespace=self.namespace,
+                timeout=timeout_seconds,
+            )
+        except WaitResourceTimeout as e:
+            raise RedisReadinessTimeout from e
+
+
+def _is_statefulset_ready(sts: "ResourceInstance | None") -> bool:
+    """StatefulSet 的副本是否全部就绪"""
+    status: ResourceField | None = getattr(sts, "status", None)
+    replicas = getattr(status, "replicas", 0) or 0
+    ready_replicas = getattr(status, "readyReplicas", 0) or 0
+    return replicas > 0 and replicas == ready_replicas
 
 
 class ServiceExporter(ABC):
@@ -58,6 +58,12 @@ class CreateServiceAccountTimeout(KubeException):
         KubeException.__init__(self, msg, *args, **kwargs)
 
 
+class WaitResourceTimeout(KubeException):
+    def __init__(self, resource_type, namespace, name, timeout, *args, **kwargs):
+        msg = f"{resource_type}<{namespace}/{name}> did not reach the expected state in {timeout} seconds"
+        super().__init__(msg, *args, **kwargs)
+
+
 class ResourceMissing(KubeException):
     def __init__(self, namespace, name, *args, **kwargs):
         msg = "Resource: <%s/%s> missing" % (namespace, name)
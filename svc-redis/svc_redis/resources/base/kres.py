@@ -20,6 +20,7 @@
 import functools
 import json
 import logging
+import math
 import time
 from contextlib import contextmanager
 from datetime import datetime
@@ -42,6 +43,7 @@ from .exceptions import (
     ReadTargetStatusTimeout,
     ResourceDeleteTimeout,
     ResourceMissing,
+    WaitResourceTimeout,
 )
 from .kube_client import CoreDynamicClient
 
@@ -172,6 +174,7 @@ class BaseKresource:
     update_subres = NameBasedMethodProxy()
     patch_subres = NameBasedMethodProxy()
     update_status = NameBasedMethodProxy()
+    wait_for = NameBasedMethodProxy()
 
     @classmethod
     def clone_from(cls, obj: "BaseKresource") -> "BaseKresource":
@@ -442,6 +445,69 @@ class NameBasedOperations(BaseOperations):
         """Update a resource's status field"""
         return functools.partial(self.update_subres, "status")(*args, **kwargs)
 
+    def wait_for(
+        self,
+        name: str,
+        predicate: Callable[[Optional[ResourceInstance]], bool],
+        namespace: Namespace = None,
+        timeout: Optional[float] = None,
+        watch_window: int = 60,
+        retry_interval: float = 1,
+    ) -> Optional[ResourceInstance]:
+        """Calling this function will blocks until the resource satisfies `predicate`.
+
+        Instead of polling, the resource is listed(selected by name) once to get its current state
+        and resourceVersion, then watched from that version, `predicate` is checked on every event.
+        When the watched version is too old(410 Gone), the resource will be listed again.
+
+        :param predicate: receives the latest resource, or None if the resource does not exist
+        :param timeout: timeout seconds for this join operation, default to never timeout
+        :param watch_window: the maximum seconds of a single watch request
+        :param retry_interval: wait interval before relisting when an unexpected error occurred
+        :return: the resource which satisfies `predicate`
+        :raises: WaitResourceTimeout if the resource is not satisfied in given timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        field_selector = f"metadata.name={name}"
+        resource_version: Optional[str] = None
+        last_exc: Optional[Exception] = None
+
+        while deadline is None or time.monotonic() < deadline:
+            try:
+                if resource_version is None:
+                    objs = KubeObjectList(
+                        self.resource.get(namespace=namespace, field_selector=field_selector, **self.default_kwargs)
+                    )
+                    obj = objs.items[0] if objs.items else None
+                    if predicate(obj):
+                        return obj
+                    resource_version = objs.metadata.resourceVersion
+
+                window = watch_window if deadline is None else min(watch_window, deadline - time.monotonic())
+                for event in self.resource.watch(
+                    namespace=namespace,
+                    field_selector=field_selector,
+                    resource_version=resource_version,
+                    timeout=max(math.ceil(window), 1),
+                ):
+                    resource_version = event["object"].metadata.resourceVersion
+                    obj = None if event["type"] == "DELETED" else event["object"]
+                    if predicate(obj):
+                        return obj
+            except Exception as e:  # noqa: BLE001
+                resource_version = None
+                if isinstance(e, ApiException) and e.status == 410:
+                    logger.info("resourceVersion of %s %s is too old, relisting", self.kres.kind, name)
+                    continue
+
+                last_exc = e
+                logger.warning("Error while waiting for %s %s: %s", self.kres.kind, name, e)
+                time.sleep(retry_interval)
+
+        raise WaitResourceTimeout(
+            resource_type=self.kres.kind, namespace=namespace, name=name, timeout=timeout
+        ) from last_exc
+
     def _add_resource_version(self, name: str, namespace: Namespace, body_dict: dict):
         """get resource from k8s, and set metadata.resourceVersion to body_dict
 
@@ -552,22 +618,18 @@ class KNode(BaseKresource):
 class KNamespace(BaseKresource):
     kind = "Namespace"
 
-    def wait_for_default_sa(self, namespace: Namespace, timeout: Optional[float] = None, check_period: float = 0.5):
+    def wait_for_default_sa(self, namespace: Namespace, timeout: Optional[float] = None):
         """Calling this function will blocks until the default ServiceAccount was created
 
         :param timeout: timeout seconds for this join operation, default to never timeout
-        :param check_period: wait interval for polling
         :raises: CreateServiceAccountTimeout if sa unable to appears in given timeout
         """
-        time_started = time.time()
-        while timeout is None or time.time() - time_started < timeout:
-            if self.default_sa_exists(namespace):
-                return
-
-            logger.warning("No default ServiceAccount found in namespace %s", namespace)
-            time.sleep(check_period)
-
-        raise CreateServiceAccountTimeout(namespace=namespace, timeout=timeout)
+        try:
+            KServiceAccount.clone_from(self).wait_for(
+                "default", lambda sa: sa is not None, namespace=namespace, timeout=timeout
+            )
+        except WaitResourceTimeout as e:
+            raise CreateServiceAccountTimeout(namespace=namespace, timeout=timeout) from e
 
     def wait_until_removed(
         self,
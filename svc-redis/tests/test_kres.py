@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+# TencentBlueKing is pleased to support the open source community by making
+# 蓝鲸智云 - PaaS 平台 (BlueKing - PaaS System) available.
+# Copyright (C) Tencent. All rights reserved.
+# Licensed under the MIT License (the "License"); you may not use this file except
+# in compliance with the License. You may obtain a copy of the License at
+#
+#     http://opensource.org/licenses/MIT
+#
+# Unless required by applicable law or agreed to in writing, software distributed under
+# the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND,
+# either express or implied. See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# We undertake not to change the open source license (MIT license) applicable
+# to the current version of the project delivered to anyone in the future.
+
+from unittest import mock
+
+import pytest
+from kubernetes.client.exceptions import ApiException
+from kubernetes.dynamic.resource import ResourceInstance
+from svc_redis.resources.base.exceptions import WaitResourceTimeout
+from svc_redis.resources.base.kres import NameBasedOperations
+
+
+def make_sts(resource_version: str, replicas: int, ready_replicas: int) -> dict:
+    return {
+        "apiVersion": "apps/v1",
+        "kind": "StatefulSet",
+        "metadata": {"name": "redis", "resourceVersion": resource_version},
+        "status": {"replicas": replicas, "readyReplicas": ready_replicas},
+    }
+
+
+def make_list(resource_version: str, *items: dict) -> ResourceInstance:
+    return ResourceInstance(
+        None,
+        {
+            "apiVersion": "apps/v1",
+            "kind": "StatefulSetList",
+            "metadata": {"resourceVersion": resource_version},
+            "items": items,
+        },
+    )
+
+
+def make_event(type_: str, sts: dict) -> dict:
+    return {"type": type_, "object": ResourceInstance(None, sts)}
+
+
+def is_ready(sts) -> bool:
+    return sts is not None and sts.status.replicas == sts.status.readyReplicas
+
+
+@pytest.fixture()
+def ops() -> NameBasedOperations:
+    ops = NameBasedOperations.__new__(NameBasedOperations)
+    ops.kres = mock.MagicMock(kind="StatefulSet")
+    ops.request_timeout = None
+    ops.resource = mock.MagicMock()
+    return ops
+
+
+class TestWaitFor:
+    def test_ready_when_listing(self, ops):
+        ops.resource.get.return_value = make_list("1", make_sts("1", 1, 1))
+
+        assert ops.wait_for("redis", is_ready, namespace="default", timeout=5).metadata.resourceVersion == "1"
+        ops.resource.watch.assert_not_called()
+
+    def test_watch_from_list_version(self, ops):
+        ops.resource.get.return_value = make_list("1", make_sts("1", 1, 0))
+        ops.resource.watch.return_value = iter(
+            [make_event("MODIFIED", make_sts("2", 1, 0)), make_event("MODIFIED", make_sts("3", 1, 1))]
+        )
+
+        assert ops.wait_for("redis", is_ready, namespace="default", timeout=5).metadata.resourceVersion == "3"
+        assert ops.resource.get.call_count == 1
+        watch_kwargs = ops.resource.watch.call_args.kwargs
+        assert watch_kwargs["resource_version"] == "1"
+        assert watch_kwargs["field_selector"] == "metadata.name=redis"
+
+    def test_relist_on_gone(self, ops):
+        ops.resource.get.side_effect = [make_list("1"), make_list("5", make_sts("5", 1, 1))]
+        ops.resource.watch.side_effect = ApiException(status=410, reason="Expired")
+
+        assert ops.wait_for("redis", is_ready, namespace="default", timeout=5).metadata.resourceVersion == "5"
+        assert ops.resource.get.call_count == 2
+
+    def test_timeout(self, ops):
+        ops.resource.get.return_value = make_list("1")
+        ops.resource.watch.side_effect = lambda **kwargs: iter([])
+
+        with pytest.raises(WaitResourceTimeout):
+            ops.wait_for("redis", is_ready, namespace="default", timeout=0.1)